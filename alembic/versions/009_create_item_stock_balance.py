@@ -0,0 +1,37 @@
+"""create item_stock_balance table and backfill it from stock_movements
+
+Revision ID: 009_create_item_stock_balance
+Revises: 008_add_price_fields_to_items
+Create Date: 2025-04-12 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '009_create_item_stock_balance'
+down_revision = '008_add_price_fields_to_items'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('item_stock_balance',
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('qty_on_hand', sa.Numeric(precision=18, scale=4), nullable=False),
+        sa.Column('value_on_hand', sa.Numeric(precision=18, scale=0), nullable=False),
+        sa.Column('last_movement_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['item_id'], ['items.id'], ),
+        sa.PrimaryKeyConstraint('item_id')
+    )
+
+    # مقداردهی اولیه از روی تحرکات موجود
+    op.execute("""
+        INSERT INTO item_stock_balance (item_id, qty_on_hand, value_on_hand, last_movement_id)
+        SELECT item_id, SUM(qty), SUM(total_cost), MAX(id)
+        FROM stock_movements
+        GROUP BY item_id
+    """)
+
+def downgrade():
+    op.drop_table('item_stock_balance')
@@ -0,0 +1,36 @@
+"""create stock_cost_layers table for FIFO costing
+
+فقط ساختار — value_on_hand در 009 از جمع total_cost ساخته شده که برای خروجی‌های قدیمی قیمت فروش
+است؛ پس از ارتقا بها را بازپردازش کنید:  python -m app.cli cost-replay
+
+Revision ID: 010_create_stock_cost_layers
+Revises: 009_create_item_stock_balance
+Create Date: 2025-04-13 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '010_create_stock_cost_layers'
+down_revision = '009_create_item_stock_balance'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('stock_cost_layers',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('movement_id', sa.Integer(), nullable=False),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.Column('qty_remaining', sa.Numeric(precision=18, scale=4), nullable=False),
+        sa.Column('unit_cost', sa.Numeric(precision=18, scale=4), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['item_id'], ['items.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stock_cost_layers_item_id'), 'stock_cost_layers', ['item_id'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_stock_cost_layers_item_id'), table_name='stock_cost_layers')
+    op.drop_table('stock_cost_layers')
@@ -0,0 +1,41 @@
+"""add composite indexes for the hot query shapes
+
+Revision ID: 011_add_hot_query_indexes
+Revises: 010_create_stock_cost_layers
+Create Date: 2025-04-14 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '011_add_hot_query_indexes'
+down_revision = '010_create_stock_cost_layers'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # stock_movements — تحرکات یک سند، تاریخچه یک کالا، بازه دوره
+    op.create_index('ix_stock_movements_reference', 'stock_movements', ['reference_type', 'reference_id'], unique=False)
+    op.create_index('ix_stock_movements_item_created', 'stock_movements', ['item_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_stock_movements_created_at'), 'stock_movements', ['created_at'], unique=False)
+
+    # journal_lines — گردش یک حساب
+    op.create_index(op.f('ix_journal_lines_ledger_account_id'), 'journal_lines', ['ledger_account_id'], unique=False)
+
+    # checks — چک‌های یک وضعیت به ترتیب سررسید + مرتب‌سازی لیست
+    op.create_index('ix_checks_status_due_date', 'checks', ['status', 'due_date'], unique=False)
+    op.create_index(op.f('ix_checks_due_date'), 'checks', ['due_date'], unique=False)
+    # با foreign_keys=ON، حذف هر فاکتور چک‌های مرتبط را جستجو می‌کند
+    op.create_index(op.f('ix_checks_related_invoice_id'), 'checks', ['related_invoice_id'], unique=False)
+
+    # آمار برنامه‌ریز SQLite برای انتخاب درست ایندکس‌ها
+    op.execute("ANALYZE")
+
+def downgrade():
+    op.drop_index(op.f('ix_checks_related_invoice_id'), table_name='checks')
+    op.drop_index(op.f('ix_checks_due_date'), table_name='checks')
+    op.drop_index('ix_checks_status_due_date', table_name='checks')
+    op.drop_index(op.f('ix_journal_lines_ledger_account_id'), table_name='journal_lines')
+    op.drop_index(op.f('ix_stock_movements_created_at'), table_name='stock_movements')
+    op.drop_index('ix_stock_movements_item_created', table_name='stock_movements')
+    op.drop_index('ix_stock_movements_reference', table_name='stock_movements')
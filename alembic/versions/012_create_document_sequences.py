@@ -0,0 +1,35 @@
+"""create document_sequences table for invoice serial allocation
+
+Revision ID: 012_create_document_sequences
+Revises: 011_add_hot_query_indexes
+Create Date: 2025-04-15 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '012_create_document_sequences'
+down_revision = '011_add_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('document_sequences',
+        sa.Column('prefix', sa.String(length=10), nullable=False),
+        sa.Column('fiscal_year', sa.Integer(), nullable=False),
+        sa.Column('next_number', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('prefix', 'fiscal_year')
+    )
+
+    # ادامه شماره‌گذاری از بزرگ‌ترین شماره فعلی هر پیشوند در هر سال شمسی
+    op.execute("""
+        INSERT INTO document_sequences (prefix, fiscal_year, next_number)
+        SELECT serial, CAST(substr(date_jalali, 1, 4) AS INTEGER), MAX(number) + 1
+        FROM invoices
+        GROUP BY serial, substr(date_jalali, 1, 4)
+    """)
+
+def downgrade():
+    op.drop_table('document_sequences')
@@ -0,0 +1,38 @@
+"""link stock movements to their invoice line
+
+Revision ID: 013_add_stock_movement_invoice_line
+Revises: 012_create_document_sequences
+Create Date: 2025-04-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '013_add_stock_movement_invoice_line'
+down_revision = '012_create_document_sequences'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('stock_movements', sa.Column('invoice_line_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_stock_movements_invoice_line_id'), 'stock_movements', ['invoice_line_id'], unique=False)
+
+    # پر کردن برای داده‌های قبلی — فقط جایی که کالا در فاکتور یک خط و یک تحرک دارد و تطبیق قطعی است؛
+    # فاکتورهای باقی‌مانده در اولین ویرایش به روش قبلی (حذف و ایجاد مجدد خطوط) بازسازی می‌شوند
+    op.execute("""
+        UPDATE stock_movements SET invoice_line_id = (
+            SELECT l.id FROM invoice_lines l
+            WHERE l.invoice_id = stock_movements.reference_id AND l.item_id = stock_movements.item_id
+        )
+        WHERE reference_type = 'invoice'
+          AND (SELECT COUNT(*) FROM invoice_lines l
+               WHERE l.invoice_id = stock_movements.reference_id AND l.item_id = stock_movements.item_id) = 1
+          AND (SELECT COUNT(*) FROM stock_movements m
+               WHERE m.reference_type = 'invoice' AND m.reference_id = stock_movements.reference_id
+                 AND m.item_id = stock_movements.item_id) = 1
+    """)
+
+def downgrade():
+    op.drop_index(op.f('ix_stock_movements_invoice_line_id'), table_name='stock_movements')
+    with op.batch_alter_table('stock_movements') as batch_op:
+        batch_op.drop_column('invoice_line_id')
@@ -0,0 +1,37 @@
+"""add materialized path to ledger accounts for balance rollup
+
+Revision ID: 014_add_ledger_account_path
+Revises: 013_add_stock_movement_invoice_line
+Create Date: 2025-04-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '014_add_ledger_account_path'
+down_revision = '013_add_stock_movement_invoice_line'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('ledger_accounts', sa.Column('path', sa.String(length=255), nullable=True))
+    op.create_index(op.f('ix_ledger_accounts_path'), 'ledger_accounts', ['path'], unique=False)
+
+    # مسیر حساب‌های موجود از روی parent_id — یک CTE بازگشتی، فقط همین یک بار
+    op.execute("""
+        WITH RECURSIVE tree(id, path) AS (
+            SELECT id, '/' || id || '/' FROM ledger_accounts WHERE parent_id IS NULL
+            UNION ALL
+            SELECT a.id, tree.path || a.id || '/' FROM ledger_accounts a JOIN tree ON a.parent_id = tree.id
+        )
+        UPDATE ledger_accounts SET path = (SELECT path FROM tree WHERE tree.id = ledger_accounts.id)
+    """)
+
+    # مانده طرف‌حساب‌ها — ایندکس پوششی، جمع بدون خواندن ردیف‌های جدول
+    op.create_index('ix_journal_lines_party_balance', 'journal_lines', ['party_id', 'debit', 'credit'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_journal_lines_party_balance', table_name='journal_lines')
+    op.drop_index(op.f('ix_ledger_accounts_path'), table_name='ledger_accounts')
+    with op.batch_alter_table('ledger_accounts') as batch_op:
+        batch_op.drop_column('path')
@@ -0,0 +1,54 @@
+"""create ledger_period_balances table and backfill it from posted journal lines
+
+Revision ID: 015_create_ledger_period_balances
+Revises: 014_add_ledger_account_path
+Create Date: 2025-04-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '015_create_ledger_period_balances'
+down_revision = '014_add_ledger_account_path'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('ledger_period_balances',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        sa.Column('party_id', sa.Integer(), nullable=False),
+        sa.Column('period', sa.String(length=7), nullable=False),
+        sa.Column('debit_total', sa.Numeric(precision=18, scale=0), nullable=False),
+        sa.Column('credit_total', sa.Numeric(precision=18, scale=0), nullable=False),
+        sa.Column('closing_balance', sa.Numeric(precision=18, scale=0), nullable=False),
+        sa.Column('is_closed', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['account_id'], ['ledger_accounts.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('account_id', 'party_id', 'period', name='uq_ledger_period_balance')
+    )
+    op.create_index(op.f('ix_ledger_period_balances_id'), 'ledger_period_balances', ['id'], unique=False)
+    op.create_index(op.f('ix_ledger_period_balances_period'), 'ledger_period_balances', ['period'], unique=False)
+
+    # مقداردهی اولیه از اسناد ثبت‌شده — مانده تجمعی با تابع پنجره‌ای؛ هیچ دوره‌ای بسته نیست
+    op.execute("""
+        INSERT INTO ledger_period_balances
+            (account_id, party_id, period, debit_total, credit_total, closing_balance, is_closed)
+        SELECT account_id, party_id, period, debit_total, credit_total,
+               SUM(debit_total - credit_total) OVER (PARTITION BY account_id, party_id ORDER BY period),
+               FALSE
+        FROM (
+            SELECT l.ledger_account_id AS account_id, COALESCE(l.party_id, 0) AS party_id, e.period AS period,
+                   SUM(COALESCE(l.debit, 0)) AS debit_total, SUM(COALESCE(l.credit, 0)) AS credit_total
+            FROM journal_lines l JOIN journal_entries e ON e.id = l.journal_entry_id
+            WHERE e.posted = TRUE
+            GROUP BY l.ledger_account_id, COALESCE(l.party_id, 0), e.period
+        ) AS totals
+    """)
+
+def downgrade():
+    op.drop_index(op.f('ix_ledger_period_balances_period'), table_name='ledger_period_balances')
+    op.drop_index(op.f('ix_ledger_period_balances_id'), table_name='ledger_period_balances')
+    op.drop_table('ledger_period_balances')
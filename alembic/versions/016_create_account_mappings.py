@@ -0,0 +1,34 @@
+"""create account_mappings table and make journal sources unique
+
+Revision ID: 016_create_account_mappings
+Revises: 015_create_ledger_period_balances
+Create Date: 2025-04-22 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '016_create_account_mappings'
+down_revision = '015_create_ledger_period_balances'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('account_mappings',
+        sa.Column('key', sa.String(length=50), nullable=False),
+        sa.Column('ledger_account_id', sa.Integer(), nullable=False),
+        sa.Column('description', sa.String(length=200), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['ledger_account_id'], ['ledger_accounts.id'], ),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+    # ثبت خودکار تکراری‌ناپذیر — هر (source_type, source_id) یک سند؛ سندهای دستی مستثنا
+    op.create_index('uq_journal_entries_source', 'journal_entries', ['source_type', 'source_id'], unique=True,
+                    sqlite_where=sa.text("source_type != 'adjustment'"),
+                    postgresql_where=sa.text("source_type != 'adjustment'"))
+
+def downgrade():
+    op.drop_index('uq_journal_entries_source', table_name='journal_entries')
+    op.drop_table('account_mappings')
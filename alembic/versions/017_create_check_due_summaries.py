@@ -0,0 +1,43 @@
+"""create check_due_summaries table and backfill it from pending checks
+
+Revision ID: 017_create_check_due_summaries
+Revises: 016_create_account_mappings
+Create Date: 2025-04-24 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '017_create_check_due_summaries'
+down_revision = '016_create_account_mappings'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('check_due_summaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('due_date', sa.Date(), nullable=False),
+        sa.Column('bank_account_id', sa.Integer(), nullable=False),
+        sa.Column('direction', sa.String(length=20), nullable=False),
+        sa.Column('check_count', sa.Integer(), nullable=False),
+        sa.Column('total_amount', sa.Numeric(precision=18, scale=0), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['bank_account_id'], ['bank_accounts.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('due_date', 'bank_account_id', 'direction', name='uq_check_due_summary')
+    )
+    op.create_index(op.f('ix_check_due_summaries_id'), 'check_due_summaries', ['id'], unique=False)
+
+    # مقداردهی اولیه از چک‌های در جریان
+    op.execute("""
+        INSERT INTO check_due_summaries (due_date, bank_account_id, direction, check_count, total_amount)
+        SELECT due_date, bank_account_id, direction, COUNT(*), SUM(amount)
+        FROM checks
+        WHERE status IN ('registered', 'issued', 'in_hand', 'deposited')
+        GROUP BY due_date, bank_account_id, direction
+    """)
+
+def downgrade():
+    op.drop_index(op.f('ix_check_due_summaries_id'), table_name='check_due_summaries')
+    op.drop_table('check_due_summaries')
@@ -0,0 +1,34 @@
+"""create append-only check_status_history table
+
+Revision ID: 018_create_check_status_history
+Revises: 017_create_check_due_summaries
+Create Date: 2025-04-26 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '018_create_check_status_history'
+down_revision = '017_create_check_due_summaries'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('check_status_history',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('check_id', sa.Integer(), nullable=False),
+        sa.Column('event', sa.String(length=20), nullable=False),
+        sa.Column('from_status', sa.String(length=50), nullable=False),
+        sa.Column('to_status', sa.String(length=50), nullable=False),
+        sa.Column('changed_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_check_status_history_id'), 'check_status_history', ['id'], unique=False)
+    op.create_index('ix_check_status_history_check', 'check_status_history', ['check_id', 'id'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_check_status_history_check', table_name='check_status_history')
+    op.drop_index(op.f('ix_check_status_history_id'), table_name='check_status_history')
+    op.drop_table('check_status_history')
@@ -0,0 +1,31 @@
+"""create ledger_closed_periods table and backfill it from closed period balances
+
+Revision ID: 019_create_ledger_closed_periods
+Revises: 018_create_check_status_history
+Create Date: 2025-04-28 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '019_create_ledger_closed_periods'
+down_revision = '018_create_check_status_history'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('ledger_closed_periods',
+        sa.Column('period', sa.String(length=7), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('period')
+    )
+
+    # دوره‌هایی که تاکنون بسته شده‌اند — از ردیف‌های منجمد مانده دوره‌ای
+    op.execute("""
+        INSERT INTO ledger_closed_periods (period)
+        SELECT DISTINCT period FROM ledger_period_balances WHERE is_closed = 1
+    """)
+
+def downgrade():
+    op.drop_table('ledger_closed_periods')
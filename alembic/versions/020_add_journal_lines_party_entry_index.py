@@ -0,0 +1,24 @@
+"""replace the party balance index with one that also covers journal_entry_id
+
+Revision ID: 020_add_journal_lines_party_entry_index
+Revises: 019_create_ledger_closed_periods
+Create Date: 2025-04-29 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '020_add_journal_lines_party_entry_index'
+down_revision = '019_create_ledger_closed_periods'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # مانده طرف‌حساب‌ها فقط از اسناد ثبت‌شده — پیوند با journal_entries هم از روی ایندکس
+    op.create_index('ix_journal_lines_party_entry_balance', 'journal_lines',
+                    ['party_id', 'journal_entry_id', 'debit', 'credit'], unique=False)
+    op.drop_index('ix_journal_lines_party_balance', table_name='journal_lines')
+
+def downgrade():
+    op.create_index('ix_journal_lines_party_balance', 'journal_lines', ['party_id', 'debit', 'credit'], unique=False)
+    op.drop_index('ix_journal_lines_party_entry_balance', table_name='journal_lines')
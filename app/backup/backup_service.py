@@ -1,40 +1,108 @@
 # app/backup/backup_service.py
-import shutil
+import sqlite3
+import tempfile
 import zipfile
 import os
 import datetime
+from app.backup.parallel_zip import DEFAULT_LEVEL, write_parallel_zip
 from app.database import DATABASE_URL
 from app.utils.crypto import encrypt_file
 
+ATTACHMENTS_PATH = "storage/attachments"
+COPY_CHUNK = 1024 * 1024
+
+
+def snapshot_database(db_path, snapshot_path, on_progress=None):
+    """کپی سازگار و آنلاین دیتابیس با backup API خود SQLite
+
+    کل کپی در یک گام و یک تراکنش خواندنی انجام می‌شود: در حالت WAL خواننده نویسنده‌ها را متوقف
+    نمی‌کند و نتیجه تصویر یک لحظه از دیتابیس است. (کپی چندگامی با هر نوشتن هم‌زمان از نو شروع
+    می‌شود و زیر بار ثبت سند ممکن است هرگز تمام نشود.)
+    """
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(snapshot_path)
+    try:
+        progress = None
+        if on_progress:
+            progress = lambda status, remaining, total: on_progress("snapshot", total - remaining, total)
+        source.backup(target, pages=-1, progress=progress)
+    finally:
+        target.close()
+        source.close()
+    return snapshot_path
+
+
+def _backup_entries(db_path, snapshot_path):
+    """(مسیر روی دیسک، نام در zip) — دیتابیس از روی snapshot"""
+    entries = [(snapshot_path, os.path.basename(db_path))] if snapshot_path else []
+    if os.path.exists(ATTACHMENTS_PATH):
+        for root, dirs, files in os.walk(ATTACHMENTS_PATH):
+            for file in files:
+                file_path = os.path.join(root, file)
+                entries.append((file_path, os.path.relpath(file_path, start=".")))
+    return entries
+
+
+def _write_zip(zip_path, entries, on_progress=None, level=DEFAULT_LEVEL, workers=1):
+    """فشرده‌سازی جریانی — پیشرفت بر حسب بایت خوانده‌شده؛ workers > 1 یعنی فشرده‌سازی چندنخی"""
+    workers = workers or os.cpu_count() or 1
+    if workers > 1:
+        progress = (lambda done, total: on_progress("compress", done, total)) if on_progress else None
+        return write_parallel_zip(zip_path, entries, level=level, workers=workers, on_progress=progress)
+    total = sum(os.path.getsize(path) for path, _ in entries)
+    done = 0
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as zipf:
+        for path, arcname in entries:
+            # با نام (نه ZipInfo) روش و سطح فشرده‌سازی از خود ZipFile گرفته می‌شود
+            with open(path, 'rb') as src, zipf.open(arcname, 'w', force_zip64=True) as dst:
+                while chunk := src.read(COPY_CHUNK):
+                    dst.write(chunk)
+                    done += len(chunk)
+                    if on_progress:
+                        on_progress("compress", done, total)
+
+
 class BackupService:
     @staticmethod
-    def create_backup(backup_path="backups", encrypt=False, key=None):
-        """ایجاد بک‌آپ از دیتابیس و پوشه پیوست‌ها"""
+    def create_backup(backup_path="backups", encrypt=False, key=None, on_progress=None,
+                      level=DEFAULT_LEVEL, workers=1):
+        """ایجاد بک‌آپ از دیتابیس و پوشه پیوست‌ها
+
+        دیتابیس ابتدا با backup API در یک snapshot موقت کپی می‌شود و فشرده‌سازی از روی snapshot
+        انجام می‌شود؛ ثبت فاکتور و سند در همین حین مجاز است. on_progress(stage, done, total) با
+        stage یکی از snapshot، compress و encrypt — از نخ اجراکننده صدا زده می‌شود.
+        level سطح deflate (۱ سریع‌ترین، ۹ کوچک‌ترین)؛ workers > 1 (یا None برای همه هسته‌ها)
+        فشرده‌سازی را در بلوک‌های موازی انجام می‌دهد — خروجی همچنان zip معمولی است.
+        """
         if not os.path.exists(backup_path):
             os.makedirs(backup_path)
 
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_file = os.path.join(backup_path, f"backup_{timestamp}.zip")
+        partial = backup_file + ".part"  # تا پایان کار در لیست بک‌آپ‌ها دیده نمی‌شود
 
-        with zipfile.ZipFile(backup_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # بک‌آپ دیتابیس
-            db_path = DATABASE_URL.replace("sqlite:///", "")
+        db_path = DATABASE_URL.replace("sqlite:///", "")
+        with tempfile.TemporaryDirectory(prefix="hg2_backup_", dir=backup_path) as temp_dir:
+            snapshot = None
             if os.path.exists(db_path):
-                zipf.write(db_path, os.path.basename(db_path))
-
-            # بک‌آپ پیوست‌ها (اگر وجود دارد)
-            attachments_path = "storage/attachments"
-            if os.path.exists(attachments_path):
-                for root, dirs, files in os.walk(attachments_path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, start=".")
-                        zipf.write(file_path, arcname)
+                snapshot = snapshot_database(db_path, os.path.join(temp_dir, "snapshot.db"), on_progress)
+            try:
+                _write_zip(partial, _backup_entries(db_path, snapshot), on_progress, level, workers)
+            except BaseException:
+                if os.path.exists(partial):
+                    os.remove(partial)
+                raise
 
         # رمزنگاری اختیاری
         if encrypt and key:
-            encrypted_file = encrypt_file(backup_file, key)
-            os.remove(backup_file)  # حذف فایل اصلی
-            backup_file = encrypted_file
+            total = os.path.getsize(partial)
+            progress = (lambda done: on_progress("encrypt", done, total)) if on_progress else None
+            try:
+                encrypted_part = encrypt_file(partial, key, output_path=backup_file + ".enc.part", on_progress=progress)
+            finally:
+                os.remove(partial)  # حذف فایل اصلی
+            os.replace(encrypted_part, backup_file + ".enc")
+            return backup_file + ".enc"
 
-        return backup_file
\ No newline at end of file
+        os.replace(partial, backup_file)
+        return backup_file
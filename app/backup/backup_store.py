@@ -0,0 +1,270 @@
+# app/backup/backup_store.py
+"""مخزن بک‌آپ افزایشی با حذف تکرار — هر قطعه یکتا فقط یک بار ذخیره می‌شود
+
+ساختار مخزن:
+    config.json              نسخه، اندازه قطعه و (در حالت رمزدار) salt و نمونه بررسی کلید
+    chunks/ab/<شناسه>        قطعه فشرده (zlib) و در صورت رمزدار بودن AES-GCM
+    manifests/<شناسه بک‌آپ>  فهرست فایل‌های یک بک‌آپ و شناسه قطعه‌های هر فایل (با همان بسته‌بندی)
+
+شناسه قطعه SHA-256 محتوای آن است (در مخزن رمزدار HMAC-SHA256 با کلید مخزن، تا محتوا از روی نام
+قطعه قابل حدس نباشد). دیتابیس SQLite صفحه‌ها را در جای خود بازنویسی می‌کند، پس قطعه‌بندی با اندازه
+ثابت بین دو بک‌آپ فقط قطعه‌های صفحه‌های تغییرکرده را جدید می‌کند.
+"""
+import datetime
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import zlib
+from app.backup.backup_service import _backup_entries, snapshot_database
+from app.database import DATABASE_URL
+from app.utils.crypto import KDF_ITERATIONS, DecryptionError, derive_key, seal, unseal
+
+STORE_VERSION = 1
+STORE_CHUNK_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6
+DEFAULT_STORE_PATH = os.path.join("backups", "store")
+_KEY_CHECK = b"hg2-backup-store"
+
+
+class BackupStoreError(Exception):
+    pass
+
+
+class BackupStore:
+    def __init__(self, path=DEFAULT_STORE_PATH, key=None):
+        self.path = path
+        config_path = os.path.join(path, "config.json")
+        if not os.path.exists(config_path):
+            raise BackupStoreError(f"مخزن بک‌آپ یافت نشد: {path} — ابتدا init اجرا شود.")
+        with open(config_path, encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.chunk_size = self.config["chunk_size"]
+        self.aes_key = None
+        if self.config.get("salt"):
+            if not key:
+                raise BackupStoreError("این مخزن رمزدار است؛ کلید لازم است.")
+            self.aes_key = derive_key(key, bytes.fromhex(self.config["salt"]), self.config["iterations"])
+            try:
+                unseal(self.aes_key, bytes.fromhex(self.config["key_check"]), _KEY_CHECK)
+            except DecryptionError:
+                raise BackupStoreError("کلید مخزن بک‌آپ نادرست است.") from None
+
+    @classmethod
+    def init(cls, path=DEFAULT_STORE_PATH, key=None, chunk_size=STORE_CHUNK_SIZE):
+        """ساخت مخزن خالی — با key همه قطعه‌ها و فهرست‌ها رمز می‌شوند"""
+        if os.path.exists(os.path.join(path, "config.json")):
+            raise BackupStoreError(f"مخزن بک‌آپ از قبل وجود دارد: {path}")
+        os.makedirs(os.path.join(path, "chunks"), exist_ok=True)
+        os.makedirs(os.path.join(path, "manifests"), exist_ok=True)
+        config = {"version": STORE_VERSION, "chunk_size": chunk_size}
+        if key:
+            salt = os.urandom(16)
+            aes_key = derive_key(key, salt, KDF_ITERATIONS)
+            config.update(salt=salt.hex(), iterations=KDF_ITERATIONS,
+                          key_check=seal(aes_key, b"", _KEY_CHECK).hex())
+        _write_atomic(os.path.join(path, "config.json"), json.dumps(config, indent=2).encode("utf-8"))
+        return cls(path, key)
+
+    # ----- بسته‌بندی قطعه‌ها -----
+    def _chunk_id(self, data: bytes) -> str:
+        if self.aes_key:
+            return hmac.new(self.aes_key, data, hashlib.sha256).hexdigest()
+        return hashlib.sha256(data).hexdigest()
+
+    def _pack(self, data: bytes, aad: bytes) -> bytes:
+        packed = zlib.compress(data, COMPRESS_LEVEL)
+        return seal(self.aes_key, packed, aad) if self.aes_key else packed
+
+    def _unpack(self, blob: bytes, aad: bytes) -> bytes:
+        if self.aes_key:
+            blob = unseal(self.aes_key, blob, aad)
+        return zlib.decompress(blob)
+
+    def _chunk_path(self, chunk_id: str) -> str:
+        return os.path.join(self.path, "chunks", chunk_id[:2], chunk_id)
+
+    def _manifest_path(self, backup_id: str) -> str:
+        return os.path.join(self.path, "manifests", backup_id)
+
+    def _read_chunk(self, chunk_id: str) -> bytes:
+        with open(self._chunk_path(chunk_id), "rb") as f:
+            data = self._unpack(f.read(), chunk_id.encode())
+        if self._chunk_id(data) != chunk_id:
+            raise BackupStoreError(f"قطعه {chunk_id} خراب است.")
+        return data
+
+    # ----- بک‌آپ -----
+    def create_backup(self, on_progress=None) -> dict:
+        """بک‌آپ جدید — فقط قطعه‌های تازه نوشته می‌شوند؛ فهرست در پایان و به‌صورت اتمی"""
+        db_path = DATABASE_URL.replace("sqlite:///", "")
+        created_at = datetime.datetime.now()
+        backup_id = created_at.strftime("%Y%m%d_%H%M%S_%f")
+        stats = {"backup_id": backup_id, "files": 0, "bytes": 0, "chunks": 0, "new_chunks": 0, "stored_bytes": 0}
+
+        with tempfile.TemporaryDirectory(prefix="hg2_store_", dir=self.path) as temp_dir:
+            snapshot = None
+            if os.path.exists(db_path):
+                snapshot = snapshot_database(db_path, os.path.join(temp_dir, "snapshot.db"), on_progress)
+            entries = _backup_entries(db_path, snapshot)
+            total = sum(os.path.getsize(path) for path, _ in entries)
+
+            files = []
+            for path, arcname in entries:
+                chunk_ids, size = [], 0
+                with open(path, "rb") as src:
+                    while data := src.read(self.chunk_size):
+                        chunk_id = self._chunk_id(data)
+                        chunk_path = self._chunk_path(chunk_id)
+                        if not os.path.exists(chunk_path):
+                            blob = self._pack(data, chunk_id.encode())
+                            os.makedirs(os.path.dirname(chunk_path), exist_ok=True)
+                            _write_atomic(chunk_path, blob)
+                            stats["new_chunks"] += 1
+                            stats["stored_bytes"] += len(blob)
+                        chunk_ids.append(chunk_id)
+                        size += len(data)
+                        stats["bytes"] += len(data)
+                        if on_progress:
+                            on_progress("store", stats["bytes"], total)
+                files.append({"path": arcname.replace(os.sep, "/"), "size": size, "chunks": chunk_ids})
+                stats["chunks"] += len(chunk_ids)
+            stats["files"] = len(files)
+
+        manifest = {"version": STORE_VERSION, "created_at": created_at.isoformat(), "files": files}
+        _write_atomic(self._manifest_path(backup_id),
+                      self._pack(json.dumps(manifest).encode("utf-8"), backup_id.encode()))
+        return stats
+
+    def read_manifest(self, backup_id: str) -> dict:
+        path = self._manifest_path(backup_id)
+        if os.path.basename(backup_id) != backup_id or not os.path.exists(path):
+            raise BackupStoreError(f"بک‌آپ یافت نشد: {backup_id}")
+        with open(path, "rb") as f:
+            return json.loads(self._unpack(f.read(), backup_id.encode()))
+
+    def list_backups(self) -> list:
+        """بک‌آپ‌ها از قدیم به جدید — [{"backup_id", "created_at", "files", "size"}, ...]"""
+        backups = []
+        for backup_id in sorted(os.listdir(os.path.join(self.path, "manifests"))):
+            if backup_id.endswith(".tmp"):
+                continue
+            manifest = self.read_manifest(backup_id)
+            backups.append({
+                "backup_id": backup_id,
+                "created_at": datetime.datetime.fromisoformat(manifest["created_at"]),
+                "files": len(manifest["files"]),
+                "size": sum(f["size"] for f in manifest["files"]),
+            })
+        return backups
+
+    # ----- بازیابی -----
+    def restore(self, backup_id: str, target_dir: str = ".", on_progress=None) -> list:
+        """بازسازی فایل‌های یک بک‌آپ در target_dir — هر قطعه هنگام خواندن با شناسه‌اش بررسی می‌شود"""
+        manifest = self.read_manifest(backup_id)
+        total = sum(f["size"] for f in manifest["files"])
+        root = os.path.abspath(target_dir)
+        done, restored = 0, []
+        for entry in manifest["files"]:
+            path = os.path.abspath(os.path.join(root, entry["path"]))
+            if os.path.commonpath([root, path]) != root:
+                raise BackupStoreError(f"مسیر نامعتبر در فهرست بک‌آپ: {entry['path']}")
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            partial = path + ".restore"
+            with open(partial, "wb") as dst:
+                for chunk_id in entry["chunks"]:
+                    data = self._read_chunk(chunk_id)
+                    dst.write(data)
+                    done += len(data)
+                    if on_progress:
+                        on_progress("restore", done, total)
+            os.replace(partial, path)
+            restored.append(path)
+        return restored
+
+    # ----- نگهداری -----
+    def prune(self, hourly: int = 24, daily: int = 7, monthly: int = 12) -> dict:
+        """نگه‌داشتن آخرین بک‌آپ هر ساعت/روز/ماه برای N ساعت/روز/ماه اخیر — سپس حذف قطعه‌های بی‌مرجع"""
+        backups = self.list_backups()
+        keep = select_retained(backups, hourly, daily, monthly)
+        removed = [b["backup_id"] for b in backups if b["backup_id"] not in keep]
+        for backup_id in removed:
+            os.remove(self._manifest_path(backup_id))
+        return {"removed_backups": removed, "kept_backups": len(keep), "removed_chunks": self._collect_garbage()}
+
+    def _collect_garbage(self) -> int:
+        referenced = set()
+        for backup in self.list_backups():
+            for entry in self.read_manifest(backup["backup_id"])["files"]:
+                referenced.update(entry["chunks"])
+        removed = 0
+        for chunk_id, path in self._stored_chunks():
+            if chunk_id not in referenced:
+                os.remove(path)
+                removed += 1
+        return removed
+
+    def _stored_chunks(self):
+        chunks_dir = os.path.join(self.path, "chunks")
+        for prefix in sorted(os.listdir(chunks_dir)):
+            for name in sorted(os.listdir(os.path.join(chunks_dir, prefix))):
+                if not name.endswith(".tmp"):
+                    yield name, os.path.join(chunks_dir, prefix, name)
+
+    def verify(self, full: bool = True, on_progress=None) -> dict:
+        """بررسی سلامت مخزن — وجود همه قطعه‌های هر بک‌آپ؛ با full محتوای هر قطعه هم بازخوانی و بررسی می‌شود"""
+        report = {"backups": 0, "chunks": 0, "missing": [], "corrupt": [], "unreadable_manifests": []}
+        referenced = set()
+        for backup_id in sorted(os.listdir(os.path.join(self.path, "manifests"))):
+            if backup_id.endswith(".tmp"):
+                continue
+            try:
+                manifest = self.read_manifest(backup_id)
+            except (BackupStoreError, DecryptionError, ValueError, zlib.error):
+                report["unreadable_manifests"].append(backup_id)
+                continue
+            report["backups"] += 1
+            for entry in manifest["files"]:
+                for chunk_id in entry["chunks"]:
+                    if chunk_id not in referenced:
+                        referenced.add(chunk_id)
+                        if not os.path.exists(self._chunk_path(chunk_id)):
+                            report["missing"].append((backup_id, entry["path"], chunk_id))
+
+        missing = {chunk_id for _, _, chunk_id in report["missing"]}
+        report["chunks"] = len(referenced)
+        if full:
+            for done, chunk_id in enumerate(sorted(referenced - missing), start=1):
+                try:
+                    self._read_chunk(chunk_id)
+                except (BackupStoreError, DecryptionError, zlib.error):
+                    report["corrupt"].append(chunk_id)
+                if on_progress:
+                    on_progress("verify", done, len(referenced) - len(missing))
+        report["ok"] = not (report["missing"] or report["corrupt"] or report["unreadable_manifests"])
+        return report
+
+
+def select_retained(backups, hourly: int, daily: int, monthly: int) -> set:
+    """شناسه بک‌آپ‌های ماندنی — آخرین بک‌آپ هر ساعت/روز/ماه، برای N ساعت/روز/ماه اخیر که بک‌آپ دارند"""
+    newest_first = sorted(backups, key=lambda b: b["created_at"], reverse=True)
+    keep = set()
+    for count, bucket_format in ((hourly, "%Y-%m-%d %H"), (daily, "%Y-%m-%d"), (monthly, "%Y-%m")):
+        buckets = set()
+        for backup in newest_first:
+            bucket = backup["created_at"].strftime(bucket_format)
+            if bucket in buckets:
+                continue
+            if len(buckets) >= count:
+                break
+            buckets.add(bucket)
+            keep.add(backup["backup_id"])
+    return keep
+
+
+def _write_atomic(path: str, data: bytes):
+    temp = path + ".tmp"
+    with open(temp, "wb") as f:
+        f.write(data)
+    os.replace(temp, path)
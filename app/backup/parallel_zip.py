@@ -0,0 +1,126 @@
+# app/backup/parallel_zip.py
+"""فشرده‌سازی چندنخی بک‌آپ — بلوک‌های deflate مستقل در ThreadPool، به هم چسبیده در یک zip معمولی
+
+هر بلوک (پیش‌فرض یک مگابایت) با compressobj جداگانه و ۳۲ کیلوبایت انتهای بلوک قبلی به‌عنوان
+دیکشنری فشرده و با Z_SYNC_FLUSH بسته می‌شود؛ خروجی بلوک‌ها پشت سر هم یک جریان deflate معتبر است
+(روش pigz) و یک بلوک خالی پایانی آن را می‌بندد. zlib هنگام فشرده‌سازی GIL را آزاد می‌کند، پس
+نخ‌ها واقعاً موازی اجرا می‌شوند. خروجی zip64 استاندارد است: zipfile، ابزارهای معمول و
+RestoreService آن را بدون تغییر می‌خوانند.
+"""
+import os
+import struct
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+BLOCK_SIZE = 1024 * 1024
+WINDOW_SIZE = 32 * 1024          # پنجره deflate — دیکشنری بلوک بعدی
+DEFAULT_LEVEL = 6
+ZIP64_VERSION = 45
+_FINAL_BLOCK = zlib.compressobj(0, zlib.DEFLATED, -zlib.MAX_WBITS).flush(zlib.Z_FINISH)
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_ZIP64_END = struct.Struct("<IQHHIIQQQQ")
+_ZIP64_LOCATOR = struct.Struct("<IIQI")
+_END = struct.Struct("<IHHHHIIH")
+_UTF8_FLAG = 0x800
+_LIMIT32 = 0xFFFFFFFF
+
+
+def compress_block(data, dictionary, level):
+    """یک بلوک deflate خام که با Z_SYNC_FLUSH در مرز بایت تمام می‌شود"""
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def deflate_parallel(src, write, pool, workers, level=DEFAULT_LEVEL, block_size=BLOCK_SIZE, on_block=None):
+    """فشرده‌سازی جریان src با write(bytes) — خروجی (CRC، اندازه اصلی، اندازه فشرده)
+
+    حداکثر 2×workers بلوک هم‌زمان در حافظه است؛ ترتیب خروجی همان ترتیب ورودی است.
+    """
+    crc, size, compressed = 0, 0, 0
+    pending = deque()
+    dictionary = None
+
+    def flush_one():
+        nonlocal compressed
+        data = pending.popleft().result()
+        write(data)
+        compressed += len(data)
+
+    while block := src.read(block_size):
+        crc = zlib.crc32(block, crc)
+        size += len(block)
+        pending.append(pool.submit(compress_block, block, dictionary, level))
+        dictionary = block[-WINDOW_SIZE:]
+        if len(pending) >= workers * 2:
+            flush_one()
+        if on_block:
+            on_block(len(block))
+    while pending:
+        flush_one()
+    write(_FINAL_BLOCK)
+    return crc, size, compressed + len(_FINAL_BLOCK)
+
+
+def _dos_datetime(date_time):
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+def write_parallel_zip(zip_path, entries, level=DEFAULT_LEVEL, workers=None, on_progress=None):
+    """نوشتن entries (مسیر، نام در zip) در zip64 با فشرده‌سازی چندنخی
+
+    اندازه‌ها و CRC پس از فشرده‌سازی در سربرگ محلی بازنویسی می‌شوند (بدون data descriptor)،
+    پس بازیابی جریانی بدون فهرست مرکزی هم ممکن است. on_progress(done, total) بر حسب بایت ورودی.
+    """
+    workers = workers or os.cpu_count() or 1
+    total = sum(os.path.getsize(path) for path, _ in entries)
+    done = 0
+    central = []
+
+    def advance(count):
+        nonlocal done
+        done += count
+        if on_progress:
+            on_progress(done, total)
+
+    with open(zip_path, 'wb') as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        for path, arcname in entries:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            name = info.filename.encode("utf-8")
+            dos_time, dos_date = _dos_datetime(info.date_time)
+            offset = out.tell()
+            # سربرگ موقت — CRC و اندازه‌ها پس از فشرده‌سازی نوشته می‌شوند
+            header = _LOCAL_HEADER.pack(0x04034b50, ZIP64_VERSION, _UTF8_FLAG, zipfile.ZIP_DEFLATED,
+                                        dos_time, dos_date, 0, _LIMIT32, _LIMIT32, len(name), 20)
+            out.write(header + name + struct.pack("<HHQQ", 1, 16, 0, 0))
+            with open(path, 'rb') as src:
+                crc, size, compressed = deflate_parallel(src, out.write, pool, workers, level, on_block=advance)
+            end = out.tell()
+            out.seek(offset + 14)
+            out.write(struct.pack("<I", crc))
+            out.seek(offset + _LOCAL_HEADER.size + len(name) + 4)
+            out.write(struct.pack("<QQ", size, compressed))
+            out.seek(end)
+            central.append((name, dos_time, dos_date, crc, size, compressed, offset, info.external_attr))
+
+        directory_offset = out.tell()
+        for name, dos_time, dos_date, crc, size, compressed, offset, external_attr in central:
+            out.write(_CENTRAL_HEADER.pack(
+                0x02014b50, (3 << 8) | ZIP64_VERSION, ZIP64_VERSION, _UTF8_FLAG, zipfile.ZIP_DEFLATED,
+                dos_time, dos_date, crc, _LIMIT32, _LIMIT32, len(name), 28, 0, 0, 0, external_attr, _LIMIT32))
+            out.write(name + struct.pack("<HHQQQ", 1, 24, size, compressed, offset))
+        zip64_end = out.tell()
+        count = len(central)
+        out.write(_ZIP64_END.pack(0x06064b50, 44, ZIP64_VERSION, ZIP64_VERSION, 0, 0, count, count,
+                                  zip64_end - directory_offset, directory_offset))
+        out.write(_ZIP64_LOCATOR.pack(0x07064b50, 0, zip64_end, 1))
+        out.write(_END.pack(0x06054b50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                            _LIMIT32, _LIMIT32, 0))
+    return zip_path
@@ -1,23 +1,296 @@
 # app/backup/restore_service.py
-import zipfile
+"""بازیابی جریانی بک‌آپ — استخراج در پوشه موقت، بررسی، سپس جایگزینی اتمی
+
+فایل بک‌آپ (رمزشده یا ساده) یک‌بار و به ترتیب خوانده می‌شود: قطعه‌های بازگشایی‌شده مستقیم به
+تجزیه‌گر zip می‌رسند و اعضا در پوشه موقت کنار مقصد باز می‌شوند؛ نسخه بازگشایی‌شده کامل zip هرگز
+روی دیسک نوشته نمی‌شود. دیتابیس موقت با PRAGMA integrity_check و نسخه Alembic بررسی می‌شود و فقط
+پس از آن با os.replace جای دیتابیس فعلی را می‌گیرد؛ قطع کار در هر مرحله دیتابیس فعلی را دست‌نخورده
+می‌گذارد. فضای اضافی لازم حداکثر یک نسخه از داده‌های بازیابی‌شده است.
+"""
 import os
+import posixpath
 import shutil
-from app.utils.crypto import decrypt_file
+import sqlite3
+import struct
+import tempfile
+import time
+import zlib
+from app.backup.backup_service import ATTACHMENTS_PATH
+from app.database import DATABASE_URL, checkpoint, engine
+from app.utils.crypto import iter_decrypt_file
+
+READ_CHUNK = 64 * 1024
+OUTPUT_CHUNK = 1024 * 1024
+MIGRATIONS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic")
+
+# سربرگ محلی عضو zip: امضا، نسخه، پرچم‌ها، روش فشرده‌سازی، زمان، تاریخ، CRC، اندازه فشرده و اصلی، طول نام و extra
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_LOCAL_SIGNATURE = 0x04034b50
+_END_SIGNATURES = (0x02014b50, 0x06054b50)  # فهرست مرکزی / پایان آرشیو
+_ZIP64_EXTRA = 0x0001
+_ZIP64_LIMIT = 0xFFFFFFFF
+
+
+class RestoreError(Exception):
+    pass
+
+
+class _ChunkReader:
+    """خواندن با اندازه دلخواه از روی تکرارگر قطعه‌ها — position تعداد بایت مصرف‌شده است"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+        self._offset = 0
+        self.position = 0
+
+    def read(self, size):
+        parts = []
+        while size > 0:
+            if self._offset >= len(self._buffer):
+                self._buffer, self._offset = next(self._chunks, b""), 0
+                if not self._buffer:
+                    break
+            part = self._buffer[self._offset:self._offset + size]
+            self._offset += len(part)
+            size -= len(part)
+            parts.append(part)
+        data = b"".join(parts)
+        self.position += len(data)
+        return data
+
+    def read_exact(self, size):
+        data = self.read(size)
+        if len(data) != size:
+            raise RestoreError("فایل بک‌آپ ناقص است.")
+        return data
+
+
+def _file_chunks(path):
+    with open(path, 'rb') as src:
+        while chunk := src.read(OUTPUT_CHUNK):
+            yield chunk
+
+
+def _zip64_sizes(extra, compressed, size):
+    """اندازه‌های ۶۴ بیتی از فیلد extra — فقط اندازه‌هایی که در سربرگ 0xFFFFFFFF هستند آنجا آمده‌اند"""
+    offset = 0
+    while offset + 4 <= len(extra):
+        tag, length = struct.unpack_from("<HH", extra, offset)
+        if tag == _ZIP64_EXTRA:
+            field = extra[offset + 4:offset + 4 + length]
+            values = [struct.unpack_from("<Q", field, i)[0] for i in range(0, len(field) - 7, 8)]
+            if size == _ZIP64_LIMIT:
+                size = values.pop(0)
+            if compressed == _ZIP64_LIMIT:
+                compressed = values.pop(0)
+            return compressed, size
+        offset += 4 + length
+    raise RestoreError("فیلد zip64 در بک‌آپ یافت نشد.")
+
+
+def _safe_name(name):
+    """نام عضو zip — مسیر مطلق یا خروج از پوشه مقصد (..) پذیرفته نمی‌شود"""
+    normalized = posixpath.normpath(name.replace("\\", "/"))
+    if normalized.startswith("/") or normalized == ".." or normalized.startswith("../"):
+        raise RestoreError(f"مسیر نامعتبر در بک‌آپ: {name}")
+    return normalized
+
+
+def _copy_member(reader, method, compressed, crc, dst, on_progress):
+    """خواندن داده یک عضو با بررسی CRC — dst=None یعنی رد شدن از عضو"""
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS) if method == 8 else None
+    checksum, written, remaining = 0, 0, compressed
+
+    def emit(data):
+        nonlocal checksum, written
+        checksum = zlib.crc32(data, checksum)
+        written += len(data)
+        if dst is not None:
+            dst.write(data)
+
+    while remaining:
+        data = reader.read_exact(min(READ_CHUNK, remaining))
+        remaining -= len(data)
+        if decompressor is None:
+            emit(data)
+        else:
+            # خروجی محدود — قطعه‌های پر از صفر دیتابیس تا هزار برابر باز می‌شوند
+            emit(decompressor.decompress(data, OUTPUT_CHUNK))
+            while decompressor.unconsumed_tail:
+                emit(decompressor.decompress(decompressor.unconsumed_tail, OUTPUT_CHUNK))
+        if on_progress:
+            on_progress(reader.position)
+    if decompressor is not None:
+        emit(decompressor.flush())
+        if not decompressor.eof:
+            raise RestoreError("داده فشرده بک‌آپ ناقص است.")
+    if checksum != crc:
+        raise RestoreError("CRC عضو بک‌آپ نادرست است — فایل خراب است.")
+    return written
+
+
+def extract_stream(reader, place, on_progress=None):
+    """استخراج ترتیبی اعضای zip از جریان — place(name) مسیر مقصد یا None (رد شدن) را می‌دهد
+
+    بک‌آپ‌های BackupService اندازه هر عضو را در سربرگ محلی دارند (بدون data descriptor)، پس
+    خواندن ترتیبی بدون seek و بدون فهرست مرکزی ممکن است. خروجی: (تعداد فایل، بایت نوشته‌شده).
+    """
+    files, written = 0, 0
+    while True:
+        signature = reader.read(4)
+        if len(signature) == 4 and struct.unpack("<I", signature)[0] in _END_SIGNATURES:
+            return files, written
+        header = signature + reader.read_exact(_LOCAL_HEADER.size - len(signature))
+        (sig, _, flags, method, _, _, crc, compressed, size, name_length, extra_length) = _LOCAL_HEADER.unpack(header)
+        if sig != _LOCAL_SIGNATURE:
+            raise RestoreError("ساختار فایل بک‌آپ نامعتبر است.")
+        if flags & 0x01 or flags & 0x08 or method not in (0, 8):
+            raise RestoreError("قالب عضو بک‌آپ پشتیبانی نمی‌شود.")
+        name = reader.read_exact(name_length).decode("utf-8" if flags & 0x800 else "cp437")
+        extra = reader.read_exact(extra_length)
+        if _ZIP64_LIMIT in (compressed, size):
+            compressed, size = _zip64_sizes(extra, compressed, size)
+
+        target = None if name.endswith("/") else place(_safe_name(name))
+        if target is None:
+            _copy_member(reader, method, compressed, crc, None, on_progress)
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as dst:
+            count = _copy_member(reader, method, compressed, crc, dst, on_progress)
+            dst.flush()
+            os.fsync(dst.fileno())
+        if count != size:
+            raise RestoreError(f"اندازه {name} در بک‌آپ نادرست است.")
+        files += 1
+        written += count
+
+
+def schema_revisions():
+    """(سرها، همه نسخه‌ها)ی مهاجرت‌های Alembic — None اگر پوشه مهاجرت‌ها همراه برنامه نباشد"""
+    if not os.path.isdir(MIGRATIONS_PATH):
+        return None
+    from alembic.script import ScriptDirectory
+    script = ScriptDirectory(MIGRATIONS_PATH)
+    return set(script.get_heads()), {revision.revision for revision in script.walk_revisions()}
+
+
+def verify_database(path):
+    """بررسی دیتابیس بازیابی‌شده پیش از جایگزینی — integrity_check و نسخه ساختار
+
+    نسخه‌ای که در مهاجرت‌های این برنامه نیست (بک‌آپ نسخه جدیدتر) رد می‌شود؛ نسخه قدیمی‌تر پذیرفته
+    می‌شود و needs_upgrade دارد. دیتابیس ساخته‌شده با init_db جدول alembic_version ندارد.
+    """
+    conn = sqlite3.connect(path)
+    try:
+        result = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        if result != ["ok"]:
+            raise RestoreError("دیتابیس بک‌آپ سالم نیست: " + "؛ ".join(result[:5]))
+        has_versions = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alembic_version'").fetchone()
+        versions = {row[0] for row in conn.execute("SELECT version_num FROM alembic_version")} if has_versions else set()
+    except sqlite3.DatabaseError as e:
+        raise RestoreError(f"دیتابیس بک‌آپ قابل خواندن نیست: {e}") from None
+    finally:
+        conn.close()
+
+    revisions = schema_revisions()
+    needs_upgrade = False
+    if versions and revisions is not None:
+        heads, known = revisions
+        unknown = versions - known
+        if unknown:
+            raise RestoreError(f"نسخه ساختار دیتابیس بک‌آپ ({', '.join(sorted(unknown))}) برای این نسخه برنامه ناشناخته است.")
+        needs_upgrade = versions != heads
+    return {"schema_version": ", ".join(sorted(versions)) or None, "needs_upgrade": needs_upgrade}
+
+
+def _remove_sidecars(db_path):
+    """فایل‌های WAL و shm دیتابیس قبلی — نباید روی دیتابیس جدید اعمال شوند"""
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
 
 class RestoreService:
     @staticmethod
-    def restore_backup(backup_file, encrypt=False, key=None):
-        """بازیابی بک‌آپ — جایگزینی دیتابیس و پیوست‌ها"""
-        if encrypt and key:
-            backup_file = decrypt_file(backup_file, key)
-
-        with zipfile.ZipFile(backup_file, 'r') as zipf:
-            for member in zipf.namelist():
-                # بازیابی دیتابیس
-                if member.endswith(".db"):
-                    zipf.extract(member, ".")
-                # بازیابی پیوست‌ها
-                elif member.startswith("storage/attachments/"):
-                    zipf.extract(member, ".")
-
-        return True
\ No newline at end of file
+    def restore_backup(backup_file, encrypt=False, key=None, on_progress=None,
+                       db_path=None, attachments_path=ATTACHMENTS_PATH):
+        """بازیابی بک‌آپ — جایگزینی دیتابیس و پیوست‌ها پس از استخراج و بررسی کامل
+
+        on_progress(stage, done, total) با stage یکی از extract و verify. خروجی گزارش بازیابی:
+        تعداد فایل، بایت، زمان، سرعت (مگابایت بر ثانیه)، نسخه ساختار و نیاز به مهاجرت.
+        """
+        started = time.perf_counter()
+        live_path = DATABASE_URL.replace("sqlite:///", "")
+        db_path = db_path or live_path
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        attachments_dir = os.path.dirname(os.path.abspath(attachments_path))
+        os.makedirs(db_dir, exist_ok=True)
+
+        total = os.path.getsize(backup_file)
+        chunks = iter_decrypt_file(backup_file, key) if encrypt and key else _file_chunks(backup_file)
+        reader = _ChunkReader(chunks)
+        progress = (lambda done: on_progress("extract", done, total)) if on_progress else None
+
+        # پوشه‌های موقت روی همان دیسک مقصد — تا rename اتمی باشد
+        staging = {"db": tempfile.mkdtemp(prefix=".hg2_restore_", dir=db_dir)}
+        staged_db = os.path.join(staging["db"], "restore.db")
+        found = {"db": False, "attachments": False}
+        attachments_prefix = ATTACHMENTS_PATH + "/"
+
+        def place(name):
+            if name.endswith(".db") and "/" not in name and not found["db"]:
+                found["db"] = True
+                return staged_db
+            if name.startswith(attachments_prefix):
+                if "attachments" not in staging:
+                    os.makedirs(attachments_dir, exist_ok=True)
+                    staging["attachments"] = tempfile.mkdtemp(prefix=".hg2_restore_", dir=attachments_dir)
+                found["attachments"] = True
+                return os.path.join(staging["attachments"], "files", name[len(attachments_prefix):])
+            return None
+
+        try:
+            files, written = extract_stream(reader, place, progress)
+            if not found["db"]:
+                raise RestoreError("فایل دیتابیس در بک‌آپ یافت نشد.")
+            if on_progress:
+                on_progress("verify", 0, 1)
+            report = verify_database(staged_db)
+            if on_progress:
+                on_progress("verify", 1, 1)
+
+            # جایگزینی — ابتدا پیوست‌ها (برگشت‌پذیر)، سپس دیتابیس
+            previous = None
+            if found["attachments"]:
+                if os.path.exists(attachments_path):
+                    previous = os.path.join(staging["attachments"], "previous")
+                    os.rename(attachments_path, previous)
+                os.rename(os.path.join(staging["attachments"], "files"), attachments_path)
+            try:
+                if os.path.abspath(db_path) == os.path.abspath(live_path):
+                    checkpoint()
+                    engine.dispose()  # اتصال‌های باز به فایل قبلی اشاره دارند
+                _remove_sidecars(db_path)
+                os.replace(staged_db, db_path)
+            except BaseException:
+                if found["attachments"]:
+                    shutil.rmtree(attachments_path, ignore_errors=True)
+                    if previous:
+                        os.rename(previous, attachments_path)
+                raise
+        finally:
+            chunks.close()
+            for path in staging.values():
+                shutil.rmtree(path, ignore_errors=True)
+
+        elapsed = time.perf_counter() - started
+        report.update({
+            "files": files,
+            "bytes": written,
+            "elapsed_seconds": round(elapsed, 3),
+            "mb_per_second": round(written / (1024 * 1024) / elapsed, 1) if elapsed else None,
+        })
+        return report
@@ -0,0 +1,247 @@
+# app/cli.py
+"""دستورات نگهداری — مثلاً: python -m app.cli stock-balance verify"""
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def stock_balance(args):
+    from app.services.stock_service import StockService
+    service = StockService()
+    if args.action == "rebuild":
+        count = service.rebuild_balances()
+        print(f"✅ موجودی {count} کالا از روی دفتر تحرکات بازسازی شد.")
+        return 0
+
+    mismatches = service.verify_balances()
+    if not mismatches:
+        print("✅ جدول موجودی با دفتر تحرکات مطابقت دارد.")
+        return 0
+    for m in mismatches:
+        print(
+            f"❌ کالا {m['item_id']}: "
+            f"تعداد {m['actual_qty']} (مورد انتظار {m['expected_qty']}), "
+            f"ارزش {m['actual_value']} (مورد انتظار {m['expected_value']}), "
+            f"آخرین تحرک {m['actual_last_movement_id']} (مورد انتظار {m['expected_last_movement_id']})"
+        )
+    print(f"{len(mismatches)} مغایرت یافت شد — برای اصلاح: python -m app.cli stock-balance rebuild")
+    return 1
+
+
+def cost_replay(args):
+    from datetime import datetime
+    from app.services.stock_service import StockService
+    since = datetime.fromisoformat(args.since) if args.since else None
+    count = StockService().replay_costs(item_ids=args.item or None, since=since)
+    print(f"✅ بهای {count} تحرک اصلاح شد.")
+    return 0
+
+
+def close_period(args):
+    from app.services.valuation_service import ValuationService
+    report = ValuationService().close_period(args.year, args.month)
+    print(
+        f"✅ دوره {report['period']}: {report['items']} کالا، {report['movements']} تحرک، "
+        f"{report['inserted']} درج / {report['updated']} به‌روزرسانی — {report['elapsed_seconds']} ثانیه"
+    )
+    return 0
+
+
+def import_invoices(args):
+    import csv
+    from sqlalchemy import select
+    from app.database import unit_of_work
+    from app.models.user import User
+    from app.importer.invoice_importer import InvoiceImporter
+
+    with unit_of_work() as db:
+        user_id = db.execute(select(User.id).where(User.username == args.user)).scalar()
+    if user_id is None:
+        print(f"❌ کاربر یافت نشد: {args.user}")
+        return 1
+
+    def progress(report):
+        print(f"… {report.invoices} فاکتور، {len(report.errors)} خطا — {report.invoices_per_second:.0f} فاکتور/ثانیه")
+
+    report = InvoiceImporter(user_id, batch_size=args.batch_size, on_progress=progress).run(args.path, args.sheet)
+    print(
+        f"✅ {report.invoices} فاکتور و {report.lines} خط در {report.elapsed_seconds:.1f} ثانیه وارد شد "
+        f"({report.invoices_per_second:.0f} فاکتور/ثانیه)."
+    )
+    if not report.errors:
+        return 0
+    if args.errors:
+        with open(args.errors, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(["row", "serial_full", "message"])
+            writer.writerows(report.errors)
+        print(f"❌ {len(report.errors)} ردیف رد شد — جزئیات در {args.errors}")
+    else:
+        for row_number, serial_full, message in report.errors:
+            print(f"❌ ردیف {row_number} ({serial_full}): {message}")
+    return 1
+
+
+def post_journals(args):
+    from datetime import date
+    from sqlalchemy import select
+    from app.database import unit_of_work
+    from app.models.user import User
+    from app.services.posting_service import PostingService
+
+    with unit_of_work() as db:
+        user_id = db.execute(select(User.id).where(User.username == args.user)).scalar()
+    if user_id is None:
+        print(f"❌ کاربر یافت نشد: {args.user}")
+        return 1
+
+    report = PostingService().post_range(date.fromisoformat(args.date_from), date.fromisoformat(args.date_to), user_id)
+    posted = "، ".join(f"{count} {source}" for source, count in sorted(report.posted.items())) or "هیچ"
+    print(
+        f"✅ اسناد ثبت‌شده: {posted} — {report.skipped} مدرک قبلاً ثبت شده بود "
+        f"({report.elapsed_seconds:.1f} ثانیه)."
+    )
+    for source_type, source_id, message in report.errors:
+        print(f"❌ {source_type} #{source_id}: {message}")
+    return 1 if report.errors else 0
+
+
+def ledger_check(args):
+    from app.services.accounting_service import AccountingService
+    report = AccountingService().check_ledger()
+    for entry_id, debit, credit in report["unbalanced"]:
+        print(f"❌ سند {entry_id} ناتراز است: بدهکار {debit}، بستانکار {credit}")
+    for line_id, entry_id in report["orphan_lines"]:
+        print(f"❌ خط {line_id} به سند ناموجود {entry_id} اشاره می‌کند")
+    for line_id, account_id in report["missing_accounts"]:
+        print(f"❌ خط {line_id} روی حساب ناموجود {account_id} ثبت شده است")
+    problems = sum(len(rows) for rows in report.values())
+    if problems:
+        print(f"{problems} مشکل در دفتر کل یافت شد.")
+        return 1
+    print("✅ دفتر کل تراز و سالم است.")
+    return 0
+
+
+def check_due(args):
+    from app.services.check_schedule_service import CheckScheduleService
+    service = CheckScheduleService()
+    if args.rebuild:
+        print(f"✅ خلاصه سررسید چک‌ها بازسازی شد — {service.rebuild_summary()} ردیف.")
+    for row in service.due_totals(args.days):
+        direction = "دریافتی" if row["direction"] == "received" else "پرداختی"
+        print(f"{row['bank_account']} — {direction}: {row['count']} چک، {row['amount']:,} ریال")
+    aging = service.aging()
+    print("سنی‌سازی: " + "، ".join(f"{key}: {value['count']} چک ({value['amount']:,})" for key, value in aging.items()))
+    return 0
+
+
+def backup_store(args):
+    from app.backup.backup_store import BackupStore, BackupStoreError
+    key = args.key or os.getenv("BACKUP_KEY")
+    try:
+        if args.action == "init":
+            BackupStore.init(args.repo, key)
+            print(f"✅ مخزن بک‌آپ ساخته شد: {args.repo}{' (رمزدار)' if key else ''}")
+            return 0
+        store = BackupStore(args.repo, key)
+        if args.action == "create":
+            stats = store.create_backup()
+            print(
+                f"✅ بک‌آپ {stats['backup_id']}: {stats['files']} فایل، {stats['bytes']:,} بایت — "
+                f"{stats['new_chunks']} قطعه جدید از {stats['chunks']} ({stats['stored_bytes']:,} بایت نوشته شد)"
+            )
+        elif args.action == "list":
+            for backup in store.list_backups():
+                print(f"{backup['backup_id']}  {backup['created_at']:%Y-%m-%d %H:%M:%S}  "
+                      f"{backup['files']} فایل  {backup['size']:,} بایت")
+        elif args.action == "restore":
+            if not args.backup_id:
+                print("❌ شناسه بک‌آپ لازم است — python -m app.cli backup-store list")
+                return 1
+            for path in store.restore(args.backup_id, args.target):
+                print(f"✅ {path}")
+        elif args.action == "prune":
+            result = store.prune(args.hourly, args.daily, args.monthly)
+            print(f"✅ {len(result['removed_backups'])} بک‌آپ و {result['removed_chunks']} قطعه حذف شد؛ "
+                  f"{result['kept_backups']} بک‌آپ باقی ماند.")
+        elif args.action == "verify":
+            report = store.verify(full=not args.quick)
+            for backup_id, path, chunk_id in report["missing"]:
+                print(f"❌ قطعه {chunk_id} از {path} (بک‌آپ {backup_id}) وجود ندارد")
+            for chunk_id in report["corrupt"]:
+                print(f"❌ قطعه {chunk_id} خراب است")
+            for backup_id in report["unreadable_manifests"]:
+                print(f"❌ فهرست بک‌آپ {backup_id} خوانده نشد")
+            if not report["ok"]:
+                return 1
+            print(f"✅ {report['backups']} بک‌آپ و {report['chunks']} قطعه سالم است.")
+    except BackupStoreError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("stock-balance", help="تطبیق یا بازسازی جدول موجودی کالا")
+    p.add_argument("action", choices=["verify", "rebuild"])
+    p.set_defaults(func=stock_balance)
+
+    p = sub.add_parser("cost-replay", help="بازپردازش بهای تحرکات (مثلاً پس از تغییر COSTING_METHOD)")
+    p.add_argument("--item", type=int, action="append", help="شناسه کالا — قابل تکرار؛ پیش‌فرض: همه")
+    p.add_argument("--since", help="از این زمان به بعد — YYYY-MM-DD[THH:MM]")
+    p.set_defaults(func=cost_replay)
+
+    p = sub.add_parser("close-period", help="ارزش‌گذاری میانگین موزون تمام کالاها برای یک ماه")
+    p.add_argument("year", type=int)
+    p.add_argument("month", type=int, choices=range(1, 13))
+    p.set_defaults(func=close_period)
+
+    p = sub.add_parser("import-invoices", help="ورود گروهی فاکتورها از CSV یا XLSX")
+    p.add_argument("path", help="فایل .csv یا .xlsx — هر ردیف یک خط فاکتور")
+    p.add_argument("--sheet", help="نام برگه اکسل — پیش‌فرض: اولین برگه")
+    p.add_argument("--user", default="admin", help="نام کاربری ثبت‌کننده — پیش‌فرض: admin")
+    p.add_argument("--batch-size", type=int, default=None, help="تعداد فاکتور در هر تراکنش")
+    p.add_argument("--errors", help="ذخیره ردیف‌های ردشده در یک فایل CSV")
+    p.set_defaults(func=import_invoices)
+
+    p = sub.add_parser("post-journals", help="ثبت خودکار اسناد حسابداری فاکتورها، دریافت/پرداخت‌ها و چک‌ها")
+    p.add_argument("--from", dest="date_from", required=True, help="از تاریخ — YYYY-MM-DD")
+    p.add_argument("--to", dest="date_to", required=True, help="تا تاریخ — YYYY-MM-DD")
+    p.add_argument("--user", default="admin", help="نام کاربری ثبت‌کننده — پیش‌فرض: admin")
+    p.set_defaults(func=post_journals)
+
+    p = sub.add_parser("ledger-check", help="بررسی سلامت دفتر کل — اسناد ناتراز و خطوط بی‌سند یا بی‌حساب")
+    p.set_defaults(func=ledger_check)
+
+    p = sub.add_parser("check-due", help="چک‌های سررسید روزهای آینده به تفکیک حساب بانکی و سنی‌سازی")
+    p.add_argument("--days", type=int, default=7, help="تعداد روزهای آینده — پیش‌فرض: ۷")
+    p.add_argument("--rebuild", action="store_true", help="بازسازی خلاصه روزانه سررسیدها از جدول چک‌ها")
+    p.set_defaults(func=check_due)
+
+    p = sub.add_parser("backup-store", help="مخزن بک‌آپ افزایشی — ساخت، بک‌آپ، فهرست، بازیابی، هرس و بررسی")
+    p.add_argument("action", choices=["init", "create", "list", "restore", "prune", "verify"])
+    p.add_argument("backup_id", nargs="?", help="شناسه بک‌آپ — برای restore")
+    p.add_argument("--repo", default=os.path.join("backups", "store"), help="مسیر مخزن — پیش‌فرض: backups/store")
+    p.add_argument("--key", help="کلید مخزن رمزدار — یا متغیر محیطی BACKUP_KEY")
+    p.add_argument("--target", default=".", help="پوشه مقصد بازیابی — پیش‌فرض: پوشه جاری")
+    p.add_argument("--hourly", type=int, default=24, help="تعداد ساعت‌های اخیر که بک‌آپ آن‌ها نگه داشته می‌شود")
+    p.add_argument("--daily", type=int, default=7, help="تعداد روزهای اخیر")
+    p.add_argument("--monthly", type=int, default=12, help="تعداد ماه‌های اخیر")
+    p.add_argument("--quick", action="store_true", help="verify فقط وجود قطعه‌ها را بررسی کند")
+    p.set_defaults(func=backup_store)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
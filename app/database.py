@@ -1,18 +1,78 @@
 # app/database.py
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session
 from app.models.base import Base
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./instance/app.db")
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
 
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
     echo=False,
 )
 
+# تنظیمات هر اتصال SQLite — برنامه تمام روز باز می‌ماند
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",        # خواندن هم‌زمان با نوشتن؛ commit بدون بازنویسی کل صفحه‌ها
+    "PRAGMA synchronous=NORMAL",      # در WAL امن است و fsync هر commit حذف می‌شود
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA cache_size=-65536",       # ۶۴ مگابایت کش صفحه (عدد منفی = کیلوبایت)
+    "PRAGMA mmap_size=268435456",     # ۲۵۶ مگابایت خواندن با memory-map
+)
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+# Session سراسری هر نخ — برای اسکریپت‌ها و تست‌ها؛ سرویس‌ها از unit_of_work استفاده می‌کنند
 SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
 
+# Session‌های واحد کار — اشیای برگشتی بعد از commit منقضی نمی‌شوند (بدون کوئری مجدد در رابط کاربری)
+_uow_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+_current_session = ContextVar("current_session", default=None)
+
+
+@contextmanager
+def unit_of_work(independent: bool = False):
+    """یک Session کوتاه‌عمر برای یک واحد کار — commit در پایان، rollback در خطا، سپس بسته می‌شود
+
+    فراخوانی تودرتو (مثلاً StockService داخل InvoiceService) همان Session و همان تراکنش
+    بیرونی را می‌گیرد؛ commit فقط در بیرونی‌ترین سطح انجام می‌شود.
+    independent=True: همیشه تراکنش جداگانه — برای کاری که نباید با تراکنش بیرونی برگردد
+    (مثل رزرو شماره سند). در SQLite نباید داخل تراکنشی که قبلاً نوشته است صدا زده شود.
+    """
+    session = _current_session.get()
+    if session is not None and not independent:
+        yield session
+        return
+
+    session = _uow_factory()
+    token = _current_session.set(session)
+    try:
+        yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        _current_session.reset(token)
+        session.close()
+
+
+def checkpoint():
+    """انتقال محتوای فایل WAL به فایل اصلی دیتابیس — پیش از کپی فایل"""
+    if IS_SQLITE:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
@@ -0,0 +1,335 @@
+# app/importer/invoice_importer.py
+"""ورود گروهی فاکتورها از CSV/XLSX — برای انتقال سوابق از سیستم قبلی
+
+هر ردیف فایل یک خط فاکتور است؛ ردیف‌های پشت‌سرهم با serial_full یکسان یک فاکتور را می‌سازند.
+ستون‌های اجباری: serial_full, invoice_type, party_code, date, sku, qty, unit_price
+ستون‌های اختیاری خط: unit_code, discount, tax, notes
+ستون‌های اختیاری سربرگ (از اولین ردیف فاکتور): invoice_tax, invoice_discount, shipping, status
+
+فاکتورها دسته‌دسته اعتبارسنجی می‌شوند (کالاها، واحدها و طرف‌حساب‌های هر دسته با یک کوئری) و هر دسته
+در یک تراکنش درج می‌شود — فاکتورها و خطوط با INSERT چندردیفی، تحرکات از مسیر apply_movements به ترتیب
+تاریخ سند. فاکتور نامعتبر رد و خطایش در گزارش ثبت می‌شود — بقیه فایل ادامه می‌یابد.
+موجودی کنترل نمی‌شود: اسناد تاریخی قبلاً رخ داده‌اند.
+"""
+import re
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import select, insert
+from app.database import unit_of_work
+from app.models.invoice import Invoice
+from app.models.invoice_line import InvoiceLine
+from app.models.item import Item
+from app.models.party import Party
+from app.models.unit import Unit
+from app.models.stock_movement import StockMovement
+from app.services.date_service import gregorian_to_jalali, jalali_to_gregorian
+from app.services.invoice_service import MOVEMENT_TYPES
+from app.utils.price_calculator import calculate_line_total
+from app.utils.stock_balance import apply_movements
+from app.utils.sequences import bump_sequences, parse_serial
+from app.importer.readers import iter_rows
+
+REQUIRED_COLUMNS = ("serial_full", "invoice_type", "party_code", "date", "sku", "qty", "unit_price")
+INVOICE_STATUSES = ("draft", "posted", "cancelled")
+
+# ارقام فارسی و عربی در خروجی سیستم‌های قدیمی
+_DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789")
+
+
+class RowError(ValueError):
+    """خطای یک ردیف فایل — فاکتور آن رد می‌شود"""
+
+    def __init__(self, row_number, message):
+        super().__init__(message)
+        self.row_number = row_number
+
+
+class ImportReport:
+    def __init__(self):
+        self.invoices = 0
+        self.lines = 0
+        self.errors = []  # (row_number, serial_full, message)
+        self.started = time.perf_counter()
+        self.elapsed_seconds = 0.0
+
+    def add_error(self, row_number, serial_full, message):
+        self.errors.append((row_number, serial_full, message))
+
+    def finish(self):
+        self.elapsed_seconds = time.perf_counter() - self.started
+        return self
+
+    @property
+    def invoices_per_second(self):
+        elapsed = self.elapsed_seconds or (time.perf_counter() - self.started)
+        return self.invoices / elapsed if elapsed > 0 else 0.0
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _text(value):
+    if value is None:
+        return ""
+    return str(value).strip().translate(_DIGITS)
+
+
+def _number(row_number, row, column, default=None) -> Decimal:
+    value = _text(row.get(column)).replace(",", "").replace("٬", "")
+    if value == "":
+        if default is None:
+            raise RowError(row_number, f"ستون {column} خالی است.")
+        return Decimal(default)
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise RowError(row_number, f"مقدار نامعتبر در ستون {column}: {value}")
+
+
+def _parse_date(row_number, value) -> date:
+    """تاریخ شمسی (1404/01/16) یا میلادی (2025-04-05) — سال کمتر از 1700 شمسی فرض می‌شود"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    parts = re.split(r"[/\-.]", _text(value).split(" ")[0])
+    try:
+        year, month, day = (int(p) for p in parts)
+        if year < 1700:
+            return jalali_to_gregorian(f"{year}/{month:02d}/{day:02d}").date()
+        return date(year, month, day)
+    except ValueError:
+        raise RowError(row_number, f"تاریخ نامعتبر: {value}")
+
+
+def _split_serial(serial_full: str):
+    """پیشوند و شماره ترتیبی — INV-1404-0012 → ("INV", 12)"""
+    prefix = serial_full.split("-")[0][:10] or "INV"
+    match = re.search(r"(\d+)$", serial_full)
+    return prefix, int(match.group(1)) if match else 0
+
+
+class InvoiceImporter:
+    BATCH_SIZE = 500     # فاکتور در هر تراکنش
+    INSERT_CHUNK = 1000  # ردیف در هر فراخوانی INSERT
+
+    def __init__(self, created_by: int, batch_size: int = None, on_progress=None):
+        self.created_by = created_by
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.on_progress = on_progress  # on_progress(report) پس از هر دسته
+        self._items = {}    # sku → ردیف سبک کالا
+        self._parties = {}  # code → id
+        self._units = None  # code/name → id
+        self._seen = set()  # سریال‌های دیده‌شده در فایل
+
+    def run(self, path, sheet=None) -> ImportReport:
+        report = ImportReport()
+        batch = []
+        for serial_full, rows in self._group(iter_rows(path, sheet)):
+            batch.append((serial_full, rows))
+            if len(batch) >= self.batch_size:
+                self._process_batch(batch, report)
+                batch = []
+        if batch:
+            self._process_batch(batch, report)
+        return report.finish()
+
+    def _group(self, rows):
+        """ردیف‌های پشت‌سرهم با serial_full یکسان — (serial_full, [(row_number, row), ...])"""
+        serial_full, group = None, []
+        for row_number, row in rows:
+            key = _text(row.get("serial_full"))
+            if group and key != serial_full:
+                yield serial_full, group
+                group = []
+            serial_full = key
+            group.append((row_number, row))
+        if group:
+            yield serial_full, group
+
+    # --- پیش‌بارگذاری ---
+    def _preload(self, db, batch):
+        if self._units is None:
+            units = db.execute(select(Unit.id, Unit.code, Unit.name)).all()
+            self._units = {name: unit_id for unit_id, _, name in units}
+            self._units.update({code: unit_id for unit_id, code, _ in units})
+
+        skus, codes, serials = set(), set(), set()
+        for serial_full, rows in batch:
+            serials.add(serial_full)
+            codes.add(_text(rows[0][1].get("party_code")))
+            skus.update(_text(row.get("sku")) for _, row in rows)
+
+        missing_skus = list(skus - self._items.keys())
+        for chunk in _chunks(missing_skus, self.INSERT_CHUNK):
+            for item in db.execute(
+                select(Item.id, Item.sku, Item.unit_type, Item.base_unit_id, Item.length, Item.width)
+                .where(Item.sku.in_(chunk))
+            ).all():
+                self._items[item.sku] = item
+
+        missing_codes = list(codes - self._parties.keys())
+        for chunk in _chunks(missing_codes, self.INSERT_CHUNK):
+            self._parties.update(db.execute(select(Party.code, Party.id).where(Party.code.in_(chunk))).all())
+
+        return set(db.execute(
+            select(Invoice.serial_full).where(Invoice.serial_full.in_(list(serials)))
+        ).scalars().all())
+
+    # --- اعتبارسنجی ---
+    def _build(self, serial_full, rows, existing) -> dict:
+        first_row_number, first = rows[0]
+        if not serial_full:
+            raise RowError(first_row_number, "ستون serial_full خالی است.")
+        if serial_full in self._seen:
+            raise RowError(first_row_number, "سریال در فایل تکراری است (ردیف‌های فاکتور باید پشت‌سرهم باشند).")
+        self._seen.add(serial_full)
+        if serial_full in existing:
+            raise RowError(first_row_number, "فاکتوری با این سریال قبلاً ثبت شده است.")
+
+        missing = [c for c in REQUIRED_COLUMNS if c not in first]
+        if missing:
+            raise RowError(first_row_number, f"ستون‌های اجباری موجود نیست: {', '.join(missing)}")
+
+        invoice_type = _text(first.get("invoice_type"))
+        if invoice_type not in MOVEMENT_TYPES:
+            raise RowError(first_row_number, f"نوع فاکتور نامعتبر: {invoice_type}")
+        party_id = self._parties.get(_text(first.get("party_code")))
+        if party_id is None:
+            raise RowError(first_row_number, f"طرف‌حساب یافت نشد: {_text(first.get('party_code'))}")
+        status = _text(first.get("status")) or "draft"
+        if status not in INVOICE_STATUSES:
+            raise RowError(first_row_number, f"وضعیت نامعتبر: {status}")
+        invoice_date = _parse_date(first_row_number, first.get("date"))
+
+        lines, subtotal = [], 0
+        for row_number, row in rows:
+            item = self._items.get(_text(row.get("sku")))
+            if item is None:
+                raise RowError(row_number, f"کالا یافت نشد: {_text(row.get('sku'))}")
+            unit_code = _text(row.get("unit_code"))
+            unit_id = self._units.get(unit_code) if unit_code else item.base_unit_id
+            if unit_id is None:
+                raise RowError(row_number, f"واحد یافت نشد: {unit_code}")
+            qty = _number(row_number, row, "qty")
+            unit_price = _number(row_number, row, "unit_price")
+            if qty <= 0 or unit_price < 0:
+                raise RowError(row_number, "مقدار باید مثبت و قیمت واحد نامنفی باشد.")
+
+            line_total = calculate_line_total(
+                item=item, qty=qty, unit_price=unit_price,
+                length=item.length if item.unit_type == "measure" else None,
+                width=item.width if item.unit_type == "measure" else None,
+            )
+            subtotal += line_total
+            lines.append({
+                "item_id": item.id,
+                "qty": float(qty),
+                "unit_id": unit_id,
+                "unit_price": int(unit_price),
+                "discount": int(_number(row_number, row, "discount", 0)),
+                "tax": int(_number(row_number, row, "tax", 0)),
+                "line_total": line_total,
+                "notes": _text(row.get("notes")),
+            })
+
+        serial, number = _split_serial(serial_full)
+        tax = int(_number(first_row_number, first, "invoice_tax", 0))
+        discount = int(_number(first_row_number, first, "invoice_discount", 0))
+        shipping = int(_number(first_row_number, first, "shipping", 0))
+        return {
+            "row_number": first_row_number,
+            "header": {
+                "invoice_type": invoice_type, "serial": serial, "number": number, "serial_full": serial_full,
+                "party_id": party_id, "date_gregorian": invoice_date,
+                "date_jalali": gregorian_to_jalali(invoice_date),
+                "subtotal": subtotal, "tax": tax, "discount": discount, "shipping": shipping,
+                "total": subtotal + tax + shipping - discount, "status": status, "created_by": self.created_by,
+            },
+            "lines": lines,
+        }
+
+    # --- درج ---
+    def _process_batch(self, batch, report):
+        with unit_of_work() as db:
+            existing = self._preload(db, batch)
+
+        invoices = []
+        for serial_full, rows in batch:
+            try:
+                invoices.append(self._build(serial_full, rows, existing))
+            except RowError as e:
+                report.add_error(e.row_number, serial_full, str(e))
+        self._write(invoices, report)
+        if self.on_progress:
+            self.on_progress(report)
+
+    def _write(self, invoices, report):
+        if not invoices:
+            return
+        try:
+            with unit_of_work() as db:
+                self._insert(db, invoices)
+        except Exception as e:
+            if len(invoices) == 1:
+                report.add_error(invoices[0]["row_number"], invoices[0]["header"]["serial_full"],
+                                 str(getattr(e, "orig", e)))
+                return
+            # خطای دیتابیس در یک دسته — فاکتورها تک‌تک درج می‌شوند تا فاکتور مقصر جدا شود
+            for invoice in invoices:
+                self._write([invoice], report)
+            return
+        report.invoices += len(invoices)
+        report.lines += sum(len(invoice["lines"]) for invoice in invoices)
+
+    def _insert(self, db, invoices):
+        ids = {}
+        for chunk in _chunks([invoice["header"] for invoice in invoices], self.INSERT_CHUNK):
+            ids.update((serial_full, invoice_id) for invoice_id, serial_full in db.execute(
+                insert(Invoice).returning(Invoice.id, Invoice.serial_full), chunk
+            ).all())
+
+        lines, movements = [], []
+        for invoice in invoices:
+            invoice_id = ids[invoice["header"]["serial_full"]]
+            lines.extend({**line, "invoice_id": invoice_id} for line in invoice["lines"])
+
+        # شناسه خطوط به ترتیب ورودی — هر تحرک به خط فاکتور خود اشاره می‌کند
+        line_ids = []
+        for chunk in _chunks(lines, self.INSERT_CHUNK):
+            line_ids.extend(db.execute(
+                insert(InvoiceLine).returning(InvoiceLine.id, sort_by_parameter_order=True), chunk
+            ).scalars())
+
+        line_id_iter = iter(line_ids)
+        for invoice in invoices:
+            header = invoice["header"]
+            invoice_id = ids[header["serial_full"]]
+            movement_type, sign = MOVEMENT_TYPES[header["invoice_type"]]
+            created_at = datetime.combine(header["date_gregorian"], datetime.min.time())
+            for line in invoice["lines"]:
+                qty = sign * line["qty"]
+                movements.append(StockMovement(
+                    item_id=line["item_id"], qty=qty, unit_id=line["unit_id"],
+                    movement_type=movement_type, reference_type="invoice", reference_id=invoice_id,
+                    invoice_line_id=next(line_id_iter),
+                    cost_per_unit=line["unit_price"], total_cost=int(qty * line["unit_price"]),
+                    created_at=created_at,
+                ))
+
+        # بهای تحرکات به ترتیب تاریخ سند تعیین می‌شود — همان موتور بهای ثبت دستی فاکتور
+        movements.sort(key=lambda m: m.created_at)
+        db.add_all(movements)
+        apply_movements(db, movements)
+
+        # سریال‌های قالب PREFIX-سال-شماره — شمارنده document_sequences از آن‌ها جلو می‌افتد
+        used = {}
+        for invoice in invoices:
+            parsed = parse_serial(invoice["header"]["serial_full"])
+            if parsed:
+                key = parsed[:2]
+                used[key] = max(used.get(key, 0), parsed[2])
+        bump_sequences(db, used)
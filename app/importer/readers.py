@@ -0,0 +1,52 @@
+# app/importer/readers.py
+"""خواندن جریانی فایل‌های ورودی — هر ردیف یک dict با کلیدهای سطر عنوان
+
+CSV با ماژول csv و XLSX با openpyxl در حالت read_only خوانده می‌شود؛ کل فایل هرگز در حافظه نیست.
+"""
+import csv
+import os
+
+
+def _clean_header(value):
+    return str(value).strip().lower() if value is not None else ""
+
+
+def iter_csv_rows(path, encoding="utf-8-sig"):
+    """(شماره ردیف در فایل، dict) — ردیف ۱ سطر عنوان است"""
+    with open(path, newline="", encoding=encoding) as f:
+        reader = csv.reader(f)
+        header = [_clean_header(h) for h in next(reader, [])]
+        for row_number, values in enumerate(reader, start=2):
+            if not any(v.strip() for v in values):
+                continue
+            yield row_number, dict(zip(header, (v.strip() for v in values)))
+
+
+def iter_xlsx_rows(path, sheet=None):
+    """(شماره ردیف در فایل، dict) — از اولین برگه یا برگه نام‌برده"""
+    from openpyxl import load_workbook  # فقط هنگام ورود از اکسل
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        rows = worksheet.iter_rows(values_only=True)
+        header = [_clean_header(h) for h in next(rows, ())]
+        for row_number, values in enumerate(rows, start=2):
+            if all(v is None or str(v).strip() == "" for v in values):
+                continue
+            yield row_number, {
+                key: value.strip() if isinstance(value, str) else value
+                for key, value in zip(header, values) if key
+            }
+    finally:
+        workbook.close()
+
+
+def iter_rows(path, sheet=None):
+    """انتخاب خواننده بر اساس پسوند فایل"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return iter_csv_rows(path)
+    if extension in (".xlsx", ".xlsm"):
+        return iter_xlsx_rows(path, sheet)
+    raise ValueError(f"نوع فایل پشتیبانی نمی‌شود: {extension}")
@@ -2,14 +2,26 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app.utils.startup_profiler import StartupProfiler
+
+# --profile-startup: زمان import ماژول‌ها + زمان رسیدن به اولین نقاشی پنجره
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+profiler = StartupProfiler().install() if PROFILE_STARTUP else None
+
 from PySide6.QtWidgets import QApplication
-from app.ui.dashboard import DashboardWindow
 
 def main():
-    app = QApplication(sys.argv)
+    argv = [arg for arg in sys.argv if arg != "--profile-startup"]
+    app = QApplication(argv)
+    from app.ui.dashboard import DashboardWindow
+    if profiler:
+        profiler.mark("import ماژول‌های رابط کاربری")
     window = DashboardWindow()
+    if profiler:
+        profiler.mark("ساخت پنجره اصلی")
+        profiler.watch_first_paint(window, on_painted=profiler.report)
     window.show()
     sys.exit(app.exec())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -12,12 +12,20 @@ from .party import Party
 from .unit import Unit
 from .item import Item
 from .stock_movement import StockMovement
+from .item_stock_balance import ItemStockBalance
+from .stock_cost_layer import StockCostLayer
 from .stock_val_period import StockValPeriod
 from .invoice import Invoice
 from .invoice_line import InvoiceLine
+from .document_sequence import DocumentSequence
 from .check import Check
 from .payment import Payment
 from .payment_line import PaymentLine
 from .journal_entry import JournalEntry
 from .journal_line import JournalLine
+from .ledger_period_balance import LedgerPeriodBalance
+from .ledger_closed_period import LedgerClosedPeriod
+from .account_mapping import AccountMapping
+from .check_due_summary import CheckDueSummary
+from .check_status_history import CheckStatusHistory
 from .print_template import PrintTemplate
\ No newline at end of file
@@ -0,0 +1,13 @@
+# app/models/account_mapping.py
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.models.base import BaseModel
+
+class AccountMapping(BaseModel):
+    __tablename__ = 'account_mappings'
+
+    key = Column(String(50), primary_key=True)  # نقش حساب در سند خودکار — مثلاً: receivable, sales
+    ledger_account_id = Column(Integer, ForeignKey('ledger_accounts.id'), nullable=False)
+    description = Column(String(200), nullable=True)
+
+    def __repr__(self):
+        return f"<AccountMapping {self.key} → {self.ledger_account_id}>"
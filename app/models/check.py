@@ -1,5 +1,5 @@
 # app/models/check.py
-from sqlalchemy import Column, Integer, String, Numeric, Date, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, String, Numeric, Date, ForeignKey, CheckConstraint, Index
 from app.models.base import BaseModel
 
 class Check(BaseModel):
@@ -14,12 +14,12 @@ class Check(BaseModel):
     amount = Column(Numeric(18, 0), nullable=False)  # ریال — بدون اعشار
     currency = Column(String(3), default="IRR")
     issue_date = Column(Date, nullable=False)
-    due_date = Column(Date, nullable=False)
+    due_date = Column(Date, nullable=False, index=True)  # مرتب‌سازی پیش‌فرض لیست چک‌ها
     status = Column(String(50), nullable=False, default="registered")  # registered, issued, in_hand, deposited, cleared, bounced, endorsed, reconciled, cancelled
     issuer_name = Column(String(200), nullable=True)
     payer_party_id = Column(Integer, ForeignKey('parties.id'), nullable=True)  # طرف پرداخت‌کننده
     payee_party_id = Column(Integer, ForeignKey('parties.id'), nullable=True)  # طرف دریافت‌کننده
-    related_invoice_id = Column(Integer, ForeignKey('invoices.id'), nullable=True)
+    related_invoice_id = Column(Integer, ForeignKey('invoices.id'), nullable=True, index=True)  # بررسی کلید خارجی هنگام حذف فاکتور
     bank_account_id = Column(Integer, ForeignKey('bank_accounts.id'), nullable=False)
     image_path = Column(String(500), nullable=True)
     bounce_reason = Column(String(500), nullable=True)
@@ -28,6 +28,8 @@ class Check(BaseModel):
     __table_args__ = (
         CheckConstraint("direction IN ('received', 'issued')", name="check_direction_valid"),
         CheckConstraint("status IN ('registered', 'issued', 'in_hand', 'deposited', 'cleared', 'bounced', 'endorsed', 'reconciled', 'cancelled')", name="check_status_valid"),
+        # چک‌های یک وضعیت به ترتیب سررسید — داشبورد و سررسیدها
+        Index('ix_checks_status_due_date', 'status', 'due_date'),
     )
 
     def __repr__(self):
@@ -0,0 +1,21 @@
+# app/models/check_due_summary.py
+from sqlalchemy import Column, Integer, String, Numeric, Date, ForeignKey, UniqueConstraint
+from app.models.base import BaseModel
+
+class CheckDueSummary(BaseModel):
+    __tablename__ = 'check_due_summaries'
+
+    id = Column(Integer, primary_key=True, index=True)
+    due_date = Column(Date, nullable=False)
+    bank_account_id = Column(Integer, ForeignKey('bank_accounts.id'), nullable=False)
+    direction = Column(String(20), nullable=False)                     # 'received' | 'issued'
+    check_count = Column(Integer, nullable=False, default=0)           # چک‌های در جریان با این سررسید
+    total_amount = Column(Numeric(18, 0), nullable=False, default=0)   # ریال
+
+    __table_args__ = (
+        # بازه سررسید (داشبورد، سنی‌سازی) با پیمایش ایندکس از due_date
+        UniqueConstraint('due_date', 'bank_account_id', 'direction', name='uq_check_due_summary'),
+    )
+
+    def __repr__(self):
+        return f"<CheckDueSummary {self.due_date} bank={self.bank_account_id} {self.direction} {self.check_count}>"
@@ -0,0 +1,22 @@
+# app/models/check_status_history.py
+from sqlalchemy import Column, Integer, String, Index
+from app.models.base import BaseModel
+
+class CheckStatusHistory(BaseModel):
+    """تاریخچه تغییر وضعیت چک — فقط درج؛ پس از حذف چک هم برای حسابرسی می‌ماند (بدون کلید خارجی)"""
+    __tablename__ = 'check_status_history'
+
+    id = Column(Integer, primary_key=True, index=True)
+    check_id = Column(Integer, nullable=False)
+    event = Column(String(20), nullable=False)        # issue, receive, deposit, clear, bounce, cancel
+    from_status = Column(String(50), nullable=False)
+    to_status = Column(String(50), nullable=False)
+    changed_by = Column(Integer, nullable=True)       # کاربر — اختیاری
+
+    __table_args__ = (
+        # تاریخچه یک چک به ترتیب زمان
+        Index('ix_check_status_history_check', 'check_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<CheckStatusHistory check={self.check_id} {self.from_status} → {self.to_status}>"
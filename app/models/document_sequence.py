@@ -0,0 +1,13 @@
+# app/models/document_sequence.py
+from sqlalchemy import Column, Integer, String
+from app.models.base import BaseModel
+
+class DocumentSequence(BaseModel):
+    __tablename__ = 'document_sequences'
+
+    prefix = Column(String(10), primary_key=True)       # پیشوند سند — مثلاً: "INV"
+    fiscal_year = Column(Integer, primary_key=True)     # سال مالی شمسی — مثلاً: 1404
+    next_number = Column(Integer, nullable=False, default=1)  # اولین شماره تخصیص‌نیافته
+
+    def __repr__(self):
+        return f"<DocumentSequence {self.prefix}-{self.fiscal_year} next={self.next_number}>"
@@ -0,0 +1,14 @@
+# app/models/item_stock_balance.py
+from sqlalchemy import Column, Integer, Numeric, ForeignKey
+from app.models.base import BaseModel
+
+class ItemStockBalance(BaseModel):
+    __tablename__ = 'item_stock_balance'
+
+    item_id = Column(Integer, ForeignKey('items.id'), primary_key=True)
+    qty_on_hand = Column(Numeric(18, 4), nullable=False, default=0)    # موجودی فعلی — واحد پایه
+    value_on_hand = Column(Numeric(18, 0), nullable=False, default=0)  # ارزش فعلی — ریال
+    last_movement_id = Column(Integer, nullable=True)                  # آخرین تحرک اعمال‌شده
+
+    def __repr__(self):
+        return f"<ItemStockBalance item={self.item_id} qty={self.qty_on_hand} value={self.value_on_hand}>"
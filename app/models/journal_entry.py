@@ -1,5 +1,5 @@
 # app/models/journal_entry.py
-from sqlalchemy import Column, Integer, String, Date, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Boolean, ForeignKey, Index, text
 from app.models.base import BaseModel
 
 class JournalEntry(BaseModel):
@@ -9,10 +9,17 @@ class JournalEntry(BaseModel):
     date = Column(Date, nullable=False, index=True)
     period = Column(String(7), nullable=False, index=True)  # YYYY-MM
     description = Column(String(500), nullable=True)
-    source_type = Column(String(50), nullable=False)  # invoice, payment, check, adjustment
+    source_type = Column(String(50), nullable=False)  # invoice, payment, check_<مرحله>, adjustment
     source_id = Column(Integer, nullable=False)
     posted = Column(Boolean, default=False)
     created_by = Column(Integer, ForeignKey('users.id'), nullable=False)
 
+    __table_args__ = (
+        # هر سند منبع فقط یک بار ثبت می‌شود — سندهای دستی (adjustment) مستثنا هستند
+        Index('uq_journal_entries_source', 'source_type', 'source_id', unique=True,
+              sqlite_where=text("source_type != 'adjustment'"),
+              postgresql_where=text("source_type != 'adjustment'")),
+    )
+
     def __repr__(self):
         return f"<JournalEntry {self.id} {self.period} {self.description}>"
\ No newline at end of file
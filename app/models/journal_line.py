@@ -1,5 +1,5 @@
 # app/models/journal_line.py
-from sqlalchemy import Column, Integer, Numeric, ForeignKey, String
+from sqlalchemy import Column, Integer, Numeric, ForeignKey, String, Index
 from app.models.base import BaseModel
 
 class JournalLine(BaseModel):
@@ -7,12 +7,18 @@ class JournalLine(BaseModel):
 
     id = Column(Integer, primary_key=True, index=True)
     journal_entry_id = Column(Integer, ForeignKey('journal_entries.id'), nullable=False, index=True)
-    ledger_account_id = Column(Integer, ForeignKey('ledger_accounts.id'), nullable=False)
+    ledger_account_id = Column(Integer, ForeignKey('ledger_accounts.id'), nullable=False, index=True)
     debit = Column(Numeric(18, 0), default=0)  # ریال
     credit = Column(Numeric(18, 0), default=0)  # ریال
     party_id = Column(Integer, ForeignKey('parties.id'), nullable=True)  # اختیاری
     reference_type = Column(String(50), nullable=True)
     reference_id = Column(Integer, nullable=True)
 
+    __table_args__ = (
+        # مانده طرف‌حساب‌ها — ایندکس پوششی؛ journal_entry_id برای پیوند با سند (فقط اسناد ثبت‌شده)
+        # بدون خواندن ردیف‌های جدول
+        Index('ix_journal_lines_party_entry_balance', 'party_id', 'journal_entry_id', 'debit', 'credit'),
+    )
+
     def __repr__(self):
         return f"<JournalLine JE={self.journal_entry_id} Dr={self.debit} Cr={self.credit}>"
\ No newline at end of file
@@ -1,5 +1,6 @@
 # app/models/ledger_account.py
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, event, select, update, func
+from sqlalchemy.orm import attributes
 from app.models.base import BaseModel
 
 class LedgerAccount(BaseModel):
@@ -10,7 +11,50 @@ class LedgerAccount(BaseModel):
     name = Column(String(200), nullable=False)
     account_type = Column(String(50), nullable=False)  # asset, liability, equity, income, expense
     parent_id = Column(Integer, ForeignKey('ledger_accounts.id'), nullable=True)
+    # مسیر از ریشه — مثلاً /1/4/9/ ؛ زیردرخت یک حساب = path LIKE '/1/4/%' (بدون پیمایش بازگشتی)
+    path = Column(String(255), nullable=True, index=True)
     is_reconcilable = Column(Boolean, default=False)
 
+    @property
+    def level(self) -> int:
+        return self.path.count("/") - 1 if self.path else 1
+
     def __repr__(self):
-        return f"<LedgerAccount {self.code} - {self.name}>"
\ No newline at end of file
+        return f"<LedgerAccount {self.code} - {self.name}>"
+
+
+def _parent_path(connection, parent_id) -> str:
+    if parent_id is None:
+        return "/"
+    table = LedgerAccount.__table__
+    path = connection.execute(select(table.c.path).where(table.c.id == parent_id)).scalar()
+    if path is None:
+        raise ValueError(f"حساب والد یافت نشد: {parent_id}")
+    return path
+
+
+@event.listens_for(LedgerAccount, "after_insert")
+def _set_path(mapper, connection, target):
+    """مسیر حساب جدید — به id نیاز دارد، پس پس از INSERT نوشته می‌شود"""
+    path = f"{_parent_path(connection, target.parent_id)}{target.id}/"
+    table = LedgerAccount.__table__
+    connection.execute(update(table).where(table.c.id == target.id).values(path=path))
+    attributes.set_committed_value(target, "path", path)
+
+
+@event.listens_for(LedgerAccount, "after_update")
+def _move_subtree(mapper, connection, target):
+    """تغییر والد — مسیر حساب و تمام زیرحساب‌ها با یک UPDATE اصلاح می‌شود"""
+    if not attributes.get_history(target, "parent_id").has_changes():
+        return
+    table = LedgerAccount.__table__
+    old_path = connection.execute(select(table.c.path).where(table.c.id == target.id)).scalar()
+    new_path = f"{_parent_path(connection, target.parent_id)}{target.id}/"
+    if new_path.startswith(old_path):
+        raise ValueError("حساب نمی‌تواند زیرمجموعه خودش یا زیرحساب‌هایش باشد.")
+    connection.execute(
+        update(table).where(table.c.path.like(f"{old_path}%")).values(
+            path=new_path + func.substr(table.c.path, len(old_path) + 1)
+        )
+    )
+    attributes.set_committed_value(target, "path", new_path)
@@ -0,0 +1,12 @@
+# app/models/ledger_closed_period.py
+from sqlalchemy import Column, String
+from app.models.base import BaseModel
+
+class LedgerClosedPeriod(BaseModel):
+    """دوره‌های بسته دفتر کل — حتی دوره‌ای که هیچ ردیف مانده ندارد (دفتر تازه یا ماه بدون گردش)"""
+    __tablename__ = 'ledger_closed_periods'
+
+    period = Column(String(7), primary_key=True)  # YYYY-MM
+
+    def __repr__(self):
+        return f"<LedgerClosedPeriod {self.period}>"
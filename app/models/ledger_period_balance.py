@@ -0,0 +1,23 @@
+# app/models/ledger_period_balance.py
+from sqlalchemy import Column, Integer, String, Numeric, Boolean, ForeignKey, UniqueConstraint
+from app.models.base import BaseModel
+
+class LedgerPeriodBalance(BaseModel):
+    __tablename__ = 'ledger_period_balances'
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey('ledger_accounts.id'), nullable=False)
+    party_id = Column(Integer, nullable=False, default=0)               # 0 = بدون طرف‌حساب
+    period = Column(String(7), nullable=False, index=True)              # YYYY-MM
+    debit_total = Column(Numeric(18, 0), nullable=False, default=0)     # گردش بدهکار دوره — ریال
+    credit_total = Column(Numeric(18, 0), nullable=False, default=0)    # گردش بستانکار دوره — ریال
+    closing_balance = Column(Numeric(18, 0), nullable=False, default=0) # مانده تجمعی تا پایان دوره (بدهکار − بستانکار)
+    is_closed = Column(Boolean, nullable=False, default=False)          # دوره بسته — ثبت جدید ممنوع
+
+    __table_args__ = (
+        # آخرین دوره هر حساب/طرف‌حساب — مانده با خواندن یک ردیف
+        UniqueConstraint('account_id', 'party_id', 'period', name='uq_ledger_period_balance'),
+    )
+
+    def __repr__(self):
+        return f"<LedgerPeriodBalance account={self.account_id} party={self.party_id} {self.period} {self.closing_balance}>"
@@ -0,0 +1,16 @@
+# app/models/stock_cost_layer.py
+from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey
+from app.models.base import BaseModel
+
+class StockCostLayer(BaseModel):
+    __tablename__ = 'stock_cost_layers'
+
+    id = Column(Integer, primary_key=True, index=True)
+    item_id = Column(Integer, ForeignKey('items.id'), nullable=False, index=True)
+    movement_id = Column(Integer, nullable=False)                 # تحرک ورودی که لایه را ساخته
+    received_at = Column(DateTime, nullable=False)                # زمان ورود — ترتیب FIFO
+    qty_remaining = Column(Numeric(18, 4), nullable=False)        # مقدار مصرف‌نشده
+    unit_cost = Column(Numeric(18, 4), nullable=False)            # بهای واحد — ریال
+
+    def __repr__(self):
+        return f"<StockCostLayer item={self.item_id} qty={self.qty_remaining} cost={self.unit_cost}>"
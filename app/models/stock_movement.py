@@ -1,5 +1,5 @@
 # app/models/stock_movement.py
-from sqlalchemy import Column, Integer, Numeric, String, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, Numeric, String, DateTime, ForeignKey, CheckConstraint, Index
 from app.models.base import BaseModel
 from sqlalchemy.sql import func  # ✅ این خط اضافه شود
 
@@ -13,12 +13,17 @@ class StockMovement(BaseModel):
     movement_type = Column(String(50), nullable=False)  # purchase_in, sale_out, adjustment, return_in, return_out
     reference_type = Column(String(50), nullable=True)  # 'invoice', 'adjustment', etc.
     reference_id = Column(Integer, nullable=True)      # ID مرجع (فاکتور، تعدیل و ...)
+    invoice_line_id = Column(Integer, nullable=True, index=True)  # خط فاکتور — ویرایش تفاضلی فاکتور
     cost_per_unit = Column(Numeric(18, 0), nullable=False)  # قیمت به ریال — بدون اعشار
     total_cost = Column(Numeric(18, 0), nullable=False)
-    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    created_at = Column(DateTime, nullable=False, server_default=func.now(), index=True)  # بازه‌های دوره ارزش‌گذاری
 
     __table_args__ = (
         CheckConstraint('qty != 0', name='check_qty_nonzero'),
+        # تحرکات یک سند — حذف/ویرایش فاکتور، بهای تمام‌شده، موجودی بدون یک فاکتور
+        Index('ix_stock_movements_reference', 'reference_type', 'reference_id'),
+        # تاریخچه یک کالا به ترتیب زمان — بازپردازش بها، آخرین بهای ورودی، میانگین موزون
+        Index('ix_stock_movements_item_created', 'item_id', 'created_at'),
     )
 
     def __repr__(self):
@@ -1,7 +1,6 @@
 # app/models/user.py
 from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
 from app.models.base import BaseModel
-import bcrypt
 
 class User(BaseModel):
     __tablename__ = 'users'
@@ -14,10 +13,12 @@ class User(BaseModel):
     is_active = Column(Boolean, default=True)
 
     def set_password(self, password: str):
+        import bcrypt  # فقط هنگام ورود/تغییر رمز — نه در راه‌اندازی برنامه
         salt = bcrypt.gensalt()
         self.password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
     def check_password(self, password: str) -> bool:
+        import bcrypt
         return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
 
     def __repr__(self):
@@ -1,28 +1,223 @@
 # app/services/accounting_service.py
-from app.database import SessionLocal
+from decimal import Decimal
+from sqlalchemy import case, func, literal, select
+from app.database import unit_of_work
 from app.models.journal_entry import JournalEntry
 from app.models.journal_line import JournalLine
-from app.utils.double_entry import validate_double_entry
+from app.models.ledger_account import LedgerAccount
+from app.models.ledger_period_balance import LedgerPeriodBalance as LPB
+from app.models.party import Party
+from app.utils.double_entry import check_balanced, scan_ledger, validate_double_entry, validate_entries
+from app.utils.ledger_balances import (
+    NO_PARTY, close_period, closed_through, ensure_open, post_lines, snapshot_closing, snapshot_totals,
+)
 
-class AccountingService:
-    def __init__(self):
-        self.db = SessionLocal()
+ZERO = Decimal("0")
+
+
+def _totals_columns(period_from=None):
+    """ستون‌های جمع گروهی — مانده پیش از period_from و گردش بدهکار/بستانکار از period_from به بعد"""
+    debit, credit = func.coalesce(JournalLine.debit, 0), func.coalesce(JournalLine.credit, 0)
+    if period_from is None:
+        return literal(0), func.sum(debit), func.sum(credit)
+    before = JournalEntry.period < period_from
+    return (
+        func.sum(case((before, debit - credit), else_=0)),
+        func.sum(case((before, 0), else_=debit)),
+        func.sum(case((before, 0), else_=credit)),
+    )
 
-    def create_journal_entry(self, data, lines_data):
-        """ایجاد ثبت روزنامه + خطوط — با اعتبارسنجی دوبل"""
-        journal_entry = JournalEntry(**data)
-        self.db.add(journal_entry)
-        self.db.flush()
 
-        for line_data in lines_data:
-            line = JournalLine(journal_entry_id=journal_entry.id, **line_data)
-            self.db.add(line)
+def _empty_row() -> dict:
+    return dict.fromkeys(("opening", "debit", "credit", "closing"), ZERO)
 
-        self.db.flush()
-        validate_double_entry(self.db, journal_entry)
-        self.db.commit()
-        self.db.refresh(journal_entry)
-        return journal_entry
+
+def _balance_row(opening, debit, credit) -> dict:
+    opening, debit, credit = Decimal(str(opening or 0)), Decimal(str(debit or 0)), Decimal(str(credit or 0))
+    return {"opening": opening, "debit": debit, "credit": credit, "closing": opening + debit - credit}
+
+
+class AccountingService:
+    def create_journal_entry(self, data, lines_data):
+        """ایجاد ثبت روزنامه + خطوط — اعتبارسنجی دوبل در حافظه، پیش از درج"""
+        check_balanced(lines_data)
+        with unit_of_work() as db:
+            ensure_open(db, data['period'])
+            journal_entry = JournalEntry(**data)
+            db.add(journal_entry)
+            db.flush()
+
+            db.add_all([JournalLine(journal_entry_id=journal_entry.id, **line_data) for line_data in lines_data])
+            db.flush()
+            if journal_entry.posted:
+                self._post(db, journal_entry)
+                db.flush()
+            db.refresh(journal_entry)
+            return journal_entry
 
     def get_journal_entries_by_period(self, period: str):
-        return self.db.query(JournalEntry).filter(JournalEntry.period == period).order_by(JournalEntry.date).all()
\ No newline at end of file
+        with unit_of_work() as db:
+            return db.query(JournalEntry).filter(JournalEntry.period == period).order_by(JournalEntry.date).all()
+
+    def post_entry(self, entry_id: int):
+        """ثبت قطعی سند پیش‌نویس — مانده دوره‌ای حساب‌ها به‌صورت افزایشی به‌روز می‌شود"""
+        with unit_of_work() as db:
+            entry = db.get(JournalEntry, entry_id)
+            if not entry:
+                raise ValueError("سند یافت نشد.")
+            if entry.posted:
+                return entry
+            validate_double_entry(db, entry)
+            self._post(db, entry)
+            db.flush()
+            return entry
+
+    def post_entries(self, entry_ids) -> int:
+        """ثبت قطعی گروهی اسناد پیش‌نویس — تراز همه اسناد با یک کوئری بررسی می‌شود"""
+        with unit_of_work() as db:
+            entries = db.execute(
+                select(JournalEntry).where(JournalEntry.id.in_(list(entry_ids)), JournalEntry.posted.isnot(True))
+            ).scalars().all()
+            if not entries:
+                return 0
+            validate_entries(db, [entry.id for entry in entries])
+            for entry in entries:
+                self._post(db, entry)
+            db.flush()
+            return len(entries)
+
+    def check_ledger(self) -> dict:
+        """بررسی سلامت کل دفتر — اسناد ناتراز، خطوط بدون سند و خطوط روی حساب ناموجود"""
+        with unit_of_work() as db:
+            return scan_ledger(db)
+
+    def close_period(self, period: str) -> int:
+        """بستن دوره مالی (YYYY-MM) و دوره‌های قبل — تعداد ردیف‌های مانده منجمدشده دوره"""
+        with unit_of_work() as db:
+            return close_period(db, period)
+
+    def get_closed_through(self):
+        with unit_of_work() as db:
+            return closed_through(db)
+
+    @staticmethod
+    def _post(db, entry: JournalEntry):
+        lines = db.execute(
+            select(JournalLine.ledger_account_id, JournalLine.party_id, JournalLine.debit, JournalLine.credit)
+            .where(JournalLine.journal_entry_id == entry.id)
+        ).all()
+        post_lines(db, entry.period, lines)
+        entry.posted = True
+
+    def trial_balance(self, period_from: str = None, period_to: str = None) -> dict:
+        """تراز آزمایشی — دوره‌ها به قالب YYYY-MM؛ هر دو اختیاری
+
+        جمع هر حساب (و جداگانه هر طرف‌حساب) از ledger_period_balances تا آخرین دوره بسته به‌علاوه یک
+        کوئری گروهی روی خطوط دوره‌های باز؛ جمع هر حساب با مسیر (path) به حساب‌های بالادست اضافه می‌شود.
+        خروجی: {"accounts": [...], "parties": [...], "total_debit", "total_credit"} — هر ردیف با
+        opening (مانده پیش از period_from)، debit، credit و closing.
+        """
+        with unit_of_work() as db:
+            totals = self._ledger_totals(db, "account_id", period_from, period_to)
+            party_totals = self._ledger_totals(db, "party_id", period_from, period_to)
+            accounts = {a.id: a for a in db.execute(
+                select(LedgerAccount.id, LedgerAccount.code, LedgerAccount.name, LedgerAccount.account_type,
+                       LedgerAccount.parent_id, LedgerAccount.path)
+            ).all()}
+            names = dict(db.execute(
+                select(Party.id, Party.name).where(Party.id.in_(list(party_totals)))
+            ).all()) if party_totals else {}
+
+        rolled = {}
+        total_debit = total_credit = ZERO
+        for account_id, values in totals.items():
+            own = _balance_row(*values)
+            total_debit += own["debit"]
+            total_credit += own["credit"]
+            path = accounts[account_id].path if account_id in accounts else None
+            for ancestor_id in (int(part) for part in (path or f"/{account_id}/").strip("/").split("/")):
+                row = rolled.setdefault(ancestor_id, _empty_row())
+                for key, value in own.items():
+                    row[key] += value
+
+        account_rows = []
+        for account_id, row in rolled.items():
+            account = accounts.get(account_id)
+            if account is None:
+                continue
+            account_rows.append({
+                "account_id": account_id, "code": account.code, "name": account.name,
+                "account_type": account.account_type, "parent_id": account.parent_id,
+                "level": account.path.count("/") - 1 if account.path else 1,
+                **row,
+            })
+        account_rows.sort(key=lambda row: row["code"])
+
+        party_rows = [{"party_id": party_id, "name": names.get(party_id, ""), **_balance_row(*values)}
+                      for party_id, values in party_totals.items()]
+        party_rows.sort(key=lambda row: row["name"])
+        return {"accounts": account_rows, "parties": party_rows,
+                "total_debit": total_debit, "total_credit": total_credit}
+
+    def account_balance(self, account_id: int, period_to: str = None, include_children: bool = True) -> Decimal:
+        """مانده یک حساب (بدهکار − بستانکار) تا پایان period_to — پیش‌فرض همراه زیرحساب‌ها"""
+        with unit_of_work() as db:
+            if include_children:
+                path = db.execute(select(LedgerAccount.path).where(LedgerAccount.id == account_id)).scalar()
+                if path is None:
+                    raise ValueError(f"حساب یافت نشد: {account_id}")
+                accounts = select(LedgerAccount.id).where(LedgerAccount.path.like(f"{path}%"))
+                snapshot, lines = LPB.account_id.in_(accounts), JournalLine.ledger_account_id.in_(accounts)
+            else:
+                snapshot, lines = LPB.account_id == account_id, JournalLine.ledger_account_id == account_id
+            totals = self._ledger_totals(db, "account_id", None, period_to, lines, snapshot_criteria=(snapshot,))
+        return sum((opening + debit - credit for opening, debit, credit in totals.values()), ZERO)
+
+    def party_net_balance(self) -> Decimal:
+        """جمع مانده تمام طرف‌حساب‌ها (بدهکار − بستانکار) — مثبت: طلب، منفی: بدهی"""
+        amount = func.sum(func.coalesce(JournalLine.debit, 0) - func.coalesce(JournalLine.credit, 0))
+        with unit_of_work() as db:
+            cutoff = closed_through(db)
+            # مانده دوره‌ای فقط اسناد ثبت‌شده را دارد — خطوط دوره‌های باز هم همین‌طور
+            stmt = select(amount).join(JournalEntry, JournalEntry.id == JournalLine.journal_entry_id).where(
+                JournalLine.party_id.isnot(None), JournalEntry.posted.is_(True)
+            )
+            total = ZERO
+            if cutoff:
+                total = sum(snapshot_closing(db, "party_id", cutoff, LPB.party_id != NO_PARTY).values(), ZERO)
+                stmt = stmt.where(JournalEntry.period > cutoff)
+            return total + Decimal(str(db.execute(stmt).scalar() or 0))
+
+    @staticmethod
+    def _ledger_totals(db, by: str, period_from, period_to, *line_criteria, snapshot_criteria=()) -> dict:
+        """{account_id یا party_id: [opening, debit, credit]} — دوره‌های بسته از مانده دوره‌ای، بقیه از خطوط ثبت‌شده"""
+        if by == "party_id":
+            column = JournalLine.party_id
+            line_criteria += (JournalLine.party_id.isnot(None),)
+            snapshot_criteria += (LPB.party_id != NO_PARTY,)
+        else:
+            column = JournalLine.ledger_account_id
+
+        cutoff = closed_through(db)
+        through = min(cutoff, period_to) if cutoff and period_to else cutoff
+        totals = {}
+        if through:
+            totals = {key: list(values) for key, values in
+                      snapshot_totals(db, by, through, period_from, *snapshot_criteria).items()}
+            if period_to and period_to <= through:
+                return totals
+
+        # فقط اسناد ثبت‌شده — مثل مانده دوره‌ای؛ وگرنه پیش‌نویس‌ها با بستن دوره از جمع حذف می‌شدند
+        stmt = select(column, *_totals_columns(period_from)).join(
+            JournalEntry, JournalEntry.id == JournalLine.journal_entry_id
+        ).where(JournalEntry.posted.is_(True), *line_criteria).group_by(column)
+        if through:
+            stmt = stmt.where(JournalEntry.period > through)
+        if period_to:
+            stmt = stmt.where(JournalEntry.period <= period_to)
+        for key, opening, debit, credit in db.execute(stmt).all():
+            row = totals.setdefault(key, [ZERO, ZERO, ZERO])
+            row[0] += Decimal(str(opening or 0))
+            row[1] += Decimal(str(debit or 0))
+            row[2] += Decimal(str(credit or 0))
+        return totals
@@ -0,0 +1,102 @@
+# app/services/check_schedule_service.py
+from datetime import date, timedelta
+from sqlalchemy import case, func, select
+from app.database import unit_of_work
+from app.models.bank_account import BankAccount
+from app.models.check import Check
+from app.models.check_due_summary import CheckDueSummary as CDS
+from app.models.party import Party
+from app.utils.check_schedule import PENDING_STATUSES, rebuild_due_summary
+
+# بازه‌های سنی سررسید — (کلید، از روز، تا روز) نسبت به امروز؛ None یعنی بی‌کران
+AGING_BUCKETS = (
+    ("overdue", None, -1),
+    ("0-7", 0, 7),
+    ("8-30", 8, 30),
+    ("31-90", 31, 90),
+)
+
+
+class CheckScheduleService:
+    def due_within(self, days: int, today: date = None, bank_account_id: int = None, direction: str = None):
+        """چک‌های در جریان با سررسید امروز تا days روز بعد — به ترتیب سررسید
+
+        از ایندکس (status, due_date) استفاده می‌کند. ردیف‌ها: (id, check_number, amount, due_date, direction,
+        status, bank_account_id, party_name)
+        """
+        today = today or date.today()
+        party_id = case((Check.direction == "received", Check.payer_party_id), else_=Check.payee_party_id)
+        stmt = (
+            select(Check.id, Check.check_number, Check.amount, Check.due_date, Check.direction, Check.status,
+                   Check.bank_account_id, func.coalesce(Party.name, Check.issuer_name))
+            .outerjoin(Party, Party.id == party_id)
+            .where(Check.status.in_(PENDING_STATUSES), Check.due_date.between(today, today + timedelta(days=days)))
+            .order_by(Check.due_date, Check.id)
+        )
+        if bank_account_id is not None:
+            stmt = stmt.where(Check.bank_account_id == bank_account_id)
+        if direction is not None:
+            stmt = stmt.where(Check.direction == direction)
+        with unit_of_work() as db:
+            return db.execute(stmt).all()
+
+    def due_totals(self, days: int, today: date = None) -> list:
+        """جمع چک‌های سررسید امروز تا days روز بعد به تفکیک حساب بانکی و جهت — از خلاصه روزانه"""
+        today = today or date.today()
+        with unit_of_work() as db:
+            rows = db.execute(
+                select(CDS.bank_account_id, BankAccount.name, CDS.direction,
+                       func.sum(CDS.check_count), func.sum(CDS.total_amount))
+                .join(BankAccount, BankAccount.id == CDS.bank_account_id)
+                .where(CDS.due_date.between(today, today + timedelta(days=days)))
+                .group_by(CDS.bank_account_id, BankAccount.name, CDS.direction)
+                .order_by(CDS.bank_account_id, CDS.direction)
+            ).all()
+        return [{"bank_account_id": bank_id, "bank_account": name, "direction": direction,
+                 "count": count, "amount": int(amount or 0)}
+                for bank_id, name, direction, count, amount in rows]
+
+    def aging(self, today: date = None, direction: str = None, bank_account_id: int = None) -> dict:
+        """سنی‌سازی چک‌های در جریان — {bucket: {"count", "amount"}} برای AGING_BUCKETS
+
+        یک کوئری روی خلاصه روزانه: بازه سررسید با ایندکس due_date و دسته‌بندی با CASE.
+        """
+        today = today or date.today()
+        bucket = case(
+            *[((CDS.due_date < today) if start is None
+               else CDS.due_date.between(today + timedelta(days=start), today + timedelta(days=end)), key)
+              for key, start, end in AGING_BUCKETS],
+        )
+        stmt = (
+            select(bucket, func.sum(CDS.check_count), func.sum(CDS.total_amount))
+            .where(CDS.due_date <= today + timedelta(days=AGING_BUCKETS[-1][2]))
+            .group_by(bucket)
+        )
+        if direction is not None:
+            stmt = stmt.where(CDS.direction == direction)
+        if bank_account_id is not None:
+            stmt = stmt.where(CDS.bank_account_id == bank_account_id)
+        result = {key: {"count": 0, "amount": 0} for key, _, _ in AGING_BUCKETS}
+        with unit_of_work() as db:
+            for key, count, amount in db.execute(stmt).all():
+                result[key] = {"count": count, "amount": int(amount or 0)}
+        return result
+
+    def daily_summary(self, date_from: date, date_to: date, direction: str = None) -> list:
+        """سررسیدهای روزانه برای داشبورد — [(due_date, direction, count, amount), ...]"""
+        stmt = (
+            select(CDS.due_date, CDS.direction, func.sum(CDS.check_count), func.sum(CDS.total_amount))
+            .where(CDS.due_date.between(date_from, date_to))
+            .group_by(CDS.due_date, CDS.direction)
+            .order_by(CDS.due_date, CDS.direction)
+        )
+        if direction is not None:
+            stmt = stmt.where(CDS.direction == direction)
+        with unit_of_work() as db:
+            return [(due_date, direction, count, int(amount or 0))
+                    for due_date, direction, count, amount in db.execute(stmt).all()]
+
+    def rebuild_summary(self) -> int:
+        """بازسازی خلاصه روزانه از جدول checks — تعداد ردیف‌ها"""
+        with unit_of_work() as db:
+            return rebuild_due_summary(db)
@@ -1,62 +1,161 @@
 # app/services/check_service.py
-from app.database import SessionLocal
+from types import SimpleNamespace
+from sqlalchemy import select, func, insert, or_, update
+from sqlalchemy.orm import aliased
+from app.database import unit_of_work
 from app.models.check import Check
-from app.utils.state_machine import CheckStateMachine
+from app.models.check_status_history import CheckStatusHistory
+from app.models.party import Party
+from app.utils.check_schedule import apply_due_changes, due_key
+from app.utils.state_machine import TRANSITIONS, next_status
+from app.utils.pagination import keyset_page, PAGE_SIZE
 
-class CheckService:
-    def __init__(self):
-        self.db = SessionLocal()
+# تعداد شناسه در هر IN — زیر سقف پارامترهای SQLite
+ID_CHUNK = 500
+
+Payer = aliased(Party)
+Payee = aliased(Party)
+
+# کلیدهای مرتب‌سازی مجاز برای لیست چک‌ها
+CHECK_SORT_COLUMNS = {
+    "check_number": Check.check_number,
+    "bank_name": Check.bank_name,
+    "amount": Check.amount,
+    "issue_date": Check.issue_date,
+    "due_date": Check.due_date,
+    "payer": func.coalesce(Payer.name, ""),
+    "payee": func.coalesce(Payee.name, ""),
+    "status": Check.status,
+    "direction": Check.direction,
+}
 
+class CheckService:
     def create_check(self, data):
-        check = Check(**data)
-        self.db.add(check)
-        self.db.commit()
-        self.db.refresh(check)
-        return check
+        with unit_of_work() as db:
+            check = Check(**data)
+            db.add(check)
+            db.flush()
+            db.refresh(check)
+            apply_due_changes(db, [(None, due_key(check))])
+            return check
 
     def get_all_checks(self):
-        return self.db.query(Check).order_by(Check.due_date.desc()).all()
-
-    def change_check_status(self, check_id: int, new_status: str):
-        check = self.db.query(Check).filter(Check.id == check_id).first()
-        if not check:
-            raise Exception("چک یافت نشد.")
-
-        # ایجاد state machine
-        sm = CheckStateMachine(check)
-        
-        # اعمال انتقال — مثال: sm.issue() یا sm.clear()
-        transition_method = getattr(sm, new_status, None)
-        if not transition_method:
-            raise ValueError(f"انتقال '{new_status}' معتبر نیست.")
-        
-        transition_method()
-        
-        # ذخیره وضعیت جدید
-        check.status = sm.state
-        self.db.commit()
-        self.db.refresh(check)
-        return check
-        
+        with unit_of_work() as db:
+            return db.query(Check).order_by(Check.due_date.desc()).all()
+
+    def get_check_by_id(self, check_id: int):
+        with unit_of_work() as db:
+            return db.get(Check, check_id)
+
+    def get_checks_page(self, after=None, limit=PAGE_SIZE, sort="due_date", descending=True, search=None):
+        """یک صفحه از لیست چک‌ها — ردیف‌ها: (id, check_number, bank_name, amount, issue_date, due_date,
+        payer_name, payee_name, status, direction)"""
+        stmt = select(
+            Check.id, Check.check_number, Check.bank_name, Check.amount, Check.issue_date, Check.due_date,
+            Payer.name, Payee.name, Check.status, Check.direction,
+        ).outerjoin(Payer, Payer.id == Check.payer_party_id).outerjoin(Payee, Payee.id == Check.payee_party_id)
+        if search:
+            pattern = f"%{search}%"
+            stmt = stmt.where(or_(Check.check_number.ilike(pattern), Check.bank_name.ilike(pattern)))
+        with unit_of_work() as db:
+            return keyset_page(db, stmt, CHECK_SORT_COLUMNS[sort], Check.id, after, descending, limit)
+
+    def change_check_status(self, check_id: int, new_status: str, changed_by: int = None):
+        """اعمال رویداد new_status (مثلاً 'deposit' یا 'clear') روی یک چک"""
+        with unit_of_work() as db:
+            check = db.get(Check, check_id)
+            if not check:
+                raise Exception("چک یافت نشد.")
+
+            before, old_status = due_key(check), check.status
+            check.status = next_status(new_status, old_status)
+            db.add(CheckStatusHistory(check_id=check.id, event=new_status, from_status=old_status,
+                                      to_status=check.status, changed_by=changed_by))
+            apply_due_changes(db, [(before, due_key(check))])
+            db.flush()
+            db.refresh(check)
+            return check
+
+    def bulk_transition(self, check_ids, event: str, changed_by: int = None) -> int:
+        """اعمال یک رویداد روی گروهی از چک‌ها — همه یا هیچ
+
+        همه انتقال‌ها ابتدا در حافظه با جدول انتقال بررسی می‌شوند؛ سپس یک UPDATE (به ازای هر ۵۰۰ شناسه)،
+        یک درج گروهی تاریخچه و یک به‌روزرسانی خلاصه سررسیدها.
+        """
+        ids = sorted(set(check_ids))
+        if not ids:
+            return 0
+        sources, dest = TRANSITIONS.get(event, (None, None))
+        if dest is None:
+            raise ValueError(f"انتقال '{event}' معتبر نیست.")
+
+        columns = (Check.id, Check.status, Check.due_date, Check.bank_account_id, Check.direction, Check.amount)
+        with unit_of_work() as db:
+            rows = {}
+            for start in range(0, len(ids), ID_CHUNK):
+                rows.update((row.id, row) for row in db.execute(
+                    select(*columns).where(Check.id.in_(ids[start:start + ID_CHUNK]))
+                ).all())
+
+            errors = [f"چک {check_id} یافت نشد." for check_id in ids if check_id not in rows]
+            for row in rows.values():
+                try:
+                    next_status(event, row.status)
+                except ValueError as e:
+                    errors.append(f"چک {row.id}: {e}")
+            if errors:
+                raise ValueError("\n".join(errors))
+
+            updated = 0
+            for start in range(0, len(ids), ID_CHUNK):
+                stmt = update(Check).where(Check.id.in_(ids[start:start + ID_CHUNK])).values(status=dest)
+                if sources != '*':
+                    # وضعیت بین خواندن و نوشتن عوض نشده باشد
+                    stmt = stmt.where(Check.status.in_(sources))
+                updated += db.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+            if updated != len(ids):
+                raise ValueError("وضعیت برخی چک‌ها هم‌زمان تغییر کرده است؛ دوباره تلاش کنید.")
+
+            db.execute(insert(CheckStatusHistory), [
+                {"check_id": row.id, "event": event, "from_status": row.status, "to_status": dest,
+                 "changed_by": changed_by} for row in rows.values()
+            ])
+            apply_due_changes(db, [
+                (due_key(row), due_key(SimpleNamespace(**{**row._asdict(), "status": dest}))) for row in rows.values()
+            ])
+            return updated
+
+    def get_status_history(self, check_id: int):
+        """تاریخچه وضعیت یک چک — به ترتیب ثبت"""
+        with unit_of_work() as db:
+            return db.execute(
+                select(CheckStatusHistory).where(CheckStatusHistory.check_id == check_id)
+                .order_by(CheckStatusHistory.id)
+            ).scalars().all()
+
     def delete_check(self, check_id: int):
         """حذف یک چک"""
-        check = self.db.query(Check).filter(Check.id == check_id).first()
-        if not check:
-            raise Exception("چک یافت نشد.")
-        self.db.delete(check)
-        self.db.commit()
+        with unit_of_work() as db:
+            check = db.get(Check, check_id)
+            if not check:
+                raise Exception("چک یافت نشد.")
+            apply_due_changes(db, [(due_key(check), None)])
+            db.delete(check)
 
     def update_check(self, check_id: int, data: dict):
         """به‌روزرسانی یک چک"""
-        check = self.db.query(Check).filter(Check.id == check_id).first()
-        if not check:
-            raise Exception("چک یافت نشد.")
-    
-        # به‌روزرسانی فیلدها
-        for key, value in data.items():
-            if hasattr(check, key):
-                setattr(check, key, value)
-    
-        self.db.commit()
-        self.db.refresh(check)
-        return check
\ No newline at end of file
+        with unit_of_work() as db:
+            check = db.get(Check, check_id)
+            if not check:
+                raise Exception("چک یافت نشد.")
+
+            # به‌روزرسانی فیلدها
+            before = due_key(check)
+            for key, value in data.items():
+                if hasattr(check, key):
+                    setattr(check, key, value)
+
+            apply_due_changes(db, [(before, due_key(check))])
+            db.flush()
+            db.refresh(check)
+            return check
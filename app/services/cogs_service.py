@@ -1,26 +1,51 @@
 # app/services/cogs_service.py
-from app.database import SessionLocal
+from decimal import Decimal
+from sqlalchemy import func
+from app.database import unit_of_work
 from app.models.stock_val_period import StockValPeriod
 from app.models.invoice_line import InvoiceLine
+from app.models.stock_movement import StockMovement
 
 class COGSService:
-    def __init__(self):
-        self.db = SessionLocal()
+    def calculate_cogs_for_invoice(self, invoice_id: int) -> dict:
+        """بهای تمام‌شده کل فاکتور — از بهای ثبت‌شده روی تحرکات خروجی، با یک کوئری"""
+        with unit_of_work() as db:
+            rows = db.query(
+                StockMovement.item_id,
+                func.sum(StockMovement.qty),
+                func.sum(StockMovement.total_cost),
+            ).filter(
+                StockMovement.reference_type == "invoice",
+                StockMovement.reference_id == invoice_id,
+                StockMovement.qty < 0,
+            ).group_by(StockMovement.item_id).all()
+
+        items = {
+            item_id: {"qty": -Decimal(str(qty)), "cogs": -int(total_cost)}
+            for item_id, qty, total_cost in rows
+        }
+        return {"total": sum(i["cogs"] for i in items.values()), "items": items}
 
     def calculate_cogs_for_invoice_line(self, invoice_line_id: int) -> int:
-        """محاسبه بهای تمام‌شده برای یک خط فاکتور — با آخرین avg_cost"""
-        line = self.db.query(InvoiceLine).filter(InvoiceLine.id == invoice_line_id).first()
-        if not line:
-            raise Exception("خط فاکتور یافت نشد.")
+        """محاسبه بهای تمام‌شده برای یک خط فاکتور"""
+        with unit_of_work() as db:
+            line = db.get(InvoiceLine, invoice_line_id)
+            if not line:
+                raise Exception("خط فاکتور یافت نشد.")
+
+            # بهای واقعی — میانگین بهای تحرکات خروجی همین کالا در همین فاکتور
+            item_cogs = self.calculate_cogs_for_invoice(line.invoice_id)["items"].get(line.item_id)
+            if item_cogs and item_cogs["qty"]:
+                return int(item_cogs["cogs"] * Decimal(str(line.qty)) / item_cogs["qty"])
 
-        # آخرین دوره مالی برای این کالا
-        last_valuation = self.db.query(StockValPeriod).filter(
-            StockValPeriod.item_id == line.item_id
-        ).order_by(StockValPeriod.period.desc()).first()
+            # آخرین دوره مالی برای این کالا
+            last_valuation = db.query(StockValPeriod).filter(
+                StockValPeriod.item_id == line.item_id
+            ).order_by(StockValPeriod.period.desc()).first()
 
-        if not last_valuation:
-            return 0
+            if not last_valuation:
+                return 0
 
-        # COGS = میانگین موزون × تعداد فروخته شده
-        cogs = int(last_valuation.avg_cost * line.qty)
-        return cogs
\ No newline at end of file
+            # COGS = میانگین موزون × تعداد فروخته شده
+            cogs = int(last_valuation.avg_cost * line.qty)
+            return cogs
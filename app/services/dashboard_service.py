@@ -1,36 +1,58 @@
 # app/services/dashboard_service.py
-from app.database import SessionLocal
+from app.database import unit_of_work
 from app.models.item import Item
 from app.models.party import Party
 from app.models.invoice import Invoice
 from app.models.check import Check
 from app.models.stock_val_period import StockValPeriod
+from app.services.accounting_service import AccountingService
+from app.services.check_schedule_service import CheckScheduleService
 from datetime import date
 from sqlalchemy import func
 
 class DashboardService:
-    def __init__(self):
-        self.db = SessionLocal()
-
     def get_item_count(self):
-        return self.db.query(Item).count()
+        with unit_of_work() as db:
+            return db.query(Item).count()
 
     def get_party_count(self):
-        return self.db.query(Party).count()
+        with unit_of_work() as db:
+            return db.query(Party).count()
 
     def get_total_inventory_value(self):
-        total = self.db.query(StockValPeriod).with_entities(
-            func.sum(StockValPeriod.total_value)
-        ).scalar()
+        with unit_of_work() as db:
+            total = db.query(StockValPeriod).with_entities(
+                func.sum(StockValPeriod.total_value)
+            ).scalar()
         return total or 0
 
     def get_today_invoices_count(self):
         today = date.today()
-        return self.db.query(Invoice).filter(Invoice.date_gregorian == today).count()
+        with unit_of_work() as db:
+            return db.query(Invoice).filter(Invoice.date_gregorian == today).count()
 
     def get_active_checks_count(self):
-        return self.db.query(Check).filter(Check.status.in_(['in_hand', 'deposited'])).count()
+        with unit_of_work() as db:
+            return db.query(Check).filter(Check.status.in_(['in_hand', 'deposited'])).count()
 
     def get_total_receivable_payable(self):
-        # ساده‌سازی — در عمل باید از جدول حسابداری محاسبه شود
-        return 0
\ No newline at end of file
+        """مانده خالص طرف‌حساب‌ها از دفتر روزنامه — مثبت: طلب، منفی: بدهی"""
+        return int(AccountingService().party_net_balance())
+
+    def get_checks_due_soon(self) -> dict:
+        """چک‌های در جریان سررسید شده و سررسید هفت روز آینده — از خلاصه روزانه سررسیدها"""
+        aging = CheckScheduleService().aging()
+        return {"overdue": aging["overdue"], "week": aging["0-7"]}
+
+    def get_summary(self) -> dict:
+        """تمام آمار داشبورد — برای بارگذاری یک‌جا در پس‌زمینه، در یک تراکنش خواندنی"""
+        with unit_of_work():
+            return {
+                "item_count": self.get_item_count(),
+                "party_count": self.get_party_count(),
+                "inventory_value": self.get_total_inventory_value(),
+                "today_invoices": self.get_today_invoices_count(),
+                "active_checks": self.get_active_checks_count(),
+                "receivable_payable": self.get_total_receivable_payable(),
+                "checks_due": self.get_checks_due_soon(),
+            }
@@ -9,6 +9,11 @@ def gregorian_to_jalali(gregorian_date) -> str:
     jdate = jdatetime.date.fromgregorian(date=gregorian_date)
     return jdate.strftime("%Y/%m/%d")
 
+def jalali_period(gregorian_date) -> str:
+    """دوره مالی شمسی یک تاریخ میلادی — YYYY-MM"""
+    jdate = jdatetime.date.fromgregorian(date=gregorian_date)
+    return f"{jdate.year}-{jdate.month:02d}"
+
 def jalali_to_gregorian(jalali_str: str) -> datetime:
     """تبدیل رشته تاریخ شمسی (YYYY/MM/DD) به datetime میلادی"""
     if not jalali_str:
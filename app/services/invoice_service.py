@@ -1,5 +1,5 @@
 # app/services/invoice_service.py
-from app.database import SessionLocal
+from app.database import unit_of_work
 from app.models.invoice import Invoice
 from app.models.invoice_line import InvoiceLine
 from app.services.date_service import gregorian_to_jalali, jalali_to_gregorian
@@ -8,269 +8,366 @@ from app.services.stock_service import StockService
 from datetime import datetime
 from app.models.item import Item
 from app.models.stock_movement import StockMovement
+from app.models.party import Party
+from app.utils.stock_balance import apply_movements, remove_movements, revise_movements
+from app.utils.sequences import allocator
+from app.utils.pagination import keyset_page, PAGE_SIZE
 from decimal import Decimal
-from sqlalchemy import func
+from sqlalchemy import func, select, or_
+
+# نوع تحرک انبار و علامت مقدار — بر اساس نوع فاکتور
+MOVEMENT_TYPES = {
+    "purchase": ("purchase_in", 1),
+    "sale": ("sale_out", -1),
+    "sale_return": ("return_in", 1),
+    "purchase_return": ("return_out", -1),
+}
+
+# کلیدهای مرتب‌سازی مجاز برای لیست فاکتورها
+INVOICE_SORT_COLUMNS = {
+    "id": Invoice.id,
+    "serial_full": Invoice.serial_full,
+    "invoice_type": Invoice.invoice_type,
+    "party": func.coalesce(Party.name, ""),
+    "date": Invoice.date_gregorian,
+    "total": Invoice.total,
+    "status": Invoice.status,
+}
+
+class InvoiceUpdateSummary:
+    """نتیجه ویرایش فاکتور — شناسه خطوط درج‌شده، تغییرکرده، حذف‌شده و بدون تغییر"""
+
+    def __init__(self, inserted=(), updated=(), deleted=(), unchanged=(), rebuilt=False):
+        self.invoice = None
+        self.inserted = list(inserted)
+        self.updated = list(updated)
+        self.deleted = list(deleted)
+        self.unchanged = list(unchanged)
+        self.rebuilt = rebuilt  # فاکتور قدیمی — خطوط به روش حذف و ایجاد مجدد بازسازی شدند
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.inserted or self.updated or self.deleted)
+
+    def __str__(self):
+        return (f"{len(self.inserted)} خط جدید، {len(self.updated)} خط ویرایش‌شده، "
+                f"{len(self.deleted)} خط حذف‌شده، {len(self.unchanged)} خط بدون تغییر")
+
 
 class InvoiceService:
     def __init__(self):
-        self.db = SessionLocal()
+        # StockService داخل واحد کار فاکتور همان Session و تراکنش را می‌گیرد
         self.stock_service = StockService()
 
     def get_current_stock_without_invoice(self, item_id: int, exclude_invoice_id: int) -> float:
         """محاسبه موجودی بدون در نظر گرفتن یک فاکتور خاص"""
-        # جمع کل حرکات به جز حرکات مربوط به فاکتور مورد نظر
-        result = self.db.query(
-            func.coalesce(func.sum(StockMovement.qty), Decimal('0'))
-        ).filter(
-            StockMovement.item_id == item_id,
-            ~(
-                (StockMovement.reference_type == "invoice") & 
-                (StockMovement.reference_id == exclude_invoice_id)
-            )
-        ).scalar()
-        
-        return float(result) if result else 0.0
+        stock = self.stock_service.get_current_stock_bulk([item_id], exclude_invoice_id=exclude_invoice_id)
+        return float(stock[item_id])
 
     # ----- helper (داخل کلاس InvoiceService) -----
     def _get_current_stock_db(self, item_id: int, exclude_invoice_id: int = None) -> Decimal:
-        """محاسبه موجودی فعلی از دیتابیس با امکان حذف حرکات مربوط به یک فاکتور خاص"""
-        q = self.db.query(func.coalesce(func.sum(StockMovement.qty), Decimal('0'))).filter(
-            StockMovement.item_id == item_id
+        """موجودی فعلی با امکان حذف حرکات مربوط به یک فاکتور خاص"""
+        return self.stock_service.get_current_stock_bulk([item_id], exclude_invoice_id=exclude_invoice_id)[item_id]
+
+    def _validate_stock(self, invoice_type: str, lines_data: list, exclude_invoice_id: int = None):
+        """اعتبارسنجی موجودی — مقدار درخواستی هر کالا در تمام خطوط جمع زده می‌شود"""
+        if invoice_type not in ['sale', 'purchase_return']:
+            return
+
+        requested = {}
+        for line_data in lines_data:
+            item_id = line_data['item_id']
+            requested[item_id] = requested.get(item_id, Decimal('0')) + Decimal(str(line_data['qty']))
+
+        # یک کوئری برای تمام کالاهای فاکتور
+        available = self.stock_service.get_current_stock_bulk(requested.keys(), exclude_invoice_id=exclude_invoice_id)
+        for item_id, qty in requested.items():
+            if qty > available[item_id]:
+                raise ValueError(
+                    f"موجودی کافی نیست. کالا: {item_id}, "
+                    f"درخواست: {qty}, موجودی: {available[item_id]}"
+                )
+
+    def _add_lines(self, db, invoice: Invoice, invoice_type: str, lines_data: list):
+        """ثبت خطوط فاکتور + تحرکات انبار — جمع خطوط، لیست تحرکات و خطوط ثبت‌شده را برمی‌گرداند"""
+        if invoice_type not in MOVEMENT_TYPES:
+            raise ValueError(f"نوع فاکتور نامعتبر: {invoice_type}")
+        movement_type, sign = MOVEMENT_TYPES[invoice_type]
+        items = self._load_items(db, lines_data)
+
+        subtotal = 0
+        lines = []
+        for line_data in lines_data:
+            item = items[line_data['item_id']]
+            line_total = self._line_total(item, line_data)
+
+            # ایجاد خط فاکتور
+            lines.append(InvoiceLine(
+                invoice_id=invoice.id,
+                item_id=line_data['item_id'],
+                qty=line_data['qty'],
+                unit_id=line_data['unit_id'],
+                unit_price=line_data['unit_price'],
+                discount=line_data.get('discount', 0),
+                tax=line_data.get('tax', 0),
+                line_total=line_total,
+                notes=line_data.get('notes', '')
+            ))
+            subtotal += line_total
+            self._update_last_price(item, invoice_type, line_data['unit_price'])
+        db.add_all(lines)
+        db.flush()  # تحرک انبار به id خط فاکتور اشاره می‌کند
+
+        movements = []
+        for line in lines:
+            movement_qty = sign * line.qty
+            stock_movement = StockMovement(
+                item_id=line.item_id,
+                qty=movement_qty,
+                unit_id=line.unit_id,
+                movement_type=movement_type,
+                reference_type="invoice",
+                reference_id=invoice.id,
+                invoice_line_id=line.id,
+                cost_per_unit=line.unit_price,
+                total_cost=int(movement_qty * line.unit_price)
+            )
+            db.add(stock_movement)
+            movements.append(stock_movement)
+
+        return subtotal, movements, lines
+
+    def _load_items(self, db, lines_data: list) -> dict:
+        """بارگذاری یک‌باره کالاهای فاکتور — به‌جای یک کوئری برای هر خط"""
+        item_ids = {line_data['item_id'] for line_data in lines_data}
+        items = {item.id: item for item in db.query(Item).filter(Item.id.in_(item_ids)).all()} if item_ids else {}
+        for item_id in item_ids - items.keys():
+            raise ValueError(f"کالا یافت نشد: {item_id}")
+        return items
+
+    @staticmethod
+    def _line_total(item: Item, line_data: dict):
+        return calculate_line_total(
+            item=item,
+            qty=line_data['qty'],
+            unit_price=line_data['unit_price'],
+            length=item.length if item.unit_type == "measure" else None,
+            width=item.width if item.unit_type == "measure" else None
         )
-        if exclude_invoice_id is not None:
-            # حذف همهٔ حرکاتی که reference_type=='invoice' و reference_id==exclude_invoice_id
-            q = q.filter(~((StockMovement.reference_type == "invoice") &
-                           (StockMovement.reference_id == exclude_invoice_id)))
-        res = q.scalar()
-        return Decimal(res or 0)
-    
+
+    @staticmethod
+    def _update_last_price(item: Item, invoice_type: str, unit_price):
+        """به‌روزرسانی آخرین قیمت کالا"""
+        if invoice_type == "purchase":
+            item.last_purchase_price = unit_price
+        elif invoice_type == "sale":
+            item.last_sale_price = unit_price
+
     def create_invoice(self, data: dict, lines_data: list):
-        """ایجاد فاکتور + خطوط + تحرکات انبار"""
-        try:
-            # --- ۱) ایجاد رکورد فاکتور ---
+        """ایجاد فاکتور + خطوط + تحرکات انبار — در یک تراکنش"""
+        # در صورت خطا rollback می‌شود و UI خطا را نشان می‌دهد (پنجره باز می‌ماند)
+        if not data.get('serial_full'):
+            # شماره پیش از باز شدن تراکنش فاکتور رزرو می‌شود (تراکنش جداگانه و کوتاه)
+            data = dict(data, serial=data.get('serial') or "INV")
+            data['number'], data['serial_full'] = allocator.next_serial(data['serial'], data.get('date_gregorian'))
+        with unit_of_work() as db:
+            # --- ۱) اعتبارسنجی موجودی ---
+            self._validate_stock(data['invoice_type'], lines_data)
+
+            # --- ۲) ایجاد رکورد فاکتور ---
             invoice = Invoice(**data)
-            self.db.add(invoice)
-            self.db.flush()  # نیاز به id فاکتور داریم
-    
-            # --- ۲) اعتبارسنجی موجودی ---
-            if data['invoice_type'] in ['sale', 'purchase_return']:
-                for line_data in lines_data:
-                    current_stock = self.stock_service.get_current_stock(line_data['item_id'])
-                    if line_data['qty'] > current_stock:
-                        raise ValueError(
-                            f"موجودی کافی نیست. کالا: {line_data['item_id']}, "
-                            f"درخواست: {line_data['qty']}, موجودی: {current_stock}"
-                        )
-    
+            db.add(invoice)
+            db.flush()  # نیاز به id فاکتور داریم
+
             # --- ۳) ثبت خطوط و تحرکات ---
-            subtotal = 0
-            for line_data in lines_data:
-                item = self.db.query(Item).filter(Item.id == line_data['item_id']).first()
-    
-                line_total = calculate_line_total(
-                    item=item,
-                    qty=line_data['qty'],
-                    unit_price=line_data['unit_price'],
-                    length=item.length if item.unit_type == "measure" else None,
-                    width=item.width if item.unit_type == "measure" else None
-                )
-    
-                # ایجاد خط فاکتور
-                line = InvoiceLine(
-                    invoice_id=invoice.id,
-                    item_id=line_data['item_id'],
-                    qty=line_data['qty'],
-                    unit_id=line_data['unit_id'],
-                    unit_price=line_data['unit_price'],
-                    discount=line_data.get('discount', 0),
-                    tax=line_data.get('tax', 0),
-                    line_total=line_total,
-                    notes=line_data.get('notes', '')
-                )
-                self.db.add(line)
-                subtotal += line_total
-    
-                # به‌روزرسانی آخرین قیمت کالا
-                if data['invoice_type'] == "purchase":
-                    item.last_purchase_price = line_data['unit_price']
-                elif data['invoice_type'] == "sale":
-                    item.last_sale_price = line_data['unit_price']
-    
-                # تعیین نوع تحرک انبار
-                if data['invoice_type'] == "purchase":
-                    movement_type, movement_qty = "purchase_in", line_data['qty']
-                elif data['invoice_type'] == "sale":
-                    movement_type, movement_qty = "sale_out", -line_data['qty']
-                elif data['invoice_type'] == "sale_return":
-                    movement_type, movement_qty = "return_in", line_data['qty']
-                elif data['invoice_type'] == "purchase_return":
-                    movement_type, movement_qty = "return_out", -line_data['qty']
-                else:
-                    raise ValueError(f"نوع فاکتور نامعتبر: {data['invoice_type']}")
-    
-                stock_movement = StockMovement(
-                    item_id=line_data['item_id'],
-                    qty=movement_qty,
-                    unit_id=line_data['unit_id'],
-                    movement_type=movement_type,
-                    reference_type="invoice",
-                    reference_id=invoice.id,
-                    cost_per_unit=line_data['unit_price'],
-                    total_cost=int(movement_qty * line_data['unit_price'])
-                )
-                self.db.add(stock_movement)
-    
-            # --- ۴) محاسبه جمع ---
+            subtotal, movements, _ = self._add_lines(db, invoice, data['invoice_type'], lines_data)
+
+            # --- ۴) محاسبه جمع و به‌روزرسانی موجودی ---
             invoice.subtotal = subtotal
             invoice.total = subtotal + invoice.tax + invoice.shipping - invoice.discount
-    
+            apply_movements(db, movements)
+
             # --- ۵) ذخیره ---
-            self.db.commit()
-            self.db.refresh(invoice)
+            db.flush()
+            db.refresh(invoice)
             return invoice
-    
-        except Exception as e:
-            self.db.rollback()
-            # اجازه می‌دهیم UI خطا را نشان دهد و پنجره باز بماند
-            raise
-    
-    
-    def update_invoice(self, invoice_id: int, data: dict, lines_data: list):
-        """به‌روزرسانی فاکتور + خطوط + تحرکات انبار (حذف و ایجاد مجدد)"""
-        invoice = self.db.query(Invoice).filter(Invoice.id == invoice_id).first()
-        if not invoice:
-            raise Exception("فاکتور یافت نشد.")
-    
-        try:
-            # --- ۱) حذف خطوط و تحرکات قبلی ---
-            self.db.query(StockMovement).filter(
-                StockMovement.reference_type == "invoice",
-                StockMovement.reference_id == invoice_id
-            ).delete()
-    
-            self.db.query(InvoiceLine).filter(
-                InvoiceLine.invoice_id == invoice_id
-            ).delete()
-    
-            # --- ۲) بروزرسانی فیلدهای اصلی ---
+
+
+    def update_invoice(self, invoice_id: int, data: dict, lines_data: list) -> "InvoiceUpdateSummary":
+        """به‌روزرسانی فاکتور — فقط خطوط درج‌شده، تغییرکرده و حذف‌شده نوشته می‌شوند
+
+        خطوط با کلید 'id' (شناسه خط فاکتور) تطبیق داده می‌شوند؛ خط بدون id خط جدید است و خط موجودی
+        که در lines_data نیامده حذف می‌شود. تحرک انبار هر خط تغییرکرده در محل اصلاح می‌شود.
+        """
+        with unit_of_work() as db:
+            invoice = db.get(Invoice, invoice_id)
+            if not invoice:
+                raise Exception("فاکتور یافت نشد.")
+            invoice_type = data['invoice_type']
+            if invoice_type not in MOVEMENT_TYPES:
+                raise ValueError(f"نوع فاکتور نامعتبر: {invoice_type}")
+
+            # --- ۱) اعتبارسنجی موجودی — بدون در نظر گرفتن تحرکات فعلی همین فاکتور ---
+            self._validate_stock(invoice_type, lines_data, exclude_invoice_id=invoice_id)
+
+            # --- ۲) تغییر نوع فاکتور یا تحرکات بدون خط (داده‌های قدیمی) — بازسازی کامل ---
+            unlinked = db.execute(
+                select(StockMovement.id).where(
+                    StockMovement.reference_type == "invoice",
+                    StockMovement.reference_id == invoice_id,
+                    StockMovement.invoice_line_id.is_(None),
+                ).limit(1)
+            ).first()
+            if unlinked or invoice_type != invoice.invoice_type:
+                summary = self._rebuild_lines(db, invoice, data, lines_data)
+            else:
+                summary = self._diff_lines(db, invoice, invoice_type, lines_data)
+
+            # --- ۳) بروزرسانی فیلدهای اصلی و جمع فاکتور ---
             for key, value in data.items():
                 if hasattr(invoice, key):
                     setattr(invoice, key, value)
-    
-            # --- ۳) اعتبارسنجی موجودی ---
-            if data['invoice_type'] in ['sale', 'purchase_return']:
-                for line_data in lines_data:
-                    current_stock = self.stock_service.get_current_stock(line_data['item_id'])
-                    if line_data['qty'] > current_stock:
-                        raise ValueError(
-                            f"موجودی کافی نیست. کالا: {line_data['item_id']}, "
-                            f"درخواست: {line_data['qty']}, موجودی: {current_stock}"
-                        )
-    
-            # --- ۴) ثبت خطوط و تحرکات جدید ---
-            subtotal = 0
-            for line_data in lines_data:
-                item = self.db.query(Item).filter(Item.id == line_data['item_id']).first()
-    
-                line_total = calculate_line_total(
-                    item=item,
-                    qty=line_data['qty'],
-                    unit_price=line_data['unit_price'],
-                    length=item.length if item.unit_type == "measure" else None,
-                    width=item.width if item.unit_type == "measure" else None
-                )
-    
-                line = InvoiceLine(
-                    invoice_id=invoice.id,
-                    item_id=line_data['item_id'],
-                    qty=line_data['qty'],
-                    unit_id=line_data['unit_id'],
-                    unit_price=line_data['unit_price'],
-                    discount=line_data.get('discount', 0),
-                    tax=line_data.get('tax', 0),
-                    line_total=line_total,
-                    notes=line_data.get('notes', '')
-                )
-                self.db.add(line)
-                subtotal += line_total
-    
-                if data['invoice_type'] == "purchase":
-                    item.last_purchase_price = line_data['unit_price']
-                elif data['invoice_type'] == "sale":
-                    item.last_sale_price = line_data['unit_price']
-    
-                if data['invoice_type'] == "purchase":
-                    movement_type, movement_qty = "purchase_in", line_data['qty']
-                elif data['invoice_type'] == "sale":
-                    movement_type, movement_qty = "sale_out", -line_data['qty']
-                elif data['invoice_type'] == "sale_return":
-                    movement_type, movement_qty = "return_in", line_data['qty']
-                elif data['invoice_type'] == "purchase_return":
-                    movement_type, movement_qty = "return_out", -line_data['qty']
-                else:
-                    raise ValueError(f"نوع فاکتور نامعتبر: {data['invoice_type']}")
-    
-                stock_movement = StockMovement(
-                    item_id=line_data['item_id'],
-                    qty=movement_qty,
-                    unit_id=line_data['unit_id'],
-                    movement_type=movement_type,
-                    reference_type="invoice",
-                    reference_id=invoice.id,
-                    cost_per_unit=line_data['unit_price'],
-                    total_cost=int(movement_qty * line_data['unit_price'])
-                )
-                self.db.add(stock_movement)
-    
-            # --- ۵) محاسبه جمع ---
-            invoice.subtotal = subtotal
-            invoice.total = subtotal + invoice.tax + invoice.shipping - invoice.discount
-    
-            # --- ۶) ذخیره ---
-            self.db.commit()
-            self.db.refresh(invoice)
-            return invoice
-    
-        except Exception as e:
-            self.db.rollback()
-            raise
-    
-    
+            db.flush()
+            invoice.subtotal = db.execute(
+                select(func.coalesce(func.sum(InvoiceLine.line_total), 0)).where(InvoiceLine.invoice_id == invoice_id)
+            ).scalar()
+            invoice.total = invoice.subtotal + invoice.tax + invoice.shipping - invoice.discount
+
+            # --- ۴) ذخیره ---
+            db.flush()
+            db.refresh(invoice)
+            summary.invoice = invoice
+            return summary
+
+    def _rebuild_lines(self, db, invoice: Invoice, data: dict, lines_data: list) -> "InvoiceUpdateSummary":
+        """حذف تمام خطوط و تحرکات و ایجاد مجدد — برای فاکتورهای ثبت‌شده پیش از پیوند تحرک به خط"""
+        old_ids = db.execute(select(InvoiceLine.id).where(InvoiceLine.invoice_id == invoice.id)).scalars().all()
+        remove_movements(
+            db,
+            StockMovement.reference_type == "invoice",
+            StockMovement.reference_id == invoice.id
+        )
+        db.query(InvoiceLine).filter(InvoiceLine.invoice_id == invoice.id).delete()
+
+        _, movements, lines = self._add_lines(db, invoice, data['invoice_type'], lines_data)
+        apply_movements(db, movements)
+        return InvoiceUpdateSummary(inserted=[line.id for line in lines], deleted=old_ids, rebuilt=True)
+
+    def _diff_lines(self, db, invoice: Invoice, invoice_type: str, lines_data: list) -> "InvoiceUpdateSummary":
+        """اعمال تفاضل خطوط — درج، اصلاح و حذف، هرکدام فقط برای خطوط مربوط"""
+        existing = {line.id: line for line in db.query(InvoiceLine).filter(InvoiceLine.invoice_id == invoice.id)}
+        movements = {m.invoice_line_id: m for m in db.query(StockMovement).filter(
+            StockMovement.reference_type == "invoice", StockMovement.reference_id == invoice.id)}
+        _, sign = MOVEMENT_TYPES[invoice_type]
+        items = self._load_items(db, lines_data)
+
+        summary = InvoiceUpdateSummary()
+        new_lines, revisions, kept = [], [], set()
+        for line_data in lines_data:
+            line = existing.get(line_data.get('id'))
+            # خط جدید، خط تکراری یا تغییر کالا — درج به‌عنوان خط تازه (خط قبلی حذف می‌شود)
+            if line is None or line.id in kept or line.item_id != line_data['item_id']:
+                new_lines.append(line_data)
+                continue
+            kept.add(line.id)
+
+            values = {
+                "qty": Decimal(str(line_data['qty'])),
+                "unit_id": line_data['unit_id'],
+                "unit_price": Decimal(str(line_data['unit_price'])),
+                "discount": Decimal(str(line_data.get('discount', 0))),
+                "tax": Decimal(str(line_data.get('tax', 0))),
+                "notes": line_data.get('notes', ''),
+            }
+            current = {
+                "qty": Decimal(str(line.qty)),
+                "unit_id": line.unit_id,
+                "unit_price": Decimal(str(line.unit_price)),
+                "discount": Decimal(str(line.discount or 0)),
+                "tax": Decimal(str(line.tax or 0)),
+                "notes": line.notes or '',
+            }
+            changed = {key: value for key, value in values.items() if current[key] != value}
+            if not changed:
+                summary.unchanged.append(line.id)
+                continue
+
+            for key, value in changed.items():
+                setattr(line, key, value)
+            line.line_total = self._line_total(items[line.item_id], line_data)
+            summary.updated.append(line.id)
+            if changed.keys() & {"qty", "unit_id", "unit_price"}:
+                self._update_last_price(items[line.item_id], invoice_type, line_data['unit_price'])
+                revisions.append((movements[line.id], sign * values["qty"], values["unit_id"], values["unit_price"]))
+
+        # --- حذف خطوطی که در فرم نیستند ---
+        deleted = [line_id for line_id in existing if line_id not in kept]
+        if deleted:
+            remove_movements(db, StockMovement.invoice_line_id.in_(deleted))
+            db.query(InvoiceLine).filter(InvoiceLine.id.in_(deleted)).delete()
+            summary.deleted = deleted
+
+        # --- اصلاح تحرکات خطوط تغییرکرده — اختلاف روی موجودی ---
+        if revisions:
+            revise_movements(db, revisions)
+
+        # --- خطوط جدید ---
+        if new_lines:
+            _, new_movements, lines = self._add_lines(db, invoice, invoice_type, new_lines)
+            apply_movements(db, new_movements)
+            summary.inserted = [line.id for line in lines]
+        return summary
+
     def delete_invoice(self, invoice_id: int):
         """حذف فاکتور + خطوط + تحرکات انبار"""
-        try:
-            invoice = self.db.query(Invoice).filter(Invoice.id == invoice_id).first()
+        with unit_of_work() as db:
+            invoice = db.get(Invoice, invoice_id)
             if not invoice:
                 raise Exception("فاکتور یافت نشد.")
-    
-            # --- ۱) حذف تحرکات ---
-            self.db.query(StockMovement).filter(
+
+            # --- ۱) حذف تحرکات (و برگشت اثر آن‌ها از موجودی) ---
+            remove_movements(
+                db,
                 StockMovement.reference_type == "invoice",
                 StockMovement.reference_id == invoice_id
-            ).delete()
-    
+            )
+
             # --- ۲) حذف خطوط ---
-            self.db.query(InvoiceLine).filter(
+            db.query(InvoiceLine).filter(
                 InvoiceLine.invoice_id == invoice_id
             ).delete()
-    
+
             # --- ۳) حذف فاکتور ---
-            self.db.delete(invoice)
-    
-            # --- ۴) ذخیره ---
-            self.db.commit()
+            db.delete(invoice)
             return True
-    
-        except Exception as e:
-            self.db.rollback()
-            raise
-    
+
+    def get_invoice_by_id(self, invoice_id: int):
+        with unit_of_work() as db:
+            return db.get(Invoice, invoice_id)
+
+    def get_invoice_lines(self, invoice_id: int):
+        with unit_of_work() as db:
+            return db.query(InvoiceLine).filter(InvoiceLine.invoice_id == invoice_id).order_by(InvoiceLine.id).all()
+
+    def get_invoices_page(self, after=None, limit=PAGE_SIZE, sort="id", descending=True, search=None):
+        """یک صفحه از لیست فاکتورها — ردیف‌ها: (id, serial_full, invoice_type, party_name, date_jalali, total, status)"""
+        stmt = select(
+            Invoice.id, Invoice.serial_full, Invoice.invoice_type, Party.name,
+            Invoice.date_jalali, Invoice.total, Invoice.status,
+        ).outerjoin(Party, Party.id == Invoice.party_id)
+        if search:
+            pattern = f"%{search}%"
+            stmt = stmt.where(or_(Invoice.serial_full.ilike(pattern), Party.name.ilike(pattern)))
+        with unit_of_work() as db:
+            return keyset_page(db, stmt, INVOICE_SORT_COLUMNS[sort], Invoice.id, after, descending, limit)
+
     def get_all_invoices(self):
-        return self.db.query(Invoice).order_by(Invoice.id.desc()).all()
+        with unit_of_work() as db:
+            return db.query(Invoice).order_by(Invoice.id.desc()).all()
 
     def get_all_invoices_with_parties(self):
         """دریافت تمام فاکتورها + JOIN با جدول طرف‌حساب‌ها برای نمایش"""
-        from app.models.party import Party
-        return self.db.query(Invoice, Party.name.label('party_name')).\
-            join(Party, Invoice.party_id == Party.id).\
-            order_by(Invoice.id.desc()).all()
\ No newline at end of file
+        with unit_of_work() as db:
+            return db.query(Invoice, Party.name.label('party_name')).\
+                join(Party, Invoice.party_id == Party.id).\
+                order_by(Invoice.id.desc()).all()
\ No newline at end of file
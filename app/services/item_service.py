@@ -1,34 +1,72 @@
 # app/services/item_service.py
-from app.database import SessionLocal
+from sqlalchemy import select, func, or_
+from app.database import unit_of_work
 from app.models.item import Item
+from app.models.unit import Unit
+from app.utils.pagination import keyset_page, PAGE_SIZE
+
+# کلیدهای مرتب‌سازی مجاز برای لیست کالاها
+ITEM_SORT_COLUMNS = {
+    "sku": Item.sku,
+    "name": Item.name,
+    "unit_type": Item.unit_type,
+    "unit": func.coalesce(Unit.name, ""),
+    "active": func.coalesce(Item.active, False),
+}
 
 class ItemService:
-    def __init__(self):
-        self.db = SessionLocal()
+    """هر متد یک واحد کار مستقل است — سرویس Session نگه نمی‌دارد"""
 
     def get_all_items(self):
-        return self.db.query(Item).all()
+        with unit_of_work() as db:
+            return db.query(Item).all()
+
+    def get_item_choices(self):
+        """ردیف‌های سبک کالا برای انتخاب در خطوط فاکتور — بدون شیء ORM (منقضی نمی‌شوند)"""
+        with unit_of_work() as db:
+            return db.execute(
+                select(Item.id, Item.sku, Item.name, Item.unit_type, Item.base_unit_id,
+                       Item.length, Item.width, Item.last_purchase_price, Item.last_sale_price)
+                .order_by(Item.name, Item.id)
+            ).all()
+
+    def get_item_by_id(self, item_id: int):
+        with unit_of_work() as db:
+            return db.get(Item, item_id)
+
+    def get_items_page(self, after=None, limit=PAGE_SIZE, sort="sku", descending=False, search=None):
+        """یک صفحه از لیست کالاها — ردیف‌ها: (id, sku, name, unit_type, unit_name, active)"""
+        stmt = select(Item.id, Item.sku, Item.name, Item.unit_type, Unit.name, Item.active).outerjoin(
+            Unit, Unit.id == Item.base_unit_id
+        )
+        if search:
+            pattern = f"%{search}%"
+            stmt = stmt.where(or_(Item.sku.ilike(pattern), Item.name.ilike(pattern), Item.barcode.ilike(pattern)))
+        with unit_of_work() as db:
+            return keyset_page(db, stmt, ITEM_SORT_COLUMNS[sort], Item.id, after, descending, limit)
 
     def create_item(self, data):
-        item = Item(**data)
-        self.db.add(item)
-        self.db.commit()
-        self.db.refresh(item)
-        return item
+        with unit_of_work() as db:
+            item = Item(**data)
+            db.add(item)
+            db.flush()
+            db.refresh(item)
+            return item
 
     def update_item(self, item_id, data):
-        item = self.db.query(Item).filter(Item.id == item_id).first()
-        if not item:
-            raise Exception("کالا یافت نشد.")
-        for key, value in data.items():
-            setattr(item, key, value)
-        self.db.commit()
-        self.db.refresh(item)
-        return item
+        with unit_of_work() as db:
+            item = db.get(Item, item_id)
+            if not item:
+                raise Exception("کالا یافت نشد.")
+            for key, value in data.items():
+                setattr(item, key, value)
+            db.flush()
+            db.refresh(item)
+            return item
 
     def delete_item(self, item_id):
-        item = self.db.query(Item).filter(Item.id == item_id).first()
-        if not item:
-            raise Exception("کالا یافت نشد.")
-        self.db.delete(item)
-        self.db.commit()
\ No newline at end of file
+        with unit_of_work() as db:
+            item = db.get(Item, item_id)
+            if not item:
+                raise Exception("کالا یافت نشد.")
+            db.delete(item)
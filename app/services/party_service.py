@@ -1,38 +1,60 @@
 # app/services/party_service.py
-from app.database import SessionLocal
+from sqlalchemy import select, func, or_
+from app.database import unit_of_work
 from app.models.party import Party
+from app.utils.pagination import keyset_page, PAGE_SIZE
 
-class PartyService:
-    def __init__(self):
-        self.db = SessionLocal()
+# کلیدهای مرتب‌سازی مجاز برای لیست طرف‌حساب‌ها
+PARTY_SORT_COLUMNS = {
+    "code": Party.code,
+    "name": Party.name,
+    "party_type": Party.party_type,
+    "phone": func.coalesce(Party.phone, ""),
+    "credit_limit": func.coalesce(Party.credit_limit, 0),
+    "is_active": func.coalesce(Party.is_active, False),
+}
 
+class PartyService:
     def get_all_parties(self):
-        return self.db.query(Party).all()
+        with unit_of_work() as db:
+            return db.query(Party).all()
+
+    def get_parties_page(self, after=None, limit=PAGE_SIZE, sort="code", descending=False, search=None):
+        """یک صفحه از لیست طرف‌حساب‌ها — ردیف‌ها: (id, code, name, party_type, phone, credit_limit, is_active)"""
+        stmt = select(Party.id, Party.code, Party.name, Party.party_type, Party.phone,
+                      Party.credit_limit, Party.is_active)
+        if search:
+            pattern = f"%{search}%"
+            stmt = stmt.where(or_(Party.code.ilike(pattern), Party.name.ilike(pattern), Party.phone.ilike(pattern)))
+        with unit_of_work() as db:
+            return keyset_page(db, stmt, PARTY_SORT_COLUMNS[sort], Party.id, after, descending, limit)
 
     def create_party(self, data):
-        party = Party(**data)
-        self.db.add(party)
-        self.db.commit()
-        self.db.refresh(party)
-        return party
+        with unit_of_work() as db:
+            party = Party(**data)
+            db.add(party)
+            db.flush()
+            db.refresh(party)
+            return party
 
     def update_party(self, party_id, data):
-        party = self.db.query(Party).filter(Party.id == party_id).first()
-        if not party:
-            raise Exception("طرف‌حساب یافت نشد.")
-        for key, value in data.items():
-            setattr(party, key, value)
-        self.db.commit()
-        self.db.refresh(party)
-        return party
+        with unit_of_work() as db:
+            party = db.get(Party, party_id)
+            if not party:
+                raise Exception("طرف‌حساب یافت نشد.")
+            for key, value in data.items():
+                setattr(party, key, value)
+            db.flush()
+            db.refresh(party)
+            return party
 
     def delete_party(self, party_id):
-        party = self.db.query(Party).filter(Party.id == party_id).first()
-        if not party:
-            raise Exception("طرف‌حساب یافت نشد.")
-        self.db.delete(party)
-        self.db.commit()
-        
-    # در کلاس PartyService — افزودن این متد
+        with unit_of_work() as db:
+            party = db.get(Party, party_id)
+            if not party:
+                raise Exception("طرف‌حساب یافت نشد.")
+            db.delete(party)
+
     def get_party_by_id(self, party_id: int):
-        return self.db.query(Party).filter(Party.id == party_id).first()
\ No newline at end of file
+        with unit_of_work() as db:
+            return db.get(Party, party_id)
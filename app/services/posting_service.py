@@ -0,0 +1,335 @@
+# app/services/posting_service.py
+"""ثبت خودکار اسناد حسابداری از فاکتورها، دریافت/پرداخت‌ها و مراحل چک — به‌صورت گروهی
+
+حساب هر نقش (دریافتنی، فروش، ...) از جدول account_mappings خوانده می‌شود. اسناد یک بازه تاریخ
+در حافظه ساخته و تراز می‌شوند و سپس با یک درج گروهی ثبت می‌شوند؛ هر (source_type, source_id)
+فقط یک بار ثبت می‌شود، پس اجرای دوباره همان بازه بی‌اثر است.
+"""
+import time
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import bindparam, func, insert, or_, select, update
+from app.database import unit_of_work
+from app.models.account_mapping import AccountMapping
+from app.models.bank_account import BankAccount
+from app.models.check import Check
+from app.models.invoice import Invoice
+from app.models.journal_entry import JournalEntry
+from app.models.journal_line import JournalLine
+from app.models.payment import Payment
+from app.models.payment_line import PaymentLine
+from app.models.stock_movement import StockMovement
+from app.services.date_service import jalali_period
+from app.utils.double_entry import check_balanced, validate_entries
+from app.utils.ledger_balances import closed_through, post_lines
+
+# نقش‌های حساب در اسناد خودکار — کلید account_mappings
+MAPPING_KEYS = {
+    "receivable": "حساب‌های دریافتنی (بدهکاران)",
+    "payable": "حساب‌های پرداختنی (بستانکاران)",
+    "sales": "فروش",
+    "sales_returns": "برگشت از فروش",
+    "inventory": "موجودی کالا",
+    "cogs": "بهای تمام‌شده کالای فروش‌رفته",
+    "tax_payable": "مالیات بر ارزش افزوده فروش",
+    "tax_receivable": "مالیات بر ارزش افزوده خرید",
+    "cash": "صندوق — دریافت/پرداخت بدون خط",
+    "checks_receivable": "اسناد دریافتنی",
+    "checks_payable": "اسناد پرداختنی",
+}
+
+# مراحل چک — (جهت، مرحله): (وضعیت‌هایی که یعنی مرحله انجام شده، ستون تاریخ، بدهکار، بستانکار)
+# "party" حساب طرف‌حساب جهت چک است (دریافتنی/پرداختنی) و "bank" حساب دفتر کل حساب بانکی چک
+CHECK_STAGES = {
+    ("received", "in_hand"): ({"in_hand", "deposited", "cleared", "bounced", "endorsed", "reconciled"},
+                              "issue_date", "checks_receivable", "party"),
+    ("received", "cleared"): ({"cleared", "reconciled"}, "due_date", "bank", "checks_receivable"),
+    ("received", "bounced"): ({"bounced"}, "due_date", "party", "checks_receivable"),
+    ("received", "endorsed"): ({"endorsed"}, "due_date", "payable", "checks_receivable"),
+    ("issued", "issued"): ({"issued", "in_hand", "deposited", "cleared", "bounced", "reconciled"},
+                           "issue_date", "party", "checks_payable"),
+    ("issued", "cleared"): ({"cleared", "reconciled"}, "due_date", "checks_payable", "bank"),
+    ("issued", "bounced"): ({"bounced"}, "due_date", "checks_payable", "party"),
+}
+
+SOURCES = ("invoice", "payment", "check")
+
+
+class PostingReport:
+    def __init__(self):
+        self.posted = {}   # source_type → تعداد سند ثبت‌شده
+        self.skipped = 0   # قبلاً ثبت شده
+        self.errors = []   # (source_type, source_id, message)
+        self.started = time.perf_counter()
+        self.elapsed_seconds = 0.0
+
+    @property
+    def total_posted(self):
+        return sum(self.posted.values())
+
+    def finish(self):
+        self.elapsed_seconds = time.perf_counter() - self.started
+        return self
+
+
+class _Entry:
+    """سند در حال ساخت — خطوط صفر حذف می‌شوند"""
+
+    def __init__(self, source_type, source_id, date, description):
+        self.source_type, self.source_id = source_type, source_id
+        self.date, self.description = date, description
+        self.lines = []
+
+    def add(self, account_id, debit=0, credit=0, party_id=None):
+        debit, credit = Decimal(str(debit or 0)), Decimal(str(credit or 0))
+        # مبلغ منفی (مثلاً تخفیف بیش از جمع) — به طرف مقابل منتقل می‌شود
+        if debit < 0:
+            debit, credit = Decimal("0"), credit - debit
+        if credit < 0:
+            debit, credit = debit - credit, Decimal("0")
+        if debit or credit:
+            self.lines.append({"ledger_account_id": account_id, "debit": debit, "credit": credit,
+                               "party_id": party_id, "reference_type": self.source_type,
+                               "reference_id": self.source_id})
+
+
+class MissingMapping(ValueError):
+    pass
+
+
+class PostingService:
+    def get_mappings(self) -> dict:
+        """{key: ledger_account_id}"""
+        with unit_of_work() as db:
+            return dict(db.execute(select(AccountMapping.key, AccountMapping.ledger_account_id)).all())
+
+    def set_mapping(self, key: str, ledger_account_id: int):
+        if key not in MAPPING_KEYS:
+            raise ValueError(f"نقش حساب نامعتبر: {key}")
+        with unit_of_work() as db:
+            mapping = db.get(AccountMapping, key)
+            if mapping is None:
+                db.add(AccountMapping(key=key, ledger_account_id=ledger_account_id, description=MAPPING_KEYS[key]))
+            else:
+                mapping.ledger_account_id = ledger_account_id
+
+    def post_range(self, date_from, date_to, created_by: int, sources=SOURCES) -> PostingReport:
+        """ثبت اسناد تمام مدارک بازه [date_from, date_to] — یک تراکنش، یک درج گروهی"""
+        report = PostingReport()
+        with unit_of_work() as db:
+            mappings = dict(db.execute(select(AccountMapping.key, AccountMapping.ledger_account_id)).all())
+            builders = {"invoice": self._invoice_entries, "payment": self._payment_entries,
+                        "check": self._check_entries}
+            entries = []
+            for source in sources:
+                entries.extend(builders[source](db, date_from, date_to, mappings, report))
+
+            entries = self._drop_posted(db, entries, report)
+            cutoff = closed_through(db)
+            valid = []
+            for entry in entries:
+                try:
+                    period = jalali_period(entry.date)
+                    if cutoff and period <= cutoff:
+                        raise ValueError(f"دوره {period} بسته شده است.")
+                    check_balanced(entry.lines)
+                except ValueError as e:
+                    report.errors.append((entry.source_type, entry.source_id, str(e)))
+                    continue
+                entry.period = period
+                valid.append(entry)
+
+            self._insert(db, valid, created_by)
+            for entry in valid:
+                kind = "check" if entry.source_type.startswith("check_") else entry.source_type
+                report.posted[kind] = report.posted.get(kind, 0) + 1
+        return report.finish()
+
+    # ----- ساخت اسناد در حافظه -----
+    @staticmethod
+    def _account(mappings, key):
+        if key not in mappings:
+            raise MissingMapping(f"حساب «{MAPPING_KEYS[key]}» ({key}) در account_mappings تعریف نشده است.")
+        return mappings[key]
+
+    def _invoice_entries(self, db, date_from, date_to, mappings, report):
+        invoices = db.execute(
+            select(Invoice.id, Invoice.invoice_type, Invoice.serial_full, Invoice.party_id, Invoice.date_gregorian,
+                   Invoice.subtotal, Invoice.tax, Invoice.discount, Invoice.shipping, Invoice.total)
+            .where(Invoice.date_gregorian.between(date_from, date_to), Invoice.status != "cancelled")
+            .order_by(Invoice.id)
+        ).all()
+        if not invoices:
+            return []
+
+        # بهای تمام‌شده هر فاکتور از تحرکات انبار — یک کوئری گروهی روی بازه شناسه‌ها
+        ids = {invoice.id for invoice in invoices}
+        costs = {
+            invoice_id: Decimal(str(cost or 0))
+            for invoice_id, cost in db.execute(
+                select(StockMovement.reference_id, func.sum(StockMovement.total_cost))
+                .where(StockMovement.reference_type == "invoice",
+                       StockMovement.reference_id.between(min(ids), max(ids)))
+                .group_by(StockMovement.reference_id)
+            ).all()
+            if invoice_id in ids
+        }
+
+        entries = []
+        for inv in invoices:
+            entry = _Entry("invoice", inv.id, inv.date_gregorian, f"فاکتور {inv.serial_full}")
+            try:
+                self._invoice_lines(entry, inv, costs.get(inv.id, Decimal("0")), mappings)
+            except MissingMapping as e:
+                report.errors.append(("invoice", inv.id, str(e)))
+                continue
+            entries.append(entry)
+        return entries
+
+    def _invoice_lines(self, entry, inv, cost, mappings):
+        account = lambda key: self._account(mappings, key)
+        net = inv.subtotal - inv.discount + inv.shipping  # مبلغ کالا/خدمت بدون مالیات
+        if inv.invoice_type == "sale":
+            entry.add(account("receivable"), debit=inv.total, party_id=inv.party_id)
+            entry.add(account("sales"), credit=net)
+            entry.add(account("tax_payable"), credit=inv.tax)
+        elif inv.invoice_type == "sale_return":
+            entry.add(account("sales_returns"), debit=net)
+            entry.add(account("tax_payable"), debit=inv.tax)
+            entry.add(account("receivable"), credit=inv.total, party_id=inv.party_id)
+        elif inv.invoice_type == "purchase":
+            entry.add(account("inventory"), debit=net)
+            entry.add(account("tax_receivable"), debit=inv.tax)
+            entry.add(account("payable"), credit=inv.total, party_id=inv.party_id)
+        elif inv.invoice_type == "purchase_return":
+            entry.add(account("payable"), debit=inv.total, party_id=inv.party_id)
+            entry.add(account("inventory"), credit=net)
+            entry.add(account("tax_receivable"), credit=inv.tax)
+        else:
+            raise MissingMapping(f"نوع فاکتور نامعتبر: {inv.invoice_type}")
+
+        # بهای تمام‌شده فروش/برگشت از فروش — مبلغ تحرکات انبار (خروج منفی، ورود مثبت)
+        if inv.invoice_type in ("sale", "sale_return") and cost:
+            entry.add(account("cogs"), debit=-cost)
+            entry.add(account("inventory"), credit=-cost)
+
+    def _payment_entries(self, db, date_from, date_to, mappings, report):
+        payments = db.execute(
+            select(Payment.id, Payment.payment_type, Payment.party_id, Payment.date, Payment.amount, Payment.reference)
+            .where(Payment.date.between(date_from, date_to), Payment.status == "completed")
+            .order_by(Payment.id)
+        ).all()
+        if not payments:
+            return []
+        ids = {payment.id for payment in payments}
+        lines = {}
+        for payment_id, account_id, amount in db.execute(
+            select(PaymentLine.payment_id, PaymentLine.account_id, PaymentLine.amount)
+            .where(PaymentLine.payment_id.between(min(ids), max(ids)))
+        ).all():
+            lines.setdefault(payment_id, []).append((account_id, amount))
+
+        entries = []
+        for payment in payments:
+            receipt = payment.payment_type == "receipt"
+            entry = _Entry("payment", payment.id, payment.date,
+                           f"{'دریافت' if receipt else 'پرداخت'} {payment.reference or payment.id}")
+            try:
+                party_account = self._account(mappings, "receivable" if receipt else "payable")
+                counter = lines.get(payment.id) or [(self._account(mappings, "cash"), payment.amount)]
+            except MissingMapping as e:
+                report.errors.append(("payment", payment.id, str(e)))
+                continue
+            for account_id, amount in counter:
+                entry.add(account_id, debit=amount if receipt else 0, credit=0 if receipt else amount)
+            if receipt:
+                entry.add(party_account, credit=payment.amount, party_id=payment.party_id)
+            else:
+                entry.add(party_account, debit=payment.amount, party_id=payment.party_id)
+            entries.append(entry)
+        return entries
+
+    def _check_entries(self, db, date_from, date_to, mappings, report):
+        checks = db.execute(
+            select(Check.id, Check.check_number, Check.direction, Check.status, Check.amount, Check.issue_date,
+                   Check.due_date, Check.payer_party_id, Check.payee_party_id, BankAccount.ledger_account_id)
+            .join(BankAccount, BankAccount.id == Check.bank_account_id)
+            .where(or_(Check.issue_date.between(date_from, date_to), Check.due_date.between(date_from, date_to)))
+            .order_by(Check.id)
+        ).all()
+
+        entries = []
+        for check in checks:
+            party_id = check.payer_party_id if check.direction == "received" else check.payee_party_id
+            accounts = {"bank": check.ledger_account_id}
+            for (direction, stage), (statuses, date_column, debit_key, credit_key) in CHECK_STAGES.items():
+                date = getattr(check, date_column)
+                if direction != check.direction or check.status not in statuses or not date_from <= date <= date_to:
+                    continue
+                entry = _Entry(f"check_{stage}", check.id, date, f"چک {check.check_number} — {stage}")
+                try:
+                    for key, side in ((debit_key, "debit"), (credit_key, "credit")):
+                        if key == "party":
+                            key = "receivable" if direction == "received" else "payable"
+                        account_id = accounts.get(key) or self._account(mappings, key)
+                        party = party_id if key in ("receivable", "payable") else None
+                        if key == "payable" and stage == "endorsed":
+                            party = check.payee_party_id
+                        entry.add(account_id, party_id=party, **{side: check.amount})
+                except MissingMapping as e:
+                    report.errors.append((entry.source_type, check.id, str(e)))
+                    continue
+                entries.append(entry)
+        return entries
+
+    # ----- ثبت -----
+    @staticmethod
+    def _drop_posted(db, entries, report):
+        """حذف اسنادی که قبلاً ثبت شده‌اند — یک کوئری روی بازه شناسه‌ها برای هر نوع منبع"""
+        by_type = {}
+        for entry in entries:
+            by_type.setdefault(entry.source_type, []).append(entry.source_id)
+        posted = set()
+        for source_type, ids in by_type.items():
+            posted.update(db.execute(
+                select(JournalEntry.source_type, JournalEntry.source_id).where(
+                    JournalEntry.source_type == source_type, JournalEntry.source_id.between(min(ids), max(ids))
+                )
+            ).all())
+        kept = [entry for entry in entries if (entry.source_type, entry.source_id) not in posted]
+        report.skipped += len(entries) - len(kept)
+        return kept
+
+    @staticmethod
+    def _insert(db, entries, created_by):
+        if not entries:
+            return
+        ids = db.execute(
+            insert(JournalEntry).returning(JournalEntry.id, sort_by_parameter_order=True),
+            [{"date": entry.date, "period": entry.period, "description": entry.description,
+              "source_type": entry.source_type, "source_id": entry.source_id, "posted": True,
+              "created_by": created_by} for entry in entries],
+        ).scalars().all()
+
+        lines, by_period = [], {}
+        for entry_id, entry in zip(ids, entries):
+            for line in entry.lines:
+                lines.append({**line, "journal_entry_id": entry_id})
+                by_period.setdefault(entry.period, []).append(
+                    (line["ledger_account_id"], line["party_id"], line["debit"], line["credit"])
+                )
+        db.execute(insert(JournalLine), lines)
+        validate_entries(db, ids)
+
+        # مانده دوره‌ای — یک بار برای هر دوره، خطوط بر اساس حساب/طرف‌حساب تجمیع می‌شوند
+        for period, period_lines in by_period.items():
+            post_lines(db, period, period_lines)
+
+        # فاکتورهای ثبت‌شده در دفتر
+        invoice_ids = [{"b_id": entry.source_id} for entry in entries if entry.source_type == "invoice"]
+        if invoice_ids:
+            db.execute(
+                update(Invoice.__table__).where(Invoice.__table__.c.id == bindparam("b_id"))
+                .values(status="posted", posted_at=datetime.now()),
+                invoice_ids,
+            )
@@ -1,35 +1,118 @@
 # app/services/stock_service.py
-from app.database import SessionLocal
+from decimal import Decimal
+from sqlalchemy import select, func, or_
+from app.database import unit_of_work
 from app.models.stock_movement import StockMovement
 from app.models.item import Item
+from app.models.unit import Unit
+from app.models.item_stock_balance import ItemStockBalance
+from app.utils.pagination import keyset_page, PAGE_SIZE
 from app.utils.validators import validate_stock_availability
+from app.utils.stock_balance import apply_movements, get_balance_qty, get_balance_qty_bulk, verify_balances, rebuild_balances
+from app.utils.cost_engine import replay_costs
+
+# کلیدهای مرتب‌سازی مجاز برای لیست موجودی
+STOCK_SORT_COLUMNS = {
+    "sku": Item.sku,
+    "name": Item.name,
+    "unit": func.coalesce(Unit.name, ""),
+    "qty": func.coalesce(ItemStockBalance.qty_on_hand, 0),
+}
 
 class StockService:
-    def __init__(self):
-        self.db = SessionLocal()
+    """داخل واحد کار دیگری (مثلاً InvoiceService) همان Session و تراکنش را به کار می‌برد"""
+
+    def get_current_stock(self, item_id: int) -> Decimal:
+        """موجودی فعلی کالا — از جدول item_stock_balance"""
+        with unit_of_work() as db:
+            return get_balance_qty(db, item_id)
 
-    def get_current_stock(self, item_id: int) -> float:
-        """محاسبه موجودی فعلی کالا"""
-        movements = self.db.query(StockMovement).filter(StockMovement.item_id == item_id).all()
-        return sum(m.qty for m in movements)
+    def get_current_stock_bulk(self, item_ids, exclude_invoice_id: int = None) -> dict:
+        """موجودی چند کالا با یک کوئری — {item_id: Decimal}"""
+        with unit_of_work() as db:
+            return get_balance_qty_bulk(db, item_ids, exclude_invoice_id=exclude_invoice_id)
 
     def add_movement(self, data: dict):
         """افزودن تحرک انبار — با اعتبارسنجی برای خروجی‌ها"""
         item_id = data['item_id']
         qty = data['qty']
 
-        # اگر خروجی است — اعتبارسنجی موجودی
-        if qty < 0:
-            current_stock = self.get_current_stock(item_id)
-            if abs(qty) > current_stock:
-                raise ValueError(f"موجودی کافی نیست. موجودی فعلی: {current_stock}")
+        with unit_of_work() as db:
+            # اگر خروجی است — اعتبارسنجی موجودی
+            if qty < 0:
+                current_stock = self.get_current_stock(item_id)
+                if abs(qty) > current_stock:
+                    raise ValueError(f"موجودی کافی نیست. موجودی فعلی: {current_stock}")
+
+            movement = StockMovement(**data)
+            movement.total_cost = int(movement.qty * movement.cost_per_unit)  # محاسبه خودکار
+            db.add(movement)
+            apply_movements(db, [movement])
+            db.flush()
+            db.refresh(movement)
+            return movement
+
+    def get_stock_page(self, after=None, limit=PAGE_SIZE, sort="sku", descending=False, search=None):
+        """یک صفحه از موجودی کالاها — ردیف‌ها: (id, sku, name, unit_name, base_unit_id, qty_on_hand, last_cost)"""
+        last_cost = select(StockMovement.cost_per_unit).where(
+            StockMovement.item_id == Item.id, StockMovement.qty > 0
+        ).order_by(StockMovement.created_at.desc(), StockMovement.id.desc()).limit(1).scalar_subquery()
+        stmt = select(
+            Item.id, Item.sku, Item.name, Unit.name, Item.base_unit_id,
+            func.coalesce(ItemStockBalance.qty_on_hand, 0), last_cost,
+        ).outerjoin(Unit, Unit.id == Item.base_unit_id).outerjoin(
+            ItemStockBalance, ItemStockBalance.item_id == Item.id
+        )
+        if search:
+            pattern = f"%{search}%"
+            stmt = stmt.where(or_(Item.sku.ilike(pattern), Item.name.ilike(pattern)))
+        with unit_of_work() as db:
+            return keyset_page(db, stmt, STOCK_SORT_COLUMNS[sort], Item.id, after, descending, limit)
+
+    def get_stock_overview(self, search=None):
+        """موجودی تمام کالاها در یک دستور SQL — ردیف‌ها: (id, sku, name, unit_name, base_unit_id, qty_on_hand, last_cost)
 
-        movement = StockMovement(**data)
-        movement.total_cost = int(movement.qty * movement.cost_per_unit)  # محاسبه خودکار
-        self.db.add(movement)
-        self.db.commit()
-        self.db.refresh(movement)
-        return movement
+        آخرین بهای ورودی هر کالا با row_number() روی تحرکات ورودی به دست می‌آید
+        (به‌جای خواندن کل تاریخچه تحرکات برای هر کالا).
+        """
+        ranked = select(
+            StockMovement.item_id,
+            StockMovement.cost_per_unit,
+            func.row_number().over(
+                partition_by=StockMovement.item_id,
+                order_by=[StockMovement.created_at.desc(), StockMovement.id.desc()],
+            ).label("rn"),
+        ).where(StockMovement.qty > 0).subquery()
+
+        stmt = select(
+            Item.id, Item.sku, Item.name, Unit.name, Item.base_unit_id,
+            func.coalesce(ItemStockBalance.qty_on_hand, 0), ranked.c.cost_per_unit,
+        ).outerjoin(Unit, Unit.id == Item.base_unit_id).outerjoin(
+            ItemStockBalance, ItemStockBalance.item_id == Item.id
+        ).outerjoin(
+            ranked, (ranked.c.item_id == Item.id) & (ranked.c.rn == 1)
+        ).order_by(Item.sku)
+        if search:
+            pattern = f"%{search}%"
+            stmt = stmt.where(or_(Item.sku.ilike(pattern), Item.name.ilike(pattern)))
+        with unit_of_work() as db:
+            return [tuple(row) for row in db.execute(stmt).all()]
 
     def get_movements_by_item(self, item_id: int):
-        return self.db.query(StockMovement).filter(StockMovement.item_id == item_id).order_by(StockMovement.created_at).all()
\ No newline at end of file
+        with unit_of_work() as db:
+            return db.query(StockMovement).filter(StockMovement.item_id == item_id).order_by(StockMovement.created_at).all()
+
+    def verify_balances(self) -> list:
+        """تطبیق جدول موجودی با دفتر تحرکات"""
+        with unit_of_work() as db:
+            return verify_balances(db)
+
+    def rebuild_balances(self) -> int:
+        """بازسازی جدول موجودی از دفتر تحرکات"""
+        with unit_of_work() as db:
+            return rebuild_balances(db)
+
+    def replay_costs(self, item_ids=None, since=None) -> int:
+        """بازپردازش بهای تحرکات — تعداد تحرکات اصلاح‌شده را برمی‌گرداند"""
+        with unit_of_work() as db:
+            return replay_costs(db, item_ids=item_ids, since=since)
\ No newline at end of file
@@ -1,38 +1,45 @@
 # app/services/unit_service.py
-from app.database import SessionLocal
+from sqlalchemy import select
+from app.database import unit_of_work
 from app.models.unit import Unit
 
 class UnitService:
-    def __init__(self):
-        self.db = SessionLocal()
-
     def get_all_units(self):
-        return self.db.query(Unit).all()
+        with unit_of_work() as db:
+            return db.query(Unit).all()
+
+    def get_unit_choices(self):
+        """ردیف‌های سبک واحد (id, name) — برای لیست‌های انتخاب"""
+        with unit_of_work() as db:
+            return db.execute(select(Unit.id, Unit.name).order_by(Unit.id)).all()
 
     def create_unit(self, data):
-        unit = Unit(**data)
-        self.db.add(unit)
-        self.db.commit()
-        self.db.refresh(unit)
-        return unit
+        with unit_of_work() as db:
+            unit = Unit(**data)
+            db.add(unit)
+            db.flush()
+            db.refresh(unit)
+            return unit
 
     def update_unit(self, unit_id, data):
-        unit = self.db.query(Unit).filter(Unit.id == unit_id).first()
-        if not unit:
-            raise Exception("واحد یافت نشد.")
-        for key, value in data.items():
-            setattr(unit, key, value)
-        self.db.commit()
-        self.db.refresh(unit)
-        return unit
+        with unit_of_work() as db:
+            unit = db.get(Unit, unit_id)
+            if not unit:
+                raise Exception("واحد یافت نشد.")
+            for key, value in data.items():
+                setattr(unit, key, value)
+            db.flush()
+            db.refresh(unit)
+            return unit
 
     def delete_unit(self, unit_id):
-        unit = self.db.query(Unit).filter(Unit.id == unit_id).first()
-        if not unit:
-            raise Exception("واحد یافت نشد.")
-        self.db.delete(unit)
-        self.db.commit()
+        with unit_of_work() as db:
+            unit = db.get(Unit, unit_id)
+            if not unit:
+                raise Exception("واحد یافت نشد.")
+            db.delete(unit)
 
     # ✅ متد جدید — افزوده شد
     def get_unit_by_id(self, unit_id: int):
-        return self.db.query(Unit).filter(Unit.id == unit_id).first()
\ No newline at end of file
+        with unit_of_work() as db:
+            return db.get(Unit, unit_id)
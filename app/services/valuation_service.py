@@ -1,55 +1,200 @@
 # app/services/valuation_service.py
-from app.database import SessionLocal
+import time
+import numpy as np
+from sqlalchemy import select, insert, update, cast, func, Float
+from app.database import unit_of_work
 from app.models.stock_val_period import StockValPeriod
 from app.models.stock_movement import StockMovement
 from datetime import datetime
 
+
+def _period_bounds(year: int, month: int):
+    """ابتدا و انتهای دوره (ماه میلادی) — [start, end)"""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def _period_end(period: str) -> datetime:
+    """پایان دوره YYYY-MM — ابتدای ماه بعد"""
+    year, month = map(int, period.split("-"))
+    return _period_bounds(year, month)[1]
+
+
+def _weighted_close(open_items, open_qty, open_value, mv_items, mv_qty, mv_value):
+    """میانگین موزون یک بازه برای همه کالاها — (item_ids، میانگین، مقدار پایانی، ارزش پایانی)
+
+    میانگین = (ارزش ابتدا + ارزش ورودی‌ها) / (مقدار ابتدا + مقدار ورودی‌ها)
+    """
+    item_ids, inverse = np.unique(np.concatenate([open_items, mv_items]), return_inverse=True)
+    n = len(item_ids)
+    open_idx, mv_idx = inverse[:len(open_items)], inverse[len(open_items):]
+
+    base_qty = np.bincount(open_idx, weights=open_qty, minlength=n)
+    base_value = np.bincount(open_idx, weights=open_value, minlength=n)
+
+    inbound = mv_qty > 0
+    in_qty = np.bincount(mv_idx, weights=np.where(inbound, mv_qty, 0.0), minlength=n)
+    in_value = np.bincount(mv_idx, weights=np.where(inbound, mv_value, 0.0), minlength=n)
+    net_qty = np.bincount(mv_idx, weights=mv_qty, minlength=n)
+
+    avail_qty = base_qty + in_qty
+    avail_value = base_value + in_value
+    avg_cost = np.divide(avail_value, avail_qty, out=np.zeros(n), where=avail_qty > 0)
+
+    closing_qty = np.round(base_qty + net_qty, 4)
+    closing_value = np.rint(closing_qty * avg_cost)
+    return item_ids, np.rint(avg_cost), closing_qty, closing_value
+
+
 class ValuationService:
-    def __init__(self):
-        self.db = SessionLocal()
+    # تعداد ردیف‌هایی که در هر نوبت از دیتابیس خوانده می‌شود
+    STREAM_BATCH_SIZE = 50000
 
     def calculate_weighted_average(self, item_id: int, year: int, month: int) -> dict:
         """محاسبه میانگین موزون برای یک کالا در یک دوره"""
         period = f"{year}-{month:02d}"
-        
-        # تمام تحرکات در این دوره
-        movements = self.db.query(StockMovement).filter(
-            StockMovement.item_id == item_id,
-            StockMovement.created_at >= f"{year}-{month:02d}-01",
-            StockMovement.created_at < f"{year}-{month+1:02d}-01" if month < 12 else f"{year+1}-01-01"
-        ).order_by(StockMovement.created_at).all()
-
-        if not movements:
-            return None
-
-        total_qty = 0.0
-        total_value = 0
-
-        for m in movements:
-            total_qty += m.qty
-            total_value += m.total_cost  # cost_per_unit * qty — از قبل محاسبه شده
-
-        avg_cost = int(total_value / total_qty) if total_qty != 0 else 0
-
-        # ذخیره در جدول دوره‌ها
-        existing = self.db.query(StockValPeriod).filter(
-            StockValPeriod.item_id == item_id,
-            StockValPeriod.period == period
-        ).first()
-
-        if existing:
-            existing.avg_cost = avg_cost
-            existing.total_qty = total_qty
-            existing.total_value = total_value
-        else:
-            period_record = StockValPeriod(
-                item_id=item_id,
-                period=period,
-                avg_cost=avg_cost,
-                total_qty=total_qty,
-                total_value=total_value
+        start, end = _period_bounds(year, month)
+
+        with unit_of_work() as db:
+            # تمام تحرکات در این دوره
+            movements = db.query(StockMovement).filter(
+                StockMovement.item_id == item_id,
+                StockMovement.created_at >= start,
+                StockMovement.created_at < end
+            ).order_by(StockMovement.created_at).all()
+
+            if not movements:
+                return None
+
+            total_qty = 0.0
+            total_value = 0
+
+            for m in movements:
+                total_qty += m.qty
+                total_value += m.total_cost  # cost_per_unit * qty — از قبل محاسبه شده
+
+            avg_cost = int(total_value / total_qty) if total_qty != 0 else 0
+
+            # ذخیره در جدول دوره‌ها
+            existing = db.query(StockValPeriod).filter(
+                StockValPeriod.item_id == item_id,
+                StockValPeriod.period == period
+            ).first()
+
+            if existing:
+                existing.avg_cost = avg_cost
+                existing.total_qty = total_qty
+                existing.total_value = total_value
+            else:
+                period_record = StockValPeriod(
+                    item_id=item_id,
+                    period=period,
+                    avg_cost=avg_cost,
+                    total_qty=total_qty,
+                    total_value=total_value
+                )
+                db.add(period_record)
+
+        return {"avg_cost": avg_cost, "total_qty": total_qty, "total_value": total_value}
+
+    def _stream_period_movements(self, db, start: datetime, end: datetime):
+        """خواندن تحرکات دوره با یک کوئری مرتب — خروجی: آرایه‌های NumPy؛ start=None یعنی از ابتدا"""
+        window = [StockMovement.created_at < end]
+        if start is not None:
+            window.append(StockMovement.created_at >= start)
+        result = db.execute(
+            select(
+                StockMovement.item_id,
+                cast(StockMovement.qty, Float),
+                cast(StockMovement.total_cost, Float),
+            ).where(*window).order_by(StockMovement.item_id, StockMovement.created_at, StockMovement.id)
+            .execution_options(yield_per=self.STREAM_BATCH_SIZE)
+        )
+
+        item_chunks, qty_chunks, value_chunks = [], [], []
+        for rows in result.partitions():
+            chunk = np.array(rows, dtype=np.float64).reshape(-1, 3)
+            item_chunks.append(chunk[:, 0].astype(np.int64))
+            qty_chunks.append(chunk[:, 1])
+            value_chunks.append(chunk[:, 2])
+
+        if not item_chunks:
+            empty = np.array([], dtype=np.float64)
+            return np.array([], dtype=np.int64), empty, empty
+        return np.concatenate(item_chunks), np.concatenate(qty_chunks), np.concatenate(value_chunks)
+
+    def close_period(self, year: int, month: int) -> dict:
+        """ارزش‌گذاری میانگین موزون تمام کالاها برای یک دوره — یک پیمایش، یک تراکنش
+
+        موجودی ابتدای دوره از آخرین دوره بسته قبل از آن خوانده می‌شود. اگر ماه‌هایی بین آن دو بسته
+        نشده باشند (یا هیچ دوره‌ای بسته نشده باشد)، تحرکات آن فاصله هم به‌عنوان یک بازه میانگین
+        موزون به موجودی ابتدا اضافه می‌شود — جاافتادن یک ماه موجودی ابتدا را صفر نمی‌کند.
+        """
+        started = time.perf_counter()
+        period = f"{year}-{month:02d}"
+        start, end = _period_bounds(year, month)
+
+        with unit_of_work() as db:
+            # --- ۱) موجودی ابتدای دوره — از آخرین دوره بسته قبلی ---
+            opening_period = db.execute(
+                select(func.max(StockValPeriod.period)).where(StockValPeriod.period < period)
+            ).scalar()
+            opening = db.execute(
+                select(
+                    StockValPeriod.item_id,
+                    cast(StockValPeriod.total_qty, Float),
+                    cast(StockValPeriod.total_value, Float),
+                ).where(StockValPeriod.period == opening_period)
+            ).all() if opening_period else []
+            open_items = np.array([r[0] for r in opening], dtype=np.int64)
+            open_qty = np.array([r[1] for r in opening], dtype=np.float64)
+            open_value = np.array([r[2] for r in opening], dtype=np.float64)
+
+            # ماه‌های بسته‌نشده بین آن دوره و این دوره
+            gap_start = _period_end(opening_period) if opening_period else None
+            gap_movements = 0
+            if gap_start is None or gap_start < start:
+                gap = self._stream_period_movements(db, gap_start, start)
+                gap_movements = len(gap[0])
+                if gap_movements:
+                    open_items, _, open_qty, open_value = _weighted_close(open_items, open_qty, open_value, *gap)
+
+            # --- ۲) تحرکات دوره ---
+            mv_items, mv_qty, mv_value = self._stream_period_movements(db, start, end)
+
+            # --- ۳) محاسبه برداری برای تمام کالاها ---
+            item_ids, avg_cost, closing_qty, closing_value = _weighted_close(
+                open_items, open_qty, open_value, mv_items, mv_qty, mv_value
             )
-            self.db.add(period_record)
+            n = len(item_ids)
+
+            # --- ۴) ذخیره گروهی (upsert) ---
+            existing = dict(db.execute(
+                select(StockValPeriod.item_id, StockValPeriod.id).where(StockValPeriod.period == period)
+            ).all())
+
+            inserts, updates = [], []
+            for item_id, avg, qty, value in zip(item_ids.tolist(), avg_cost.tolist(),
+                                                closing_qty.tolist(), closing_value.tolist()):
+                row = {"avg_cost": int(avg), "total_qty": qty, "total_value": int(value)}
+                if item_id in existing:
+                    updates.append({"id": existing[item_id], **row})
+                else:
+                    inserts.append({"item_id": item_id, "period": period, **row})
+
+            if updates:
+                db.execute(update(StockValPeriod), updates)
+            if inserts:
+                db.execute(insert(StockValPeriod), inserts)
 
-        self.db.commit()
-        return {"avg_cost": avg_cost, "total_qty": total_qty, "total_value": total_value}
\ No newline at end of file
+        return {
+            "period": period,
+            "items": n,
+            "movements": len(mv_items),
+            "opening_period": opening_period,
+            "gap_movements": gap_movements,
+            "inserted": len(inserts),
+            "updated": len(updates),
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+        }
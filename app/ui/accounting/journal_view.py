@@ -87,4 +87,20 @@ class JournalView(QWidget):
         self.table.resizeColumnsToContents()
 
     def close_period(self):
-        QMessageBox.information(self, "به زودی", "بستن دوره مالی در نسخه بعدی فعال خواهد شد.")
\ No newline at end of file
+        period = self.period_input.text().strip()
+        if not period:
+            QMessageBox.warning(self, "خطا", "لطفاً دوره مالی را وارد کنید.")
+            return
+        reply = QMessageBox.question(
+            self, "بستن دوره مالی",
+            f"دوره {period} و دوره‌های قبل از آن بسته می‌شوند و ثبت سند در آن‌ها ممکن نخواهد بود. ادامه می‌دهید؟",
+            QMessageBox.Yes | QMessageBox.No,
+        )
+        if reply != QMessageBox.Yes:
+            return
+        try:
+            count = self.service.close_period(period)
+        except ValueError as e:
+            QMessageBox.warning(self, "خطا", str(e))
+            return
+        QMessageBox.information(self, "موفقیت", f"دوره {period} بسته شد — مانده {count} حساب منجمد شد.")
\ No newline at end of file
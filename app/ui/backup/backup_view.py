@@ -1,12 +1,17 @@
 # app/ui/backup/backup_view.py
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QTableView, QLabel, QMessageBox, QFileDialog,
-                               QCheckBox, QLineEdit)
+                               QCheckBox, QLineEdit, QProgressBar)
 from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
 from PySide6.QtWidgets import QInputDialog
 import os
 from app.backup.backup_service import BackupService
 from app.backup.restore_service import RestoreService
+from app.ui.workers import run_in_background
+
+# عنوان مراحل بک‌آپ در نوار پیشرفت
+BACKUP_STAGES = {"snapshot": "کپی دیتابیس", "compress": "فشرده‌سازی", "encrypt": "رمزنگاری",
+                 "extract": "استخراج بک‌آپ", "verify": "بررسی دیتابیس"}
 
 class BackupTableModel(QAbstractTableModel):
     def __init__(self, backup_files):
@@ -84,6 +89,11 @@ class BackupView(QWidget):
         self.encrypt_check.stateChanged.connect(lambda: self.key_input.setEnabled(self.encrypt_check.isChecked()))
         layout.addLayout(encrypt_layout)
 
+        # پیشرفت بک‌آپ — کار در پس‌زمینه انجام می‌شود و پنجره قفل نمی‌شود
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
         # Backup List
         self.table = QTableView()
         self.table.setSelectionBehavior(QTableView.SelectRows)
@@ -115,16 +125,40 @@ class BackupView(QWidget):
             QMessageBox.warning(self, "خطا", "کلید رمزنگاری باید 32 کاراکتر باشد.")
             return
 
-        try:
-            backup_file = BackupService.create_backup(
+        self.backup_btn.setEnabled(False)
+        self.restore_btn.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.backup_worker = run_in_background(
+            lambda on_progress: BackupService.create_backup(
                 backup_path=self.backup_path,
                 encrypt=encrypt,
-                key=key if encrypt else None
-            )
-            QMessageBox.information(self, "موفق", f"بک‌آپ با موفقیت ایجاد شد:\n{backup_file}")
-            self.load_backup_list()
-        except Exception as e:
-            QMessageBox.critical(self, "خطا", f"خطا در ایجاد بک‌آپ: {str(e)}")
+                key=key if encrypt else None,
+                on_progress=on_progress,
+                workers=None,  # فشرده‌سازی روی همه هسته‌ها
+            ),
+            self.on_backup_finished,
+            self.on_backup_failed,
+            on_progress=self.on_backup_progress,
+        )
+
+    def on_backup_progress(self, stage, done, total):
+        self.progress_bar.setFormat(f"{BACKUP_STAGES.get(stage, stage)} — %p%")
+        self.progress_bar.setValue(int(done * 100 / total) if total else 100)
+
+    def _backup_done(self):
+        self.progress_bar.setVisible(False)
+        self.backup_btn.setEnabled(True)
+        self.restore_btn.setEnabled(True)
+
+    def on_backup_finished(self, backup_file):
+        self._backup_done()
+        QMessageBox.information(self, "موفق", f"بک‌آپ با موفقیت ایجاد شد:\n{backup_file}")
+        self.load_backup_list()
+
+    def on_backup_failed(self, message):
+        self._backup_done()
+        QMessageBox.critical(self, "خطا", f"خطا در ایجاد بک‌آپ: {message}")
 
     def restore_backup(self):
         selected = self.table.selectionModel().selectedRows()
@@ -139,8 +173,9 @@ class BackupView(QWidget):
         key = None
         if encrypt:
             key, ok = QInputDialog.getText(self, "کلید رمزنگاری", "کلید را وارد کنید:")
-            if not ok or len(key.encode()) != 32:
-                QMessageBox.warning(self, "خطا", "کلید باید 32 کاراکتر باشد.")
+            # بک‌آپ‌های قدیمی با کلید Fernet (۴۴ کاراکتر) رمز شده‌اند — طول کلید بررسی نمی‌شود
+            if not ok or not key:
+                QMessageBox.warning(self, "خطا", "کلید رمزنگاری وارد نشده است.")
                 return
             key = key.encode()
 
@@ -152,8 +187,26 @@ class BackupView(QWidget):
         )
 
         if reply == QMessageBox.Yes:
-            try:
-                RestoreService.restore_backup(backup_file, encrypt=encrypt, key=key if encrypt else None)
-                QMessageBox.information(self, "موفق", "بازیابی با موفقیت انجام شد.\nبرنامه را مجدداً راه‌اندازی کنید.")
-            except Exception as e:
-                QMessageBox.critical(self, "خطا", f"خطا در بازیابی: {str(e)}")
\ No newline at end of file
+            self.backup_btn.setEnabled(False)
+            self.restore_btn.setEnabled(False)
+            self.progress_bar.setValue(0)
+            self.progress_bar.setVisible(True)
+            self.restore_worker = run_in_background(
+                lambda on_progress: RestoreService.restore_backup(
+                    backup_file, encrypt=encrypt, key=key if encrypt else None, on_progress=on_progress),
+                self.on_restore_finished,
+                self.on_restore_failed,
+                on_progress=self.on_backup_progress,
+            )
+
+    def on_restore_finished(self, report):
+        self._backup_done()
+        message = (f"بازیابی با موفقیت انجام شد.\n{report['files']} فایل، "
+                   f"{report['bytes'] // 1024} KB در {report['elapsed_seconds']} ثانیه ({report['mb_per_second']} MB/s)")
+        if report["needs_upgrade"]:
+            message += "\n\nنسخه ساختار دیتابیس قدیمی است — مهاجرت‌ها را اجرا کنید (alembic upgrade head)."
+        QMessageBox.information(self, "موفق", message + "\nبرنامه را مجدداً راه‌اندازی کنید.")
+
+    def on_restore_failed(self, message):
+        self._backup_done()
+        QMessageBox.critical(self, "خطا", f"خطا در بازیابی (داده‌های فعلی تغییری نکرده‌اند): {message}")
@@ -1,61 +1,26 @@
 # app/ui/checks/check_list.py
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QTableView, QLineEdit, QLabel, QMessageBox)
-from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtCore import Qt, QThreadPool
 from app.services.check_service import CheckService
-
-class CheckTableModel(QAbstractTableModel):
-    def __init__(self, checks):
-        super().__init__()
-        self.checks = checks
-        self.headers = ["شماره چک", "بانک", "مبلغ", "تاریخ صدور", "سررسید", "پرداخت‌کننده", "دریافت‌کننده", "وضعیت", "جهت"]
-        
-        # ✅ بارگذاری یک‌باره تمام طرف‌حساب‌ها — برای جلوگیری از فراخوانی مکرر دیتابیس
-        from app.services.party_service import PartyService
-        self.party_service = PartyService()
-        self.parties = {p.id: p for p in self.party_service.get_all_parties()}  # کش به صورت dict
-
-    def rowCount(self, parent=QModelIndex()):
-        """تعداد ردیف‌های داده را برمی‌گرداند"""
-        return len(self.checks)
-
-    def columnCount(self, parent=QModelIndex()):
-        """تعداد ستون‌ها را برمی‌گرداند"""
-        return len(self.headers)
-
-    def headerData(self, section, orientation, role=Qt.DisplayRole):
-        """هدرهای ستون‌ها را برمی‌گرداند"""
-        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
-            return self.headers[section]
-        return None
-
-    def data(self, index, role=Qt.DisplayRole):
-        if not index.isValid():
-            return None
-        check = self.checks[index.row()]
-        col = index.column()
-        if role == Qt.DisplayRole:
-            if col == 0: return check.check_number
-            elif col == 1: return check.bank_name
-            elif col == 2: return f"{check.amount:,.0f}"
-            elif col == 3:  # تاریخ صدور — شمسی
-                return check.date_jalali if hasattr(check, 'date_jalali') else self.gregorian_to_jalali(check.issue_date)
-            elif col == 4:  # سررسید — شمسی
-                return self.gregorian_to_jalali(check.due_date)
-            elif col == 5:  # پرداخت‌کننده
-                if check.payer_party_id:
-                    from app.services.party_service import PartyService
-                    party = PartyService().get_party_by_id(check.payer_party_id)
-                    return party.name if party else "-"
-                return "-"
-            elif col == 6:  # دریافت‌کننده
-                if check.payee_party_id:
-                    from app.services.party_service import PartyService
-                    party = PartyService().get_party_by_id(check.payee_party_id)
-                    return party.name if party else "-"
-                return "-"
-            elif col == 7: return check.status
-            elif col == 8: return "دریافتی" if check.direction == "received" else "پرداختی"
+from app.ui.workers import service_call
+from app.ui.paged_table_model import PagedTableModel
+
+class CheckTableModel(PagedTableModel):
+    headers = ["شماره چک", "بانک", "مبلغ", "تاریخ صدور", "سررسید", "پرداخت‌کننده", "دریافت‌کننده", "وضعیت", "جهت"]
+    sort_keys = ["check_number", "bank_name", "amount", "issue_date", "due_date", "payer", "payee", "status", "direction"]
+
+    def display(self, row, col):
+        _, check_number, bank_name, amount, issue_date, due_date, payer_name, payee_name, status, direction = row
+        if col == 0: return check_number
+        elif col == 1: return bank_name
+        elif col == 2: return f"{amount:,.0f}"
+        elif col == 3: return self.gregorian_to_jalali(issue_date)  # تاریخ صدور — شمسی
+        elif col == 4: return self.gregorian_to_jalali(due_date)  # سررسید — شمسی
+        elif col == 5: return payer_name or "-"  # پرداخت‌کننده
+        elif col == 6: return payee_name or "-"  # دریافت‌کننده
+        elif col == 7: return status
+        elif col == 8: return "دریافتی" if direction == "received" else "پرداختی"
         return None
 
     def gregorian_to_jalali(self, gregorian_date):
@@ -96,6 +61,11 @@ class CheckListView(QWidget):
         self.table.setEditTriggers(QTableView.NoEditTriggers)
         layout.addWidget(self.table)
 
+        # وضعیت بارگذاری پس‌زمینه
+        self.loading_label = QLabel("⏳ در حال بارگذاری...")
+        self.loading_label.setVisible(False)
+        layout.addWidget(self.loading_label)
+
         # Buttons
         btn_layout = QHBoxLayout()
         self.add_btn = QPushButton("➕ ایجاد چک جدید")
@@ -112,16 +82,24 @@ class CheckListView(QWidget):
         self.setLayout(layout)
 
     def load_data(self):
-        self.checks = self.service.get_all_checks()
-        self.model = CheckTableModel(self.checks)
-        self.table.setModel(self.model)
-        self.table.resizeColumnsToContents()
+        if self.table.model() is None:
+            self.model = CheckTableModel(service_call(CheckService, "get_checks_page"), sort="due_date",
+                                         descending=True, thread_pool=QThreadPool.globalInstance())
+            self.table.setModel(self.model)
+            self.model.loadingChanged.connect(self.on_loading_changed)
+            self.model.loadFailed.connect(
+                lambda message: QMessageBox.critical(self, "خطا", f"خطا در بارگذاری داده‌ها:\n{message}"))
+            self.table.horizontalHeader().setSortIndicator(4, Qt.DescendingOrder)
+            self.table.setSortingEnabled(True)
+        self.model.refresh()
+
+    def on_loading_changed(self, loading):
+        self.loading_label.setVisible(loading)
+        if not loading:
+            self.table.resizeColumnsToContents()
 
     def filter_data(self):
-        text = self.search_input.text().lower()
-        filtered = [chk for chk in self.checks if text in chk.check_number.lower() or text in chk.bank_name.lower()]
-        self.model.checks = filtered
-        self.model.layoutChanged.emit()
+        self.model.set_search(self.search_input.text())
 
     def add_check(self):
         from app.ui.checks.check_dialog import CheckDialog
@@ -141,8 +119,7 @@ class CheckListView(QWidget):
         if not selected:
             QMessageBox.warning(self, "هشدار", "لطفاً یک چک را انتخاب کنید.")
             return
-        row = selected[0].row()
-        check = self.model.checks[row]
+        check = self.service.get_check_by_id(self.model.row_id(selected[0].row()))
         dialog = CheckDialog(self, check)
         if dialog.exec():
             data = dialog.get_data()
@@ -158,11 +135,10 @@ class CheckListView(QWidget):
         if not selected:
             QMessageBox.warning(self, "هشدار", "لطفاً یک چک را انتخاب کنید.")
             return
-        row = selected[0].row()
-        check = self.model.checks[row]
-        if QMessageBox.question(self, "تأیید حذف", f"آیا از حذف چک «{check.check_number}» اطمینان دارید؟", QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
+        check_id, check_number = self.model.rows[selected[0].row()][:2]
+        if QMessageBox.question(self, "تأیید حذف", f"آیا از حذف چک «{check_number}» اطمینان دارید؟", QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
             try:
-                self.service.delete_check(check.id)
+                self.service.delete_check(check_id)
                 QMessageBox.information(self, "موفق", "چک حذف شد.")
                 self.load_data()
             except Exception as e:
@@ -1,16 +1,22 @@
 # app/ui/dashboard.py
 from PySide6.QtWidgets import QMainWindow, QVBoxLayout, QWidget, QLabel, QTabWidget
 from PySide6.QtCore import Qt
-from app.ui.parties.party_list import PartyListView
-from app.ui.units.unit_list import UnitListView
-from app.ui.items.item_list import ItemListView
-from app.ui.stock.stock_view import StockView
-from app.ui.invoices.invoice_list import InvoiceListView
-from app.ui.checks.check_list import CheckListView
-from app.ui.accounting.journal_view import JournalView 
-from app.ui.backup.backup_view import BackupView
+import importlib
 from PySide6.QtWidgets import QGridLayout, QFrame
 from app.services.dashboard_service import DashboardService  # جدید — باید ایجاد شود
+from app.ui.workers import run_in_background, service_call
+
+# تب‌ها — (عنوان، ماژول، کلاس نما، نام attribute)؛ هر نما در اولین نمایش تبش ساخته می‌شود
+LAZY_TABS = [
+    ("طرف‌حساب‌ها", "app.ui.parties.party_list", "PartyListView", "party_view"),
+    ("واحدها", "app.ui.units.unit_list", "UnitListView", "unit_view"),
+    ("کالاها", "app.ui.items.item_list", "ItemListView", "item_view"),
+    ("📦 انبار", "app.ui.stock.stock_view", "StockView", "stock_view"),
+    ("📄 فاکتورها", "app.ui.invoices.invoice_list", "InvoiceListView", "invoice_view"),
+    ("💳 چک‌ها", "app.ui.checks.check_list", "CheckListView", "check_view"),
+    ("📚 دفتر روزنامه", "app.ui.accounting.journal_view", "JournalView", "journal_view"),
+    ("💾 بک‌آپ و بازیابی", "app.ui.backup.backup_view", "BackupView", "backup_view"),
+]
 
 class DashboardWindow(QMainWindow):
     def __init__(self):
@@ -31,32 +37,23 @@ class DashboardWindow(QMainWindow):
         title_label.setStyleSheet("font-size: 20px; font-weight: bold; margin: 20px;")
         layout.addWidget(title_label, 0, 0, 1, 3)
 
-        # کارت‌های آمار
-        service = DashboardService()
-
-        # کارت ۱: تعداد کالاها
-        card1 = self.create_stat_card("📦 تعداد کالاها", f"{service.get_item_count():,}")
-        layout.addWidget(card1, 1, 0)
-
-        # کارت ۲: تعداد طرف‌حساب‌ها
-        card2 = self.create_stat_card("👥 تعداد طرف‌حساب‌ها", f"{service.get_party_count():,}")
-        layout.addWidget(card2, 1, 1)
-
-        # کارت ۳: موجودی کل انبار (ریال)
-        card3 = self.create_stat_card("💰 ارزش کل انبار", f"{service.get_total_inventory_value():,} ریال")
-        layout.addWidget(card3, 1, 2)
-
-        # کارت ۴: فاکتورهای امروز
-        card4 = self.create_stat_card("📄 فاکتورهای امروز", f"{service.get_today_invoices_count()}")
-        layout.addWidget(card4, 2, 0)
-
-        # کارت ۵: چک‌های در جریان
-        card5 = self.create_stat_card("💳 چک‌های در جریان", f"{service.get_active_checks_count()}")
-        layout.addWidget(card5, 2, 1)
-
-        # کارت ۶: بدهی/طلب کل
-        card6 = self.create_stat_card("📊 بدهی/طلب کل", f"{service.get_total_receivable_payable():,} ریال")
-        layout.addWidget(card6, 2, 2)
+        # کارت‌های آمار — مقادیر در پس‌زمینه بارگذاری می‌شوند تا پنجره فوراً نمایش داده شود
+        self.stat_labels = {}
+        cards = [
+            ("item_count", "📦 تعداد کالاها", 1, 0),
+            ("party_count", "👥 تعداد طرف‌حساب‌ها", 1, 1),
+            ("inventory_value", "💰 ارزش کل انبار", 1, 2),
+            ("today_invoices", "📄 فاکتورهای امروز", 2, 0),
+            ("active_checks", "💳 چک‌های در جریان", 2, 1),
+            ("receivable_payable", "📊 بدهی/طلب کل", 2, 2),
+            ("checks_due", "⏰ سررسید چک — ۷ روز آینده", 3, 0),
+        ]
+        for key, title, row, col in cards:
+            card, self.stat_labels[key] = self.create_stat_card(title, "⏳")
+            layout.addWidget(card, row, col)
+        self.stats_worker = run_in_background(
+            service_call(DashboardService, "get_summary"), self.show_stats, self.show_stats_failed
+        )
 
         placeholder_widget.setLayout(layout)
         self.tabs.insertTab(0, placeholder_widget, "📊 داشبورد")
@@ -67,36 +64,16 @@ class DashboardWindow(QMainWindow):
         placeholder_widget.setLayout(layout)
         self.tabs.addTab(placeholder_widget, "داشبورد")
 
-        # Tab 2: Parties
-        self.party_view = PartyListView()
-        self.tabs.addTab(self.party_view, "طرف‌حساب‌ها")
-
-        # Tab 3: Units
-        self.unit_view = UnitListView()
-        self.tabs.addTab(self.unit_view, "واحدها")
-
-        # Tab 4: Items
-        self.item_view = ItemListView()
-        self.tabs.addTab(self.item_view, "کالاها")
-
-        # Tab 5: Stock
-        self.stock_view = StockView()
-        self.tabs.addTab(self.stock_view, "📦 انبار")
-
-        # Tab 6: Invoices ✅ اضافه شد
-        self.invoice_view = InvoiceListView()
-        self.tabs.addTab(self.invoice_view, "📄 فاکتورها")
-        
-        # Tab 7: checks
-        self.check_view = CheckListView()
-        self.tabs.addTab(self.check_view, "💳 چک‌ها")
-        
-        # Tab 8: Journal ✅ اضافه شد
-        self.journal_view = JournalView()
-        self.tabs.addTab(self.journal_view, "📚 دفتر روزنامه")
-        
-        self.backup_view = BackupView()
-        self.tabs.addTab(self.backup_view, "💾 بک‌آپ و بازیابی")
+        # سایر تب‌ها — فقط یک ظرف خالی؛ نمای واقعی در اولین فعال‌سازی تب ساخته می‌شود
+        self.lazy_tabs = {}
+        for title, module, class_name, attr in LAZY_TABS:
+            container = QWidget()
+            container.setLayout(QVBoxLayout())
+            container.layout().setContentsMargins(0, 0, 0, 0)
+            self.lazy_tabs[container] = (module, class_name, attr)
+            setattr(self, attr, None)
+            self.tabs.addTab(container, title)
+        self.tabs.currentChanged.connect(self.ensure_tab_loaded)
 
         self.setCentralWidget(self.tabs)
 
@@ -114,6 +91,18 @@ class DashboardWindow(QMainWindow):
             }
         """)
         
+    def ensure_tab_loaded(self, index):
+        """ساخت نمای تب در اولین فعال‌سازی — import ماژول نما هم تا همین لحظه به تعویق می‌افتد"""
+        container = self.tabs.widget(index)
+        spec = self.lazy_tabs.pop(container, None)
+        if spec is None:
+            return
+        module, class_name, attr = spec
+        view = getattr(importlib.import_module(module), class_name)()
+        container.layout().addWidget(view)
+        setattr(self, attr, view)
+        return view
+
     def create_stat_card(self, title, value):
         """ایجاد یک کارت آماری"""
         frame = QFrame()
@@ -130,4 +119,24 @@ class DashboardWindow(QMainWindow):
         layout.addWidget(title_label)
         layout.addWidget(value_label)
         frame.setLayout(layout)
-        return frame        
\ No newline at end of file
+        return frame, value_label
+
+    def show_stats(self, stats):
+        """نمایش آمار بارگذاری‌شده در کارت‌ها"""
+        self.stat_labels["item_count"].setText(f"{stats['item_count']:,}")
+        self.stat_labels["party_count"].setText(f"{stats['party_count']:,}")
+        self.stat_labels["inventory_value"].setText(f"{stats['inventory_value']:,} ریال")
+        self.stat_labels["today_invoices"].setText(f"{stats['today_invoices']}")
+        self.stat_labels["active_checks"].setText(f"{stats['active_checks']}")
+        self.stat_labels["receivable_payable"].setText(f"{stats['receivable_payable']:,} ریال")
+        due = stats["checks_due"]
+        self.stat_labels["checks_due"].setText(
+            f"{due['week']['count']} چک — {due['week']['amount']:,} ریال"
+            + (f"\n({due['overdue']['count']} چک معوق)" if due["overdue"]["count"] else "")
+        )
+
+    def show_stats_failed(self, message):
+        """خطا در بارگذاری آمار — کارت‌ها به‌جای ⏳ دائمی علامت خطا و متن آن را نشان می‌دهند"""
+        for label in self.stat_labels.values():
+            label.setText("⚠️")
+            label.setToolTip(f"خطا در بارگذاری آمار: {message}")
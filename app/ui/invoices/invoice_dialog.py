@@ -194,12 +194,11 @@ class InvoiceDialog(QDialog):
 
     def load_invoice_lines(self, invoice):
         from app.services.invoice_service import InvoiceService
-        from app.models.invoice_line import InvoiceLine
-        service = InvoiceService()
-        lines = service.db.query(InvoiceLine).filter(InvoiceLine.invoice_id == invoice.id).all()
+        lines = InvoiceService().get_invoice_lines(invoice.id)
         lines_data = []
         for line in lines:
             lines_data.append({
+                'id': line.id,  # ویرایش تفاضلی — تطبیق با خط ذخیره‌شده
                 'item_id': line.item_id,
                 'qty': float(line.qty),
                 'unit_id': line.unit_id,
@@ -222,25 +221,18 @@ class InvoiceDialog(QDialog):
         jalali_str = self.date_input.text().strip()
         gregorian_date = jalali_to_gregorian(jalali_str)
         
-        # ✅ اگر در حالت ویرایش هستیم — serial_full قبلی را حفظ کن
-        if self.invoice:
-            serial_full = self.invoice.serial_full
-        else:
-            # ✅ فقط در حالت ایجاد جدید — serial_full جدید تولید شود
-            from jdatetime import datetime as jdatetime
-            now = jdatetime.now()
-            serial_full = f"INV-{now.strftime('%Y%m%d')}-{now.strftime('%H%M%S')}"
-        
-        return {
+        data = {
             "invoice_type": type_reverse[self.type_combo.currentIndex()],
             "serial": "INV",
-            "number": 1,
-            "serial_full": serial_full,  # ✅ اصلاح شد
             "party_id": self.selected_party_id,
             "date_gregorian": gregorian_date,
             "date_jalali": jalali_str,
             "created_by": 1,
         }
+        # در حالت ویرایش سریال قبلی حفظ می‌شود؛ فاکتور جدید سریال را از جدول document_sequences می‌گیرد
+        if self.invoice:
+            data.update(number=self.invoice.number, serial_full=self.invoice.serial_full)
+        return data
 
     def validate(self):
         if not self.date_input.text().strip():
@@ -16,8 +16,10 @@ class InvoiceLineDelegate(QStyledItemDelegate):
         from app.services.unit_service import UnitService
         self.item_service = ItemService()
         self.unit_service = UnitService()
-        self.items = self.item_service.get_all_items()
-        self.units = self.unit_service.get_all_units()
+        self.items = self.item_service.get_item_choices()
+        self.units = self.unit_service.get_unit_choices()
+        self.items_by_id = {i.id: i for i in self.items}
+        self.items_by_label = {f"{i.name} ({i.sku})": i for i in self.items}
 
     def createEditor(self, parent, option, index):
         col = index.column()
@@ -72,7 +74,7 @@ class InvoiceLineDelegate(QStyledItemDelegate):
         if isinstance(editor, QLineEdit):
             if col == 0:  # item_id
                 if value:
-                    item = next((i for i in self.items if i.id == value), None)
+                    item = self.items_by_id.get(value)
                     if item:
                         editor.setText(f"{item.name} ({item.sku})")
                     else:
@@ -102,19 +104,13 @@ class InvoiceLineDelegate(QStyledItemDelegate):
                 # ✅ پیشنهاد خودکار قیمت واحد بر اساس آخرین قیمت خرید/فروش
                 row = index.row()
                 # پیدا کردن item_id از متن وارد شده
-                selected_item = None
-                for item in self.items:
-                    if f"{item.name} ({item.sku})" == text:
-                        selected_item = item
-                        break
+                selected_item = self.items_by_label.get(text)
                 
                 if selected_item:
                     # دسترسی به parent (InvoiceDialog) برای دریافت نوع فاکتور
                     parent_dialog = self.parent()
                     if hasattr(parent_dialog, 'type_combo'):
                         invoice_type_text = parent_dialog.type_combo.currentText()
-                        from app.services.item_service import ItemService
-                        item_service = ItemService()
                         
                         if invoice_type_text == "خرید":
                             unit_price = selected_item.last_purchase_price or 0
@@ -3,6 +3,7 @@ from PySide6.QtCore import QAbstractTableModel, Qt, QModelIndex
 from app.services.item_service import ItemService
 from app.services.unit_service import UnitService
 from app.utils.price_calculator import calculate_line_total
+from app.utils.query_counter import no_queries
 
 class InvoiceLineTableModel(QAbstractTableModel):
     def __init__(self, lines_data):
@@ -10,8 +11,12 @@ class InvoiceLineTableModel(QAbstractTableModel):
         self.lines_data = lines_data
         self.item_service = ItemService()
         self.unit_service = UnitService()
-        self.items = self.item_service.get_all_items()
-        self.units = self.unit_service.get_all_units()
+        # ردیف‌های سبک + دیکشنری بر اساس id — data() نه به دیتابیس دست می‌زند نه کل لیست را می‌پیماید
+        self.items = self.item_service.get_item_choices()
+        self.units = self.unit_service.get_unit_choices()
+        self.items_by_id = {i.id: i for i in self.items}
+        self.units_by_id = {u.id: u for u in self.units}
+        self.items_by_label = {f"{i.name} ({i.sku})": i for i in self.items}
         self.headers = ["کالا", "تعداد", "واحد", "قیمت واحد", "مبلغ کل", "تخفیف", "مالیات", "یادداشت"]
 
     def rowCount(self, parent=None):
@@ -20,6 +25,7 @@ class InvoiceLineTableModel(QAbstractTableModel):
     def columnCount(self, parent=None):
         return len(self.headers)
 
+    @no_queries
     def data(self, index, role=Qt.DisplayRole):
         if not index.isValid():
             return None
@@ -31,7 +37,7 @@ class InvoiceLineTableModel(QAbstractTableModel):
             if col == 0:
                 item_id = line.get('item_id')
                 if item_id:
-                    item = next((i for i in self.items if i.id == item_id), None)
+                    item = self.items_by_id.get(item_id)
                     return item.name if item else ""
                 return ""
             elif col == 1:
@@ -39,7 +45,7 @@ class InvoiceLineTableModel(QAbstractTableModel):
             elif col == 2:
                 unit_id = line.get('unit_id')
                 if unit_id:
-                    unit = next((u for u in self.units if u.id == unit_id), None)
+                    unit = self.units_by_id.get(unit_id)
                     return unit.name if unit else ""
                 return ""
             elif col == 3:
@@ -71,19 +77,15 @@ class InvoiceLineTableModel(QAbstractTableModel):
                     item = self.items[value]
                     self.lines_data[row]['item_id'] = item.id
                     # ✅ واحد پایه کالا به صورت خودکار تنظیم می‌شود
-                    unit = next((u for u in self.units if u.id == item.base_unit_id), None)
+                    unit = self.units_by_id.get(item.base_unit_id)
                     if unit:
                         self.lines_data[row]['unit_id'] = unit.id
                     self.recalculate_line_total(row)
                 elif isinstance(value, str):  # از طریق جستجو
-                    selected_item = None
-                    for item in self.items:
-                        if f"{item.name} ({item.sku})" == value:
-                            selected_item = item
-                            break
+                    selected_item = self.items_by_label.get(value)
                     if selected_item:
                         self.lines_data[row]['item_id'] = selected_item.id
-                        unit = next((u for u in self.units if u.id == selected_item.base_unit_id), None)
+                        unit = self.units_by_id.get(selected_item.base_unit_id)
                         if unit:
                             self.lines_data[row]['unit_id'] = unit.id
                         self.recalculate_line_total(row)
@@ -133,7 +135,7 @@ class InvoiceLineTableModel(QAbstractTableModel):
             line['line_total'] = 0
             return
 
-        item = next((i for i in self.items if i.id == item_id), None)
+        item = self.items_by_id.get(item_id)
         if not item:
             line['line_total'] = 0
             return
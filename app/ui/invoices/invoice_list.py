@@ -1,42 +1,25 @@
 # app/ui/invoices/invoice_list.py
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QTableView, QLineEdit, QLabel, QMessageBox, QDialog, QHeaderView)
-from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtCore import Qt, QThreadPool
 from app.services.invoice_service import InvoiceService
-from PySide6.QtCore import QSortFilterProxyModel
+from app.ui.workers import service_call
+from app.ui.paged_table_model import PagedTableModel
 
-# جایگزین کلاس InvoiceTableModel
-class InvoiceTableModel(QAbstractTableModel):
-    def __init__(self, invoices_with_party):
-        super().__init__()
-        self.invoices = invoices_with_party  # لیست tupleهای (Invoice, party_name)
-        self.headers = ["سریال", "نوع", "طرف حساب", "تاریخ", "جمع کل", "وضعیت"]
-
-    def rowCount(self, parent=QModelIndex()):
-        return len(self.invoices)
-
-    def columnCount(self, parent=QModelIndex()):
-        return len(self.headers)
-
-    def data(self, index, role=Qt.DisplayRole):
-        if not index.isValid():
-            return None
-        invoice, party_name = self.invoices[index.row()]  # ✅ تغییر اینجا
-        col = index.column()
-        if role == Qt.DisplayRole:
-            if col == 0: return invoice.serial_full
-            elif col == 1:
-                type_map = {"purchase": "خرید", "sale": "فروش", "purchase_return": "مرجوعی خرید", "sale_return": "مرجوعی فروش"}
-                return type_map.get(invoice.invoice_type, invoice.invoice_type)
-            elif col == 2: return party_name or "-"  # ✅ نمایش نام طرف‌حساب
-            elif col == 3: return invoice.date_jalali or "—"  # ✅ تاریخ شمسی
-            elif col == 4: return f"{invoice.total:,.0f}"
-            elif col == 5: return invoice.status
-        return None
+class InvoiceTableModel(PagedTableModel):
+    headers = ["سریال", "نوع", "طرف حساب", "تاریخ", "جمع کل", "وضعیت"]
+    sort_keys = ["serial_full", "invoice_type", "party", "date", "total", "status"]
 
-    def headerData(self, section, orientation, role=Qt.DisplayRole):
-        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
-            return self.headers[section]
+    def display(self, row, col):
+        _, serial_full, invoice_type, party_name, date_jalali, total, status = row
+        if col == 0: return serial_full
+        elif col == 1:
+            type_map = {"purchase": "خرید", "sale": "فروش", "purchase_return": "مرجوعی خرید", "sale_return": "مرجوعی فروش"}
+            return type_map.get(invoice_type, invoice_type)
+        elif col == 2: return party_name or "-"
+        elif col == 3: return date_jalali or "—"
+        elif col == 4: return f"{total:,.0f}"
+        elif col == 5: return status
         return None
 
 class InvoiceListView(QWidget):
@@ -70,9 +53,7 @@ class InvoiceListView(QWidget):
         self.table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
         self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         
-        # 2. استفاده از Proxy Model برای سورت پیشرفته
-        self.proxy_model = QSortFilterProxyModel()
-        self.proxy_model.setSortCaseSensitivity(Qt.CaseInsensitive)
+        # 2. مرتب‌سازی سمت سرور — با کلیک روی سرستون‌ها (PagedTableModel.sort)
         
         # 3. اندازه ستون ها اتوماتیک اضافه شود
         #self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
@@ -85,6 +66,11 @@ class InvoiceListView(QWidget):
         self.table.verticalHeader().setVisible(True)  # مخفی کردن شماره سطرها
         self.table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
         layout.addWidget(self.table)
+
+        # وضعیت بارگذاری پس‌زمینه
+        self.loading_label = QLabel("⏳ در حال بارگذاری...")
+        self.loading_label.setVisible(False)
+        layout.addWidget(self.loading_label)
         
 
         # Buttons
@@ -104,49 +90,24 @@ class InvoiceListView(QWidget):
 
     def load_data(self):
         try:
-            # دریافت داده‌ها از سرویس
-            self.invoices = self.service.get_all_invoices_with_parties()
-            
-            # ایجاد مدل و تنظیم آن روی جدول
-            self.model = InvoiceTableModel(self.invoices)
-            
-            # استفاده از Proxy Model برای سورت پیشرفته (اختیاری)
-            self.proxy_model = QSortFilterProxyModel()
-            self.proxy_model.setSourceModel(self.model)
-            self.proxy_model.setSortCaseSensitivity(Qt.CaseInsensitive)
-            
-            # تنظیم مدل روی جدول
-            self.table.setModel(self.proxy_model)
-            
-            # فعال کردن قابلیت سورت
-            self.table.setSortingEnabled(True)
-            
-            # اطمینان از نمایش داده‌ها
-            self.table.viewport().update()
+            if self.table.model() is None:
+                # جدیدترین فاکتورها در ابتدا — صفحه به صفحه هنگام اسکرول
+                self.model = InvoiceTableModel(service_call(InvoiceService, "get_invoices_page"), sort="date",
+                                               descending=True, thread_pool=QThreadPool.globalInstance())
+                self.table.setModel(self.model)
+                self.model.loadingChanged.connect(self.loading_label.setVisible)
+                self.model.loadFailed.connect(
+                    lambda message: QMessageBox.critical(self, "خطا", f"خطا در بارگذاری داده‌ها:\n{message}"))
+                self.table.horizontalHeader().setSortIndicator(3, Qt.DescendingOrder)
+                self.table.setSortingEnabled(True)
+            self.model.refresh()
             
         except Exception as e:
             QMessageBox.critical(self, "خطا در بارگذاری داده‌ها", 
                                f"خطا در دریافت اطلاعات فاکتورها:\n{str(e)}")
 
     def filter_data(self):
-        text = self.search_input.text().lower()
-        if not text:
-            self.model.invoices = self.invoices
-            self.model.layoutChanged.emit()
-            return
-        
-        # ✅ inv یک tuple است: (Invoice, party_name)
-        # ✅ پس باید از inv[0] برای دسترسی به فیلدهای Invoice استفاده کرد
-        filtered = []
-        for inv in self.invoices:
-            try:
-                if text in inv[0].serial_full.lower():
-                    filtered.append(inv)
-            except Exception:
-                continue  # برای جلوگیری از خطا در صورت وجود داده نامعتبر
-        
-        self.model.invoices = filtered
-        self.model.layoutChanged.emit()
+        self.model.set_search(self.search_input.text())
         
     def add_invoice(self):
         from app.ui.invoices.invoice_dialog import InvoiceDialog
@@ -194,8 +155,7 @@ class InvoiceListView(QWidget):
             QMessageBox.warning(self, "هشدار", "لطفاً یک فاکتور را انتخاب کنید.")
             return
         
-        row = selected[0].row()
-        invoice, party_name = self.model.invoices[row]
+        invoice = self.service.get_invoice_by_id(self.model.row_id(selected[0].row()))
         
         dialog = InvoiceDialog(self, invoice)
         
@@ -205,8 +165,8 @@ class InvoiceListView(QWidget):
                 data = dialog.get_data()
                 lines_data = dialog.table_model.lines_data
                 try:
-                    self.service.update_invoice(invoice.id, data, lines_data)
-                    QMessageBox.information(self, "موفقیت", "فاکتور با موفقیت ویرایش شد.")
+                    summary = self.service.update_invoice(invoice.id, data, lines_data)
+                    QMessageBox.information(self, "موفقیت", f"فاکتور با موفقیت ویرایش شد.\n{summary}")
                     self.load_data()
                     break  # خروج از حلقه در صورت موفقیت
                 except Exception as e:
@@ -237,11 +197,10 @@ class InvoiceListView(QWidget):
         if not selected:
             QMessageBox.warning(self, "هشدار", "لطفاً یک فاکتور را انتخاب کنید.")
             return
-        row = selected[0].row()
-        invoice, party_name = self.model.invoices[row]  # ✅ tuple است
-        if QMessageBox.question(self, "تأیید حذف", f"آیا از حذف فاکتور «{invoice.serial_full}» اطمینان دارید؟", QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
+        invoice_id, serial_full = self.model.rows[selected[0].row()][:2]
+        if QMessageBox.question(self, "تأیید حذف", f"آیا از حذف فاکتور «{serial_full}» اطمینان دارید؟", QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
             try:
-                self.service.delete_invoice(invoice.id)
+                self.service.delete_invoice(invoice_id)
                 QMessageBox.information(self, "موفق", "فاکتور حذف شد.")
                 self.load_data()
             except Exception as e:
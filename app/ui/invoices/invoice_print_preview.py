@@ -2,7 +2,6 @@
 from PySide6.QtWebEngineWidgets import QWebEngineView
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QPushButton
 from app.utils.template_engine import render_invoice_template
-from jinja2 import TemplateNotFound
 
 class InvoicePrintPreview(QDialog):
     def __init__(self, parent=None, invoice_data=None):
@@ -1,49 +1,23 @@
 # app/ui/items/item_list.py
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QTableView, QLineEdit, QLabel, QMessageBox)
-from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtCore import Qt, QThreadPool
 from app.services.item_service import ItemService
+from app.ui.workers import service_call
+from app.ui.paged_table_model import PagedTableModel
 from app.ui.items.item_dialog import ItemDialog
 
-class ItemTableModel(QAbstractTableModel):
-    def __init__(self, items):
-        super().__init__()
-        self.items = items
-        self.headers = ["کد کالا", "نام", "نوع", "واحد", "فعال"]
-
-    def rowCount(self, parent=QModelIndex()):
-        return len(self.items)
-
-    def columnCount(self, parent=QModelIndex()):
-        return len(self.headers)
-
-    def data(self, index, role=Qt.DisplayRole):
-        if not index.isValid():
-            return None
-        item = self.items[index.row()]
-        col = index.column()
-        if role == Qt.DisplayRole:
-            if col == 0: return item.sku
-            elif col == 1: return item.name
-            elif col == 2: return "تعدادی" if item.unit_type == "count" else "اندازه‌ای"
-            elif col == 3:
-                if hasattr(item, 'unit') and item.unit:
-                    return item.unit.name
-                else:
-                    # بارگذاری واحد از دیتابیس
-                    from app.services.unit_service import UnitService
-                    unit_service = UnitService()
-                    unit = unit_service.get_unit_by_id(item.base_unit_id)
-                    if unit:
-                        item.unit = unit  # ذخیره برای نمایش بعدی
-                        return unit.name
-                    return "نامشخص"
-            elif col == 4: return "✅" if item.active else "❌"
-        return None
-
-    def headerData(self, section, orientation, role=Qt.DisplayRole):
-        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
-            return self.headers[section]
+class ItemTableModel(PagedTableModel):
+    headers = ["کد کالا", "نام", "نوع", "واحد", "فعال"]
+    sort_keys = ["sku", "name", "unit_type", "unit", "active"]
+
+    def display(self, row, col):
+        _, sku, name, unit_type, unit_name, active = row
+        if col == 0: return sku
+        elif col == 1: return name
+        elif col == 2: return "تعدادی" if unit_type == "count" else "اندازه‌ای"
+        elif col == 3: return unit_name or "نامشخص"
+        elif col == 4: return "✅" if active else "❌"
         return None
 
 class ItemListView(QWidget):
@@ -70,6 +44,11 @@ class ItemListView(QWidget):
         self.table.setEditTriggers(QTableView.NoEditTriggers)
         layout.addWidget(self.table)
 
+        # وضعیت بارگذاری پس‌زمینه
+        self.loading_label = QLabel("⏳ در حال بارگذاری...")
+        self.loading_label.setVisible(False)
+        layout.addWidget(self.loading_label)
+
         # Buttons
         btn_layout = QHBoxLayout()
         self.add_btn = QPushButton("➕ افزودن")
@@ -86,19 +65,24 @@ class ItemListView(QWidget):
         self.setLayout(layout)
 
     def load_data(self):
-        self.items = self.service.get_all_items()
-        self.model = ItemTableModel(self.items)
-        self.table.setModel(self.model)
-        self.table.resizeColumnsToContents()
+        if self.table.model() is None:
+            self.model = ItemTableModel(service_call(ItemService, "get_items_page"), sort="sku",
+                                        thread_pool=QThreadPool.globalInstance())
+            self.table.setModel(self.model)
+            self.model.loadingChanged.connect(self.on_loading_changed)
+            self.model.loadFailed.connect(
+                lambda message: QMessageBox.critical(self, "خطا", f"خطا در بارگذاری داده‌ها:\n{message}"))
+            self.table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
+            self.table.setSortingEnabled(True)
+        self.model.refresh()
+
+    def on_loading_changed(self, loading):
+        self.loading_label.setVisible(loading)
+        if not loading:
+            self.table.resizeColumnsToContents()
 
     def filter_data(self):
-        text = self.search_input.text().lower()
-        filtered = [i for i in self.items if
-                    text in i.sku.lower() or
-                    text in i.name.lower() or
-                    (i.barcode and text in i.barcode.lower())]
-        self.model.items = filtered
-        self.model.layoutChanged.emit()
+        self.model.set_search(self.search_input.text())
 
     def add_item(self):
         dialog = ItemDialog(self)
@@ -116,8 +100,7 @@ class ItemListView(QWidget):
         if not selected:
             QMessageBox.warning(self, "هشدار", "لطفاً یک رکورد را انتخاب کنید.")
             return
-        row = selected[0].row()
-        item = self.model.items[row]
+        item = self.service.get_item_by_id(self.model.row_id(selected[0].row()))
         dialog = ItemDialog(self, item)
         if dialog.exec():
             data = dialog.get_data()
@@ -133,13 +116,12 @@ class ItemListView(QWidget):
         if not selected:
             QMessageBox.warning(self, "هشدار", "لطفاً یک رکورد را انتخاب کنید.")
             return
-        row = selected[0].row()
-        item = self.model.items[row]
+        item_id, _, name = self.model.rows[selected[0].row()][:3]
         if QMessageBox.question(self, "تأیید حذف",
-                                f"آیا از حذف کالا «{item.name}» اطمینان دارید؟",
+                                f"آیا از حذف کالا «{name}» اطمینان دارید؟",
                                 QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
             try:
-                self.service.delete_item(item.id)
+                self.service.delete_item(item_id)
                 QMessageBox.information(self, "موفق", "کالا حذف شد.")
                 self.load_data()
             except Exception as e:
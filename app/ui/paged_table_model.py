@@ -0,0 +1,143 @@
+# app/ui/paged_table_model.py
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+from app.utils.pagination import PAGE_SIZE
+from app.utils.query_counter import no_queries
+from app.ui.workers import Worker
+
+
+class PagedTableModel(QAbstractTableModel):
+    """مدل جدول صفحه‌بندی‌شده — ردیف‌ها (tuple) صفحه به صفحه با fetchMore از سرویس خوانده می‌شوند
+
+    fetch_page: متد صفحه سرویس — fetch_page(after, limit, sort, descending, search) -> (rows, cursor)
+    زیرکلاس‌ها headers، sort_keys (کلید مرتب‌سازی سرویس برای هر ستون یا None) و display را تعریف می‌کنند.
+    ستون اول هر ردیف id رکورد است.
+
+    با thread_pool، صفحه‌ها در پس‌زمینه خوانده می‌شوند (fetch_page باید سرویس را در همان نخ
+    بسازد — workers.service_call)؛ با تغییر مرتب‌سازی یا فیلتر، بارگذاری قبلی لغو می‌شود.
+    """
+    headers = []
+    sort_keys = []
+
+    loadingChanged = Signal(bool)
+    loadFailed = Signal(str)
+
+    def __init__(self, fetch_page, sort=None, descending=False, page_size=PAGE_SIZE, thread_pool=None):
+        super().__init__()
+        self.fetch_page = fetch_page
+        self.sort_key = sort
+        self.descending = descending
+        self.search = None
+        self.page_size = page_size
+        self.thread_pool = thread_pool
+        self.rows = []
+        self._cursor = None
+        self._has_more = True
+        self._generation = 0   # با هر refresh زیاد می‌شود — نتایج نسل‌های قبلی دور ریخته می‌شوند
+        self._pending = None   # Worker صفحه در حال بارگذاری
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    @no_queries
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self.display(self.rows[index.row()], index.column())
+
+    def display(self, row, column):
+        """متن نمایشی یک خانه — فقط از روی tuple ردیف، بدون دسترسی به دیتابیس"""
+        raise NotImplementedError
+
+    # --- بارگذاری تدریجی ---
+    @property
+    def loading(self):
+        return self._pending is not None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more and self._pending is None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        kwargs = dict(
+            after=self._cursor, limit=self.page_size,
+            sort=self.sort_key, descending=self.descending, search=self.search,
+        )
+        if self.thread_pool is None:
+            self._append_page(self.fetch_page(**kwargs))
+            return
+
+        worker = Worker(self.fetch_page, tag=self._generation, **kwargs)
+        worker.signals.finished.connect(self._on_page_loaded)
+        worker.signals.failed.connect(self._on_page_failed)
+        self._pending = worker
+        self.loadingChanged.emit(True)
+        worker.start(self.thread_pool)
+
+    def _append_page(self, page):
+        rows, cursor = page
+        self._cursor = cursor
+        self._has_more = cursor is not None
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+
+    def _on_page_loaded(self, generation, page):
+        if generation != self._generation:
+            return  # نتیجه یک بارگذاری لغوشده
+        self._pending = None
+        self._append_page(page)
+        self.loadingChanged.emit(False)
+
+    def _on_page_failed(self, generation, message):
+        if generation != self._generation:
+            return
+        self._pending = None
+        self._has_more = False
+        self.loadingChanged.emit(False)
+        self.loadFailed.emit(message)
+
+    def cancel_loading(self):
+        """لغو بارگذاری در جریان — نتیجه‌اش (اگر برسد) نادیده گرفته می‌شود"""
+        self._generation += 1
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+            self.loadingChanged.emit(False)
+
+    def refresh(self):
+        """بارگذاری مجدد از صفحه اول — با همان مرتب‌سازی و فیلتر"""
+        self.cancel_loading()
+        self.beginResetModel()
+        self.rows = []
+        self._cursor = None
+        self._has_more = True
+        self.endResetModel()
+        self.fetchMore()
+
+    # --- مرتب‌سازی و فیلتر سمت سرور ---
+    def sort(self, column, order=Qt.AscendingOrder):
+        key = self.sort_keys[column] if column < len(self.sort_keys) else None
+        if key is None:
+            return
+        descending = order == Qt.DescendingOrder
+        if key == self.sort_key and descending == self.descending:
+            return
+        self.sort_key, self.descending = key, descending
+        self.refresh()
+
+    def set_search(self, text):
+        self.search = text.strip() or None
+        self.refresh()
+
+    def row_id(self, row):
+        return self.rows[row][0]
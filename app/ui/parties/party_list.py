@@ -1,42 +1,27 @@
 # app/ui/parties/party_list.py
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QTableView, QLineEdit, QLabel, QMessageBox)
-from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtCore import Qt, QThreadPool
 from app.services.party_service import PartyService
+from app.ui.workers import service_call
+from app.ui.paged_table_model import PagedTableModel
 from app.ui.parties.party_dialog import PartyDialog
 
-class PartyTableModel(QAbstractTableModel):
-    def __init__(self, parties):
-        super().__init__()
-        self.parties = parties
-        self.headers = ["کد", "نام", "نوع", "تلفن", "اعتبار", "فعال"]
-
-    def rowCount(self, parent=QModelIndex()):
-        return len(self.parties)
-
-    def columnCount(self, parent=QModelIndex()):
-        return len(self.headers)
-
-    def data(self, index, role=Qt.DisplayRole):
-        if not index.isValid():
-            return None
-        party = self.parties[index.row()]
-        col = index.column()
-        if role == Qt.DisplayRole:
-            if col == 0: return party.code
-            elif col == 1: return party.name
-            elif col == 2:
-                type_map = {"customer": "مشتری", "supplier": "تأمین‌کننده", "both": "هر دو"}
-                return type_map.get(party.party_type, party.party_type)
-            elif col == 3: return party.phone or "-"
-            elif col == 4:
-                return f"{party.credit_limit:,.2f}" if party.credit_limit else "-"
-            elif col == 5: return "✅" if party.is_active else "❌"
-        return None
-
-    def headerData(self, section, orientation, role=Qt.DisplayRole):
-        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
-            return self.headers[section]
+class PartyTableModel(PagedTableModel):
+    headers = ["کد", "نام", "نوع", "تلفن", "اعتبار", "فعال"]
+    sort_keys = ["code", "name", "party_type", "phone", "credit_limit", "is_active"]
+
+    def display(self, row, col):
+        _, code, name, party_type, phone, credit_limit, is_active = row
+        if col == 0: return code
+        elif col == 1: return name
+        elif col == 2:
+            type_map = {"customer": "مشتری", "supplier": "تأمین‌کننده", "both": "هر دو"}
+            return type_map.get(party_type, party_type)
+        elif col == 3: return phone or "-"
+        elif col == 4:
+            return f"{credit_limit:,.2f}" if credit_limit else "-"
+        elif col == 5: return "✅" if is_active else "❌"
         return None
 
 class PartyListView(QWidget):
@@ -63,6 +48,11 @@ class PartyListView(QWidget):
         self.table.setEditTriggers(QTableView.NoEditTriggers)
         layout.addWidget(self.table)
 
+        # وضعیت بارگذاری پس‌زمینه
+        self.loading_label = QLabel("⏳ در حال بارگذاری...")
+        self.loading_label.setVisible(False)
+        layout.addWidget(self.loading_label)
+
         # Buttons
         btn_layout = QHBoxLayout()
         self.add_btn = QPushButton("➕ افزودن")
@@ -79,19 +69,24 @@ class PartyListView(QWidget):
         self.setLayout(layout)
 
     def load_data(self):
-        self.parties = self.service.get_all_parties()
-        self.model = PartyTableModel(self.parties)
-        self.table.setModel(self.model)
-        self.table.resizeColumnsToContents()
+        if self.table.model() is None:
+            self.model = PartyTableModel(service_call(PartyService, "get_parties_page"), sort="code",
+                                         thread_pool=QThreadPool.globalInstance())
+            self.table.setModel(self.model)
+            self.model.loadingChanged.connect(self.on_loading_changed)
+            self.model.loadFailed.connect(
+                lambda message: QMessageBox.critical(self, "خطا", f"خطا در بارگذاری داده‌ها:\n{message}"))
+            self.table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
+            self.table.setSortingEnabled(True)
+        self.model.refresh()
+
+    def on_loading_changed(self, loading):
+        self.loading_label.setVisible(loading)
+        if not loading:
+            self.table.resizeColumnsToContents()
 
     def filter_data(self):
-        text = self.search_input.text().lower()
-        filtered = [p for p in self.parties if
-                    text in p.code.lower() or
-                    text in p.name.lower() or
-                    (p.phone and text in p.phone.lower())]
-        self.model.parties = filtered
-        self.model.layoutChanged.emit()
+        self.model.set_search(self.search_input.text())
 
     def add_party(self):
         dialog = PartyDialog(self)
@@ -109,8 +104,7 @@ class PartyListView(QWidget):
         if not selected:
             QMessageBox.warning(self, "هشدار", "لطفاً یک رکورد را انتخاب کنید.")
             return
-        row = selected[0].row()
-        party = self.model.parties[row]
+        party = self.service.get_party_by_id(self.model.row_id(selected[0].row()))
         dialog = PartyDialog(self, party)
         if dialog.exec():
             data = dialog.get_data()
@@ -126,13 +120,12 @@ class PartyListView(QWidget):
         if not selected:
             QMessageBox.warning(self, "هشدار", "لطفاً یک رکورد را انتخاب کنید.")
             return
-        row = selected[0].row()
-        party = self.model.parties[row]
+        party_id, _, name = self.model.rows[selected[0].row()][:3]
         if QMessageBox.question(self, "تأیید حذف",
-                                f"آیا از حذف طرف‌حساب «{party.name}» اطمینان دارید؟",
+                                f"آیا از حذف طرف‌حساب «{name}» اطمینان دارید؟",
                                 QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
             try:
-                self.service.delete_party(party.id)
+                self.service.delete_party(party_id)
                 QMessageBox.information(self, "موفق", "طرف‌حساب حذف شد.")
                 self.load_data()
             except Exception as e:
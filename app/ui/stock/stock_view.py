@@ -1,48 +1,29 @@
 # app/ui/stock/stock_view.py
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QTableView, QLineEdit, QLabel, QMessageBox, QHeaderView, QInputDialog)
-from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtCore import Qt, QThreadPool
 from app.services.stock_service import StockService
-from app.services.item_service import ItemService
-from app.services.unit_service import UnitService
-
-class StockTableModel(QAbstractTableModel):
-    def __init__(self, items_with_stock):
-        super().__init__()
-        self.items = items_with_stock
-        self.headers = ["کد کالا", "نام کالا", "واحد", "موجودی", "آخرین قیمت", "ارزش کل"]
-
-    def rowCount(self, parent=QModelIndex()):
-        return len(self.items)
-
-    def columnCount(self, parent=QModelIndex()):
-        return len(self.headers)
-
-    def data(self, index, role=Qt.DisplayRole):
-        if not index.isValid():
-            return None
-        item, stock, last_cost = self.items[index.row()]
-        col = index.column()
-        if role == Qt.DisplayRole:
-            if col == 0: return item.sku
-            elif col == 1: return item.name
-            elif col == 2: return item.unit.name if hasattr(item, 'unit') else "نامشخص"  # ✅ واحد واقعی!
-            elif col == 3: return f"{stock:.4f}"
-            elif col == 4: return f"{last_cost:,.0f}" if last_cost else "-"
-            elif col == 5: return f"{int(stock * last_cost):,.0f}" if last_cost else "-"
-        return None
-
-    def headerData(self, section, orientation, role=Qt.DisplayRole):
-        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
-            return self.headers[section]
+from app.ui.workers import service_call
+from app.ui.paged_table_model import PagedTableModel
+
+class StockTableModel(PagedTableModel):
+    headers = ["کد کالا", "نام کالا", "واحد", "موجودی", "آخرین قیمت", "ارزش کل"]
+    sort_keys = ["sku", "name", "unit", "qty", None, None]
+
+    def display(self, row, col):
+        _, sku, name, unit_name, _, stock, last_cost = row
+        if col == 0: return sku
+        elif col == 1: return name
+        elif col == 2: return unit_name or "نامشخص"
+        elif col == 3: return f"{stock:.4f}"
+        elif col == 4: return f"{last_cost:,.0f}" if last_cost else "-"
+        elif col == 5: return f"{int(stock * last_cost):,.0f}" if last_cost else "-"
         return None
 
 class StockView(QWidget):
     def __init__(self):
         super().__init__()
         self.stock_service = StockService()
-        self.item_service = ItemService()
-        self.unit_service = UnitService()
         self.setup_ui()
         self.load_data()
 
@@ -69,6 +50,11 @@ class StockView(QWidget):
         self.table.setEditTriggers(QTableView.NoEditTriggers)
         layout.addWidget(self.table)
 
+        # وضعیت بارگذاری پس‌زمینه
+        self.loading_label = QLabel("⏳ در حال بارگذاری...")
+        self.loading_label.setVisible(False)
+        layout.addWidget(self.loading_label)
+
         # Buttons
         btn_layout = QHBoxLayout()
         self.adjust_btn = QPushButton("⚖️ تعدیل موجودی")
@@ -83,54 +69,32 @@ class StockView(QWidget):
         self.setLayout(layout)
 
     def load_data(self):
-        # بارگذاری کالاها + موجودی + آخرین قیمت
-        all_items = self.item_service.get_all_items()
-        items_with_stock = []
-
-        for item in all_items:
-            # ✅ بارگذاری واحد مرتبط — JOIN معادل
-            unit = self.unit_service.get_unit_by_id(item.base_unit_id)
-            item.unit = unit  # attach for display
-
-            stock = self.stock_service.get_current_stock(item.id)
-            
-            # آخرین قیمت — آخرین تحرک ورودی
-            last_movement = self.stock_service.get_movements_by_item(item.id)
-            last_cost = None
-            if last_movement:
-                # آخرین تحرک ورودی را پیدا کن
-                for m in reversed(last_movement):
-                    if m.qty > 0:  # ورودی
-                        last_cost = m.cost_per_unit
-                        break
-
-            items_with_stock.append((item, stock, last_cost))
-
-        self.items = items_with_stock
-        self.model = StockTableModel(self.items)
-        self.table.setModel(self.model)
-        
-        # تنظیم عرض ستون‌ها
-        header = self.table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeToContents)
-        header.setSectionResizeMode(1, QHeaderView.Stretch)  # نام کالا
+        # کالاها + واحد + موجودی + آخرین قیمت — یک کوئری برای هر صفحه
+        if self.table.model() is None:
+            self.model = StockTableModel(service_call(StockService, "get_stock_page"), sort="sku",
+                                         thread_pool=QThreadPool.globalInstance())
+            self.table.setModel(self.model)
+            self.model.loadingChanged.connect(self.loading_label.setVisible)
+            self.model.loadFailed.connect(
+                lambda message: QMessageBox.critical(self, "خطا", f"خطا در بارگذاری داده‌ها:\n{message}"))
+            self.table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
+            self.table.setSortingEnabled(True)
+
+            # تنظیم عرض ستون‌ها
+            header = self.table.horizontalHeader()
+            header.setSectionResizeMode(QHeaderView.ResizeToContents)
+            header.setSectionResizeMode(1, QHeaderView.Stretch)  # نام کالا
+        self.model.refresh()
 
     def filter_data(self):
-        text = self.search_input.text().lower()
-        filtered = [
-            (item, stock, cost) for item, stock, cost in self.items
-            if text in item.sku.lower() or text in item.name.lower()
-        ]
-        self.model.items = filtered
-        self.model.layoutChanged.emit()
+        self.model.set_search(self.search_input.text())
 
     def adjust_stock(self):
         selected = self.table.selectionModel().selectedRows()
         if not selected:
             QMessageBox.warning(self, "هشدار", "لطفاً یک کالا را انتخاب کنید.")
             return
-        row = selected[0].row()
-        item, current_stock, last_cost = self.items[row]
+        item_id, _, _, _, unit_id, current_stock, last_cost = self.model.rows[selected[0].row()]
         
         # تبدیل current_stock به float
         current_stock_float = float(current_stock)
@@ -154,16 +118,13 @@ class StockView(QWidget):
             QMessageBox.information(self, "اطلاع", "تغییری اعمال نشد.")
             return
         
-        # دریافت واحد و قیمت
-        unit_id = item.base_unit_id
+        # قیمت تعدیل — آخرین قیمت خرید
         cost_per_unit = float(last_cost) if last_cost else 0.0  # تبدیل به float
         
         try:
             # ✅ ایجاد تحرک تعدیل
-            from app.services.stock_service import StockService
-            stock_service = StockService()
             movement_data = {
-                "item_id": item.id,
+                "item_id": item_id,
                 "qty": adjustment_qty,
                 "unit_id": unit_id,
                 "movement_type": "adjustment",
@@ -171,7 +132,7 @@ class StockView(QWidget):
                 "reference_id": None,
                 "cost_per_unit": cost_per_unit,
             }
-            stock_service.add_movement(movement_data)
+            self.stock_service.add_movement(movement_data)
             QMessageBox.information(self, "موفق", "موجودی با موفقیت تعدیل شد.")
             self.load_data()
         except Exception as e:
@@ -0,0 +1,83 @@
+# app/ui/workers.py
+"""اجرای کارهای دیتابیسی در پس‌زمینه — QThreadPool + QRunnable
+
+سرویس‌ها برای هر متد یک unit_of_work کوتاه‌عمر باز می‌کنند، پس Session بین نخ‌ها مشترک نمی‌شود؛
+service_call سرویس را داخل نخ اجراکننده می‌سازد و SessionLocal (اگر کاری از آن استفاده کرده باشد)
+در پایان کار آزاد می‌شود.
+"""
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from app.database import SessionLocal
+
+# کارهای در صف یا در حال اجرا — تا پایان کار، شیء پایتونی آن‌ها زنده می‌ماند
+_active_workers = set()
+
+
+class WorkerSignals(QObject):
+    finished = Signal(object, object)  # (tag, result)
+    failed = Signal(object, str)       # (tag, message)
+    progress = Signal(object, object)  # (tag, (مرحله، انجام‌شده، کل))
+
+
+class Worker(QRunnable):
+    """اجرای fn در یک نخ از QThreadPool — نتیجه از طریق سیگنال به نخ رابط کاربری می‌رسد"""
+
+    def __init__(self, fn, *args, tag=None, **kwargs):
+        super().__init__()
+        self.setAutoDelete(False)  # مالکیت با پایتون — برای لغو و tryTake
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.tag = tag
+        self.cancelled = False
+        self.signals = WorkerSignals()
+
+    def start(self, pool: QThreadPool = None):
+        self.pool = pool or QThreadPool.globalInstance()
+        _active_workers.add(self)
+        self.pool.start(self)
+        return self
+
+    def cancel(self):
+        """لغو — اگر هنوز شروع نشده از صف حذف می‌شود، وگرنه نتیجه‌اش ارسال نمی‌شود"""
+        self.cancelled = True
+        pool = getattr(self, "pool", None)
+        if pool is not None and pool.tryTake(self):
+            _active_workers.discard(self)
+
+    def run(self):
+        try:
+            if self.cancelled:
+                return
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.failed.emit(self.tag, str(e))
+        else:
+            if not self.cancelled:
+                self.signals.finished.emit(self.tag, result)
+        finally:
+            SessionLocal.remove()
+            _active_workers.discard(self)
+
+
+def service_call(service_cls, method: str):
+    """تابعی که سرویس را در نخ اجراکننده می‌سازد و متد آن را صدا می‌زند"""
+    def call(*args, **kwargs):
+        return getattr(service_cls(), method)(*args, **kwargs)
+    return call
+
+
+def run_in_background(fn, on_finished, on_failed=None, pool: QThreadPool = None, on_progress=None) -> Worker:
+    """شروع یک کار پس‌زمینه — on_finished(result) و on_failed(message) در نخ رابط کاربری اجرا می‌شوند
+
+    با on_progress، تابع fn آرگومان on_progress(*values) می‌گیرد که از نخ اجراکننده صدا زده می‌شود؛
+    مقادیر با سیگنال به نخ رابط کاربری می‌رسند و on_progress(*values) آنجا اجرا می‌شود.
+    """
+    worker = Worker(fn)
+    worker.signals.finished.connect(lambda tag, result: on_finished(result))
+    if on_failed is not None:
+        worker.signals.failed.connect(lambda tag, message: on_failed(message))
+    if on_progress is not None:
+        worker.kwargs["on_progress"] = lambda *values: worker.signals.progress.emit(worker.tag, values)
+        worker.signals.progress.connect(lambda tag, values: on_progress(*values))
+    return worker.start(pool)
@@ -0,0 +1,67 @@
+# app/utils/check_schedule.py
+"""خلاصه روزانه سررسید چک‌ها — جدول check_due_summaries
+
+هر ردیف: تعداد و جمع مبلغ چک‌های در جریان یک روز سررسید، برای یک حساب بانکی و یک جهت.
+ایجاد، ویرایش، حذف و تغییر وضعیت چک ردیف‌های مربوط را به‌صورت افزایشی به‌روز می‌کند؛
+داشبورد و سنی‌سازی به‌جای جدول checks فقط همین جدول کوچک را می‌خوانند.
+"""
+from decimal import Decimal
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from app.models.check import Check
+from app.models.check_due_summary import CheckDueSummary
+
+# وضعیت‌هایی که چک هنوز وصول/پرداخت نشده است
+PENDING_STATUSES = ("registered", "issued", "in_hand", "deposited")
+
+CDS = CheckDueSummary
+
+
+def due_key(check):
+    """(due_date, bank_account_id, direction, amount) چک در جریان — یا None"""
+    if check is None or check.status not in PENDING_STATUSES:
+        return None
+    return check.due_date, check.bank_account_id, check.direction, Decimal(str(check.amount or 0))
+
+
+def apply_due_changes(session: Session, changes) -> int:
+    """اعمال تغییرات — changes: [(کلید قبلی، کلید جدید), ...] از due_key؛ هر کدام می‌تواند None باشد"""
+    deltas = {}
+    for before, after in changes:
+        if before == after:
+            continue
+        for key, sign in ((before, -1), (after, 1)):
+            if key is None:
+                continue
+            due_date, bank_account_id, direction, amount = key
+            count, total = deltas.get((due_date, bank_account_id, direction), (0, Decimal("0")))
+            deltas[(due_date, bank_account_id, direction)] = (count + sign, total + sign * amount)
+
+    options = {"synchronize_session": False}
+    for (due_date, bank_account_id, direction), (count, total) in deltas.items():
+        if not count and not total:
+            continue
+        row = (CDS.due_date == due_date, CDS.bank_account_id == bank_account_id, CDS.direction == direction)
+        updated = session.execute(
+            update(CDS).where(*row).values(check_count=CDS.check_count + count, total_amount=CDS.total_amount + total),
+            execution_options=options,
+        ).rowcount
+        if not updated:
+            session.execute(insert(CDS).values(due_date=due_date, bank_account_id=bank_account_id,
+                                               direction=direction, check_count=count, total_amount=total))
+        elif count < 0:
+            session.execute(delete(CDS).where(*row, CDS.check_count <= 0), execution_options=options)
+    return len(deltas)
+
+
+def rebuild_due_summary(session: Session) -> int:
+    """بازسازی کامل از جدول checks — یک INSERT ... SELECT گروهی"""
+    session.execute(delete(CDS), execution_options={"synchronize_session": False})
+    totals = (
+        select(Check.due_date, Check.bank_account_id, Check.direction, func.count(), func.sum(Check.amount))
+        .where(Check.status.in_(PENDING_STATUSES))
+        .group_by(Check.due_date, Check.bank_account_id, Check.direction)
+    )
+    session.execute(insert(CDS).from_select(
+        ["due_date", "bank_account_id", "direction", "check_count", "total_amount"], totals))
+    return session.execute(select(func.count()).select_from(CDS)).scalar()
@@ -15,9 +15,7 @@ def generate_unit_code():
     unique_part = uuid.uuid4().hex[:4].upper()
     return f"{prefix}-{unique_part}"
 
-def generate_serial(prefix="INV"):
-    """تولید سریال — مثلاً: INV-2025-0001"""
-    year = datetime.now().year
-    # در عمل: آخرین شماره از دیتابیس گرفته می‌شود — اینجا ساده‌سازی شده
-    last_num = 1  # در عمل: SELECT MAX(number) FROM invoices WHERE serial LIKE 'INV-2025%'
-    return f"{prefix}-{year}-{last_num:04d}"
\ No newline at end of file
+def generate_serial(prefix="INV", for_date=None):
+    """تخصیص سریال بعدی — مثلاً: INV-1404-0001 (سال مالی شمسی تاریخ سند، از جدول document_sequences)"""
+    from app.utils.sequences import allocator
+    return allocator.next_serial(prefix, for_date)[1]
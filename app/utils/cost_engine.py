@@ -0,0 +1,242 @@
+# app/utils/cost_engine.py
+"""موتور بهای تمام‌شده دائمی — میانگین متحرک (پیش‌فرض) یا لایه‌های FIFO
+
+بهای هر تحرک خروجی در لحظه ثبت تعیین می‌شود؛ وضعیت جاری هر کالا همان
+item_stock_balance (مقدار و ارزش) و در روش FIFO، جدول stock_cost_layers است.
+"""
+import os
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import select, update, delete, insert, func
+from sqlalchemy.orm import Session
+from app.models.stock_movement import StockMovement
+from app.models.item_stock_balance import ItemStockBalance
+from app.models.stock_cost_layer import StockCostLayer
+
+MOVING_AVERAGE = "moving_average"
+FIFO = "fifo"
+
+COSTING_METHOD = os.getenv("COSTING_METHOD", MOVING_AVERAGE)
+
+# ورودی‌هایی که با بهای میانگین فعلی ثبت می‌شوند — نه قیمت روی سند
+AVERAGE_COST_INBOUND_TYPES = {"return_in"}
+
+
+def _d(value) -> Decimal:
+    return Decimal(str(value or 0))
+
+
+def _round(value: Decimal) -> Decimal:
+    return value.quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+
+
+class CostState:
+    """وضعیت بهای یک کالا در حین پردازش تحرکات"""
+
+    def __init__(self, qty=0, value=0, layers=None, last_created_at=None, has_balance=False):
+        self.qty = _d(qty)
+        self.value = _d(value)
+        self.layers = layers if layers is not None else []  # [movement, qty_remaining, unit_cost, received_at]
+        self.last_created_at = last_created_at
+        self.has_balance = has_balance  # ردیف item_stock_balance دارد
+        self.layers_changed = False
+
+    def average(self):
+        return self.value / self.qty if self.qty > 0 else None
+
+    def receive(self, movement, qty: Decimal, total: Decimal, received_at):
+        self.qty += qty
+        self.value += total
+        if COSTING_METHOD == FIFO:
+            self.layers.append([movement, qty, total / qty, received_at])
+            self.layers_changed = True
+
+    def issue(self, qty: Decimal, fallback_unit_cost: Decimal) -> Decimal:
+        """خروج از موجودی — بهای کل (مثبت) را برمی‌گرداند"""
+        if COSTING_METHOD == FIFO:
+            total, remaining = Decimal("0"), qty
+            while remaining > 0 and self.layers:
+                layer = self.layers[0]
+                used = min(remaining, layer[1])
+                total += used * layer[2]
+                layer[1] -= used
+                remaining -= used
+                if layer[1] <= 0:
+                    self.layers.pop(0)
+            if remaining > 0:  # موجودی منفی — با آخرین بهای شناخته‌شده
+                total += remaining * fallback_unit_cost
+            self.layers_changed = True
+            total = _round(total)
+        elif self.qty <= 0:
+            total = _round(qty * fallback_unit_cost)
+        elif qty >= self.qty:
+            # خروج کل موجودی — ارزش باقی‌مانده دقیقاً صفر می‌شود
+            total = self.value + _round((qty - self.qty) * self.value / self.qty)
+        else:
+            total = _round(self.value * qty / self.qty)
+
+        self.qty -= qty
+        self.value -= total
+        return total
+
+    def apply(self, movement, qty, movement_type, cost_per_unit, total_cost, created_at):
+        """تعیین بهای یک تحرک و اعمال آن بر وضعیت — (cost_per_unit, total_cost) جدید"""
+        if qty > 0:
+            average = self.average()
+            if movement_type in AVERAGE_COST_INBOUND_TYPES and average is not None:
+                total = _round(qty * average)
+            elif total_cost is not None:
+                total = total_cost
+            else:
+                total = _round(qty * cost_per_unit)
+            self.receive(movement, qty, total, created_at)
+            return _round(total / qty), total
+
+        fallback = self.average()
+        if fallback is None:
+            fallback = self.layers[-1][2] if self.layers else cost_per_unit
+        total = self.issue(-qty, fallback)
+        return _round(total / -qty), -total
+
+
+def load_cost_states(session: Session, item_ids) -> dict:
+    """بارگذاری وضعیت جاری چند کالا — یک کوئری (+ یک کوئری لایه‌ها در FIFO)"""
+    item_ids = list(set(item_ids))
+    # تاریخ آخرین تحرک = بیشترین created_at، نه created_at بزرگ‌ترین id — پس از یک تحرک عقب‌افتاده
+    # بزرگ‌ترین id تاریخ قدیمی دارد (از ایندکس ix_stock_movements_item_created خوانده می‌شود)
+    latest = (
+        select(StockMovement.item_id, func.max(StockMovement.created_at).label("last_created_at"))
+        .where(StockMovement.item_id.in_(item_ids))
+        .group_by(StockMovement.item_id)
+        .subquery()
+    )
+    rows = session.execute(
+        select(ItemStockBalance.item_id, ItemStockBalance.qty_on_hand,
+               ItemStockBalance.value_on_hand, latest.c.last_created_at)
+        .outerjoin(latest, latest.c.item_id == ItemStockBalance.item_id)
+        .where(ItemStockBalance.item_id.in_(item_ids))
+    ).all()
+    states = {item_id: CostState() for item_id in item_ids}
+    for item_id, qty, value, last_created_at in rows:
+        states[item_id] = CostState(qty, value, last_created_at=last_created_at, has_balance=True)
+
+    if COSTING_METHOD == FIFO:
+        layers = session.execute(
+            select(StockCostLayer.item_id, StockCostLayer.movement_id, StockCostLayer.qty_remaining,
+                   StockCostLayer.unit_cost, StockCostLayer.received_at)
+            .where(StockCostLayer.item_id.in_(item_ids))
+            .order_by(StockCostLayer.item_id, StockCostLayer.received_at, StockCostLayer.movement_id)
+        ).all()
+        for item_id, movement_id, qty, unit_cost, received_at in layers:
+            states[item_id].layers.append([movement_id, _d(qty), _d(unit_cost), received_at])
+    return states
+
+
+def cost_new_movements(states: dict, movements: list) -> dict:
+    """تعیین بهای تحرکات جدید (پیش از flush) — کالاهای دارای تحرک عقب‌افتاده را برمی‌گرداند"""
+    backdated = {}
+    for m in movements:
+        state = states[m.item_id]
+        created_at = m.created_at or datetime.now()
+        if m.created_at is not None and state.last_created_at is not None and m.created_at < state.last_created_at:
+            backdated[m.item_id] = min(backdated.get(m.item_id, m.created_at), m.created_at)
+        total_cost = _d(m.total_cost) if m.total_cost is not None else None
+        m.cost_per_unit, m.total_cost = state.apply(
+            m, _d(m.qty), m.movement_type, _d(m.cost_per_unit), total_cost, created_at
+        )
+        if state.last_created_at is None or created_at > state.last_created_at:
+            state.last_created_at = created_at
+    return backdated
+
+
+def save_cost_layers(session: Session, states: dict):
+    """ذخیره لایه‌های FIFO کالاهایی که تغییر کرده‌اند"""
+    if COSTING_METHOD != FIFO:
+        return
+    changed = {item_id: s for item_id, s in states.items() if s.layers_changed}
+    if not changed:
+        return
+    session.execute(delete(StockCostLayer).where(StockCostLayer.item_id.in_(list(changed))))
+    rows = [
+        {
+            "item_id": item_id,
+            "movement_id": movement if isinstance(movement, int) else movement.id,
+            "qty_remaining": qty,
+            "unit_cost": unit_cost,
+            "received_at": received_at,
+        }
+        for item_id, state in changed.items()
+        for movement, qty, unit_cost, received_at in state.layers
+        if qty > 0
+    ]
+    if rows:
+        session.execute(insert(StockCostLayer), rows)
+
+
+def _state_before(session: Session, item_id: int, since) -> CostState:
+    """وضعیت کالا درست پیش از لحظه since — از روی دفتر تحرکات"""
+    qty, value = session.execute(
+        select(func.sum(StockMovement.qty), func.sum(StockMovement.total_cost))
+        .where(StockMovement.item_id == item_id, StockMovement.created_at < since)
+    ).one()
+    state = CostState(qty, value)
+    if COSTING_METHOD != FIFO:
+        return state
+
+    # لایه‌های باقی‌مانده = ورودی‌ها به ترتیب ورود، پس از کسر کل خروجی‌های قبل از since
+    consumed = -_d(session.execute(
+        select(func.sum(StockMovement.qty))
+        .where(StockMovement.item_id == item_id, StockMovement.created_at < since, StockMovement.qty < 0)
+    ).scalar())
+    inbound = select(
+        StockMovement.id, StockMovement.qty, StockMovement.total_cost, StockMovement.created_at,
+        func.sum(StockMovement.qty).over(order_by=[StockMovement.created_at, StockMovement.id]).label("cum_qty"),
+    ).where(StockMovement.item_id == item_id, StockMovement.created_at < since, StockMovement.qty > 0).subquery()
+    rows = session.execute(
+        select(inbound).where(inbound.c.cum_qty > float(consumed))
+        .order_by(inbound.c.created_at, inbound.c.id)
+    ).all()
+    for movement_id, qty, total_cost, created_at, cum_qty in rows:
+        qty, cum_qty = _d(qty), _d(cum_qty)
+        remaining = min(qty, cum_qty - consumed)
+        state.layers.append([movement_id, remaining, _d(total_cost) / qty, created_at])
+    state.value = sum((layer[1] * layer[2] for layer in state.layers), Decimal("0"))
+    state.layers_changed = True
+    return state
+
+
+def replay_item_costs(session: Session, item_id: int, since=None) -> int:
+    """بازپردازش بهای تحرکات یک کالا از لحظه since به بعد — تعداد تحرکات اصلاح‌شده"""
+    # created_at پیش‌فرض سرور بدون کسر ثانیه ذخیره می‌شود («…:08») و در مقایسه متنی SQLite از پارامتر
+    # «…:08.000000» کوچک‌تر است؛ با یک ثانیه عقب‌تر، تحرک‌های همان ثانیه هم بازپردازش می‌شوند
+    since = since - timedelta(seconds=1) if since else datetime.min
+    state = _state_before(session, item_id, since)
+    rows = session.execute(
+        select(StockMovement.id, StockMovement.qty, StockMovement.movement_type,
+               StockMovement.cost_per_unit, StockMovement.total_cost, StockMovement.created_at)
+        .where(StockMovement.item_id == item_id, StockMovement.created_at >= since)
+        .order_by(StockMovement.created_at, StockMovement.id)
+    ).all()
+
+    changes = []
+    for movement_id, qty, movement_type, cost_per_unit, total_cost, created_at in rows:
+        cost_per_unit, total_cost = _d(cost_per_unit), _d(total_cost)
+        new_cost, new_total = state.apply(movement_id, _d(qty), movement_type, cost_per_unit, total_cost, created_at)
+        if new_cost != cost_per_unit or new_total != total_cost:
+            changes.append({"id": movement_id, "cost_per_unit": new_cost, "total_cost": new_total})
+
+    if changes:
+        session.execute(update(StockMovement), changes)
+    session.execute(
+        update(ItemStockBalance).where(ItemStockBalance.item_id == item_id).values(value_on_hand=state.value),
+        execution_options={"synchronize_session": False},
+    )
+    save_cost_layers(session, {item_id: state})
+    return len(changes)
+
+
+def replay_costs(session: Session, item_ids=None, since=None) -> int:
+    """بازپردازش بهای چند کالا (یا همه) — مثلاً پس از تغییر روش بهای تمام‌شده"""
+    if item_ids is None:
+        item_ids = session.execute(select(StockMovement.item_id).distinct()).scalars().all()
+    return sum(replay_item_costs(session, item_id, since) for item_id in item_ids)
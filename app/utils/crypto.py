@@ -1,25 +1,208 @@
 # app/utils/crypto.py
-from cryptography.fernet import Fernet
+"""رمزنگاری جریانی فایل‌های بک‌آپ — AES-256-GCM در قطعه‌های مستقل با حافظه ثابت
+
+قالب فایل .enc:
+    سربرگ: MAGIC | نسخه (1) | تعداد تکرار PBKDF2 (4) | salt (16) | اندازه قطعه (4) | پیشوند nonce (8)
+    هر قطعه: پرچم آخرین قطعه (1) | طول متن رمز (4) | متن رمز + برچسب GCM (16)
+کلید AES از کلید/گذرواژه کاربر با PBKDF2-HMAC-SHA256 و salt سربرگ ساخته می‌شود. nonce هر قطعه
+پیشوند + شماره قطعه است و سربرگ، شماره و پرچم قطعه در داده همراه (AAD) احراز می‌شوند؛ پس جابه‌جایی،
+حذف یا بریدن قطعه‌ها هنگام بازگشایی خطا می‌دهد. فایل‌های قدیمی (یک توکن Fernet) هم خوانده می‌شوند.
+"""
 import os
+import struct
+
+# cryptography فقط هنگام بک‌آپ/بازیابی رمزدار بارگذاری می‌شود
+
+MAGIC = b"HG2ENC"
+VERSION = 1
+CHUNK_SIZE = 1024 * 1024        # یک مگابایت — حافظه مصرفی مستقل از اندازه فایل
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+KDF_ITERATIONS = 200_000
+SALT_SIZE = 16
+NONCE_PREFIX_SIZE = 8
+TAG_SIZE = 16
+
+_HEADER = struct.Struct(f">{len(MAGIC)}sBI{SALT_SIZE}sI{NONCE_PREFIX_SIZE}s")
+_FRAME = struct.Struct(">BI")
+_LEGACY_PREFIX = b"gAAAAA"  # نسخه 0x80 توکن Fernet در base64
+
+
+class DecryptionError(ValueError):
+    pass
+
 
 def generate_key():
+    from cryptography.fernet import Fernet
     return Fernet.generate_key()
 
-def encrypt_file(file_path, key):
-    f = Fernet(key)
-    with open(file_path, 'rb') as file:
-        file_data = file.read()
-    encrypted_data = f.encrypt(file_data)
-    with open(file_path + '.enc', 'wb') as file:
-        file.write(encrypted_data)
-    return file_path + '.enc'
-
-def decrypt_file(encrypted_file_path, key):
-    f = Fernet(key)
-    with open(encrypted_file_path, 'rb') as file:
-        encrypted_data = file.read()
-    decrypted_data = f.decrypt(encrypted_data)
-    original_path = encrypted_file_path.replace('.enc', '')
-    with open(original_path, 'wb') as file:
-        file.write(decrypted_data)
-    return original_path
\ No newline at end of file
+
+def _key_bytes(key) -> bytes:
+    return key.encode("utf-8") if isinstance(key, str) else bytes(key)
+
+
+def derive_key(key, salt: bytes, iterations: int = KDF_ITERATIONS) -> bytes:
+    """کلید ۳۲ بایتی از کلید/گذرواژه کاربر — PBKDF2-HMAC-SHA256"""
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=iterations)
+    return kdf.derive(_key_bytes(key))
+
+
+def _derive(key, salt: bytes, iterations: int):
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    return AESGCM(derive_key(key, salt, iterations))
+
+
+def seal(aes_key: bytes, data: bytes, aad: bytes = None) -> bytes:
+    """رمزنگاری یک بلوک مستقل — nonce تصادفی ۱۲ بایتی + متن رمز + برچسب"""
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    nonce = os.urandom(12)
+    return nonce + AESGCM(aes_key).encrypt(nonce, data, aad)
+
+
+def unseal(aes_key: bytes, blob: bytes, aad: bytes = None) -> bytes:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    try:
+        return AESGCM(aes_key).decrypt(blob[:12], blob[12:], aad)
+    except InvalidTag:
+        raise DecryptionError("کلید نادرست است یا داده رمزشده دست‌کاری شده است.") from None
+
+
+def _aad(header: bytes, index: int, final: int) -> bytes:
+    return header + struct.pack(">QB", index, final)
+
+
+def _read_exact(src, size: int) -> bytes:
+    data = src.read(size)
+    while len(data) < size:
+        more = src.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def encrypt_stream(src, dst, key, chunk_size: int = CHUNK_SIZE, on_progress=None) -> int:
+    """رمزنگاری جریان src در dst — تعداد بایت متن اصلی"""
+    salt, prefix = os.urandom(SALT_SIZE), os.urandom(NONCE_PREFIX_SIZE)
+    header = _HEADER.pack(MAGIC, VERSION, KDF_ITERATIONS, salt, chunk_size, prefix)
+    aes = _derive(key, salt, KDF_ITERATIONS)
+    dst.write(header)
+
+    done, index = 0, 0
+    chunk = _read_exact(src, chunk_size)
+    while True:
+        # یک قطعه جلوتر خوانده می‌شود تا آخرین قطعه علامت بخورد (حتی فایل خالی یک قطعه دارد)
+        following = _read_exact(src, chunk_size) if len(chunk) == chunk_size else b""
+        final = 0 if following else 1
+        nonce = prefix + struct.pack(">I", index)
+        sealed = aes.encrypt(nonce, chunk, _aad(header, index, final))
+        dst.write(_FRAME.pack(final, len(sealed)))
+        dst.write(sealed)
+        done += len(chunk)
+        if on_progress:
+            on_progress(done)
+        if final:
+            return done
+        chunk, index = following, index + 1
+
+
+def iter_decrypt(src, key):
+    """متن اصلی قطعه‌به‌قطعه از جریان رمزشده — بریدگی/دست‌کاری در همان قطعه خطا می‌دهد"""
+    from cryptography.exceptions import InvalidTag
+    header = _read_exact(src, _HEADER.size)
+    if len(header) != _HEADER.size:
+        raise DecryptionError("فایل رمزشده ناقص است.")
+    magic, version, iterations, salt, chunk_size, prefix = _HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise DecryptionError("قالب فایل رمزشده پشتیبانی نمی‌شود.")
+    aes = _derive(key, salt, iterations)
+
+    index = 0
+    while True:
+        frame = _read_exact(src, _FRAME.size)
+        if len(frame) != _FRAME.size:
+            raise DecryptionError("فایل رمزشده ناقص است (قطعه پایانی یافت نشد).")
+        final, length = _FRAME.unpack(frame)
+        if length > chunk_size + TAG_SIZE:
+            raise DecryptionError("قطعه نامعتبر در فایل رمزشده.")
+        sealed = _read_exact(src, length)
+        try:
+            chunk = aes.decrypt(prefix + struct.pack(">I", index), sealed, _aad(header, index, final))
+        except InvalidTag:
+            raise DecryptionError("کلید نادرست است یا فایل رمزشده دست‌کاری شده است.") from None
+        if final:
+            if src.read(1):
+                raise DecryptionError("داده اضافی پس از قطعه پایانی فایل رمزشده.")
+            yield chunk
+            return
+        yield chunk
+        index += 1
+
+
+def decrypt_stream(src, dst, key, on_progress=None) -> int:
+    """بازگشایی جریان با قالب قطعه‌ای در dst — تعداد بایت متن اصلی"""
+    done = 0
+    for chunk in iter_decrypt(src, key):
+        dst.write(chunk)
+        done += len(chunk)
+        if on_progress:
+            on_progress(done)
+    return done
+
+
+def iter_decrypt_file(encrypted_file_path, key):
+    """متن اصلی فایل .enc قطعه‌به‌قطعه — قالب قدیمی Fernet یک قطعه (کل فایل) است"""
+    with open(encrypted_file_path, 'rb') as src:
+        if _read_exact(src, len(_LEGACY_PREFIX)) == _LEGACY_PREFIX:
+            src.seek(0)
+            yield _legacy_plaintext(src, key)
+            return
+        src.seek(0)
+        yield from iter_decrypt(src, key)
+
+
+def _decrypted_path(encrypted_file_path):
+    return encrypted_file_path[:-len(".enc")] if encrypted_file_path.endswith(".enc") else encrypted_file_path + ".dec"
+
+
+def encrypt_file(file_path, key, output_path=None, on_progress=None):
+    """رمزنگاری جریانی فایل — خروجی file_path + '.enc'"""
+    output_path = output_path or file_path + '.enc'
+    try:
+        with open(file_path, 'rb') as src, open(output_path, 'wb') as dst:
+            encrypt_stream(src, dst, key, on_progress=on_progress)
+    except BaseException:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    return output_path
+
+
+def decrypt_file(encrypted_file_path, key, output_path=None, on_progress=None):
+    """بازگشایی فایل .enc — قالب قطعه‌ای به‌صورت جریانی، قالب قدیمی Fernet یک‌جا"""
+    output_path = output_path or _decrypted_path(encrypted_file_path)
+    with open(encrypted_file_path, 'rb') as src:
+        legacy = _read_exact(src, len(_LEGACY_PREFIX)) == _LEGACY_PREFIX
+        src.seek(0)
+        try:
+            with open(output_path, 'wb') as dst:
+                if legacy:
+                    dst.write(_legacy_plaintext(src, key))
+                else:
+                    decrypt_stream(src, dst, key, on_progress=on_progress)
+        except BaseException:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+    return output_path
+
+
+def _legacy_plaintext(src, key) -> bytes:
+    """فایل‌های ساخته‌شده با نسخه‌های قبل — یک توکن Fernet برای کل فایل"""
+    from cryptography.fernet import Fernet, InvalidToken
+    try:
+        return Fernet(_key_bytes(key)).decrypt(src.read())
+    except (InvalidToken, ValueError):
+        raise DecryptionError("کلید نادرست است یا فایل رمزشده (قالب قدیمی) خراب است.") from None
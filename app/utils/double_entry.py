@@ -1,13 +1,85 @@
 # app/utils/double_entry.py
+from decimal import Decimal
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from app.models.journal_entry import JournalEntry
 from app.models.journal_line import JournalLine
+from app.models.ledger_account import LedgerAccount
+
+# تعداد شناسه در هر IN — زیر سقف پارامترهای SQLite
+ID_CHUNK = 500
+
+def _d(value) -> Decimal:
+    return Decimal(str(value or 0))
+
+def _unbalanced_query():
+    debit = func.sum(func.coalesce(JournalLine.debit, 0))
+    credit = func.sum(func.coalesce(JournalLine.credit, 0))
+    return (select(JournalLine.journal_entry_id, debit, credit)
+            .group_by(JournalLine.journal_entry_id)
+            .having(debit != credit))
+
+def find_unbalanced(session: Session, entry_ids=None) -> list:
+    """اسناد ناتراز — یک کوئری GROUP BY/HAVING (به ازای هر ۵۰۰ شناسه)؛ entry_ids=None یعنی کل دفتر
+
+    خروجی: [(journal_entry_id, جمع بدهکار, جمع بستانکار), ...]
+    """
+    if entry_ids is None:
+        rows = session.execute(_unbalanced_query().order_by(JournalLine.journal_entry_id)).all()
+    else:
+        ids = sorted(set(entry_ids))
+        rows = []
+        for start in range(0, len(ids), ID_CHUNK):
+            chunk = ids[start:start + ID_CHUNK]
+            rows.extend(session.execute(
+                _unbalanced_query().where(JournalLine.journal_entry_id.in_(chunk))
+                .order_by(JournalLine.journal_entry_id)
+            ).all())
+    return [(entry_id, _d(debit), _d(credit)) for entry_id, debit, credit in rows]
+
+def validate_entries(session: Session, entry_ids):
+    """اعتبارسنجی: جمع debit == جمع credit برای هر سند مجموعه — خطا با فهرست اسناد ناتراز"""
+    unbalanced = find_unbalanced(session, entry_ids)
+    if unbalanced:
+        details = "، ".join(f"سند {entry_id}: Debit={debit} != Credit={credit}"
+                           for entry_id, debit, credit in unbalanced[:10])
+        raise ValueError(f"ثبت دوبل نامعتبر در {len(unbalanced)} سند — {details}")
+    return True
 
 def validate_double_entry(session: Session, journal_entry: JournalEntry):
     """اعتبارسنجی: جمع debit == جمع credit"""
-    lines = session.query(JournalLine).filter(JournalLine.journal_entry_id == journal_entry.id).all()
-    total_debit = sum(line.debit for line in lines)
-    total_credit = sum(line.credit for line in lines)
+    return validate_entries(session, [journal_entry.id])
+
+def scan_ledger(session: Session) -> dict:
+    """بررسی سلامت کل دفتر — برای اجرای شبانه روی دیتابیس‌های بزرگ
+
+    هر بخش یک کوئری است: اسناد ناتراز، خطوط بدون سند (orphan) و خطوط روی حساب ناموجود.
+    """
+    orphan_lines = session.execute(
+        select(JournalLine.id, JournalLine.journal_entry_id)
+        .where(~select(JournalEntry.id).where(JournalEntry.id == JournalLine.journal_entry_id).exists())
+        .order_by(JournalLine.id)
+    ).all()
+    missing_accounts = session.execute(
+        select(JournalLine.id, JournalLine.ledger_account_id)
+        .where(~select(LedgerAccount.id).where(LedgerAccount.id == JournalLine.ledger_account_id).exists())
+        .order_by(JournalLine.id)
+    ).all()
+    return {
+        "unbalanced": find_unbalanced(session),
+        "orphan_lines": [tuple(row) for row in orphan_lines],
+        "missing_accounts": [tuple(row) for row in missing_accounts],
+    }
+
+def check_balanced(lines) -> Decimal:
+    """اعتبارسنجی در حافظه پیش از درج — lines: دیکشنری‌هایی با debit/credit؛ جمع بدهکار را برمی‌گرداند"""
+    total_debit = total_credit = Decimal("0")
+    for line in lines:
+        debit, credit = Decimal(str(line.get("debit") or 0)), Decimal(str(line.get("credit") or 0))
+        if debit < 0 or credit < 0:
+            raise ValueError("مبلغ بدهکار و بستانکار نمی‌تواند منفی باشد.")
+        total_debit += debit
+        total_credit += credit
     if total_debit != total_credit:
         raise ValueError(f"ثبت دوبل نامعتبر: Debit={total_debit} != Credit={total_credit}")
-    return True
\ No newline at end of file
+    return total_debit
@@ -0,0 +1,158 @@
+# app/utils/ledger_balances.py
+"""مانده دوره‌ای دفتر کل — جدول ledger_period_balances
+
+هر ردیف: گردش بدهکار/بستانکار یک حساب (و طرف‌حساب) در یک دوره + مانده تجمعی تا پایان آن دوره.
+ثبت هر سند (posted) ردیف‌ها را به‌صورت افزایشی به‌روز می‌کند و بستن دوره آن‌ها را منجمد می‌کند؛
+مانده تا آخرین دوره بسته از یک ردیف خوانده می‌شود و فقط خطوط دوره‌های باز جمع زده می‌شوند.
+"""
+from decimal import Decimal
+from sqlalchemy import and_, func, insert, select, update
+from sqlalchemy.orm import Session
+from app.models.journal_entry import JournalEntry
+from app.models.ledger_period_balance import LedgerPeriodBalance
+from app.models.ledger_closed_period import LedgerClosedPeriod
+
+NO_PARTY = 0  # party_id ردیف‌های بدون طرف‌حساب
+
+LPB = LedgerPeriodBalance
+
+
+def _d(value) -> Decimal:
+    return Decimal(str(value or 0))
+
+
+def closed_through(session: Session):
+    """آخرین دوره بسته (YYYY-MM) — یا None"""
+    return session.execute(select(func.max(LedgerClosedPeriod.period))).scalar()
+
+
+def ensure_open(session: Session, period: str):
+    """سند جدید یا ثبت سند فقط در دوره باز"""
+    cutoff = closed_through(session)
+    if cutoff and period <= cutoff:
+        raise ValueError(f"دوره {period} بسته شده است؛ ثبت سند در آن مجاز نیست.")
+
+
+def post_lines(session: Session, period: str, lines) -> int:
+    """اعمال خطوط یک سند ثبت‌شده — lines: [(account_id, party_id, debit, credit), ...]"""
+    ensure_open(session, period)
+
+    totals = {}
+    for account_id, party_id, debit, credit in lines:
+        key = (account_id, party_id or NO_PARTY)
+        old_debit, old_credit = totals.get(key, (Decimal("0"), Decimal("0")))
+        totals[key] = (old_debit + _d(debit), old_credit + _d(credit))
+
+    options = {"synchronize_session": False}
+    for (account_id, party_id), (debit, credit) in totals.items():
+        delta = debit - credit
+        pair = (LPB.account_id == account_id, LPB.party_id == party_id)
+        updated = session.execute(
+            update(LPB).where(*pair, LPB.period == period).values(
+                debit_total=LPB.debit_total + debit,
+                credit_total=LPB.credit_total + credit,
+                closing_balance=LPB.closing_balance + delta,
+            ),
+            execution_options=options,
+        ).rowcount
+        if not updated:
+            previous = session.execute(
+                select(LPB.closing_balance).where(*pair, LPB.period < period).order_by(LPB.period.desc()).limit(1)
+            ).scalar()
+            session.execute(insert(LPB).values(
+                account_id=account_id, party_id=party_id, period=period, debit_total=debit,
+                credit_total=credit, closing_balance=_d(previous) + delta, is_closed=False,
+            ))
+        # سند با تاریخ گذشته — مانده تجمعی دوره‌های بعدی هم جابه‌جا می‌شود
+        if delta:
+            session.execute(
+                update(LPB).where(*pair, LPB.period > period).values(closing_balance=LPB.closing_balance + delta),
+                execution_options=options,
+            )
+    return len(totals)
+
+
+def close_period(session: Session, period: str) -> int:
+    """بستن دوره‌ها تا period — مانده هر حساب/طرف‌حساب در ردیف همان دوره منجمد می‌شود
+
+    تعداد ردیف‌های دوره period را برمی‌گرداند — صفر برای دفتری که تا این دوره گردشی ندارد؛ دوره در هر
+    حال در ledger_closed_periods ثبت و بسته می‌شود. سند پیش‌نویس در دوره‌های در حال بسته شدن مجاز نیست.
+    """
+    cutoff = closed_through(session)
+    if cutoff and period <= cutoff:
+        raise ValueError(f"دوره {cutoff} قبلاً بسته شده است.")
+    drafts = select(func.count(JournalEntry.id)).where(
+        JournalEntry.period <= period, JournalEntry.posted.isnot(True)
+    )
+    if cutoff:
+        drafts = drafts.where(JournalEntry.period > cutoff)
+    count = session.execute(drafts).scalar()
+    if count:
+        raise ValueError(f"{count} سند پیش‌نویس تا دوره {period} وجود دارد؛ ابتدا آن‌ها را ثبت یا حذف کنید.")
+
+    # انتقال مانده — هر حساب/طرف‌حسابی که در این دوره گردش نداشته، ردیفی با مانده آخرین دوره‌اش می‌گیرد
+    latest = select(LPB.account_id, LPB.party_id, func.max(LPB.period).label("period")).where(
+        LPB.period <= period
+    ).group_by(LPB.account_id, LPB.party_id).subquery()
+    carried = session.execute(
+        select(LPB.account_id, LPB.party_id, LPB.closing_balance).join(latest, and_(
+            LPB.account_id == latest.c.account_id, LPB.party_id == latest.c.party_id, LPB.period == latest.c.period,
+        )).where(latest.c.period < period)
+    ).all()
+    if carried:
+        session.execute(insert(LPB), [
+            {"account_id": account_id, "party_id": party_id, "period": period, "debit_total": 0,
+             "credit_total": 0, "closing_balance": closing, "is_closed": False}
+            for account_id, party_id, closing in carried
+        ])
+
+    session.execute(
+        update(LPB).where(LPB.period <= period, LPB.is_closed.is_(False)).values(is_closed=True),
+        execution_options={"synchronize_session": False},
+    )
+    session.execute(insert(LedgerClosedPeriod).values(period=period))
+    return session.execute(select(func.count(LPB.id)).where(LPB.period == period)).scalar()
+
+
+def snapshot_closing(session: Session, by: str, through: str, *criteria) -> dict:
+    """مانده پایان دوره through از ردیف‌های مانده دوره‌ای به تفکیک by ("account_id" یا "party_id")"""
+    key = getattr(LPB, by)
+    if through == closed_through(session):
+        # بستن دوره مانده همه را به همان دوره منتقل کرده است — یک ردیف برای هر حساب/طرف‌حساب
+        rows = select(key, func.sum(LPB.closing_balance)).where(LPB.period == through, *criteria)
+    else:
+        latest = select(LPB.account_id, LPB.party_id, func.max(LPB.period).label("period")).where(
+            LPB.period <= through, *criteria
+        ).group_by(LPB.account_id, LPB.party_id).subquery()
+        rows = select(key, func.sum(LPB.closing_balance)).join(latest, and_(
+            LPB.account_id == latest.c.account_id, LPB.party_id == latest.c.party_id,
+            LPB.period == latest.c.period,
+        ))
+    return {value: _d(balance) for value, balance in session.execute(rows.group_by(key)).all()}
+
+
+def snapshot_totals(session: Session, by: str, through: str, period_from: str = None, *criteria) -> dict:
+    """جمع از ردیف‌های دوره‌های بسته تا through به تفکیک by — {key: (opening, debit, credit)}
+
+    opening مانده پیش از period_from و debit/credit گردش دوره‌های period_from..through؛
+    بدون period_from گردش از ابتدا.
+    """
+    key = getattr(LPB, by)
+    closing = snapshot_closing(session, by, through, *criteria)
+    turnover = {}
+    if period_from is None or period_from <= through:
+        window = [LPB.period <= through, *criteria]
+        if period_from is not None:
+            window.append(LPB.period >= period_from)
+        turnover = {
+            value: (_d(debit), _d(credit))
+            for value, debit, credit in session.execute(
+                select(key, func.sum(LPB.debit_total), func.sum(LPB.credit_total)).where(*window).group_by(key)
+            ).all()
+        }
+
+    totals = {}
+    for value, balance in closing.items():
+        debit, credit = turnover.get(value, (Decimal("0"), Decimal("0")))
+        totals[value] = (balance - debit + credit, debit, credit)
+    return totals
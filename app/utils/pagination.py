@@ -0,0 +1,24 @@
+# app/utils/pagination.py
+"""صفحه‌بندی keyset — هر صفحه از آخرین ردیف صفحه قبل ادامه می‌یابد (بدون OFFSET)"""
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+PAGE_SIZE = 200
+
+
+def keyset_page(session: Session, stmt, sort_column, id_column, after=None, descending=False, limit=PAGE_SIZE):
+    """یک صفحه از ردیف‌ها — (rows, cursor)
+
+    stmt: select ستون‌های نمایشی؛ ستون اول باید id باشد.
+    sort_column: نباید NULL برگرداند (در صورت نیاز با coalesce).
+    cursor: (مقدار ستون مرتب‌سازی، id) آخرین ردیف برای صفحه بعد — None یعنی صفحه آخر.
+    """
+    stmt = stmt.add_columns(sort_column.label("_sort_key"))
+    if after is not None:
+        key = tuple_(sort_column, id_column)
+        stmt = stmt.where(key < tuple_(*after) if descending else key > tuple_(*after))
+    order = [sort_column.desc(), id_column.desc()] if descending else [sort_column, id_column]
+    rows = session.execute(stmt.order_by(*order).limit(limit)).all()
+
+    cursor = (rows[-1][-1], rows[-1][0]) if len(rows) == limit else None
+    return [tuple(row[:-1]) for row in rows], cursor
@@ -0,0 +1,75 @@
+# app/utils/query_counter.py
+"""شمارش کوئری‌های اجراشده — برای اطمینان از اینکه رندر جدول‌ها به دیتابیس دست نمی‌زند
+
+با DEBUG_QUERIES=1 هر کوئری داخل data() مدل‌های جدول، خطای AssertionError می‌دهد.
+"""
+import os
+from contextlib import contextmanager
+from functools import wraps
+from sqlalchemy import event
+
+DEBUG_QUERIES = os.getenv("DEBUG_QUERIES") == "1"
+
+
+class QueryCounter:
+    def __init__(self, record=True):
+        self.count = 0
+        self.record = record
+        self.statements = []
+        self.last_statement = None
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        self.count += 1
+        self.last_statement = statement
+        if self.record:
+            self.statements.append(statement)
+
+    def install(self, engine):
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def remove(self, engine):
+        event.remove(engine, "before_cursor_execute", self._on_execute)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """شمارش کوئری‌های اجراشده در بدنه with"""
+    if engine is None:
+        from app.database import engine
+    counter = QueryCounter()
+    counter.install(engine)
+    try:
+        yield counter
+    finally:
+        counter.remove(engine)
+
+
+_debug_counter = None
+
+
+def _get_debug_counter():
+    global _debug_counter
+    if _debug_counter is None:
+        from app.database import engine
+        _debug_counter = QueryCounter(record=False)
+        _debug_counter.install(engine)
+    return _debug_counter
+
+
+def no_queries(method):
+    """دکوراتور متد data() مدل‌ها — در حالت DEBUG_QUERIES هر کوئری را خطا می‌داند"""
+    if not DEBUG_QUERIES:
+        return method
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        counter = _get_debug_counter()
+        before = counter.count
+        result = method(*args, **kwargs)
+        if counter.count != before:
+            raise AssertionError(
+                f"{method.__qualname__}: {counter.count - before} کوئری هنگام رندر — "
+                f"{counter.last_statement}"
+            )
+        return result
+    return wrapper
@@ -0,0 +1,93 @@
+# app/utils/sequences.py
+"""شماره‌گذاری اسناد — جدول document_sequences با کلید (پیشوند، سال مالی شمسی)
+
+تخصیص با یک UPDATE ... RETURNING انجام می‌شود: قفل نوشتن از همان دستور اول گرفته می‌شود (معادل
+BEGIN IMMEDIATE در SQLite و قفل ردیف در PostgreSQL)، پس دو برنامه هرگز شماره یکسان نمی‌گیرند و
+نیازی به SELECT MAX(number) روی جدول فاکتورها نیست.
+
+با SERIAL_BLOCK_SIZE > 1 هر برنامه (مثلاً صندوق فروشگاه) یک بلوک شماره رزرو می‌کند و تا پایان بلوک
+بدون مراجعه به دیتابیس شماره می‌دهد؛ شماره‌های مصرف‌نشده بلوک با بستن برنامه از دست می‌روند.
+"""
+import os
+import re
+import threading
+from datetime import date
+import jdatetime
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import unit_of_work
+from app.models.document_sequence import DocumentSequence
+
+SERIAL_BLOCK_SIZE = int(os.getenv("SERIAL_BLOCK_SIZE", "1"))
+
+
+def fiscal_year_of(for_date=None) -> int:
+    """سال مالی شمسی یک تاریخ میلادی — پیش‌فرض: امروز"""
+    return jdatetime.date.fromgregorian(date=for_date or date.today()).year
+
+
+def format_serial(prefix: str, fiscal_year: int, number: int) -> str:
+    return f"{prefix}-{fiscal_year}-{number:04d}"
+
+
+def parse_serial(serial_full: str):
+    """(prefix, fiscal_year, number) برای سریال‌های قالب format_serial — وگرنه None"""
+    match = re.fullmatch(r"([^-]{1,10})-(\d{4})-(\d+)", serial_full or "")
+    return (match.group(1), int(match.group(2)), int(match.group(3))) if match else None
+
+
+def reserve_numbers(session: Session, prefix: str, fiscal_year: int, count: int = 1) -> int:
+    """رزرو count شماره پشت‌سرهم — اولین شماره را برمی‌گرداند"""
+    stmt = update(DocumentSequence).where(
+        DocumentSequence.prefix == prefix, DocumentSequence.fiscal_year == fiscal_year
+    ).values(next_number=DocumentSequence.next_number + count).returning(DocumentSequence.next_number)
+    end = session.execute(stmt, execution_options={"synchronize_session": False}).scalar()
+    if end is None:
+        # اولین سند این پیشوند در این سال
+        try:
+            with session.begin_nested():
+                session.execute(insert(DocumentSequence).values(prefix=prefix, fiscal_year=fiscal_year, next_number=1))
+        except IntegrityError:
+            pass  # برنامه دیگری هم‌زمان ردیف را ساخت
+        end = session.execute(stmt, execution_options={"synchronize_session": False}).scalar()
+    return end - count
+
+
+def bump_sequences(session: Session, used: dict):
+    """پس از ورود اسناد با شماره از پیش تعیین‌شده — {(prefix, fiscal_year): بزرگ‌ترین شماره}"""
+    for (prefix, fiscal_year), number in used.items():
+        first = reserve_numbers(session, prefix, fiscal_year, 0)
+        if first <= number:
+            reserve_numbers(session, prefix, fiscal_year, number + 1 - first)
+
+
+class SerialAllocator:
+    """تخصیص شماره سند با بلوک‌های رزروشده در حافظه همین برنامه — امن برای چند نخ"""
+
+    def __init__(self, block_size: int = None):
+        self.block_size = block_size or SERIAL_BLOCK_SIZE
+        self._blocks = {}  # (prefix, fiscal_year) → (شماره بعدی، پایان بلوک)
+        self._lock = threading.Lock()
+
+    def next_number(self, prefix: str, fiscal_year: int) -> int:
+        with self._lock:
+            key = (prefix, fiscal_year)
+            number, end = self._blocks.get(key, (0, 0))
+            if number >= end:
+                # تراکنش جداگانه و کوتاه — رزرو با rollback سند برنمی‌گردد و قفل را نگه نمی‌دارد
+                with unit_of_work(independent=True) as db:
+                    number = reserve_numbers(db, prefix, fiscal_year, self.block_size)
+                end = number + self.block_size
+            self._blocks[key] = (number + 1, end)
+            return number
+
+    def next_serial(self, prefix: str = "INV", for_date=None):
+        """(number, serial_full) — مثلاً (12, "INV-1404-0012")"""
+        fiscal_year = fiscal_year_of(for_date)
+        number = self.next_number(prefix, fiscal_year)
+        return number, format_serial(prefix, fiscal_year, number)
+
+
+# تخصیص‌دهنده پیش‌فرض برنامه
+allocator = SerialAllocator()
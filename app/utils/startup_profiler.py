@@ -0,0 +1,107 @@
+# app/utils/startup_profiler.py
+"""پروفایل زمان راه‌اندازی — زمان import هر ماژول (مانند python -X importtime) و زمان اولین نقاشی پنجره
+
+استفاده: python app/main.py --profile-startup
+"""
+import sys
+import time
+import importlib.abc
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """پوشش loader اصلی — فقط اجرای ماژول زمان‌گیری می‌شود"""
+
+    def __init__(self, loader, fullname, profiler):
+        self._loader = loader
+        self._fullname = fullname
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter(self._fullname)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(self._fullname)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    def __init__(self, profiler):
+        self._profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, fullname, self._profiler)
+                return spec
+        return None
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports = []   # (name, self_seconds, cumulative_seconds, depth)
+        self.marks = []     # (label, seconds since start)
+        self._stack = []    # [name, start, child_seconds]
+        self._finder = _TimingFinder(self)
+
+    # --- زمان import ---
+    def install(self):
+        sys.meta_path.insert(0, self._finder)
+        return self
+
+    def uninstall(self):
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    def _enter(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def _exit(self, name):
+        _, start, children = self._stack.pop()
+        cumulative = time.perf_counter() - start
+        self.imports.append((name, cumulative - children, cumulative, len(self._stack)))
+        if self._stack:
+            self._stack[-1][2] += cumulative
+
+    # --- نقاط زمانی ---
+    def mark(self, label):
+        self.marks.append((label, time.perf_counter() - self.started))
+
+    def watch_first_paint(self, widget, on_painted=None):
+        """ثبت زمان اولین نقاشی ویجت — سپس گزارش چاپ می‌شود"""
+        from PySide6.QtCore import QObject, QEvent
+
+        profiler = self
+
+        class _PaintFilter(QObject):
+            def eventFilter(self, obj, event):
+                if event.type() == QEvent.Paint:
+                    widget.removeEventFilter(self)
+                    profiler.mark("اولین نقاشی پنجره")
+                    profiler.uninstall()
+                    if on_painted:
+                        on_painted()
+                return False
+
+        self._paint_filter = _PaintFilter()
+        widget.installEventFilter(self._paint_filter)
+
+    def report(self, top=25, stream=None):
+        stream = stream or sys.stderr
+        total = sum(cumulative for _, _, cumulative, depth in self.imports if depth == 0)
+        print(f"\n=== پروفایل راه‌اندازی — {len(self.imports)} ماژول، {total * 1000:.1f} ms import ===", file=stream)
+        print(f"{'self (ms)':>10} | {'cumulative (ms)':>15} | ماژول", file=stream)
+        for name, self_time, cumulative, depth in sorted(self.imports, key=lambda r: r[2], reverse=True)[:top]:
+            print(f"{self_time * 1000:10.1f} | {cumulative * 1000:15.1f} | {'  ' * depth}{name}", file=stream)
+        for label, seconds in self.marks:
+            print(f"{label}: {seconds * 1000:.1f} ms", file=stream)
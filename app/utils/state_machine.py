@@ -1,22 +1,50 @@
 # app/utils/state_machine.py
-from transitions import Machine
+"""وضعیت‌های چک — جدول انتقال یک بار در زمان import ساخته می‌شود و بین همه چک‌ها مشترک است"""
+
+STATES = ('registered', 'issued', 'in_hand', 'deposited', 'cleared', 'bounced', 'endorsed', 'reconciled', 'cancelled')
+
+# رویداد: (وضعیت‌های مبدأ، وضعیت مقصد) — '*' یعنی از هر وضعیت
+TRANSITIONS = {
+    'issue': (('registered',), 'issued'),
+    'receive': (('issued',), 'in_hand'),
+    'deposit': (('in_hand',), 'deposited'),
+    'clear': (('deposited',), 'cleared'),
+    'bounce': (('deposited',), 'bounced'),
+    'cancel': ('*', 'cancelled'),
+}
+
+# (رویداد، وضعیت فعلی) → وضعیت جدید
+TRANSITION_TABLE = {
+    (event, source): dest
+    for event, (sources, dest) in TRANSITIONS.items()
+    for source in (STATES if sources == '*' else sources)
+}
+
+
+def next_status(event: str, status: str) -> str:
+    """وضعیت بعد از رویداد — ValueError اگر رویداد یا انتقال از وضعیت فعلی مجاز نباشد"""
+    if event not in TRANSITIONS:
+        raise ValueError(f"انتقال '{event}' معتبر نیست.")
+    dest = TRANSITION_TABLE.get((event, status))
+    if dest is None:
+        raise ValueError(f"انتقال '{event}' از وضعیت '{status}' مجاز نیست.")
+    return dest
+
 
 class CheckStateMachine:
-    states = ['registered', 'issued', 'in_hand', 'deposited', 'cleared', 'bounced', 'endorsed', 'reconciled', 'cancelled']
+    """رابط قدیمی — sm.deposit() و sm.state روی همان جدول مشترک"""
+    states = list(STATES)
 
     def __init__(self, check):
         self.check = check
-        self.machine = Machine(model=self, states=CheckStateMachine.states, initial=check.status)
-        
-        # تعاریف انتقال — مثال ساده
-        self.machine.add_transition('issue', 'registered', 'issued')
-        self.machine.add_transition('receive', 'issued', 'in_hand')
-        self.machine.add_transition('deposit', 'in_hand', 'deposited')
-        self.machine.add_transition('clear', 'deposited', 'cleared')
-        self.machine.add_transition('bounce', 'deposited', 'bounced')
-        self.machine.add_transition('cancel', '*', 'cancelled')
-
-    def on_enter_state(self):
-        """به‌روزرسانی وضعیت در دیتابیس — فراخوانی پس از هر انتقال"""
+        self.state = check.status
+
+    def trigger(self, event: str):
+        self.state = next_status(event, self.state)
         self.check.status = self.state
-        # در عمل: باید session.commit() شود — در سرویس انجام می‌شود
\ No newline at end of file
+        return True
+
+    def __getattr__(self, event):
+        if event in TRANSITIONS:
+            return lambda: self.trigger(event)
+        raise AttributeError(event)
@@ -0,0 +1,224 @@
+# app/utils/stock_balance.py
+from decimal import Decimal
+from sqlalchemy import func, update, insert, delete, select, bindparam
+from sqlalchemy.orm import Session
+from app.models.stock_movement import StockMovement
+from app.models.item_stock_balance import ItemStockBalance
+from app.utils import cost_engine
+from app.utils.cost_engine import load_cost_states, cost_new_movements, save_cost_layers, replay_item_costs, FIFO
+
+
+def _to_decimal(value) -> Decimal:
+    return Decimal(str(value or 0))
+
+
+def _adjust_balance(session: Session, item_id: int, qty, value, last_movement_id=None):
+    """افزودن/کسر مقدار و ارزش به ردیف موجودی کالا — به‌صورت اتمیک در همان تراکنش"""
+    values = {
+        "qty_on_hand": ItemStockBalance.qty_on_hand + qty,
+        "value_on_hand": ItemStockBalance.value_on_hand + value,
+    }
+    if last_movement_id is not None:
+        values["last_movement_id"] = last_movement_id
+    result = session.execute(
+        update(ItemStockBalance).where(ItemStockBalance.item_id == item_id).values(**values),
+        execution_options={"synchronize_session": False},
+    )
+    if result.rowcount == 0:
+        session.execute(insert(ItemStockBalance).values(
+            item_id=item_id,
+            qty_on_hand=qty,
+            value_on_hand=value,
+            last_movement_id=last_movement_id,
+        ))
+
+
+def _adjust_balances(session: Session, totals: dict, existing: set):
+    """نسخه گروهی _adjust_balance — یک UPDATE با executemany برای کالاهای دارای ردیف + درج بقیه
+
+    totals: {item_id: (qty, value, last_movement_id)}
+    """
+    table = ItemStockBalance.__table__
+    updates = [
+        {"b_item_id": item_id, "b_qty": qty, "b_value": value, "b_last": last_id}
+        for item_id, (qty, value, last_id) in totals.items() if item_id in existing
+    ]
+    if updates:
+        session.execute(
+            update(table).where(table.c.item_id == bindparam("b_item_id")).values(
+                qty_on_hand=table.c.qty_on_hand + bindparam("b_qty"),
+                value_on_hand=table.c.value_on_hand + bindparam("b_value"),
+                last_movement_id=bindparam("b_last"),
+            ),
+            updates,
+        )
+    inserts = [
+        {"item_id": item_id, "qty_on_hand": qty, "value_on_hand": value, "last_movement_id": last_id}
+        for item_id, (qty, value, last_id) in totals.items() if item_id not in existing
+    ]
+    if inserts:
+        session.execute(insert(table), inserts)
+
+
+def apply_movements(session: Session, movements: list):
+    """تعیین بهای تحرکات جدید + اعمال آن‌ها روی جدول موجودی — باید پیش از commit فراخوانی شود"""
+    if not movements:
+        return
+
+    # بهای خروجی‌ها از وضعیت جاری کالا (میانگین متحرک یا FIFO) تعیین می‌شود
+    states = load_cost_states(session, {m.item_id for m in movements})
+    backdated = cost_new_movements(states, movements)
+    session.flush()  # نیاز به id تحرکات داریم
+
+    # تجمیع بر اساس کالا — یک UPDATE گروهی برای تمام کالاها، نه یک دستور برای هر تحرک
+    totals = {}
+    for m in movements:
+        qty, value, last_id = totals.get(m.item_id, (Decimal("0"), Decimal("0"), 0))
+        totals[m.item_id] = (qty + _to_decimal(m.qty), value + _to_decimal(m.total_cost), max(last_id, m.id))
+
+    _adjust_balances(session, totals, {item_id for item_id, state in states.items() if state.has_balance})
+    save_cost_layers(session, states)
+
+    # تحرک با تاریخ گذشته — بهای تحرکات بعدی از همان لحظه بازپردازش می‌شود
+    for item_id, since in backdated.items():
+        replay_item_costs(session, item_id, since)
+
+
+def remove_movements(session: Session, *criteria) -> int:
+    """حذف تحرکات مطابق شرط‌ها + کسر اثر آن‌ها از جدول موجودی"""
+    rows = session.execute(
+        select(
+            StockMovement.item_id,
+            func.sum(StockMovement.qty),
+            func.sum(StockMovement.total_cost),
+            func.min(StockMovement.created_at),
+        ).where(*criteria).group_by(StockMovement.item_id)
+    ).all()
+    if not rows:
+        return 0
+
+    deleted = session.execute(delete(StockMovement).where(*criteria)).rowcount
+
+    for item_id, qty, value, since in rows:
+        # اگر آخرین تحرک حذف شده باشد — آخرین تحرک باقی‌مانده جایگزین می‌شود
+        last_id = select(func.max(StockMovement.id)).where(StockMovement.item_id == item_id).scalar_subquery()
+        _adjust_balance(session, item_id, -_to_decimal(qty), -_to_decimal(value), last_id)
+
+        # حذف تحرکی که تحرکات بعدی دارد — بهای آن‌ها بازپردازش می‌شود (در FIFO لایه‌ها همیشه بازسازی می‌شوند)
+        later = session.execute(
+            select(StockMovement.id).where(StockMovement.item_id == item_id, StockMovement.created_at >= since).limit(1)
+        ).first()
+        if later or cost_engine.COSTING_METHOD == FIFO:
+            replay_item_costs(session, item_id, since)
+    return deleted
+
+
+def revise_movements(session: Session, revisions: list) -> int:
+    """اصلاح تحرکات موجود در محل — [(movement, qty, unit_id, cost_per_unit), ...]
+
+    فقط اختلاف مقدار و ارزش روی جدول موجودی اعمال می‌شود و بهای هر کالا از زمان قدیمی‌ترین
+    تحرک اصلاح‌شده بازپردازش می‌شود؛ شناسه تحرکات و لایه‌های قبل از آن دست نمی‌خورند.
+    """
+    since = {}
+    for movement, qty, unit_id, cost_per_unit in revisions:
+        qty = _to_decimal(qty)
+        total_cost = int(qty * _to_decimal(cost_per_unit))
+        _adjust_balance(session, movement.item_id, qty - _to_decimal(movement.qty),
+                        total_cost - _to_decimal(movement.total_cost))
+        movement.qty, movement.unit_id = qty, unit_id
+        movement.cost_per_unit, movement.total_cost = cost_per_unit, total_cost
+        item_since = since.get(movement.item_id)
+        since[movement.item_id] = movement.created_at if item_since is None else min(item_since, movement.created_at)
+
+    session.flush()
+    for item_id, item_since in since.items():
+        replay_item_costs(session, item_id, item_since)
+    return len(revisions)
+
+
+def get_balance_qty(session: Session, item_id: int) -> Decimal:
+    """خواندن موجودی فعلی کالا — O(1)"""
+    qty = session.execute(
+        select(ItemStockBalance.qty_on_hand).where(ItemStockBalance.item_id == item_id)
+    ).scalar()
+    return _to_decimal(qty)
+
+
+def get_balance_qty_bulk(session: Session, item_ids, exclude_invoice_id: int = None) -> dict:
+    """موجودی چند کالا با یک کوئری — اختیاری: بدون اثر تحرکات یک فاکتور"""
+    item_ids = list(set(item_ids))
+    stock = {item_id: Decimal("0") for item_id in item_ids}
+    if not item_ids:
+        return stock
+
+    query = select(ItemStockBalance.item_id, ItemStockBalance.qty_on_hand).where(
+        ItemStockBalance.item_id.in_(item_ids)
+    )
+    if exclude_invoice_id is not None:
+        # اثر تحرکات فاکتور مورد نظر — جمع گروهی بر اساس کالا
+        excluded = select(
+            StockMovement.item_id,
+            func.sum(StockMovement.qty).label("qty"),
+        ).where(
+            StockMovement.item_id.in_(item_ids),
+            StockMovement.reference_type == "invoice",
+            StockMovement.reference_id == exclude_invoice_id,
+        ).group_by(StockMovement.item_id).subquery()
+        query = select(
+            ItemStockBalance.item_id,
+            ItemStockBalance.qty_on_hand - func.coalesce(excluded.c.qty, 0),
+        ).outerjoin(excluded, excluded.c.item_id == ItemStockBalance.item_id).where(
+            ItemStockBalance.item_id.in_(item_ids)
+        )
+
+    for item_id, qty in session.execute(query).all():
+        stock[item_id] = _to_decimal(qty)
+    return stock
+
+
+def _movement_totals(session: Session) -> dict:
+    rows = session.execute(
+        select(
+            StockMovement.item_id,
+            func.sum(StockMovement.qty),
+            func.sum(StockMovement.total_cost),
+            func.max(StockMovement.id),
+        ).group_by(StockMovement.item_id)
+    ).all()
+    return {item_id: (_to_decimal(qty), _to_decimal(value), last_id) for item_id, qty, value, last_id in rows}
+
+
+def verify_balances(session: Session) -> list:
+    """مقایسه جدول موجودی با دفتر تحرکات — لیست مغایرت‌ها را برمی‌گرداند"""
+    expected = _movement_totals(session)
+    actual = {
+        b.item_id: (_to_decimal(b.qty_on_hand), _to_decimal(b.value_on_hand), b.last_movement_id)
+        for b in session.query(ItemStockBalance).all()
+    }
+
+    mismatches = []
+    for item_id in sorted(set(expected) | set(actual)):
+        exp = expected.get(item_id, (Decimal("0"), Decimal("0"), None))
+        act = actual.get(item_id, (Decimal("0"), Decimal("0"), None))
+        if (exp[0].quantize(Decimal("0.0001")) != act[0].quantize(Decimal("0.0001"))
+                or exp[1].quantize(Decimal("1")) != act[1].quantize(Decimal("1"))
+                or exp[2] != act[2]):
+            mismatches.append({
+                "item_id": item_id,
+                "expected_qty": exp[0], "actual_qty": act[0],
+                "expected_value": exp[1], "actual_value": act[1],
+                "expected_last_movement_id": exp[2], "actual_last_movement_id": act[2],
+            })
+    return mismatches
+
+
+def rebuild_balances(session: Session) -> int:
+    """بازسازی کامل جدول موجودی از روی دفتر تحرکات — تعداد کالاها را برمی‌گرداند"""
+    session.execute(delete(ItemStockBalance))
+    totals = _movement_totals(session)
+    if totals:
+        session.execute(insert(ItemStockBalance), [
+            {"item_id": item_id, "qty_on_hand": qty, "value_on_hand": value, "last_movement_id": last_id}
+            for item_id, (qty, value, last_id) in totals.items()
+        ])
+    return len(totals)
@@ -1,11 +1,13 @@
 # app/utils/template_engine.py
-import jinja2
-import arabic_reshaper
-from bidi.algorithm import get_display
 from jdatetime import date as jdate
 
 def render_invoice_template(template_body: str, context: dict) -> str:
     """رندر کردن قالب فاکتور با داده‌های فاکتور — با پشتیبانی RTL"""
+    # موتور قالب و ابزار RTL فقط هنگام چاپ بارگذاری می‌شوند
+    import jinja2
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+
     # افزودن توابع کمکی به context
     context['to_jalali'] = lambda greg_date: jdate.fromgregorian(date=greg_date).strftime("%Y/%m/%d") if greg_date else ""
     context['format_price'] = lambda price: f"{int(price):,}" if price else "0"
@@ -0,0 +1,91 @@
+# benchmarks/bench_backup_compression.py
+"""مقایسه فشرده‌سازی بک‌آپ: zip تک‌نخی فعلی در برابر بلوک‌های deflate موازی
+
+اجرا:  python benchmarks/bench_backup_compression.py --size-mb 1024 --levels 1,6,9
+یک دیتابیس آزمایشی با ردیف‌های شبیه اقلام فاکتور ساخته و برای هر سطح، زمان و نسبت فشرده‌سازی
+دو روش گزارش می‌شود. خروجی روش موازی با zipfile (بررسی CRC) اعتبارسنجی می‌شود.
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import zipfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MB = 1024 * 1024
+
+
+def seed(db_path, size_mb, batch=100000):
+    """ساخت دیتابیس تا رسیدن به اندازه خواسته‌شده — متن تکراری و اعداد تصادفی"""
+    rnd = random.Random(42)
+    names = [f"کالا {i} — شرح نمونه" for i in range(5000)]
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE invoice_lines (id INTEGER PRIMARY KEY, invoice_no TEXT, item TEXT,"
+                 " qty REAL, unit_price INTEGER, total INTEGER, note TEXT)")
+    row_id = 0
+    while os.path.getsize(db_path) < size_mb * MB:
+        rows = []
+        for _ in range(batch):
+            row_id += 1
+            qty, price = rnd.randint(1, 50), rnd.randint(1000, 10_000_000)
+            rows.append((row_id, f"INV-{row_id // 20:08d}", rnd.choice(names), qty, price, qty * price,
+                         rnd.choice(("", "تحویل فوری", "پرداخت چکی", f"ارجاع {rnd.randint(1, 99999)}"))))
+        conn.executemany("INSERT INTO invoice_lines VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+    conn.close()
+    return row_id
+
+
+def measure(write, zip_path, entries):
+    started = time.perf_counter()
+    write(zip_path, entries)
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(zip_path)
+    os.remove(zip_path)
+    return elapsed, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--levels", default="1,6,9")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    from app.backup.backup_service import _write_zip
+    from app.backup.parallel_zip import write_parallel_zip
+
+    work_dir = tempfile.mkdtemp(prefix="hg2_bench_")
+    db_path = os.path.join(work_dir, "bench.db")
+    started = time.perf_counter()
+    rows = seed(db_path, args.size_mb)
+    source_size = os.path.getsize(db_path)
+    print(f"داده آزمایشی: {rows:,} ردیف، {source_size / MB:,.0f} MB — {time.perf_counter() - started:.1f} ثانیه")
+
+    entries = [(db_path, "bench.db")]
+    zip_path = os.path.join(work_dir, "bench.zip")
+    for level in (int(value) for value in args.levels.split(",")):
+        single, single_size = measure(lambda path, items: _write_zip(path, items, level=level, workers=1),
+                                      zip_path, entries)
+        write_parallel_zip(zip_path, entries, level=level, workers=args.workers)
+        with zipfile.ZipFile(zip_path) as zipf:
+            assert zipf.testzip() is None
+        os.remove(zip_path)
+        parallel, parallel_size = measure(
+            lambda path, items: write_parallel_zip(path, items, level=level, workers=args.workers), zip_path, entries)
+        print(f"سطح {level}: zip تک‌نخی {single:.1f} ثانیه ({source_size / MB / single:.0f} MB/s، نسبت "
+              f"{source_size / single_size:.2f}) — موازی با {args.workers} نخ {parallel:.1f} ثانیه "
+              f"({source_size / MB / parallel:.0f} MB/s، نسبت {source_size / parallel_size:.2f}) "
+              f"— {single / parallel:.1f}x، حجم {(parallel_size - single_size) * 100 / single_size:+.1f}٪")
+
+    os.remove(db_path)
+    os.rmdir(work_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# benchmarks/bench_stock_overview.py
+"""مقایسه بارگذاری تب انبار: روش قدیم (۳ کوئری برای هر کالا، موجودی با جمع همه تحرکات) در برابر get_stock_overview
+
+اجرا:  python benchmarks/bench_stock_overview.py --items 10000 --movements 1000000
+روش قدیم روی نمونه‌ای از کالاها (--legacy-sample) اجرا و زمانش برای کل کالاها برون‌یابی می‌شود.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(session, items, movements, batch=50000):
+    from sqlalchemy import insert
+    from app.models.unit import Unit
+    from app.models.item import Item
+    from app.models.stock_movement import StockMovement
+    from app.utils.stock_balance import rebuild_balances
+
+    session.execute(insert(Unit), [{"id": 1, "code": "BENCH", "name": "عدد", "factor_to_base": 1}])
+    session.execute(insert(Item), [
+        {"id": i, "sku": f"B{i:06d}", "name": f"کالا {i}", "unit_type": "count", "base_unit_id": 1, "active": True}
+        for i in range(1, items + 1)
+    ])
+
+    rnd = random.Random(42)
+    start = datetime(2024, 1, 1)
+    for offset in range(0, movements, batch):
+        rows = []
+        for n in range(offset, min(offset + batch, movements)):
+            qty = rnd.choice((5, 10, 20)) if rnd.random() < 0.6 else -rnd.choice((1, 2, 3))
+            cost = rnd.randint(1000, 100000)
+            rows.append({
+                "item_id": rnd.randint(1, items), "qty": qty, "unit_id": 1,
+                "movement_type": "purchase_in" if qty > 0 else "sale_out",
+                "cost_per_unit": cost, "total_cost": qty * cost,
+                "created_at": start + timedelta(seconds=n * 30),
+            })
+        session.execute(insert(StockMovement), rows)
+    rebuild_balances(session)
+    session.commit()
+
+
+def legacy_current_stock(session, item_id):
+    """get_current_stock نسخه قبل — خواندن همه تحرکات کالا و جمع در پایتون (بدون جدول موجودی)"""
+    from app.models.stock_movement import StockMovement
+    movements = session.query(StockMovement).filter(StockMovement.item_id == item_id).all()
+    return sum(m.qty for m in movements)
+
+
+def legacy_load(session, item_service, unit_service, stock_service, items):
+    """همان حلقه قبلی StockView.load_data — با محاسبه موجودی از روی کل تحرکات، مثل کد قبلی"""
+    rows = []
+    for item in items:
+        unit = unit_service.get_unit_by_id(item.base_unit_id)
+        stock = legacy_current_stock(session, item.id)
+        last_cost = None
+        for m in reversed(stock_service.get_movements_by_item(item.id)):
+            if m.qty > 0:
+                last_cost = m.cost_per_unit
+                break
+        rows.append((item.id, item.sku, item.name, unit.name if unit else None, stock, last_cost))
+    session.expunge_all()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--movements", type=int, default=1000000)
+    parser.add_argument("--legacy-sample", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='hg2_bench_'), 'bench.db')}"
+    from app.database import SessionLocal, init_db
+    from app.services.item_service import ItemService
+    from app.services.unit_service import UnitService
+    from app.services.stock_service import StockService
+    from app.utils.query_counter import count_queries
+
+    init_db()
+    session = SessionLocal()
+    started = time.perf_counter()
+    seed(session, args.items, args.movements)
+    print(f"داده آزمایشی: {args.items:,} کالا، {args.movements:,} تحرک — {time.perf_counter() - started:.1f} ثانیه")
+
+    item_service, unit_service, stock_service = ItemService(), UnitService(), StockService()
+
+    sample = item_service.get_all_items()[:args.legacy_sample]
+    with count_queries() as counter:
+        started = time.perf_counter()
+        legacy_rows = legacy_load(session, item_service, unit_service, stock_service, sample)
+        legacy_elapsed = time.perf_counter() - started
+    legacy_total = legacy_elapsed * args.items / len(sample)
+    print(f"روش قدیم: {len(sample):,} کالا در {legacy_elapsed:.2f} ثانیه، {counter.count:,} کوئری "
+          f"— برآورد برای همه: {legacy_total:.1f} ثانیه، {counter.count * args.items // len(sample):,} کوئری")
+
+    with count_queries() as counter:
+        started = time.perf_counter()
+        overview = stock_service.get_stock_overview()
+        overview_elapsed = time.perf_counter() - started
+    print(f"get_stock_overview: {len(overview):,} کالا در {overview_elapsed:.2f} ثانیه، {counter.count} کوئری "
+          f"— {legacy_total / overview_elapsed:.0f}x سریع‌تر")
+
+    with count_queries() as counter:
+        started = time.perf_counter()
+        page, _ = stock_service.get_stock_page()
+        page_elapsed = time.perf_counter() - started
+    print(f"صفحه اول تب انبار: {len(page)} ردیف در {page_elapsed * 1000:.1f} میلی‌ثانیه، {counter.count} کوئری")
+
+    # صحت: نتیجه دو روش برای نمونه یکسان است
+    by_id = {row[0]: row for row in overview}
+    for item_id, _, _, unit_name, stock, last_cost in legacy_rows:
+        row = by_id[item_id]
+        assert (row[3], row[5], row[6]) == (unit_name, stock, last_cost), item_id
+    print("✅ خروجی دو روش یکسان است.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+# tests/conftest.py
+import os
+import tempfile
+
+# ✅ تست‌ها روی یک دیتابیس موقت اجرا می‌شوند — instance/app.db دست نمی‌خورد
+# (باید پیش از import شدن app.database تنظیم شود)
+_test_db_dir = tempfile.mkdtemp(prefix="hg2_tests_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_test_db_dir, 'app.db')}")
+
+import pytest
+from types import SimpleNamespace
+
+
+@pytest.fixture(scope="session")
+def refs():
+    """رکوردهای والد مشترک (کاربر، طرف‌حساب، حساب بانکی) — foreign_keys در SQLite فعال است"""
+    from app.database import SessionLocal, init_db
+    from app.models.role import Role
+    from app.models.user import User
+    from app.models.party import Party
+    from app.models.ledger_account import LedgerAccount
+    from app.models.bank_account import BankAccount
+
+    init_db()
+    db = SessionLocal()
+    role = Role(name="test-role", permissions="{}")
+    db.add(role)
+    db.flush()
+    user = User(username="test-user", password_hash="-", full_name="کاربر تست", role_id=role.id)
+    party = Party(code="TEST-PARTY", name="طرف‌حساب تست", party_type="both")
+    ledger = LedgerAccount(code="TEST-1.1", name="بانک تست", account_type="asset")
+    db.add_all([user, party, ledger])
+    db.flush()
+    bank = BankAccount(name="حساب تست", bank_name="ملی", account_number="1", ledger_account_id=ledger.id)
+    db.add(bank)
+    db.commit()
+    result = SimpleNamespace(user_id=user.id, party_id=party.id, party_code=party.code, bank_account_id=bank.id)
+    db.close()
+    return result
@@ -13,15 +13,183 @@ def test_backup_creation():
     os.rmdir("test_backups")
 
 def test_backup_with_encryption():
+    from app.database import init_db
     from app.utils.crypto import generate_key
+    init_db()  # بازیابی بدون دیتابیس در بک‌آپ خطا می‌دهد
     key = generate_key()
     backup_file = BackupService.create_backup(backup_path="test_backups", encrypt=True, key=key)
     assert os.path.exists(backup_file)
     assert backup_file.endswith(".enc")
     # بازیابی و بررسی
-    restored = RestoreService.restore_backup(backup_file, encrypt=True, key=key)
-    assert restored is True
+    report = RestoreService.restore_backup(backup_file, encrypt=True, key=key)
+    assert report["files"] >= 1 and report["bytes"] > 0
+    # فایل بازگشایی‌شده موقت پس از بازیابی حذف می‌شود
+    assert os.listdir("test_backups") == [os.path.basename(backup_file)]
     # پاک‌سازی
-    os.remove(backup_file.replace('.enc', '.zip'))
     os.remove(backup_file)
-    os.rmdir("test_backups")
\ No newline at end of file
+    os.rmdir("test_backups")
+
+def test_backup_snapshot_while_writing(tmp_path):
+    import sqlite3
+    import threading
+    import zipfile
+    from app.database import engine, init_db
+    init_db()
+
+    # نوشتن هم‌زمان در دیتابیس در حین بک‌آپ
+    stop = threading.Event()
+    def writer():
+        with engine.connect() as conn:
+            while not stop.is_set():
+                conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS backup_probe (value INTEGER)")
+                conn.exec_driver_sql("INSERT INTO backup_probe (value) VALUES (1)")
+                conn.commit()
+    thread = threading.Thread(target=writer)
+    thread.start()
+    stages = set()
+    try:
+        backup_file = BackupService.create_backup(backup_path=str(tmp_path),
+                                                  on_progress=lambda stage, done, total: stages.add(stage))
+    finally:
+        stop.set()
+        thread.join()
+        with engine.connect() as conn:
+            conn.exec_driver_sql("DROP TABLE IF EXISTS backup_probe")
+            conn.commit()
+
+    assert stages == {"snapshot", "compress"}
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(backup_file)]
+    with zipfile.ZipFile(backup_file) as zipf:
+        (name,) = [n for n in zipf.namelist() if n.endswith(".db")]
+        zipf.extract(name, tmp_path / "restored")
+    conn = sqlite3.connect(tmp_path / "restored" / name)
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+    finally:
+        conn.close()
+
+def _restore_target(tmp_path):
+    live = tmp_path / "live"
+    (live / "attachments").mkdir(parents=True)
+    (live / "attachments" / "old.txt").write_text("قبلی")
+    (live / "app.db").write_bytes(b"current database")
+    return str(live / "app.db"), str(live / "attachments")
+
+def test_streaming_restore_verifies_before_swap(tmp_path):
+    import sqlite3
+    from app.backup.restore_service import schema_revisions
+    from app.database import engine, init_db
+    from app.utils.crypto import generate_key
+    init_db()
+    heads, _ = schema_revisions()
+    with engine.connect() as conn:
+        conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL)")
+        conn.exec_driver_sql("INSERT INTO alembic_version VALUES (?)", (sorted(heads)[0],))
+        conn.commit()
+    key = generate_key()
+    try:
+        backup_file = BackupService.create_backup(backup_path=str(tmp_path / "backups"), encrypt=True, key=key)
+    finally:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("DROP TABLE alembic_version")
+            conn.commit()
+
+    db_path, attachments = _restore_target(tmp_path)
+    stages = set()
+    report = RestoreService.restore_backup(backup_file, encrypt=True, key=key, db_path=db_path,
+                                           attachments_path=attachments,
+                                           on_progress=lambda stage, done, total: stages.add(stage))
+    assert stages == {"extract", "verify"}
+    assert report["schema_version"] == sorted(heads)[0] and not report["needs_upgrade"]
+    assert report["mb_per_second"] is not None
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+    finally:
+        conn.close()
+    # بک‌آپ پیوستی نداشت — پیوست‌های فعلی دست نمی‌خورند؛ پوشه موقتی باقی نمی‌ماند
+    assert os.listdir(attachments) == ["old.txt"]
+    assert sorted(os.listdir(tmp_path / "live")) == ["app.db", "attachments"]
+
+def test_failed_restore_leaves_target_untouched(tmp_path):
+    import sqlite3
+    import zipfile
+    from app.backup.restore_service import RestoreError
+    from app.utils.crypto import DecryptionError, generate_key
+
+    # دیتابیس با نسخه ساختار ناشناخته (بک‌آپ از نسخه جدیدتر برنامه)
+    newer = tmp_path / "newer.db"
+    conn = sqlite3.connect(newer)
+    conn.execute("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)")
+    conn.execute("INSERT INTO alembic_version VALUES ('999_from_the_future')")
+    conn.commit()
+    conn.close()
+    newer_backup = tmp_path / "newer.zip"
+    with zipfile.ZipFile(newer_backup, "w", zipfile.ZIP_DEFLATED) as zipf:
+        zipf.write(newer, "app.db")
+        zipf.writestr("storage/attachments/new.txt", "جدید")
+
+    # بک‌آپ رمزشده بریده‌شده
+    key = generate_key()
+    truncated = BackupService.create_backup(backup_path=str(tmp_path / "backups"), encrypt=True, key=key)
+    with open(truncated, "r+b") as f:
+        f.truncate(os.path.getsize(truncated) // 2)
+
+    db_path, attachments = _restore_target(tmp_path)
+    with pytest.raises(RestoreError, match="ناشناخته"):
+        RestoreService.restore_backup(str(newer_backup), db_path=db_path, attachments_path=attachments)
+    with pytest.raises(DecryptionError):
+        RestoreService.restore_backup(truncated, encrypt=True, key=key, db_path=db_path, attachments_path=attachments)
+
+    with open(db_path, "rb") as f:
+        assert f.read() == b"current database"
+    assert os.listdir(attachments) == ["old.txt"]
+    assert sorted(os.listdir(tmp_path / "live")) == ["app.db", "attachments"]
+
+def test_parallel_compression_round_trip(tmp_path):
+    import io
+    import random
+    import sqlite3
+    import zipfile
+    import zlib
+    from concurrent.futures import ThreadPoolExecutor
+    from app.backup.parallel_zip import deflate_parallel
+    from app.database import init_db
+
+    # بلوک‌های کوچک — چسباندن چند بلوک با دیکشنری یک جریان deflate معتبر می‌سازد
+    rnd = random.Random(7)
+    data = b"".join(f"{rnd.randint(0, 999)} ردیف {i}\n".encode() for i in range(20000))
+    out = io.BytesIO()
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        crc, size, compressed = deflate_parallel(io.BytesIO(data), out.write, pool, 3, level=1, block_size=4096)
+    assert (crc, size, compressed) == (zlib.crc32(data), len(data), len(out.getvalue()))
+    assert zlib.decompress(out.getvalue(), -zlib.MAX_WBITS) == data
+
+    init_db()
+    backup_file = BackupService.create_backup(backup_path=str(tmp_path / "backups"), level=1, workers=3)
+    with zipfile.ZipFile(backup_file) as zipf:
+        assert zipf.testzip() is None
+    db_path = str(tmp_path / "restored" / "app.db")
+    report = RestoreService.restore_backup(backup_file, db_path=db_path, attachments_path=str(tmp_path / "attachments"))
+    assert report["files"] >= 1
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+    finally:
+        conn.close()
+
+def test_single_threaded_zip_honours_level(tmp_path):
+    import random
+    import zipfile
+    from app.backup.backup_service import _write_zip
+    rnd = random.Random(3)
+    source = tmp_path / "data.db"
+    source.write_bytes(b"".join(f"{rnd.randint(0, 10 ** 6)} ردیف\n".encode() for _ in range(50000)))
+    sizes = {}
+    for level in (1, 9):
+        zip_path = tmp_path / f"level{level}.zip"
+        _write_zip(str(zip_path), [(str(source), "data.db")], level=level)
+        with zipfile.ZipFile(zip_path) as zipf:
+            assert zipf.testzip() is None
+            sizes[level] = zipf.getinfo("data.db").compress_size
+    assert sizes[9] < sizes[1]
@@ -0,0 +1,92 @@
+# tests/test_backup_store.py
+import os
+import sqlite3
+import pytest
+from datetime import datetime, timedelta
+from app.database import DATABASE_URL, engine, init_db
+from app.backup.backup_store import BackupStore, BackupStoreError, select_retained
+
+DB_NAME = os.path.basename(DATABASE_URL.replace("sqlite:///", ""))
+
+def _integrity(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_incremental_backups_share_chunks_and_restore_any_point(tmp_path):
+    init_db()
+    store = BackupStore.init(str(tmp_path / "repo"), chunk_size=4096)
+    first = store.create_backup()
+    assert first["new_chunks"] > 0 and first["files"] >= 1
+
+    # تغییر کوچک — فقط قطعه‌های صفحه‌های تغییرکرده جدیدند
+    with engine.connect() as conn:
+        conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS store_probe (value TEXT)")
+        conn.exec_driver_sql("INSERT INTO store_probe (value) VALUES ('second')")
+        conn.commit()
+    try:
+        second = store.create_backup()
+    finally:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("DROP TABLE store_probe")
+            conn.commit()
+    assert 0 < second["new_chunks"] < second["chunks"] / 2
+
+    assert [b["backup_id"] for b in store.list_backups()] == [first["backup_id"], second["backup_id"]]
+    for stats, has_probe in ((first, False), (second, True)):
+        target = tmp_path / stats["backup_id"]
+        store.restore(stats["backup_id"], str(target))
+        restored = str(target / DB_NAME)
+        assert _integrity(restored) == "ok"
+        conn = sqlite3.connect(restored)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+        assert ("store_probe" in tables) == has_probe
+
+    assert store.verify()["ok"]
+
+    # هرس — فقط آخرین بک‌آپ می‌ماند و قطعه‌های بی‌مرجع حذف می‌شوند
+    result = store.prune(hourly=1, daily=0, monthly=0)
+    assert result["removed_backups"] == [first["backup_id"]] and result["removed_chunks"] > 0
+    report = store.verify()
+    assert report["ok"] and report["backups"] == 1
+
+def test_verify_detects_missing_and_corrupt_chunks(tmp_path):
+    init_db()
+    store = BackupStore.init(str(tmp_path / "repo"), chunk_size=4096)
+    store.create_backup()
+    chunks = sorted(path for _, path in store._stored_chunks())
+    with open(chunks[0], "r+b") as f:
+        data = bytearray(f.read())
+        data[len(data) // 2] ^= 0xFF
+        f.seek(0)
+        f.write(data)
+    os.remove(chunks[1])
+
+    report = store.verify()
+    assert not report["ok"]
+    assert len(report["corrupt"]) == 1 and len(report["missing"]) >= 1
+    assert store.verify(full=False)["corrupt"] == []
+
+def test_encrypted_store_requires_the_key(tmp_path):
+    init_db()
+    repo = str(tmp_path / "repo")
+    stats = BackupStore.init(repo, key="گذرواژه مخزن", chunk_size=65536).create_backup()
+    with pytest.raises(BackupStoreError):
+        BackupStore(repo)
+    with pytest.raises(BackupStoreError):
+        BackupStore(repo, key="wrong")
+    store = BackupStore(repo, key="گذرواژه مخزن")
+    store.restore(stats["backup_id"], str(tmp_path / "restored"))
+    assert _integrity(str(tmp_path / "restored" / DB_NAME)) == "ok"
+
+def test_retention_policy():
+    now = datetime(2025, 6, 15, 12, 30)
+    backups = [{"backup_id": f"b{i}", "created_at": now - timedelta(minutes=30 * i)} for i in range(24 * 4 * 2)]
+    # هر ساعت دو بک‌آپ، چهار روز
+    kept = select_retained(backups, hourly=3, daily=2, monthly=1)
+    # ۳ ساعت اخیر (آخرین بک‌آپ هر ساعت) + آخرین بک‌آپ دیروز؛ امروز و این ماه همان b0 است
+    yesterday_last = next(b["backup_id"] for b in backups if b["created_at"].day == 14)
+    assert kept == {"b0", "b2", "b4", yesterday_last}
@@ -0,0 +1,78 @@
+# tests/test_check_schedule.py
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import select
+from app.database import SessionLocal, init_db
+from app.models.bank_account import BankAccount
+from app.models.check_due_summary import CheckDueSummary
+from app.models.ledger_account import LedgerAccount
+from app.services.check_service import CheckService
+from app.services.check_schedule_service import CheckScheduleService
+
+TODAY = date(2033, 1, 1)
+
+@pytest.fixture(scope="module")
+def bank():
+    """حساب بانکی جداگانه — چک‌های تست‌های دیگر در نتیجه‌ها نیایند"""
+    init_db()
+    db = SessionLocal()
+    ledger = LedgerAccount(code="CDS-1", name="بانک سررسید", account_type="asset")
+    db.add(ledger)
+    db.flush()
+    bank = BankAccount(name="حساب سررسید", bank_name="ملت", account_number="2", ledger_account_id=ledger.id)
+    db.add(bank)
+    db.commit()
+    bank_id = bank.id
+    db.close()
+    return bank_id
+
+def _check(refs, bank, number, direction, due_in, status, amount=1000):
+    return CheckService().create_check({
+        "check_number": f"CDS-{number}", "bank_name": "ملت", "account_number": "2", "direction": direction,
+        "amount": amount, "issue_date": TODAY - timedelta(days=30), "due_date": TODAY + timedelta(days=due_in),
+        "status": status, "bank_account_id": bank, "created_by": refs.user_id,
+    }).id
+
+def _summary(bank):
+    db = SessionLocal()
+    try:
+        return db.execute(select(CheckDueSummary.due_date, CheckDueSummary.direction, CheckDueSummary.check_count,
+                                 CheckDueSummary.total_amount)
+                          .where(CheckDueSummary.bank_account_id == bank)
+                          .order_by(CheckDueSummary.due_date, CheckDueSummary.direction)).all()
+    finally:
+        db.close()
+
+def _counts(aging):
+    return {key: value["count"] for key, value in aging.items()}
+
+def test_schedule_and_aging_follow_status_changes(refs, bank):
+    checks, schedule = CheckService(), CheckScheduleService()
+    soon = _check(refs, bank, 1, "received", 3, "in_hand", 2000)
+    later = _check(refs, bank, 2, "received", 20, "registered", 3000)
+    overdue = _check(refs, bank, 3, "issued", -5, "issued", 4000)
+    _check(refs, bank, 4, "received", 100, "in_hand")
+    _check(refs, bank, 5, "received", 3, "cleared")   # وصول‌شده — در خلاصه نیست
+
+    aging = schedule.aging(TODAY, bank_account_id=bank)
+    assert _counts(aging) == {"overdue": 1, "0-7": 1, "8-30": 1, "31-90": 0}
+    assert aging["overdue"]["amount"] == 4000
+    assert [row.id for row in schedule.due_within(7, TODAY, bank_account_id=bank)] == [soon]
+    assert [row.id for row in schedule.due_within(30, TODAY, bank_account_id=bank, direction="issued")] == []
+    totals = [row for row in schedule.due_totals(30, TODAY) if row["bank_account_id"] == bank]
+    assert totals == [{"bank_account_id": bank, "bank_account": "حساب سررسید", "direction": "received",
+                       "count": 2, "amount": 5000}]
+
+    # تغییر وضعیت، سررسید و حذف — خلاصه به‌صورت افزایشی
+    checks.change_check_status(soon, "deposit")
+    assert _counts(schedule.aging(TODAY, bank_account_id=bank))["0-7"] == 1
+    checks.change_check_status(soon, "clear")
+    checks.update_check(later, {"due_date": TODAY + timedelta(days=40)})
+    checks.delete_check(overdue)
+    assert _counts(schedule.aging(TODAY, bank_account_id=bank)) == {"overdue": 0, "0-7": 0, "8-30": 0, "31-90": 1}
+    assert schedule.daily_summary(TODAY, TODAY + timedelta(days=365), "received")[-2:] == [
+        (TODAY + timedelta(days=40), "received", 1, 3000), (TODAY + timedelta(days=100), "received", 1, 1000)]
+
+    incremental = _summary(bank)
+    schedule.rebuild_summary()
+    assert _summary(bank) == incremental
@@ -0,0 +1,55 @@
+# tests/test_check_transitions.py
+import pytest
+from datetime import date
+from sqlalchemy import event
+from app.database import engine, init_db
+from app.services.check_service import CheckService
+from app.utils.state_machine import TRANSITION_TABLE, next_status
+
+def _checks(refs, count, status="in_hand"):
+    service = CheckService()
+    return [service.create_check({
+        "check_number": f"BULK-{status}-{i}", "bank_name": "ملی", "account_number": "1", "direction": "received",
+        "amount": 1000, "issue_date": date(2034, 1, 1), "due_date": date(2034, 2, 1), "status": status,
+        "bank_account_id": refs.bank_account_id, "created_by": refs.user_id,
+    }).id for i in range(count)]
+
+def test_transition_table():
+    assert next_status("deposit", "in_hand") == "deposited"
+    assert next_status("cancel", "cleared") == "cancelled"
+    assert ("clear", "in_hand") not in TRANSITION_TABLE
+    with pytest.raises(ValueError):
+        next_status("clear", "in_hand")
+    with pytest.raises(ValueError):
+        next_status("no-such-event", "in_hand")
+
+def test_bulk_transition_is_all_or_nothing_with_one_update(refs):
+    init_db()
+    service = CheckService()
+    ids = _checks(refs, 30)
+    (cleared,) = _checks(refs, 1, status="cleared")
+
+    # یک چک نامعتبر — هیچ چکی تغییر نمی‌کند
+    with pytest.raises(ValueError, match=f"چک {cleared}"):
+        service.bulk_transition(ids + [cleared], "deposit")
+    assert {service.get_check_by_id(check_id).status for check_id in ids} == {"in_hand"}
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert service.bulk_transition(ids, "deposit", changed_by=refs.user_id) == 30
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len([s for s in statements if s.startswith("UPDATE checks")]) == 1
+    assert {service.get_check_by_id(check_id).status for check_id in ids} == {"deposited"}
+
+    service.change_check_status(ids[0], "clear")
+    history = service.get_status_history(ids[0])
+    assert [(h.event, h.from_status, h.to_status) for h in history] == [
+        ("deposit", "in_hand", "deposited"), ("clear", "deposited", "cleared")]
+    assert history[0].changed_by == refs.user_id
+
+    # تاریخچه پس از حذف چک می‌ماند
+    service.delete_check(ids[0])
+    assert len(service.get_status_history(ids[0])) == 2
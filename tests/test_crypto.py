@@ -0,0 +1,53 @@
+# tests/test_crypto.py
+import io
+import os
+import pytest
+from app.utils.crypto import DecryptionError, decrypt_file, decrypt_stream, encrypt_file, encrypt_stream
+
+KEY = b"0123456789abcdef0123456789abcdef"
+
+def _roundtrip(data, chunk_size):
+    encrypted = io.BytesIO()
+    assert encrypt_stream(io.BytesIO(data), encrypted, KEY, chunk_size=chunk_size) == len(data)
+    decrypted = io.BytesIO()
+    assert decrypt_stream(io.BytesIO(encrypted.getvalue()), decrypted, KEY) == len(data)
+    return encrypted.getvalue(), decrypted.getvalue()
+
+@pytest.mark.parametrize("size", [0, 1, 64, 100, 1000])
+def test_chunked_roundtrip(size):
+    data = os.urandom(size)
+    encrypted, decrypted = _roundtrip(data, chunk_size=64)
+    assert decrypted == data
+
+def test_tampering_truncation_and_wrong_key_are_detected():
+    encrypted, _ = _roundtrip(os.urandom(300), chunk_size=64)
+    flipped = bytearray(encrypted)
+    flipped[-20] ^= 1
+    frame = 5 + 64 + 16  # پرچم + طول + قطعه کامل + برچسب
+    for broken, key in ((bytes(flipped), KEY), (encrypted[:-frame + 1], KEY), (encrypted, b"wrong key")):
+        with pytest.raises(DecryptionError):
+            decrypt_stream(io.BytesIO(broken), io.BytesIO(), key)
+    # حذف یک قطعه کامل از میانه — ترتیب قطعه‌ها احراز می‌شود (۴ قطعه کامل و یک قطعه ۴۴ بایتی)
+    header = len(encrypted) - 4 * frame - (5 + 44 + 16)
+    dropped = encrypted[:header] + encrypted[header + frame:]
+    with pytest.raises(DecryptionError):
+        decrypt_stream(io.BytesIO(dropped), io.BytesIO(), KEY)
+
+def test_files_and_legacy_fernet_format(tmp_path):
+    from cryptography.fernet import Fernet
+    source = tmp_path / "backup.zip"
+    source.write_bytes(os.urandom(3 * 1024 * 1024 + 7))
+
+    encrypted = encrypt_file(str(source), KEY)
+    assert encrypted == str(source) + ".enc"
+    restored = decrypt_file(encrypted, KEY, output_path=str(tmp_path / "restored.zip"))
+    assert open(restored, "rb").read() == source.read_bytes()
+
+    # فایل‌های .enc نسخه‌های قبل — یک توکن Fernet
+    key = Fernet.generate_key()
+    legacy = tmp_path / "old.zip.enc"
+    legacy.write_bytes(Fernet(key).encrypt(b"legacy backup"))
+    assert open(decrypt_file(str(legacy), key), "rb").read() == b"legacy backup"
+    with pytest.raises(DecryptionError):
+        decrypt_file(str(legacy), Fernet.generate_key())
+    assert not os.path.exists(tmp_path / "old.zip")
@@ -0,0 +1,40 @@
+# tests/test_database.py
+import pytest
+from app.database import engine, unit_of_work, init_db
+from app.models.unit import Unit
+from app.utils.code_generator import generate_unit_code
+
+
+@pytest.fixture(scope="module", autouse=True)
+def schema():
+    init_db()
+
+
+def test_sqlite_pragmas_applied():
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+
+
+def test_nested_unit_of_work_shares_one_transaction():
+    code = generate_unit_code()
+    with pytest.raises(RuntimeError):
+        with unit_of_work() as outer:
+            with unit_of_work() as inner:
+                assert inner is outer
+                inner.add(Unit(code=code, name="تو در تو", factor_to_base=1.0))
+            outer.flush()
+            raise RuntimeError("خطا پس از واحد کار داخلی")
+
+    # commit داخلی انجام نشده — کل تراکنش برگشت خورده است
+    with unit_of_work() as db:
+        assert db.query(Unit).filter(Unit.code == code).count() == 0
+
+
+def test_objects_usable_after_unit_of_work_closes():
+    with unit_of_work() as db:
+        unit = Unit(code=generate_unit_code(), name="پس از بستن", factor_to_base=1.0)
+        db.add(unit)
+        db.flush()
+    assert unit.id is not None and unit.name == "پس از بستن"
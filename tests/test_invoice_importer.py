@@ -0,0 +1,86 @@
+# tests/test_invoice_importer.py
+import csv
+import pytest
+from decimal import Decimal
+from app.database import SessionLocal, init_db
+from app.models.unit import Unit
+from app.models.item import Item
+from app.models.invoice import Invoice
+from app.models.invoice_line import InvoiceLine
+from app.models.stock_movement import StockMovement
+from app.services.stock_service import StockService
+from app.importer.invoice_importer import InvoiceImporter
+from app.utils.code_generator import generate_sku, generate_unit_code
+
+HEADER = ["serial_full", "invoice_type", "party_code", "date", "sku", "qty", "unit_price", "notes"]
+
+@pytest.fixture(scope="module")
+def db():
+    init_db()
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def item(db):
+    unit = Unit(code=generate_unit_code(), name="عدد", factor_to_base=1.0)
+    db.add(unit)
+    db.commit()
+    item = Item(sku=generate_sku(), name="کالای ورودی", unit_type="count", base_unit_id=unit.id, active=True)
+    db.add(item)
+    db.commit()
+    return item
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return str(path)
+
+def test_import_csv_in_batches_with_row_errors(db, item, refs, tmp_path):
+    party = refs.party_code
+    path = _write_csv(tmp_path / "invoices.csv", [
+        [f"IMP-{item.id}-1", "purchase", party, "1404/01/10", item.sku, "10", "1,000", ""],
+        [f"IMP-{item.id}-1", "purchase", party, "1404/01/10", item.sku, "۵", "1000", "ارقام فارسی"],
+        [f"IMP-{item.id}-2", "sale", party, "2025-04-05", item.sku, "6", "2500", ""],
+        [f"IMP-{item.id}-3", "sale", party, "2025-04-06", "NO-SUCH-SKU", "1", "2500", ""],
+        [f"IMP-{item.id}-4", "sale", "NO-PARTY", "2025-04-06", item.sku, "1", "2500", ""],
+        [f"IMP-{item.id}-5", "sale", party, "2025-04-07", item.sku, "2", "2500", ""],
+    ])
+
+    report = InvoiceImporter(refs.user_id, batch_size=2).run(path)
+
+    assert (report.invoices, report.lines) == (3, 4)
+    assert [(row, serial) for row, serial, _ in report.errors] == [(5, f"IMP-{item.id}-3"), (6, f"IMP-{item.id}-4")]
+    assert report.invoices_per_second > 0
+
+    purchase = db.query(Invoice).filter(Invoice.serial_full == f"IMP-{item.id}-1").one()
+    assert (purchase.serial, purchase.number, purchase.total) == ("IMP", 1, 15000)
+    assert db.query(InvoiceLine).filter(InvoiceLine.invoice_id == purchase.id).count() == 2
+
+    # موجودی و بها مثل ثبت از طریق InvoiceService — میانگین متحرک روی تاریخ فاکتورها
+    stock = StockService()
+    assert stock.get_current_stock(item.id) == Decimal("7")
+    assert [m for m in stock.verify_balances() if m["item_id"] == item.id] == []
+    sale = db.query(Invoice).filter(Invoice.serial_full == f"IMP-{item.id}-2").one()
+    movement = db.query(StockMovement).filter(StockMovement.reference_id == sale.id,
+                                              StockMovement.reference_type == "invoice").one()
+    assert int(movement.total_cost) == -6000
+
+    # ورود دوباره همان فایل — همه فاکتورها تکراری‌اند
+    again = InvoiceImporter(refs.user_id).run(path)
+    assert again.invoices == 0 and len(again.errors) == 5
+
+def test_import_xlsx(db, item, refs, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER)
+    sheet.append([f"XLS-{item.id}-1", "purchase", refs.party_code, "1404/02/01", item.sku, 3, 700, None])
+    path = str(tmp_path / "invoices.xlsx")
+    workbook.save(path)
+
+    report = InvoiceImporter(refs.user_id).run(path)
+    assert (report.invoices, report.errors) == (1, [])
+    assert StockService().get_current_stock(item.id) == Decimal("3")
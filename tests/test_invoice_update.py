@@ -0,0 +1,134 @@
+# tests/test_invoice_update.py
+import pytest
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import event, update
+from app.database import SessionLocal, engine, init_db
+from app.models.unit import Unit
+from app.models.item import Item
+from app.models.invoice_line import InvoiceLine
+from app.models.stock_movement import StockMovement
+from app.models.item_stock_balance import ItemStockBalance
+from app.services.stock_service import StockService
+from app.services.invoice_service import InvoiceService
+from app.utils.code_generator import generate_sku, generate_unit_code
+
+@pytest.fixture(scope="module")
+def db():
+    init_db()
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def items(db):
+    unit = Unit(code=generate_unit_code(), name="عدد", factor_to_base=1.0)
+    db.add(unit)
+    db.commit()
+    items = [Item(sku=generate_sku(), name=f"کالای ویرایش {i}", unit_type="count", base_unit_id=unit.id, active=True)
+             for i in range(3)]
+    db.add_all(items)
+    db.commit()
+    return [(item.id, unit.id) for item in items]
+
+def _header(refs, invoice_type, serial_full):
+    return {"invoice_type": invoice_type, "serial": "INV", "number": 1, "serial_full": serial_full,
+            "party_id": refs.party_id, "date_gregorian": date(2025, 4, 5), "date_jalali": "1404/01/16",
+            "created_by": refs.user_id, "tax": 0, "discount": 0, "shipping": 0}
+
+def _line(item, qty, price, **extra):
+    item_id, unit_id = item
+    return {"item_id": item_id, "qty": qty, "unit_id": unit_id, "unit_price": price, **extra}
+
+def _lines(db, invoice_id):
+    db.expire_all()
+    return {line.id: line for line in db.query(InvoiceLine).filter(InvoiceLine.invoice_id == invoice_id)}
+
+def _movements(db, invoice_id):
+    return {m.invoice_line_id: m for m in db.query(StockMovement).filter(
+        StockMovement.reference_type == "invoice", StockMovement.reference_id == invoice_id)}
+
+def _mismatches(items):
+    ids = {item_id for item_id, _ in items}
+    return [m for m in StockService().verify_balances() if m["item_id"] in ids]
+
+def test_update_applies_only_the_line_diff(db, items, refs):
+    service = InvoiceService()
+    header = _header(refs, "purchase", f"INV-DIFF-{items[0][0]}")
+    invoice = service.create_invoice(header, [_line(items[0], 10, 1000), _line(items[1], 5, 2000)])
+    first, second = sorted(_lines(db, invoice.id))
+    movement_ids = {line_id: m.id for line_id, m in _movements(db, invoice.id).items()}
+
+    summary = service.update_invoice(invoice.id, header, [
+        _line(items[0], 12, 1000, id=first),   # تغییر مقدار
+        _line(items[2], 3, 500),               # خط جدید؛ خط دوم حذف می‌شود
+    ])
+
+    assert (summary.updated, summary.deleted, summary.unchanged, summary.rebuilt) == ([first], [second], [], False)
+    assert len(summary.inserted) == 1 and summary.changed
+    assert summary.invoice.subtotal == 12 * 1000 + 3 * 500 and summary.invoice.total == summary.invoice.subtotal
+
+    lines = _lines(db, invoice.id)
+    assert set(lines) == {first, summary.inserted[0]}
+    assert lines[first].qty == Decimal("12")
+    movements = _movements(db, invoice.id)
+    assert movements[first].id == movement_ids[first]  # تحرک در محل اصلاح شد، نه حذف و ایجاد مجدد
+    assert movements[first].qty == Decimal("12") and int(movements[first].total_cost) == 12000
+
+    stock = StockService()
+    assert [stock.get_current_stock(item_id) for item_id, _ in items] == [Decimal("12"), Decimal("0"), Decimal("3")]
+    assert _mismatches(items) == []
+
+def test_unchanged_update_writes_no_lines_or_movements(db, items, refs):
+    service = InvoiceService()
+    header = _header(refs, "purchase", f"INV-SAME-{items[0][0]}")
+    invoice = service.create_invoice(header, [_line(items[0], 4, 1000, notes="یادداشت")])
+    line_id = next(iter(_lines(db, invoice.id)))
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        summary = service.update_invoice(invoice.id, header, [_line(items[0], 4.0, 1000, id=line_id, notes="یادداشت")])
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert (summary.unchanged, summary.changed) == ([line_id], False)
+    writes = [s for s in statements if s.lstrip().split(None, 1)[0] in ("INSERT", "UPDATE", "DELETE")
+              and ("invoice_lines" in s or "stock_movements" in s or "item_stock_balance" in s)]
+    assert writes == []
+
+def test_sale_qty_change_recosts_movement(db, items, refs):
+    service = InvoiceService()
+    StockService().add_movement({"item_id": items[0][0], "qty": 10.0, "unit_id": items[0][1],
+                                 "movement_type": "purchase_in", "cost_per_unit": 1000,
+                                 "reference_type": "manual", "reference_id": None})
+    header = _header(refs, "sale", f"INV-SALE-DIFF-{items[0][0]}")
+    invoice = service.create_invoice(header, [_line(items[0], 4, 2500)])
+    line_id = next(iter(_lines(db, invoice.id)))
+
+    service.update_invoice(invoice.id, header, [_line(items[0], 6, 2500, id=line_id)])
+
+    movement = _movements(db, invoice.id)[line_id]
+    assert movement.qty == Decimal("-6") and int(movement.total_cost) == -6000  # بهای تمام‌شده، نه قیمت فروش
+    balance = db.get(ItemStockBalance, items[0][0])
+    db.refresh(balance)
+    assert (balance.qty_on_hand, int(balance.value_on_hand)) == (Decimal("4"), 4000)
+    assert _mismatches(items) == []
+
+def test_legacy_invoice_is_rebuilt(db, items, refs):
+    service = InvoiceService()
+    header = _header(refs, "purchase", f"INV-LEGACY-{items[0][0]}")
+    invoice = service.create_invoice(header, [_line(items[0], 2, 1000)])
+    old_id = next(iter(_lines(db, invoice.id)))
+    # تحرک ثبت‌شده پیش از پیوند تحرک به خط فاکتور
+    db.execute(update(StockMovement).where(StockMovement.reference_id == invoice.id,
+                                           StockMovement.reference_type == "invoice").values(invoice_line_id=None))
+    db.commit()
+
+    summary = service.update_invoice(invoice.id, header, [_line(items[0], 5, 1000, id=old_id)])
+
+    assert summary.rebuilt and summary.deleted == [old_id] and len(summary.inserted) == 1
+    assert set(_movements(db, invoice.id)) == set(summary.inserted)
+    assert StockService().get_current_stock(items[0][0]) == Decimal("5")
+    assert _mismatches(items) == []
@@ -0,0 +1,112 @@
+# tests/test_ledger_period_balances.py
+import pytest
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import select
+from app.database import SessionLocal, init_db
+from app.models.ledger_account import LedgerAccount
+from app.models.ledger_period_balance import LedgerPeriodBalance
+from app.models.party import Party
+from app.services.accounting_service import AccountingService
+
+@pytest.fixture(scope="module")
+def accounts():
+    init_db()
+    db = SessionLocal()
+    receivable = LedgerAccount(code="LPB1", name="دریافتنی", account_type="asset")
+    sales = LedgerAccount(code="LPB4", name="فروش", account_type="income")
+    party = Party(code="LPB-PARTY", name="مشتری دوره", party_type="customer")
+    db.add_all([receivable, sales, party])
+    db.commit()
+    ids = {"receivable": receivable.id, "sales": sales.id, "party": party.id}
+    db.close()
+    return ids
+
+def _entry(refs, accounts, period, amount, posted=True):
+    """فروش نسیه (amount مثبت) یا برگشت (amount منفی) به طرف‌حساب"""
+    year, month = map(int, period.split("-"))
+    debit, credit = (amount, 0) if amount > 0 else (0, -amount)
+    return AccountingService().create_journal_entry(
+        {"date": date(year, month, 1), "period": period, "source_type": "adjustment", "source_id": 0,
+         "created_by": refs.user_id, "posted": posted},
+        [{"ledger_account_id": accounts["receivable"], "debit": debit, "credit": credit, "party_id": accounts["party"]},
+         {"ledger_account_id": accounts["sales"], "debit": credit, "credit": debit}],
+    )
+
+def _snapshot(account_id, party_id, period):
+    db = SessionLocal()
+    try:
+        return db.execute(select(
+            LedgerPeriodBalance.debit_total, LedgerPeriodBalance.credit_total,
+            LedgerPeriodBalance.closing_balance, LedgerPeriodBalance.is_closed,
+        ).where(LedgerPeriodBalance.account_id == account_id, LedgerPeriodBalance.party_id == party_id,
+                LedgerPeriodBalance.period == period)).one()
+    finally:
+        db.close()
+
+def test_closing_a_period_without_balances(accounts, refs):
+    # هنوز هیچ ردیف مانده‌ای تا این دوره نیست — دوره باز هم بسته و ثبت در آن ممنوع می‌شود
+    service = AccountingService()
+    assert service.close_period("1389-12") == 0
+    assert service.get_closed_through() == "1389-12"
+    with pytest.raises(ValueError, match="بسته"):
+        _entry(refs, accounts, "1389-12", 10)
+
+def test_posting_updates_snapshots_and_closing_freezes_them(accounts, refs):
+    service = AccountingService()
+    receivable, party = accounts["receivable"], accounts["party"]
+
+    _entry(refs, accounts, "1390-01", 1000)
+    _entry(refs, accounts, "1390-03", 500)
+    assert _snapshot(receivable, party, "1390-01") == (1000, 0, 1000, False)
+
+    # سند با تاریخ گذشته — مانده تجمعی دوره بعد هم جابه‌جا می‌شود
+    _entry(refs, accounts, "1390-02", -200)
+    assert _snapshot(receivable, party, "1390-02") == (0, 200, 800, False)
+    assert _snapshot(receivable, party, "1390-03")[2] == 1300
+
+    # سند پیش‌نویس — در مانده دوره‌ای نیست و مانع بستن دوره است
+    draft = _entry(refs, accounts, "1390-02", 100, posted=False)
+    assert _snapshot(receivable, party, "1390-02")[2] == 800
+    with pytest.raises(ValueError, match="پیش‌نویس"):
+        service.close_period("1390-02")
+    service.post_entry(draft.id)
+    assert _snapshot(receivable, party, "1390-03")[2] == 1400
+
+    assert service.close_period("1390-02") >= 2
+    assert service.get_closed_through() == "1390-02"
+    assert _snapshot(receivable, party, "1390-01")[3] and _snapshot(receivable, party, "1390-02")[3]
+    assert not _snapshot(receivable, party, "1390-03")[3]
+    with pytest.raises(ValueError, match="بسته"):
+        _entry(refs, accounts, "1390-02", 10)
+
+    # مانده‌ها: یک ردیف مانده دوره بسته + خطوط دوره‌های باز
+    assert service.account_balance(receivable, period_to="1390-02") == Decimal("900")
+    assert service.account_balance(receivable) == Decimal("1400")
+    march = {row["account_id"]: row for row in service.trial_balance("1390-03", "1390-03")["accounts"]}
+    assert (march[receivable]["opening"], march[receivable]["debit"], march[receivable]["closing"]) == (900, 500, 1400)
+    february = {row["account_id"]: row for row in service.trial_balance("1390-02", "1390-02")["accounts"]}
+    assert (february[receivable]["opening"], february[receivable]["debit"], february[receivable]["credit"]) == (1000, 100, 200)
+    parties = {row["party_id"]: row for row in service.trial_balance(None, "1390-03")["parties"]}
+    assert parties[party]["closing"] == 1400
+
+    # بستن دوره بدون گردش — مانده هر حساب به همان دوره منتقل می‌شود
+    service.close_period("1390-04")
+    assert _snapshot(receivable, party, "1390-04") == (0, 0, 1400, True)
+    assert service.account_balance(accounts["sales"]) == Decimal("-1400")
+
+def test_drafts_in_open_periods_are_not_counted(accounts, refs):
+    service = AccountingService()
+    receivable, party = accounts["receivable"], accounts["party"]
+    balance, net = service.account_balance(receivable), service.party_net_balance()
+
+    # پیش‌نویس در دوره باز — تراز قبل و بعد از بستن دوره یکسان می‌ماند
+    draft = _entry(refs, accounts, "1391-01", 700, posted=False)
+    assert service.account_balance(receivable) == balance
+    assert service.party_net_balance() == net
+    parties = {row["party_id"]: row for row in service.trial_balance(None, "1391-01")["parties"]}
+    assert parties[party]["closing"] == 1400
+
+    service.post_entry(draft.id)
+    assert service.account_balance(receivable) == balance + 700
+    assert service.party_net_balance() == net + 700
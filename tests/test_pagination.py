@@ -0,0 +1,55 @@
+# tests/test_pagination.py
+import uuid
+import pytest
+from app.database import SessionLocal, init_db
+from app.models.unit import Unit
+from app.models.item import Item
+from app.services.item_service import ItemService
+from app.services.stock_service import StockService
+from app.utils.code_generator import generate_unit_code
+
+@pytest.fixture(scope="module")
+def items():
+    init_db()
+    db = SessionLocal()
+    prefix = f"PG{uuid.uuid4().hex[:6]}"
+    unit = Unit(code=generate_unit_code(), name="کیلوگرم", factor_to_base=1.0)
+    db.add(unit)
+    db.commit()
+    # چند کالا با نام تکراری — ترتیب باید با id پایدار بماند
+    for i in range(23):
+        db.add(Item(sku=f"{prefix}-{i:03d}", name=f"{prefix} نام {i % 5}", unit_type="count",
+                    base_unit_id=unit.id, active=True))
+    db.commit()
+    yield prefix
+    db.close()
+
+def _all_pages(fetch_page, **kwargs):
+    rows, after, pages = [], None, 0
+    while True:
+        page, after = fetch_page(after=after, limit=5, **kwargs)
+        rows.extend(page)
+        pages += 1
+        if after is None:
+            return rows, pages
+
+def test_keyset_pages_cover_all_rows_in_order(items):
+    service = ItemService()
+    rows, pages = _all_pages(service.get_items_page, sort="name", search=items)
+
+    assert pages == 5
+    assert len(rows) == 23
+    assert len({r[0] for r in rows}) == 23
+    assert [(r[2], r[0]) for r in rows] == sorted((r[2], r[0]) for r in rows)
+    assert all(r[4] == "کیلوگرم" for r in rows)  # نام واحد — از همان کوئری
+
+def test_keyset_pages_descending(items):
+    rows, _ = _all_pages(ItemService().get_items_page, sort="sku", descending=True, search=items)
+    skus = [r[1] for r in rows]
+    assert skus == sorted(skus, reverse=True)
+
+def test_stock_page_rows(items):
+    rows, _ = _all_pages(StockService().get_stock_page, sort="qty", search=f"{items}-00")
+    assert len(rows) == 10
+    assert {r[3] for r in rows} == {"کیلوگرم"}
+    assert all(r[5] == 0 and r[6] is None for r in rows)
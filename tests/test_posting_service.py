@@ -0,0 +1,119 @@
+# tests/test_posting_service.py
+import pytest
+from datetime import date
+from sqlalchemy import func, select
+from app.database import SessionLocal, init_db
+from app.models.unit import Unit
+from app.models.item import Item
+from app.models.check import Check
+from app.models.invoice import Invoice
+from app.models.payment import Payment
+from app.models.bank_account import BankAccount
+from app.models.journal_entry import JournalEntry
+from app.models.journal_line import JournalLine
+from app.models.ledger_account import LedgerAccount
+from app.services.invoice_service import InvoiceService
+from app.services.posting_service import MAPPING_KEYS, PostingService
+from app.utils.code_generator import generate_sku, generate_unit_code
+
+# بازه‌ای که هیچ تست دیگری در آن سند ندارد
+DATE_FROM, DATE_TO = date(2027, 3, 1), date(2027, 3, 31)
+
+@pytest.fixture(scope="module")
+def mappings():
+    init_db()
+    db = SessionLocal()
+    accounts = {key: LedgerAccount(code=f"MAP-{key}", name=description, account_type="asset")
+                for key, description in MAPPING_KEYS.items()}
+    db.add_all(accounts.values())
+    db.commit()
+    ids = {key: account.id for key, account in accounts.items()}
+    db.close()
+    service = PostingService()
+    for key, account_id in ids.items():
+        service.set_mapping(key, account_id)
+    return ids
+
+@pytest.fixture(scope="module")
+def documents(mappings, refs):
+    db = SessionLocal()
+    unit = Unit(code=generate_unit_code(), name="عدد", factor_to_base=1.0)
+    db.add(unit)
+    db.commit()
+    item = Item(sku=generate_sku(), name="کالای ثبت سند", unit_type="count", base_unit_id=unit.id, active=True)
+    db.add(item)
+    db.commit()
+    line = {"item_id": item.id, "unit_id": unit.id}
+
+    service = InvoiceService()
+    header = {"serial": "INV", "number": 1, "party_id": refs.party_id, "date_jalali": "1405/12/11",
+              "created_by": refs.user_id, "discount": 0, "shipping": 0}
+    purchase = service.create_invoice(
+        {**header, "invoice_type": "purchase", "serial_full": f"POST-P-{item.id}", "date_gregorian": date(2027, 3, 2),
+         "tax": 900}, [{**line, "qty": 10, "unit_price": 1000}])
+    sale = service.create_invoice(
+        {**header, "invoice_type": "sale", "serial_full": f"POST-S-{item.id}", "date_gregorian": date(2027, 3, 3),
+         "tax": 1000}, [{**line, "qty": 4, "unit_price": 2500}])
+
+    payment = Payment(payment_type="receipt", party_id=refs.party_id, date=date(2027, 3, 4), amount=5000,
+                      method="cash", status="completed", created_by=refs.user_id)
+    check = Check(check_number=f"POST-{item.id}", bank_name="ملی", account_number="1", direction="received",
+                  amount=3000, issue_date=date(2027, 3, 5), due_date=date(2027, 3, 20), status="cleared",
+                  payer_party_id=refs.party_id, bank_account_id=refs.bank_account_id, created_by=refs.user_id)
+    db.add_all([payment, check])
+    db.commit()
+    ids = {"purchase": purchase.id, "sale": sale.id, "payment": payment.id, "check": check.id}
+    db.close()
+    return ids
+
+def _lines(db, source_type, source_id):
+    return db.execute(
+        select(JournalLine.ledger_account_id, JournalLine.debit, JournalLine.credit)
+        .join(JournalEntry, JournalEntry.id == JournalLine.journal_entry_id)
+        .where(JournalEntry.source_type == source_type, JournalEntry.source_id == source_id)
+        .order_by(JournalLine.id)
+    ).all()
+
+def test_post_range_builds_balanced_entries_once(mappings, documents, refs):
+    report = PostingService().post_range(DATE_FROM, DATE_TO, refs.user_id)
+    assert report.errors == []
+    assert report.posted == {"invoice": 2, "payment": 1, "check": 2}
+
+    db = SessionLocal()
+    try:
+        m = mappings
+        assert _lines(db, "invoice", documents["sale"]) == [
+            (m["receivable"], 11000, 0), (m["sales"], 0, 10000), (m["tax_payable"], 0, 1000),
+            (m["cogs"], 4000, 0), (m["inventory"], 0, 4000),
+        ]
+        assert _lines(db, "invoice", documents["purchase"]) == [
+            (m["inventory"], 10000, 0), (m["tax_receivable"], 900, 0), (m["payable"], 0, 10900),
+        ]
+        assert _lines(db, "payment", documents["payment"]) == [(m["cash"], 5000, 0), (m["receivable"], 0, 5000)]
+        bank = db.execute(select(BankAccount.ledger_account_id).where(BankAccount.id == refs.bank_account_id)).scalar()
+        assert _lines(db, "check_in_hand", documents["check"]) == [
+            (m["checks_receivable"], 3000, 0), (m["receivable"], 0, 3000)]
+        assert _lines(db, "check_cleared", documents["check"]) == [(bank, 3000, 0), (m["checks_receivable"], 0, 3000)]
+
+        entry = db.execute(select(JournalEntry).where(JournalEntry.source_type == "invoice",
+                                                      JournalEntry.source_id == documents["sale"])).scalar_one()
+        assert entry.posted and entry.period == "1405-12"
+        assert db.get(Invoice, documents["sale"]).status == "posted"
+    finally:
+        db.close()
+
+    # اجرای دوباره همان بازه — همه مدارک قبلاً ثبت شده‌اند
+    again = PostingService().post_range(DATE_FROM, DATE_TO, refs.user_id)
+    assert (again.posted, again.skipped, again.errors) == ({}, 5, [])
+
+    db = SessionLocal()
+    try:
+        count = db.execute(select(func.count()).select_from(JournalEntry).where(
+            JournalEntry.date.between(DATE_FROM, DATE_TO))).scalar()
+        assert count == 5
+    finally:
+        db.close()
+
+def test_unknown_mapping_key_is_rejected(mappings):
+    with pytest.raises(ValueError):
+        PostingService().set_mapping("no-such-role", mappings["cash"])
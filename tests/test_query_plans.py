@@ -0,0 +1,110 @@
+# tests/test_query_plans.py
+"""رگرسیون طرح اجرا — هیچ کوئری سرویس‌ها نباید روی جدول‌های پرحجم به پیمایش کامل جدول برسد"""
+import re
+import pytest
+from datetime import date
+from sqlalchemy import event, select
+from app.database import engine, unit_of_work, init_db
+from app.models.unit import Unit
+from app.models.item import Item
+from app.models.check import Check
+from app.models.journal_entry import JournalEntry
+from app.models.journal_line import JournalLine
+from app.services.stock_service import StockService
+from app.services.invoice_service import InvoiceService
+from app.services.cogs_service import COGSService
+from app.services.check_service import CheckService
+from app.services.dashboard_service import DashboardService
+from app.services.valuation_service import ValuationService
+from app.utils.code_generator import generate_sku, generate_unit_code
+
+# جدول‌هایی که با گذر زمان بزرگ می‌شوند
+HOT_TABLES = ("stock_movements", "journal_lines", "checks")
+
+# «SCAN <table>» بدون ایندکس — پیمایش کامل جدول (نام مستعار SQLAlchemy مثل stock_movements_1 هم)
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def _full_scans(statement, parameters=()):
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    scans = []
+    for row in plan:
+        match = FULL_SCAN.match(row[3])
+        if match and match.group(1).rstrip("_0123456789") in HOT_TABLES:
+            scans.append(row[3])
+    return scans
+
+
+@pytest.fixture
+def captured():
+    """دستورهای SELECT/UPDATE/DELETE اجراشده — همراه پارامترها، برای EXPLAIN"""
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", on_execute)
+
+
+def test_service_queries_use_indexes(refs, captured):
+    init_db()
+    with unit_of_work() as db:
+        unit = Unit(code=generate_unit_code(), name="عدد", factor_to_base=1.0)
+        db.add(unit)
+        db.flush()
+        item = Item(sku=generate_sku(), name="کالای طرح اجرا", unit_type="count", base_unit_id=unit.id, active=True)
+        db.add(item)
+        db.flush()
+        item_id, unit_id = item.id, unit.id
+
+    captured.clear()
+    stock, invoices = StockService(), InvoiceService()
+    stock.add_movement({"item_id": item_id, "qty": 10.0, "unit_id": unit_id, "movement_type": "purchase_in",
+                        "cost_per_unit": 1000, "reference_type": "manual", "reference_id": None})
+    header = {"serial": "INV", "number": 1, "party_id": refs.party_id, "date_gregorian": date(2025, 4, 5),
+              "date_jalali": "1404/01/16", "created_by": refs.user_id, "tax": 0, "discount": 0, "shipping": 0}
+    invoice = invoices.create_invoice({**header, "invoice_type": "sale", "serial_full": f"INV-PLAN-{item_id}"},
+                                      [{"item_id": item_id, "qty": 2.0, "unit_id": unit_id, "unit_price": 1500}])
+    invoices.update_invoice(invoice.id, {**header, "invoice_type": "sale"},
+                            [{"item_id": item_id, "qty": 3.0, "unit_id": unit_id, "unit_price": 1500}])
+    invoices.get_current_stock_without_invoice(item_id, invoice.id)
+    COGSService().calculate_cogs_for_invoice(invoice.id)
+    stock.get_stock_page(search="کالای طرح اجرا")
+    stock.get_movements_by_item(item_id)
+    invoices.delete_invoice(invoice.id)
+
+    CheckService().create_check({
+        "check_number": "PLAN-1", "bank_name": "ملی", "account_number": "1", "direction": "received",
+        "amount": 1000, "issue_date": date(2025, 1, 1), "due_date": date(2025, 2, 1),
+        "bank_account_id": refs.bank_account_id, "created_by": refs.user_id,
+    })
+    CheckService().get_checks_page()
+    DashboardService().get_summary()
+    ValuationService().close_period(2025, 4)
+    assert captured
+
+    offenders = {statement: scans for statement, parameters in captured
+                 if (scans := _full_scans(statement, parameters))}
+    assert offenders == {}
+
+
+def test_ledger_account_lines_use_index():
+    init_db()
+    stmt = select(JournalLine.journal_entry_id, JournalLine.debit, JournalLine.credit).where(
+        JournalLine.ledger_account_id == 1
+    )
+    compiled = stmt.compile(engine)
+    assert _full_scans(str(compiled), tuple(compiled.params.values())) == []
+
+
+def test_posted_party_balance_uses_index():
+    init_db()
+    stmt = select(JournalLine.debit, JournalLine.credit).join(
+        JournalEntry, JournalEntry.id == JournalLine.journal_entry_id
+    ).where(JournalLine.party_id.isnot(None), JournalEntry.posted.is_(True))
+    compiled = stmt.compile(engine)
+    assert _full_scans(str(compiled), tuple(compiled.params.values())) == []
@@ -0,0 +1,79 @@
+# tests/test_sequences.py
+import threading
+import pytest
+from datetime import date
+from app.database import SessionLocal, unit_of_work, init_db
+from app.models.document_sequence import DocumentSequence
+from app.models.unit import Unit
+from app.models.item import Item
+from app.services.invoice_service import InvoiceService
+from app.utils.sequences import SerialAllocator, bump_sequences, fiscal_year_of, reserve_numbers
+from app.utils.code_generator import generate_sku, generate_unit_code
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    init_db()
+
+def _next_number(prefix, fiscal_year):
+    with unit_of_work() as db:
+        return db.get(DocumentSequence, (prefix, fiscal_year)).next_number
+
+def test_sequential_numbers_per_fiscal_year():
+    allocator = SerialAllocator(block_size=1)
+    assert allocator.next_serial("SQA", date(2025, 4, 5)) == (1, "SQA-1404-0001")
+    assert allocator.next_serial("SQA", date(2025, 4, 6)) == (2, "SQA-1404-0002")
+    # سال مالی جدید از ۱ شروع می‌شود
+    assert allocator.next_serial("SQA", date(2026, 3, 25)) == (1, "SQA-1405-0001")
+    assert fiscal_year_of(date(2026, 3, 20)) == 1404
+
+def test_block_reservation():
+    pos1, pos2 = SerialAllocator(block_size=50), SerialAllocator(block_size=50)
+    assert [pos1.next_number("SQB", 1404) for _ in range(3)] == [1, 2, 3]
+    assert pos2.next_number("SQB", 1404) == 51
+    assert _next_number("SQB", 1404) == 101
+    assert pos1.next_number("SQB", 1404) == 4
+
+def test_concurrent_allocation_is_unique():
+    allocators = [SerialAllocator(block_size=size) for size in (1, 1, 5, 5)]
+    numbers, lock = [], threading.Lock()
+
+    def worker(allocator):
+        for _ in range(25):
+            number = allocator.next_number("SQC", 1404)
+            with lock:
+                numbers.append(number)
+
+    threads = [threading.Thread(target=worker, args=(a,)) for a in allocators]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(numbers) == len(set(numbers)) == 100
+
+def test_bump_sequences_after_import():
+    with unit_of_work() as db:
+        reserve_numbers(db, "SQD", 1404)
+        bump_sequences(db, {("SQD", 1404): 40, ("SQD", 1403): 7})
+    assert (_next_number("SQD", 1404), _next_number("SQD", 1403)) == (41, 8)
+    with unit_of_work() as db:
+        bump_sequences(db, {("SQD", 1404): 10})  # شمارنده عقب نمی‌رود
+    assert _next_number("SQD", 1404) == 41
+
+def test_create_invoice_allocates_serial(refs):
+    db = SessionLocal()
+    unit = Unit(code=generate_unit_code(), name="عدد", factor_to_base=1.0)
+    db.add(unit)
+    db.commit()
+    item = Item(sku=generate_sku(), name="کالای سریال", unit_type="count", base_unit_id=unit.id, active=True)
+    db.add(item)
+    db.commit()
+    item_id, unit_id = item.id, unit.id
+    db.close()
+
+    header = {"invoice_type": "purchase", "serial": "SQE", "party_id": refs.party_id,
+              "date_gregorian": date(2025, 4, 5), "date_jalali": "1404/01/16", "created_by": refs.user_id}
+    line = [{"item_id": item_id, "qty": 1.0, "unit_id": unit_id, "unit_price": 100}]
+    first = InvoiceService().create_invoice(dict(header), line)
+    second = InvoiceService().create_invoice(dict(header), line)
+    assert (first.number, first.serial_full) == (1, "SQE-1404-0001")
+    assert (second.number, second.serial_full) == (2, "SQE-1404-0002")
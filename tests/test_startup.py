@@ -0,0 +1,17 @@
+# tests/test_startup.py
+import os
+import sys
+import subprocess
+
+HEAVY_MODULES = ["jinja2", "transitions", "cryptography", "bcrypt", "openpyxl", "reportlab", "numpy"]
+VIEW_MODULES = ["app.ui.items.item_list", "app.ui.invoices.invoice_list", "app.ui.backup.backup_view"]
+
+def test_dashboard_import_defers_heavy_modules():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (
+        "import sys, app.ui.dashboard\n"
+        f"print([m for m in {HEAVY_MODULES + VIEW_MODULES!r} if m in sys.modules])\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,151 @@
+# tests/test_stock_balance.py
+import pytest
+from datetime import date
+from decimal import Decimal
+from app.database import SessionLocal, init_db
+from app.models.unit import Unit
+from app.models.item import Item
+from app.models.stock_movement import StockMovement
+from app.models.item_stock_balance import ItemStockBalance
+from app.services.stock_service import StockService
+from app.services.invoice_service import InvoiceService
+from app.utils.code_generator import generate_sku, generate_unit_code
+
+@pytest.fixture(scope="module")
+def db():
+    init_db()
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def item(db):
+    unit = Unit(code=generate_unit_code(), name="عدد", factor_to_base=1.0)
+    db.add(unit)
+    db.commit()
+    item = Item(sku=generate_sku(), name="کالای موجودی", unit_type="count", base_unit_id=unit.id, active=True)
+    db.add(item)
+    db.commit()
+    return item
+
+def _movement(item, qty, cost):
+    return {
+        "item_id": item.id, "qty": qty, "unit_id": item.base_unit_id,
+        "movement_type": "purchase_in" if qty > 0 else "sale_out",
+        "cost_per_unit": cost, "reference_type": "manual", "reference_id": None,
+    }
+
+def _mismatches_for(service, item):
+    return [m for m in service.verify_balances() if m["item_id"] == item.id]
+
+def test_add_movement_updates_balance(db, item):
+    service = StockService()
+    service.add_movement(_movement(item, 100.0, 5000))
+    m = service.add_movement(_movement(item, -30.0, 5000))
+
+    assert service.get_current_stock(item.id) == Decimal("70")
+    balance = db.get(ItemStockBalance, item.id)
+    db.refresh(balance)
+    assert balance.value_on_hand == 350000
+    assert balance.last_movement_id == m.id
+    assert _mismatches_for(service, item) == []
+
+def test_invoice_create_and_delete_keep_balance_in_sync(db, item, refs):
+    stock = StockService()
+    invoices = InvoiceService()
+    invoice = invoices.create_invoice({
+        "invoice_type": "purchase", "serial": "INV", "number": 1,
+        "serial_full": f"INV-BAL-{item.id}", "party_id": refs.party_id,
+        "date_gregorian": date(2025, 4, 5), "date_jalali": "1404/01/16",
+        "created_by": refs.user_id, "tax": 0, "discount": 0, "shipping": 0,
+    }, [
+        {"item_id": item.id, "qty": 10.0, "unit_id": item.base_unit_id, "unit_price": 1000},
+        {"item_id": item.id, "qty": 5.0, "unit_id": item.base_unit_id, "unit_price": 1000},
+    ])
+    assert stock.get_current_stock(item.id) == Decimal("15")
+
+    invoices.delete_invoice(invoice.id)
+    assert stock.get_current_stock(item.id) == Decimal("0")
+    assert _mismatches_for(stock, item) == []
+
+def test_verify_and_rebuild(db, item):
+    service = StockService()
+    service.add_movement(_movement(item, 20.0, 1000))
+
+    # تحرکی که مستقیم و بدون به‌روزرسانی موجودی درج شده است
+    db.add(StockMovement(item_id=item.id, qty=5.0, unit_id=item.base_unit_id, movement_type="adjustment",
+                         cost_per_unit=1000, total_cost=5000))
+    db.commit()
+
+    mismatch = _mismatches_for(service, item)
+    assert len(mismatch) == 1
+    assert mismatch[0]["expected_qty"] == Decimal("25")
+    assert mismatch[0]["actual_qty"] == Decimal("20")
+
+    service.rebuild_balances()
+    assert _mismatches_for(service, item) == []
+    assert service.get_current_stock(item.id) == Decimal("25")
+
+def _sale(refs, item, serial_full, lines):
+    return ({
+        "invoice_type": "sale", "serial": "INV", "number": 1,
+        "serial_full": serial_full, "party_id": refs.party_id,
+        "date_gregorian": date(2025, 4, 6), "date_jalali": "1404/01/17",
+        "created_by": refs.user_id, "tax": 0, "discount": 0, "shipping": 0,
+    }, [{"item_id": item.id, "qty": qty, "unit_id": item.base_unit_id, "unit_price": 2000} for qty in lines])
+
+def test_get_current_stock_bulk(db, item, refs):
+    service = StockService()
+    service.add_movement(_movement(item, 40.0, 1000))
+    invoice = InvoiceService().create_invoice(*_sale(refs, item, f"INV-BULK-{item.id}", [15.0]))
+
+    stock = service.get_current_stock_bulk([item.id, -1])
+    assert stock == {item.id: Decimal("25"), -1: Decimal("0")}
+    stock = service.get_current_stock_bulk([item.id], exclude_invoice_id=invoice.id)
+    assert stock[item.id] == Decimal("40")
+
+def test_sale_validation_aggregates_duplicate_lines(db, item, refs):
+    from sqlalchemy import event
+    from app.database import engine
+
+    StockService().add_movement(_movement(item, 10.0, 1000))
+    service = InvoiceService()
+
+    # هر خط به‌تنهایی مجاز است ولی جمع دو خط از موجودی بیشتر است
+    with pytest.raises(ValueError, match="موجودی کافی نیست"):
+        service.create_invoice(*_sale(refs, item, f"INV-DUP-{item.id}", [6.0, 6.0]))
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        invoice = service.create_invoice(*_sale(refs, item, f"INV-OK-{item.id}", [2.0] * 5))
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    # اعتبارسنجی موجودی — یک کوئری برای کل فاکتور (بارگذاری وضعیت بهای تمام‌شده جداست)
+    stock_reads = [s for s in statements if s.lstrip().startswith("SELECT") and "item_stock_balance" in s
+                   and "last_created_at" not in s]
+    assert len(stock_reads) == 1
+
+    # ویرایش: موجودی بدون تحرکات قبلی همین فاکتور سنجیده می‌شود
+    data, lines = _sale(refs, item, invoice.serial_full, [4.0, 6.0])
+    service.update_invoice(invoice.id, data, lines)
+    assert StockService().get_current_stock(item.id) == Decimal("0")
+
+def test_stock_overview_single_statement(db, item):
+    from app.utils.query_counter import count_queries
+    service = StockService()
+    service.add_movement(_movement(item, 10.0, 1000))
+    service.add_movement(_movement(item, 5.0, 1200))
+    service.add_movement(_movement(item, -3.0, 1100))
+
+    sku = item.sku
+    with count_queries() as counter:
+        rows = service.get_stock_overview(search=sku)
+    assert counter.count == 1
+    assert len(rows) == 1
+    item_id, row_sku, _, unit_name, unit_id, qty, last_cost = rows[0]
+    assert (item_id, row_sku, unit_name, unit_id) == (item.id, sku, "عدد", item.base_unit_id)
+    assert qty == Decimal("12")
+    assert last_cost == 1200
@@ -0,0 +1,121 @@
+# tests/test_stock_movement_costing.py
+import pytest
+from datetime import datetime, date
+from decimal import Decimal
+from app.database import SessionLocal, init_db
+from app.models.unit import Unit
+from app.models.item import Item
+from app.models.stock_movement import StockMovement
+from app.models.item_stock_balance import ItemStockBalance
+from app.models.invoice_line import InvoiceLine
+from app.services.stock_service import StockService
+from app.services.invoice_service import InvoiceService
+from app.services.cogs_service import COGSService
+from app.utils import cost_engine
+from app.utils.code_generator import generate_sku, generate_unit_code
+
+@pytest.fixture(scope="module")
+def db():
+    init_db()
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def item(db):
+    unit = Unit(code=generate_unit_code(), name="عدد", factor_to_base=1.0)
+    db.add(unit)
+    db.commit()
+    item = Item(sku=generate_sku(), name="کالای بهای تمام‌شده", unit_type="count", base_unit_id=unit.id, active=True)
+    db.add(item)
+    db.commit()
+    return item
+
+def _movement(item, qty, cost, created_at):
+    return {
+        "item_id": item.id, "qty": qty, "unit_id": item.base_unit_id,
+        "movement_type": "purchase_in" if qty > 0 else "sale_out",
+        "cost_per_unit": cost, "reference_type": "manual", "reference_id": None,
+        "created_at": created_at,
+    }
+
+def _value_on_hand(db, item):
+    balance = db.get(ItemStockBalance, item.id)
+    db.refresh(balance)
+    return balance.value_on_hand
+
+def _mismatches_for(service, item):
+    return [m for m in service.verify_balances() if m["item_id"] == item.id]
+
+def test_moving_average_sale_cost(db, item):
+    service = StockService()
+    service.add_movement(_movement(item, 10.0, 100, datetime(2024, 1, 1)))
+    service.add_movement(_movement(item, 10.0, 200, datetime(2024, 1, 2)))
+    sale = service.add_movement(_movement(item, -5.0, 0, datetime(2024, 1, 3)))
+
+    assert sale.total_cost == -750
+    assert sale.cost_per_unit == 150
+    assert _value_on_hand(db, item) == 2250
+    assert _mismatches_for(service, item) == []
+
+def test_backdated_movement_replays_later_costs(db, item):
+    service = StockService()
+    service.add_movement(_movement(item, 10.0, 100, datetime(2024, 2, 1)))
+    sale = service.add_movement(_movement(item, -5.0, 0, datetime(2024, 2, 3)))
+    assert sale.total_cost == -500
+
+    # خرید با تاریخ قبل از فروش — بهای فروش باید دوباره محاسبه شود
+    service.add_movement(_movement(item, 10.0, 400, datetime(2024, 2, 2)))
+    db.expire_all()
+    sale = db.get(StockMovement, sale.id)
+    assert sale.total_cost == -1250
+    assert _value_on_hand(db, item) == 3750
+    assert _mismatches_for(service, item) == []
+
+def test_second_backdated_movement_is_detected(db, item):
+    service = StockService()
+    service.add_movement(_movement(item, 10.0, 100, datetime(2024, 4, 2)))
+    sale = service.add_movement(_movement(item, -5.0, 0, datetime(2024, 4, 10)))
+    # اولین تحرک عقب‌افتاده — بزرگ‌ترین id حالا تاریخ ۱ آوریل دارد
+    service.add_movement(_movement(item, 10.0, 200, datetime(2024, 4, 1)))
+    # دومین تحرک عقب‌افتاده (قبل از فروش، بعد از بزرگ‌ترین id) — باید باز هم بازپردازش شود
+    service.add_movement(_movement(item, 10.0, 400, datetime(2024, 4, 5)))
+    db.expire_all()
+    sale = db.get(StockMovement, sale.id)
+    assert sale.total_cost == -1167  # 5 × (2000 + 1000 + 4000) / 30
+    assert cost_engine.replay_costs(db, [item.id]) == 0
+    db.rollback()
+    assert _mismatches_for(service, item) == []
+
+def test_fifo_consumes_oldest_layers(db, item, monkeypatch):
+    monkeypatch.setattr(cost_engine, "COSTING_METHOD", cost_engine.FIFO)
+    service = StockService()
+    service.add_movement(_movement(item, 10.0, 100, datetime(2024, 3, 1)))
+    service.add_movement(_movement(item, 10.0, 200, datetime(2024, 3, 2)))
+    sale = service.add_movement(_movement(item, -15.0, 0, datetime(2024, 3, 3)))
+
+    assert sale.total_cost == -2000
+    assert _value_on_hand(db, item) == 1000
+    assert _mismatches_for(service, item) == []
+
+def test_invoice_cogs_from_movements(db, item, refs):
+    invoices = InvoiceService()
+    base = {
+        "serial": "INV", "number": 1, "party_id": refs.party_id,
+        "date_gregorian": date(2025, 4, 5), "date_jalali": "1404/01/16",
+        "created_by": refs.user_id, "tax": 0, "discount": 0, "shipping": 0,
+    }
+    invoices.create_invoice({**base, "invoice_type": "purchase", "serial_full": f"INV-COGS-P-{item.id}"}, [
+        {"item_id": item.id, "qty": 4.0, "unit_id": item.base_unit_id, "unit_price": 300},
+    ])
+    sale = invoices.create_invoice({**base, "invoice_type": "sale", "serial_full": f"INV-COGS-S-{item.id}"}, [
+        {"item_id": item.id, "qty": 1.0, "unit_id": item.base_unit_id, "unit_price": 900},
+        {"item_id": item.id, "qty": 2.0, "unit_id": item.base_unit_id, "unit_price": 900},
+    ])
+
+    cogs = COGSService()
+    report = cogs.calculate_cogs_for_invoice(sale.id)
+    assert report["total"] == 900
+    assert report["items"][item.id]["qty"] == Decimal("3")
+    line = db.query(InvoiceLine).filter(InvoiceLine.invoice_id == sale.id, InvoiceLine.qty == 2.0).one()
+    assert cogs.calculate_cogs_for_invoice_line(line.id) == 600
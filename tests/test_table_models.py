@@ -0,0 +1,85 @@
+# tests/test_table_models.py
+import pytest
+from datetime import date
+from app.database import SessionLocal, init_db
+from app.models.unit import Unit
+from app.models.item import Item
+from app.models.party import Party
+from app.models.check import Check
+from app.services.item_service import ItemService
+from app.services.check_service import CheckService
+from app.utils.query_counter import count_queries
+from app.utils.code_generator import generate_sku, generate_unit_code
+
+pytest.importorskip("PySide6")
+from app.ui.items.item_list import ItemTableModel
+from app.ui.checks.check_list import CheckTableModel
+
+@pytest.fixture(scope="module")
+def db():
+    init_db()
+    session = SessionLocal()
+    yield session
+    session.close()
+
+def _repaint(model):
+    """خواندن تمام خانه‌ها — همان کاری که نما هنگام رندر انجام می‌دهد"""
+    return [model.data(model.index(r, c)) for r in range(model.rowCount()) for c in range(model.columnCount())]
+
+def test_item_model_repaint_runs_no_queries(db):
+    unit = Unit(code=generate_unit_code(), name="متر", factor_to_base=1.0)
+    db.add(unit)
+    db.commit()
+    for _ in range(3):
+        db.add(Item(sku=generate_sku(), name="کالای رندر", unit_type="count", base_unit_id=unit.id, active=True))
+    db.commit()
+
+    model = ItemTableModel(ItemService().get_items_page, sort="sku")
+    model.set_search("کالای رندر")
+    with count_queries() as counter:
+        cells = _repaint(model)
+    assert counter.count == 0
+    assert "متر" in cells
+
+def test_check_model_shows_party_names_without_queries(db, refs):
+    payer = Party(code="CHK-PAYER", name="پرداخت‌کننده تست", party_type="customer")
+    db.add(payer)
+    db.commit()
+    db.add(Check(check_number="RND-0001", bank_name="ملی", account_number="1", direction="received",
+                 amount=1000, issue_date=date(2025, 1, 1), due_date=date(2025, 2, 1),
+                 payer_party_id=payer.id, bank_account_id=refs.bank_account_id, created_by=refs.user_id))
+    db.commit()
+
+    model = CheckTableModel(CheckService().get_checks_page, sort="due_date", descending=True)
+    model.set_search("RND-0001")
+    with count_queries() as counter:
+        cells = _repaint(model)
+    assert counter.count == 0
+    assert "پرداخت‌کننده تست" in cells
+
+def test_background_fetch_ignores_stale_results(db):
+    from PySide6.QtCore import QCoreApplication, QThreadPool
+    from app.ui.workers import service_call
+    app = QCoreApplication.instance() or QCoreApplication([])
+    unit = Unit(code=generate_unit_code(), name="عدد", factor_to_base=1.0)
+    db.add(unit)
+    db.commit()
+    for _ in range(4):
+        db.add(Item(sku=generate_sku(), name="کالای پس‌زمینه", unit_type="count", base_unit_id=unit.id, active=True))
+    db.commit()
+
+    pool = QThreadPool()
+    model = ItemTableModel(service_call(ItemService, "get_items_page"), sort="sku", thread_pool=pool)
+    model.set_search("کالای پس‌زمینه")
+    assert model.loading and model.rowCount() == 0
+    model.set_search("بدون-نتیجه")  # فیلتر عوض شد — نتیجه جستجوی قبلی نباید برسد
+
+    pool.waitForDone()
+    app.processEvents()
+    assert not model.loading
+    assert model.rowCount() == 0
+
+    model.set_search("کالای پس‌زمینه")
+    pool.waitForDone()
+    app.processEvents()
+    assert model.rowCount() == 4
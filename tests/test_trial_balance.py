@@ -0,0 +1,110 @@
+# tests/test_trial_balance.py
+import pytest
+from datetime import date
+from decimal import Decimal
+from app.database import SessionLocal, init_db
+from app.models.ledger_account import LedgerAccount
+from app.models.party import Party
+from app.services.accounting_service import AccountingService
+from app.services.dashboard_service import DashboardService
+
+@pytest.fixture(scope="module")
+def db():
+    init_db()
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture(scope="module")
+def chart(db):
+    """درخت حساب‌ها: دارایی ← جاری ← (صندوق، دریافتنی) ؛ درآمد ← فروش"""
+    def add(code, name, account_type, parent=None):
+        account = LedgerAccount(code=code, name=name, account_type=account_type,
+                                parent_id=parent.id if parent else None)
+        db.add(account)
+        db.flush()
+        return account
+
+    assets = add("TB1", "دارایی", "asset")
+    current = add("TB1.1", "دارایی جاری", "asset", assets)
+    cash = add("TB1.1.1", "صندوق", "asset", current)
+    receivable = add("TB1.1.2", "حساب‌های دریافتنی", "asset", current)
+    income = add("TB4", "درآمد", "income")
+    sales = add("TB4.1", "فروش", "income", income)
+    party = Party(code="TB-PARTY", name="مشتری تراز", party_type="customer")
+    db.add(party)
+    db.commit()
+    return {name: a.id for name, a in (("assets", assets), ("current", current), ("cash", cash),
+                                       ("receivable", receivable), ("income", income), ("sales", sales))} | {
+        "party": party.id}
+
+def _entry(refs, period, lines):
+    year, month = map(int, period.split("-"))
+    return AccountingService().create_journal_entry(
+        {"date": date(year, month, 1), "period": period, "description": "تست تراز",
+         "source_type": "adjustment", "source_id": 0, "created_by": refs.user_id, "posted": True},
+        lines,
+    )
+
+def test_paths_are_materialized(db, chart):
+    cash = db.get(LedgerAccount, chart["cash"])
+    assert cash.path == f"/{chart['assets']}/{chart['current']}/{chart['cash']}/"
+    assert cash.level == 3
+
+def test_trial_balance_rolls_up_the_tree(chart, refs):
+    _entry(refs, "2031-01", [
+        {"ledger_account_id": chart["receivable"], "debit": 1000, "credit": 0, "party_id": chart["party"]},
+        {"ledger_account_id": chart["sales"], "debit": 0, "credit": 1000},
+    ])
+    _entry(refs, "2031-02", [
+        {"ledger_account_id": chart["cash"], "debit": 600, "credit": 0},
+        {"ledger_account_id": chart["receivable"], "debit": 0, "credit": 600, "party_id": chart["party"]},
+    ])
+
+    result = AccountingService().trial_balance("2031-02", "2031-02")
+    rows = {row["account_id"]: row for row in result["accounts"]}
+
+    assert (rows[chart["receivable"]]["opening"], rows[chart["receivable"]]["credit"],
+            rows[chart["receivable"]]["closing"]) == (1000, 600, 400)
+    # جمع حساب‌های فرزند در حساب‌های والد
+    assert (rows[chart["current"]]["opening"], rows[chart["current"]]["debit"],
+            rows[chart["current"]]["credit"], rows[chart["current"]]["closing"]) == (1000, 600, 600, 1000)
+    assert rows[chart["assets"]]["closing"] == rows[chart["current"]]["closing"]
+    assert rows[chart["income"]]["closing"] == -1000
+    assert rows[chart["assets"]]["level"] == 1 and rows[chart["cash"]]["level"] == 3
+
+    parties = {row["party_id"]: row for row in result["parties"]}
+    assert (parties[chart["party"]]["opening"], parties[chart["party"]]["closing"]) == (1000, 400)
+
+    # دوره تا ۲۰۳۱-۰۱ — ثبت ماه بعد دیده نمی‌شود
+    january = {row["account_id"]: row for row in AccountingService().trial_balance(None, "2031-01")["accounts"]}
+    assert january[chart["receivable"]]["closing"] == 1000 and chart["cash"] not in january
+
+    # کل دفتر تراز است
+    full = AccountingService().trial_balance()
+    assert full["total_debit"] == full["total_credit"]
+
+    service = AccountingService()
+    assert service.account_balance(chart["current"]) == Decimal("1000")
+    assert service.account_balance(chart["current"], include_children=False) == 0
+    assert service.account_balance(chart["receivable"], period_to="2031-01") == Decimal("1000")
+    assert DashboardService().get_total_receivable_payable() == int(service.party_net_balance())
+
+def test_moving_an_account_updates_descendant_paths(db, chart):
+    current = db.get(LedgerAccount, chart["current"])
+    current.parent_id = chart["income"]
+    db.commit()
+    db.expire_all()
+    cash = db.get(LedgerAccount, chart["cash"])
+    assert cash.path == f"/{chart['income']}/{chart['current']}/{chart['cash']}/"
+
+    # حلقه در درخت — درآمد زیر صندوق که خودش زیرمجموعه درآمد است
+    income = db.get(LedgerAccount, chart["income"])
+    income.parent_id = chart["cash"]
+    with pytest.raises(ValueError):
+        db.commit()
+    db.rollback()
+
+    current = db.get(LedgerAccount, chart["current"])
+    current.parent_id = chart["assets"]
+    db.commit()
@@ -0,0 +1,84 @@
+# tests/test_valuation_service.py
+import pytest
+from datetime import datetime
+from app.database import SessionLocal, init_db
+from app.models.unit import Unit
+from app.models.item import Item
+from app.models.stock_movement import StockMovement
+from app.models.stock_val_period import StockValPeriod
+from app.services.valuation_service import ValuationService
+from app.utils.code_generator import generate_sku, generate_unit_code
+
+@pytest.fixture(scope="module")
+def db():
+    init_db()
+    session = SessionLocal()
+    yield session
+    session.close()
+
+def _add(db, item, qty, cost, when):
+    db.add(StockMovement(item_id=item.id, qty=qty, unit_id=item.base_unit_id,
+                         movement_type="purchase_in" if qty > 0 else "sale_out",
+                         cost_per_unit=cost, total_cost=int(qty * cost), created_at=when))
+
+def _valuation(db, item, period):
+    db.expire_all()
+    return db.query(StockValPeriod).filter(StockValPeriod.item_id == item.id,
+                                           StockValPeriod.period == period).one()
+
+def test_close_period_carries_opening_balance_forward(db):
+    unit = Unit(code=generate_unit_code(), name="عدد", factor_to_base=1.0)
+    db.add(unit)
+    db.commit()
+    item = Item(sku=generate_sku(), name="کالای ارزش‌گذاری", unit_type="count", base_unit_id=unit.id, active=True)
+    db.add(item)
+    db.commit()
+
+    _add(db, item, 10, 100, datetime(2023, 1, 5))
+    _add(db, item, 10, 200, datetime(2023, 1, 10))
+    _add(db, item, -5, 999, datetime(2023, 1, 20))   # بهای خروجی در میانگین اثری ندارد
+    _add(db, item, 5, 310, datetime(2023, 2, 3))
+    _add(db, item, -10, 999, datetime(2023, 2, 28, 23, 59))
+    db.commit()
+
+    service = ValuationService()
+    report = service.close_period(2023, 1)
+    assert report["period"] == "2023-01"
+    assert report["movements"] >= 3
+    jan = _valuation(db, item, "2023-01")
+    assert (jan.avg_cost, float(jan.total_qty), jan.total_value) == (150, 15.0, 2250)
+
+    report = service.close_period(2023, 2)
+    feb = _valuation(db, item, "2023-02")
+    # (2250 + 1550) / (15 + 5) = 190
+    assert (feb.avg_cost, float(feb.total_qty), feb.total_value) == (190, 10.0, 1900)
+    assert report["inserted"] >= 1
+
+    # اجرای مجدد — ردیف‌های موجود به‌روزرسانی می‌شوند نه تکرار
+    report = service.close_period(2023, 2)
+    assert report["inserted"] == 0 and report["updated"] >= 1
+    assert db.query(StockValPeriod).filter(StockValPeriod.item_id == item.id).count() == 2
+
+def test_skipped_month_keeps_opening_balance(db):
+    unit = Unit(code=generate_unit_code(), name="عدد", factor_to_base=1.0)
+    db.add(unit)
+    db.commit()
+    item = Item(sku=generate_sku(), name="کالای ماه جاافتاده", unit_type="count", base_unit_id=unit.id, active=True)
+    db.add(item)
+    db.commit()
+
+    _add(db, item, 10, 100, datetime(2022, 3, 5))
+    _add(db, item, 10, 300, datetime(2022, 4, 10))   # ماه ۴ بسته نمی‌شود
+    _add(db, item, -5, 999, datetime(2022, 4, 20))
+    _add(db, item, 5, 400, datetime(2022, 5, 3))
+    _add(db, item, -10, 999, datetime(2022, 5, 25))
+    db.commit()
+
+    service = ValuationService()
+    service.close_period(2022, 3)
+    report = service.close_period(2022, 5)
+    assert report["opening_period"] == "2022-03"
+    assert report["gap_movements"] >= 2
+    may = _valuation(db, item, "2022-05")
+    # ابتدا: (1000 + 3000) / 20 = 200 → 15 × 200 = 3000؛ سپس (3000 + 2000) / 20 = 250
+    assert (may.avg_cost, float(may.total_qty), may.total_value) == (250, 10.0, 2500)